@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Benchmark del KDE por binning lineal + FFT (core.density).
+
+Compara, para varios tamaños y grupos, el KDE por FFT con la evaluación directa del
+núcleo en cada nodo de la rejilla (O(n·g), sólo hasta --naive-max puntos) y muestra
+el error máximo entre ambos.
+
+Uso:
+    python benchmarks/bench_density.py --sizes 10k,1M,10M --groups 4
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+# Agregar el directorio del proyecto al path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chart_maker.core.density import GRID_SIZE, bandwidth, kde
+
+
+def parse_size(text: str) -> int:
+    text = text.strip().lower()
+    factor = {'k': 1_000, 'm': 1_000_000}.get(text[-1], 1)
+    return int(float(text.rstrip('km')) * factor)
+
+
+def naive_kde(values: np.ndarray, grid: np.ndarray, width: float) -> np.ndarray:
+    density = np.zeros_like(grid)
+    for start in range(0, len(values), 10_000):
+        chunk = values[start:start + 10_000]
+        density += np.exp(-0.5 * ((grid[:, None] - chunk[None, :]) / width) ** 2).sum(axis=1)
+    return density / (len(values) * width * np.sqrt(2 * np.pi))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="KDE por FFT frente a evaluación directa")
+    parser.add_argument('--sizes', default='10k,1M,10M', help="Tamaños separados por comas (10k, 1M...)")
+    parser.add_argument('--groups', type=int, default=4, help="Grupos (campo de color)")
+    parser.add_argument('--method', default='scott', help="scott, silverman o un número")
+    parser.add_argument('--grid', type=int, default=GRID_SIZE, help="Nodos de la rejilla")
+    parser.add_argument('--naive-max', type=int, default=1_000_000, help="Máximo de puntos para el cálculo directo")
+    args = parser.parse_args(argv)
+    method = args.method if args.method in ('scott', 'silverman') else float(args.method)
+    rng = np.random.default_rng(0)
+
+    print(f"{'n':>12} {'fft (ms)':>10} {'directo (ms)':>13} {'error máx':>10}")
+    for n in map(parse_size, args.sizes.split(',')):
+        codes = rng.integers(0, args.groups, n)
+        values = rng.normal(codes * 3.0, 1.0 + codes * 0.5)
+        start = time.perf_counter()
+        grid, densities = kde(values, codes, args.groups, method=method, grid_size=args.grid)
+        fft_ms = (time.perf_counter() - start) * 1000
+
+        naive_ms, error = float('nan'), float('nan')
+        if n <= args.naive_max:
+            single = values[codes == 0]
+            grid, fft = kde(single, method=method, grid_size=args.grid)
+            start = time.perf_counter()
+            direct = naive_kde(single, grid, bandwidth(single, method))
+            naive_ms = (time.perf_counter() - start) * 1000
+            error = float(np.abs(direct - fft[0]).max() / direct.max())
+        print(f"{n:>12,} {fft_ms:>10.1f} {naive_ms:>13.1f} {error:>10.2e}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Benchmark del modelo tipado del encoding (core.encoding).
+
+Compara, para muchos specs con muchos canales (capas) sobre los mismos campos:
+  - memoria: encodings como dicts de dicts frente a FieldDef con __slots__
+  - mapeo: _map_encoding sobre dicts (parsea en cada llamada) frente a un Encoding
+    ya parseado en la validación
+
+Uso:
+    python benchmarks/bench_encoding.py --specs 2000 --channels 40
+"""
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+# Agregar el directorio del proyecto al path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chart_maker.core.encoding import parse_encoding
+from chart_maker.core.vegalite_mapper import _map_encoding
+
+TYPES = ['quantitative', 'nominal', 'temporal', 'ordinal']
+CHANNELS = ['x', 'y', 'x2', 'y2', 'color', 'size', 'shape']
+
+
+def make_encoding(channels: int) -> dict:
+    # Cada spec construye sus dicts (como al leerlos de JSON): nombres de campo no compartidos
+    return {
+        (CHANNELS[i] if i < len(CHANNELS) else f'capa{i}'): {
+            'field': ''.join(['campo_', str(i % 12)]),
+            'type': TYPES[i % len(TYPES)],
+            **({'aggregate': 'sum'} if i % 3 == 0 else {}),
+        }
+        for i in range(channels)
+    }
+
+
+def measure_memory(build):
+    tracemalloc.start()
+    objects = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return objects, current
+
+
+def compact(encoding):
+    """Sólo los FieldDef: lo que se mantiene vivo si el dict original se descarta."""
+    return parse_encoding(encoding).fields
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Encoding en dicts frente a FieldDef tipados")
+    parser.add_argument('--specs', type=int, default=2000, help="Número de specs")
+    parser.add_argument('--channels', type=int, default=40, help="Canales (capas) por spec")
+    parser.add_argument('--repeat', type=int, default=5, help="Repeticiones del mapeo")
+    args = parser.parse_args(argv)
+
+    raw, raw_bytes = measure_memory(lambda: [make_encoding(args.channels) for _ in range(args.specs)])
+    _, typed_bytes = measure_memory(lambda: [compact(make_encoding(args.channels)) for _ in range(args.specs)])
+    parsed = [parse_encoding(e) for e in raw]
+
+    def map_all(encodings):
+        best = float('inf')
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            for encoding in encodings:
+                _map_encoding('lineas', encoding)
+            best = min(best, time.perf_counter() - start)
+        return best
+
+    dict_seconds = map_all(raw)
+    typed_seconds = map_all(parsed)
+    start = time.perf_counter()
+    for encoding in raw:
+        parse_encoding(encoding)
+    parse_seconds = time.perf_counter() - start
+
+    print(f"{args.specs} specs × {args.channels} canales")
+    print(f"memoria  dicts: {raw_bytes / 1024:10.0f} KB   FieldDef: {typed_bytes / 1024:10.0f} KB "
+          f"({typed_bytes / raw_bytes:.0%})")
+    print(f"mapeo    dicts: {dict_seconds * 1000:10.1f} ms   parseado: {typed_seconds * 1000:10.1f} ms "
+          f"({dict_seconds / typed_seconds:.1f}x)")
+    print(f"parseo una vez (validación): {parse_seconds * 1000:.1f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
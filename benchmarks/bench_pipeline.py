@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+Benchmarks del pipeline completo de ChartSpec.
+
+Mide, para cada tipo de gráfico de CHART_TYPES y cada tamaño de datos:
+validación de ChartSpec, chartspec_to_vegalite, generación del HTML de vista
+previa y cada exportador de list_exporters(); y por tamaño, la carga de CSV/JSON.
+Los datos se generan con core.synthetic a partir del ejemplo de cada tipo.
+
+Cada repetición vacía antes las cachés de precálculo, así que 'results' son tiempos en
+frío; las etapas que precalculan (vegalite, export) guardan además en 'warm' el tiempo
+con la caché ya llena (la vista previa al cambiar sólo el título).
+
+Uso:
+    python benchmarks/bench_pipeline.py --sizes 1k,100k --output benchmarks/baseline.json
+    python benchmarks/bench_pipeline.py --sizes 1k,100k --compare benchmarks/baseline.json
+    python benchmarks/bench_pipeline.py --sizes 1k,100k,1M,10M --types barras_vertical,lineas
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+# Agregar el directorio del proyecto al path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chart_maker.core import spatial, timeseries, tracing, transforms
+from chart_maker.core.chart_types import CHART_TYPES
+from chart_maker.core.data_io import read_csv_rows, read_json_rows
+from chart_maker.core.spec import ChartSpec
+from chart_maker.core.synthetic import generate_columns, generate_records, template_for, write_columns
+from chart_maker.core.vegalite_mapper import chartspec_to_vegalite
+from chart_maker.exporters import get_exporter, list_exporters
+
+DEFAULT_SIZES = '1k,100k'
+DEFAULT_REPEAT = 3
+DEFAULT_THRESHOLD = 0.20
+
+# Extensión del archivo de salida de cada exportador (como en MainWindow.export_to_platform)
+EXPORT_EXTENSIONS = {
+    'powerbi_python': '.pbiviz',
+    'tableau': '.twb',
+    'looker': '.lkml',
+    'looker_studio': '.json',
+}
+
+STAGES = ['validate', 'vegalite', 'preview_html', 'export', 'load']
+
+
+def parse_size(text: str) -> int:
+    """Convierte '1k', '100k', '1M', '10M' o '2500' a número de filas."""
+    text = text.strip()
+    multipliers = {'k': 1_000, 'K': 1_000, 'm': 1_000_000, 'M': 1_000_000}
+    if text and text[-1] in multipliers:
+        return int(float(text[:-1]) * multipliers[text[-1]])
+    return int(text)
+
+
+def base_spec(chart_type: str, size: int) -> dict:
+    """Spec del tipo de gráfico con 'size' filas sintéticas generadas a partir de su ejemplo."""
+    template = template_for(chart_type)
+    return {
+        'type': chart_type,
+        'title': f'Benchmark {chart_type}',
+        'data': generate_records(chart_type, size),
+        'encoding': template['encoding'],
+    }
+
+
+# Cachés de precálculo (resultados, hashes de datos, índices espaciales, fechas parseadas)
+CACHES = (transforms.CACHE, transforms.DATA_HASHES, spatial.INDEX_CACHE, timeseries.PARSED_CACHE)
+
+
+def clear_caches():
+    """Vacía las cachés de precálculo para medir el cálculo en frío."""
+    for cache in CACHES:
+        cache.clear()
+
+
+def measure(func, repeat: int, setup=None) -> float:
+    """Mejor tiempo (s) de 'repeat' ejecuciones de func; setup (sin medir) antes de cada una."""
+    best = float('inf')
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        gc.collect()
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def make_preview_widget():
+    """Widget de vista previa sin pantalla (None si PySide6 no está disponible)."""
+    try:
+        os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+        from PySide6.QtWidgets import QApplication
+        from chart_maker.app.ui.preview_web_view_local import PreviewWebView
+    except ImportError:
+        return None
+    app = QApplication.instance() or QApplication([])
+    widget = PreviewWebView()
+    widget._app = app
+    return widget
+
+
+def run(sizes, chart_types, stages, repeat, work_dir):
+    results = {}
+    warm = {}
+    errors = {}
+    preview = make_preview_widget() if 'preview_html' in stages else None
+    if 'preview_html' in stages and preview is None:
+        print("⚠️ PySide6 no disponible: se omite preview_html")
+
+    def record(key, func, cached=False):
+        try:
+            results[key] = measure(func, repeat, setup=clear_caches)
+            if cached:
+                func()
+                warm[key] = measure(func, repeat)
+        except Exception as e:
+            errors[key] = f"{type(e).__name__}: {e}"
+
+    for size in sizes:
+        print(f"\n📏 {size:,} filas")
+        for chart_type in chart_types:
+            spec = base_spec(chart_type, size)
+
+            if 'validate' in stages:
+                record(f"validate|{chart_type}|{size}", lambda: ChartSpec(**spec))
+            if 'vegalite' in stages:
+                record(f"vegalite|{chart_type}|{size}", lambda: chartspec_to_vegalite(spec), cached=True)
+            if preview is not None:
+                vega_spec = chartspec_to_vegalite(spec)
+                record(f"preview_html|{chart_type}|{size}", lambda: preview.generate_preview_html(vega_spec))
+            if 'export' in stages:
+                chart_spec = ChartSpec(**spec)
+                for name in list_exporters():
+                    exporter = get_exporter(name)
+                    path = os.path.join(work_dir, f"{chart_type}_{size}{EXPORT_EXTENSIONS.get(name, '.out')}")
+                    record(f"export:{name}|{chart_type}|{size}", lambda: exporter.export(chart_spec, path), cached=True)
+            print(f"  ✅ {chart_type}")
+
+        if 'load' in stages:
+            columns = generate_columns('barras_vertical', size)
+            csv_path = os.path.join(work_dir, f"datos_{size}.csv")
+            json_path = os.path.join(work_dir, f"datos_{size}.json")
+            write_columns(columns, csv_path, 'csv')
+            write_columns(columns, json_path, 'json')
+            del columns
+            record(f"load_csv|*|{size}", lambda: read_csv_rows(csv_path))
+            record(f"load_json|*|{size}", lambda: read_json_rows(json_path))
+
+    return results, warm, errors
+
+
+def compare(results, baseline, threshold):
+    """Devuelve las regresiones (clave, antes, ahora, ratio) por encima del umbral."""
+    regressions = []
+    for key, seconds in sorted(results.items()):
+        before = baseline.get(key)
+        if not before:
+            continue
+        ratio = seconds / before
+        if ratio > 1 + threshold:
+            regressions.append((key, before, seconds, ratio))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks del pipeline de ChartSpec")
+    parser.add_argument('--sizes', default=DEFAULT_SIZES,
+                        help="Tamaños de datos separados por comas (1k,100k,1M,10M)")
+    parser.add_argument('--types', default='',
+                        help="Tipos de gráfico separados por comas (por defecto, todos los de CHART_TYPES)")
+    parser.add_argument('--stages', default=','.join(STAGES),
+                        help=f"Etapas a medir: {','.join(STAGES)}")
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT,
+                        help="Repeticiones por medida (se guarda el mejor tiempo)")
+    parser.add_argument('--output', help="Archivo JSON donde guardar los resultados (línea base)")
+    parser.add_argument('--compare', help="Línea base JSON con la que comparar")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help="Regresión tolerada como fracción (0.20 = 20%%)")
+    parser.add_argument('--trace', metavar='RUTA',
+                        help="Guardar una traza Chrome trace-event de las etapas medidas")
+    args = parser.parse_args(argv)
+    if args.trace:
+        tracing.enable(args.trace)
+
+    sizes = [parse_size(s) for s in args.sizes.split(',') if s.strip()]
+    chart_types = [t for t in args.types.split(',') if t] or list(dict.fromkeys(CHART_TYPES))
+    unknown = [t for t in chart_types if t not in CHART_TYPES]
+    if unknown:
+        parser.error(f"Tipos de gráfico no soportados: {unknown}")
+    stages = [s for s in args.stages.split(',') if s]
+
+    work_dir = tempfile.mkdtemp(prefix='chart_maker_bench_')
+    try:
+        results, warm, errors = run(sizes, chart_types, stages, args.repeat, work_dir)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    for key, message in sorted(errors.items()):
+        print(f"❌ {key}: {message}")
+
+    report = {
+        "meta": {
+            "date": datetime.now().isoformat(timespec='seconds'),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "sizes": sizes,
+            "repeat": args.repeat,
+        },
+        "results": results,
+        "warm": warm,
+        "errors": errors,
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"\n💾 Resultados guardados en {args.output}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f).get('results', {})
+        regressions = compare(results, baseline, args.threshold)
+        print(f"\n📊 Comparación con {args.compare} (umbral {args.threshold:.0%}):")
+        for key, before, after, ratio in regressions:
+            print(f"⚠️ {key}: {before * 1000:.2f} ms → {after * 1000:.2f} ms (x{ratio:.2f})")
+        if not regressions:
+            print("✅ Sin regresiones")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
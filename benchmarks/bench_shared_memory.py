@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Benchmark del transporte de datasets a los workers de exportación.
+
+Compara, para el mismo lote de exportaciones en un pool de procesos:
+  - pickle: cada trabajo lleva el spec con sus filas (se serializan por trabajo)
+  - shm_dicts: el dataset se publica una vez con core.shared_data y cada worker
+    convierte el bloque en una lista de dicts (SharedDataset.records())
+  - shm: como shm_dicts, pero los workers trabajan sobre las columnas del bloque
+    (SharedDataset.rows()) y sólo crean las filas que recorren
+
+Informa del tiempo total, los bytes serializados por trabajo, el tamaño del bloque
+compartido y el pico de memoria (maxrss) de los workers, junto al de un worker que hace
+el mismo trabajo con los datos de ejemplo del tipo (base: módulos cargados, sin dataset). Los workers se crean con 'spawn' para que no hereden las
+filas del proceso principal, que contarían en su memoria residente. Con 'vegalite' el
+resultado se serializa como lo devolvería batch_vegalite.
+
+Uso:
+    python benchmarks/bench_shared_memory.py --rows 1M --jobs 8 --workers 4 --type histograma
+    python benchmarks/bench_shared_memory.py --rows 100k --exporter tableau --output shm.json
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import pickle
+import resource
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+# Agregar el directorio del proyecto al path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_pipeline import EXPORT_EXTENSIONS, base_spec, parse_size
+from chart_maker.core.synthetic import template_for
+from chart_maker.core.shared_data import SharedDataset
+from chart_maker.core.spec import ChartSpec
+from chart_maker.core.vegalite_mapper import chartspec_to_vegalite
+from chart_maker.exporters import get_exporter
+
+DEFAULT_ROWS = '100k'
+DEFAULT_JOBS = 8
+DEFAULT_TYPE = 'barras_agrupadas'
+
+
+def _maxrss_mb() -> float:
+    # ru_maxrss se conserva tras execve (un worker 'spawn' heredaría el pico del padre);
+    # VmHWM es el pico del espacio de direcciones actual. Ambos en KB en Linux.
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _run(spec, exporter_name, output_path):
+    if exporter_name == 'vegalite':
+        pickle.dumps(chartspec_to_vegalite(spec))
+    else:
+        get_exporter(exporter_name).export(ChartSpec(**spec), output_path)
+    return _maxrss_mb()
+
+
+def base_task(spec, exporter_name, output_path):
+    return _run(dict(spec, data=template_for(spec['type'])['data']), exporter_name, output_path)
+
+
+def pickled_task(spec, exporter_name, output_path):
+    return _run(spec, exporter_name, output_path)
+
+
+def _shared_task(rows_of, handle, spec, exporter_name, output_path):
+    dataset = SharedDataset.attach(handle)
+    try:
+        return _run(dict(spec, data=rows_of(dataset)), exporter_name, output_path)
+    finally:
+        dataset.close()
+
+
+def shared_dicts_task(handle, spec, exporter_name, output_path):
+    return _shared_task(SharedDataset.records, handle, spec, exporter_name, output_path)
+
+
+def shared_task(handle, spec, exporter_name, output_path):
+    return _shared_task(SharedDataset.rows, handle, spec, exporter_name, output_path)
+
+
+def _pool(workers):
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+
+
+def run_mode(task, jobs, workers):
+    start = time.perf_counter()
+    with _pool(workers) as pool:
+        peaks = list(pool.map(task, *zip(*jobs)))
+    return {
+        'seconds': time.perf_counter() - start,
+        'bytes_per_job': len(pickle.dumps(jobs[0])),
+        'worker_maxrss_mb': max(peaks),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Transporte de datasets: pickle vs memoria compartida")
+    parser.add_argument('--rows', default=DEFAULT_ROWS, help="Filas del dataset (ej. 100k, 1M)")
+    parser.add_argument('--jobs', type=int, default=DEFAULT_JOBS, help="Exportaciones del lote")
+    parser.add_argument('--workers', type=int, default=None, help="Procesos del pool")
+    parser.add_argument('--type', default=DEFAULT_TYPE, help="Tipo de gráfico")
+    parser.add_argument('--exporter', default='vegalite',
+                        help="Exportador de list_exporters() o 'vegalite' (sólo el mapeo)")
+    parser.add_argument('--output', help="Guardar los resultados en JSON")
+    args = parser.parse_args(argv)
+
+    spec = base_spec(args.type, parse_size(args.rows))
+    rows = spec.pop('data')
+    extension = EXPORT_EXTENSIONS.get(args.exporter, '.json')
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        paths = [os.path.join(work_dir, f"{i}{extension}") for i in range(args.jobs)]
+
+        results = {'rows': len(rows), 'jobs': args.jobs, 'exporter': args.exporter}
+        with _pool(1) as pool:
+            results['base_worker_maxrss_mb'] = pool.submit(base_task, spec, args.exporter, paths[0]).result()
+        full_spec = dict(spec, data=rows)
+        results['pickle'] = run_mode(pickled_task, [(full_spec, args.exporter, p) for p in paths], args.workers)
+
+        start = time.perf_counter()
+        with SharedDataset.publish(rows) as dataset:
+            publish_seconds = time.perf_counter() - start
+            shared_jobs = [(dataset.handle, spec, args.exporter, p) for p in paths]
+            results['shm_dicts'] = run_mode(shared_dicts_task, shared_jobs, args.workers)
+            results['shm'] = run_mode(shared_task, shared_jobs, args.workers)
+            results['shm']['publish_seconds'] = publish_seconds
+            results['shm']['segment_mb'] = dataset.handle.size / 1024 / 1024
+
+    print(f"{results['rows']} filas, {args.jobs} trabajos ({args.exporter}, {args.type})")
+    print(f"{'modo':<11}{'tiempo (s)':>12}{'bytes/trabajo':>16}{'maxrss worker (MB)':>20}")
+    for mode in ('pickle', 'shm_dicts', 'shm'):
+        r = results[mode]
+        print(f"{mode:<11}{r['seconds']:>12.2f}{r['bytes_per_job']:>16,}{r['worker_maxrss_mb']:>20.1f}")
+    print(f"{'base':<11}{'':>28}{results['base_worker_maxrss_mb']:>20.1f}")
+    print(f"bloque compartido: {results['shm']['segment_mb']:.1f} MB, "
+          f"publicado en {results['shm']['publish_seconds']:.2f} s")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
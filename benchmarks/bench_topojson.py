@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Benchmark de la conversión GeoJSON -> TopoJSON simplificado (core.topology).
+
+Genera una rejilla de regiones con fronteras irregulares compartidas (como un fichero de
+municipios) y compara el tamaño del GeoJSON con el del TopoJSON sin simplificar y
+simplificado para varios tamaños de gráfico, más el tiempo de una lectura desde la caché.
+
+Uso:
+    python benchmarks/bench_topojson.py --regions 40 --points 200
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+# Agregar el directorio del proyecto al path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chart_maker.core.topology import geojson_to_topology, load_topology, simplify_tolerance
+
+
+def jagged_grid(regions: int, points: int, seed: int = 0):
+    """FeatureCollection de regions × regions polígonos con lados de `points` vértices."""
+    rng = np.random.default_rng(seed)
+    edges = {}
+
+    def edge(a, b):
+        if (b, a) in edges:
+            # Lado compartido: los mismos vértices recorridos al revés
+            return np.vstack([[a], edges[(b, a)][:0:-1]])
+        t = np.linspace(0, 1, points)[:-1, None]
+        line = (1 - t) * np.array(a, float) + t * np.array(b, float)
+        line[1:] += rng.normal(0, 0.01, (points - 2, 2))
+        edges[(a, b)] = line
+        return line
+
+    features = []
+    for i in range(regions):
+        for j in range(regions):
+            corners = [(i, j), (i + 1, j), (i + 1, j + 1), (i, j + 1)]
+            ring = np.vstack([edge(corners[k], corners[(k + 1) % 4]) for k in range(4)] + [[corners[0]]])
+            features.append({
+                'type': 'Feature',
+                'properties': {'codigo': f'{i:03d}{j:03d}', 'nombre': f'Región {i}-{j}'},
+                'geometry': {'type': 'Polygon', 'coordinates': [(ring * 0.1 - 3.7).round(7).tolist()]},
+            })
+    return {'type': 'FeatureCollection', 'features': features}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Tamaño y tiempo de GeoJSON -> TopoJSON")
+    parser.add_argument('--regions', type=int, default=40, help="Regiones por lado de la rejilla")
+    parser.add_argument('--points', type=int, default=200, help="Vértices por lado de cada región")
+    parser.add_argument('--sizes', default='400x300,1200x900', help="Tamaños de gráfico (ancho x alto)")
+    args = parser.parse_args(argv)
+
+    geojson = jagged_grid(args.regions, args.points)
+    raw = len(json.dumps(geojson))
+    print(f"GeoJSON: {len(geojson['features']):,} regiones, {raw / 1e6:.1f} MB")
+
+    def size(topology):
+        return len(json.dumps(topology, separators=(',', ':')))
+
+    start = time.perf_counter()
+    topology = geojson_to_topology(geojson, properties=['codigo'])
+    elapsed = time.perf_counter() - start
+    print(f"{'variante':>22} {'MB':>8} {'reducción':>10} {'tiempo (s)':>11}")
+    print(f"{'sin simplificar':>22} {size(topology) / 1e6:>8.2f} {raw / size(topology):>9.1f}x {elapsed:>11.2f}")
+    for text in args.sizes.split(','):
+        width, height = (float(v) for v in text.split('x'))
+        tolerance = simplify_tolerance(topology['bbox'], width, height)
+        start = time.perf_counter()
+        simplified = geojson_to_topology(geojson, tolerance=tolerance, properties=['codigo'])
+        elapsed = time.perf_counter() - start
+        print(f"{text:>22} {size(simplified) / 1e6:>8.2f} {raw / size(simplified):>9.1f}x {elapsed:>11.2f}")
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'regiones.geojson')
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(geojson, f)
+        cache = os.path.join(directory, 'cache')
+        load_topology(path, properties=['codigo'], directory=cache)
+        start = time.perf_counter()
+        load_topology(path, properties=['codigo'], directory=cache)
+        print(f"Lectura desde la caché en disco: {(time.perf_counter() - start) * 1000:.1f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
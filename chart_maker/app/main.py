@@ -1,12 +1,27 @@
 # main.py
 # Entry point de la GUI principal
 
+import argparse
+import os
 import sys
 from PySide6.QtWidgets import QApplication
 from chart_maker.app.ui.main_window import MainWindow
+from chart_maker.app.ui.stall_watchdog import DEFAULT_THRESHOLD_MS, ENV_VAR as WATCHDOG_ENV_VAR
+from chart_maker.core import tracing
 
 def main():
-    app = QApplication(sys.argv)
+    parser = argparse.ArgumentParser(description="Creador de Gráficos")
+    parser.add_argument('--trace', nargs='?', const=tracing.DEFAULT_TRACE_PATH, metavar='RUTA',
+                        help="Guardar una traza Chrome trace-event del pipeline al salir")
+    parser.add_argument('--watchdog', nargs='?', type=int, const=DEFAULT_THRESHOLD_MS, metavar='MS',
+                        help="Registrar bloqueos de la interfaz de más de MS milisegundos")
+    args, qt_args = parser.parse_known_args()
+    if args.trace:
+        tracing.enable(args.trace)
+    if args.watchdog:
+        os.environ[WATCHDOG_ENV_VAR] = str(args.watchdog)
+
+    app = QApplication(sys.argv[:1] + qt_args)
     window = MainWindow()
     window.show()
     sys.exit(app.exec())
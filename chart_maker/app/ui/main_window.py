@@ -10,16 +10,18 @@ from PySide6.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
 from PySide6.QtCore import Qt, QTimer
 from PySide6.QtGui import QFont, QIcon
 import json
-import csv
 import io
 from typing import Dict, Any, Optional
 
+from ...core import tracing
 from ...core.chart_types import CHART_TYPES
+from ...core.data_io import read_csv_rows, read_json_rows
 from ...core.examples_new import EXAMPLES
 from ...core.spec import ChartSpec
-from ...core.vegalite_mapper import chartspec_to_vegalite
 from ...exporters import get_exporter, list_exporters
 from .preview_web_view_local import PreviewWebView
+from .preview_worker import PreviewController, build_spec_from_controls
+from .stall_watchdog import StallWatchdog, StallSummaryDialog, watched_handler
 
 
 class MainWindow(QMainWindow):
@@ -37,7 +39,30 @@ class MainWindow(QMainWindow):
         self.auto_update_timer.setSingleShot(True)
         
         self.init_ui()
+        
+        # Vista previa calculada fuera del hilo de la GUI
+        self.preview_controller = PreviewController(self.preview_web_view.generate_preview_html, self)
+        self.preview_controller.ready.connect(self.on_preview_ready)
+        self.preview_controller.error.connect(self.on_preview_error)
+        
         self.load_example_chart()
+        
+        # Vigilante de bloqueos de la GUI (opcional, CHART_MAKER_WATCHDOG)
+        self.stall_watchdog = StallWatchdog.from_env()
+        if self.stall_watchdog:
+            self.stall_watchdog.start()
+            diagnostics_menu = self.menuBar().addMenu("Diagnóstico")
+            diagnostics_menu.addAction("Bloqueos de la interfaz...", self.show_stall_summary)
+    
+    def show_stall_summary(self):
+        """Muestra los manejadores que más han bloqueado la interfaz"""
+        StallSummaryDialog(self.stall_watchdog, self).exec()
+    
+    def closeEvent(self, event):
+        self.preview_controller.shutdown()
+        if self.stall_watchdog:
+            self.stall_watchdog.stop()
+        super().closeEvent(event)
     
     def init_ui(self):
         """Inicializa la interfaz de usuario"""
@@ -420,6 +445,7 @@ class MainWindow(QMainWindow):
         """Maneja el cambio de descripción"""
         self.schedule_update()
     
+    @watched_handler('on_data_changed')
     def on_data_changed(self):
         """Maneja el cambio de datos"""
         self.schedule_update()
@@ -431,87 +457,56 @@ class MainWindow(QMainWindow):
     def schedule_update(self):
         """Programa una actualización de la vista previa"""
         self.auto_update_timer.stop()
-        self.auto_update_timer.start(500)  # Actualizar después de 500ms de inactividad
+        # Debounce adaptado al coste de las últimas vistas previas
+        self.auto_update_timer.start(self.preview_controller.debounce_ms())
     
+    @watched_handler('update_preview')
     def update_preview(self):
-        """Actualiza la vista previa del gráfico"""
-        try:
-            # Construir especificación actual
-            spec = self.build_current_spec()
-            
-            if spec:
-                # Mapear ChartSpec canónico → Vega-Lite para la vista previa
-                vega_spec = chartspec_to_vegalite(spec)
-                # Actualizar vista previa con Vega-Lite
-                self.preview_web_view.update_chart(vega_spec)
-                # Guardar la especificación canónica como estado actual
-                self.current_spec = ChartSpec(**spec)
-                self.statusBar().showMessage("Vista previa actualizada")
-            
-        except Exception as e:
-            self.show_error(f"Error al actualizar vista previa: {e}")
-            self.statusBar().showMessage(f"Error: {e}")
+        """Pide una vista previa; se calcula en segundo plano y cancela la anterior"""
+        self.auto_update_timer.stop()
+        self.preview_controller.submit(self.collect_controls())
+        self.statusBar().showMessage("Calculando vista previa...")
+    
+    def on_preview_ready(self, result: Dict[str, Any]):
+        """Muestra el resultado de la vista previa vigente"""
+        # Actualizar vista previa con Vega-Lite
+        self.preview_web_view.show_preview(result["vega_spec"], result["html"])
+        # Guardar la especificación canónica como estado actual
+        self.current_spec = result["chart_spec"]
+        self.statusBar().showMessage(f"Vista previa actualizada · {self._format_timings(result['timings'])}")
+    
+    def on_preview_error(self, message: str):
+        self.show_error(f"Error al actualizar vista previa: {message}")
+        self.statusBar().showMessage(f"Error: {message}")
+    
+    def _format_timings(self, timings) -> str:
+        """Resumen de los tiempos por etapa de la última vista previa para la barra de estado."""
+        names = {
+            'MainWindow.build_current_spec': 'spec',
+            'chartspec_to_vegalite': 'Vega-Lite',
+            'PreviewWebView.update_chart': 'vista previa',
+            'ChartSpec': 'validación',
+            'MainWindow.update_preview': 'total',
+        }
+        return " · ".join(f"{names[name]} {ms:.1f} ms" for name, ms in timings if name in names)
+    
+    def collect_controls(self) -> Dict[str, Any]:
+        """Lee los valores de los controles (en el hilo de la GUI) para construir la especificación"""
+        return {
+            "type": self.chart_type_combo.currentText(),
+            "width": self.width_spin.value(),
+            "height": self.height_spin.value(),
+            "title": self.title_edit.text().strip(),
+            "description": self.description_edit.text().strip(),
+            "data_text": self.data_editor.toPlainText().strip(),
+            "theme": self.theme_combo.currentText(),
+            "color_scheme": self.color_scheme_combo.currentText(),
+        }
     
+    @tracing.traced('MainWindow.build_current_spec')
     def build_current_spec(self) -> Optional[Dict[str, Any]]:
         """Construye la especificación ChartSpec canónica basada en los controles"""
-        try:
-            # Especificación canónica base
-            spec: Dict[str, Any] = {
-                "type": self.chart_type_combo.currentText(),
-                "width": self.width_spin.value(),
-                "height": self.height_spin.value(),
-                "encoding": {},
-                "options": {}
-            }
-            
-            # Título y descripción
-            title = self.title_edit.text().strip()
-            if title:
-                spec["title"] = title
-            
-            description = self.description_edit.text().strip()
-            if description:
-                spec["description"] = description
-            
-            # Datos
-            try:
-                data_text = self.data_editor.toPlainText().strip()
-                if data_text:
-                    data = json.loads(data_text)
-                    # Aceptar tanto lista de dicts como dict (e.g., {"values": [...]}, {"url": "..."})
-                    spec["data"] = data
-                else:
-                    # Datos de ejemplo por defecto
-                    spec["data"] = [
-                        {"x": "A", "y": 10},
-                        {"x": "B", "y": 20},
-                        {"x": "C", "y": 15}
-                    ]
-            except json.JSONDecodeError as e:
-                raise ValueError(f"JSON de datos inválido: {e}")
-            
-            # Encoding básico por defecto (canónico)
-            if not spec.get("encoding"):
-                spec["encoding"] = {
-                    "x": {"field": "x", "type": "nominal"},
-                    "y": {"field": "y", "type": "quantitative"}
-                }
-            
-            # Opciones de estilo (canónicas)
-            options: Dict[str, Any] = {}
-            theme = self.theme_combo.currentText()
-            if theme and theme != "default":
-                options["theme"] = theme
-            color_scheme = self.color_scheme_combo.currentText()
-            if color_scheme:
-                options["colorScheme"] = color_scheme
-            if options:
-                spec["options"] = options
-            
-            return spec
-            
-        except Exception as e:
-            raise ValueError(f"Error al construir especificación: {e}")
+        return build_spec_from_controls(self.collect_controls())
     
     def clear_preview(self):
         """Limpia la vista previa"""
@@ -534,6 +529,7 @@ class MainWindow(QMainWindow):
         data_json = json.dumps(example_data, indent=2, ensure_ascii=False)
         self.data_editor.setPlainText(data_json)
     
+    @watched_handler('load_data_file')
     def load_data_file(self):
         """Carga datos desde un archivo"""
         file_path, _ = QFileDialog.getOpenFileName(
@@ -545,20 +541,21 @@ class MainWindow(QMainWindow):
         
         if file_path:
             try:
-                with open(file_path, 'r', encoding='utf-8') as file:
-                    if file_path.endswith('.json'):
-                        data = json.load(file)
-                        data_json = json.dumps(data, indent=2, ensure_ascii=False)
-                        self.data_editor.setPlainText(data_json)
-                    elif file_path.endswith('.csv'):
-                        # TODO: Implementar carga de CSV
-                        self.show_info("Carga de CSV no implementada aún")
-                    
+                if file_path.endswith('.json'):
+                    data = read_json_rows(file_path)
+                    data_json = json.dumps(data, indent=2, ensure_ascii=False)
+                    self.data_editor.setPlainText(data_json)
+                elif file_path.endswith('.csv'):
+                    data = read_csv_rows(file_path)
+                    data_json = json.dumps(data, indent=2, ensure_ascii=False)
+                    self.data_editor.setPlainText(data_json)
+                
                 self.statusBar().showMessage(f"Datos cargados desde: {file_path}")
                 
             except Exception as e:
                 self.show_error(f"Error al cargar archivo: {e}")
     
+    @watched_handler('load_csv_file')
     def load_csv_file(self):
         """Carga datos desde un archivo CSV"""
         file_path, _ = QFileDialog.getOpenFileName(
@@ -570,32 +567,8 @@ class MainWindow(QMainWindow):
         
         if file_path:
             try:
-                # Leer el CSV
-                with open(file_path, 'r', encoding='utf-8') as file:
-                    # Detectar el dialecto del CSV
-                    sample = file.read(1024)
-                    file.seek(0)
-                    sniffer = csv.Sniffer()
-                    dialect = sniffer.sniff(sample)
-                    
-                    # Leer los datos
-                    reader = csv.DictReader(file, dialect=dialect)
-                    data = []
-                    
-                    for row in reader:
-                        # Convertir valores numéricos
-                        converted_row = {}
-                        for key, value in row.items():
-                            # Intentar convertir a número
-                            try:
-                                if '.' in value:
-                                    converted_row[key] = float(value)
-                                else:
-                                    converted_row[key] = int(value)
-                            except ValueError:
-                                # Mantener como string
-                                converted_row[key] = value
-                        data.append(converted_row)
+                # Leer el CSV (detecta el dialecto y convierte los valores numéricos)
+                data = read_csv_rows(file_path)
                 
                 # Actualizar la información del CSV
                 num_rows = len(data)
@@ -644,6 +617,7 @@ class MainWindow(QMainWindow):
         
         return output.getvalue()
     
+    @watched_handler('export_json')
     def export_json(self):
         """Exporta la especificación actual como JSON"""
         try:
@@ -669,6 +643,7 @@ class MainWindow(QMainWindow):
         except Exception as e:
             self.show_error(f"Error al exportar JSON: {e}")
     
+    @watched_handler('export_to_platform')
     def export_to_platform(self, platform: str):
         """Exporta el gráfico a una plataforma específica"""
         try:
@@ -713,7 +688,8 @@ class MainWindow(QMainWindow):
                 exporter = get_exporter(platform)
                 
                 # Crear ChartSpec object
-                chart_spec = ChartSpec(**spec)
+                with tracing.span('ChartSpec'):
+                    chart_spec = ChartSpec(**spec)
                 
                 # Exportar
                 success = exporter.export(chart_spec, file_path)
@@ -727,6 +703,7 @@ class MainWindow(QMainWindow):
         except Exception as e:
             self.show_error(f"Error al exportar para {platform}: {e}")
     
+    @watched_handler('export_to_platform_with_extension')
     def export_to_platform_with_extension(self, platform: str, extension: str):
         """Exporta el gráfico a una plataforma específica con extensión personalizada"""
         try:
@@ -758,7 +735,8 @@ class MainWindow(QMainWindow):
                 exporter = get_exporter(platform)
                 
                 # Crear ChartSpec object
-                chart_spec = ChartSpec(**spec)
+                with tracing.span('ChartSpec'):
+                    chart_spec = ChartSpec(**spec)
                 
                 # Exportar
                 success = exporter.export(chart_spec, file_path)
@@ -8,6 +8,8 @@ from PySide6.QtGui import QFont
 import json
 from typing import Dict, Any, Optional
 
+from ...core import tracing
+
 
 class PreviewWebView(QWidget):
     """Widget de vista previa local que muestra información del gráfico sin dependencias externas"""
@@ -103,6 +105,7 @@ class PreviewWebView(QWidget):
         """
         self.text_browser.setHtml(initial_html)
     
+    @tracing.traced('PreviewWebView.update_chart')
     def update_chart(self, spec: Dict[str, Any]):
         """
         Actualiza la vista previa con una nueva especificación
@@ -120,6 +123,18 @@ class PreviewWebView(QWidget):
         except Exception as e:
             self.show_error(str(e))
     
+    def show_preview(self, spec: Dict[str, Any], preview_html: str):
+        """
+        Muestra un HTML de vista previa ya generado (p. ej. en un hilo de trabajo)
+        
+        Args:
+            spec: Especificación del gráfico en formato Vega-Lite
+            preview_html: HTML devuelto por generate_preview_html(spec)
+        """
+        self.current_spec = spec
+        self.text_browser.setHtml(preview_html)
+    
+    @tracing.traced('PreviewWebView.generate_preview_html')
     def generate_preview_html(self, spec: Dict[str, Any]) -> str:
         """
         Genera HTML local para mostrar información del gráfico
@@ -0,0 +1,210 @@
+"""
+Cálculo de la vista previa fuera del hilo de la GUI
+
+El hilo de la GUI sólo lee los controles; el parseo de los datos, el mapeo a Vega-Lite,
+la validación del ChartSpec y la generación del HTML se hacen en un hilo del pool.
+Cada petición lleva un número de generación: al pedir una nueva vista previa la
+anterior se cancela (entre etapas) y su resultado, si llega, se descarta.
+El retardo del debounce se adapta al coste medido de las últimas vistas previas.
+"""
+
+import json
+import time
+from typing import Any, Callable, Dict, Optional
+
+from PySide6.QtCore import QObject, QRunnable, QThreadPool, Signal
+
+from ...core import tracing
+from ...core.spec import ChartSpec
+from ...core.vegalite_mapper import chartspec_to_vegalite
+
+# Límites del debounce adaptativo (ms) y peso del último coste en la media móvil
+MIN_DEBOUNCE_MS = 150
+MAX_DEBOUNCE_MS = 1500
+DEBOUNCE_COST_FACTOR = 2.0
+COST_SMOOTHING = 0.3
+
+DEFAULT_DATA = [
+    {"x": "A", "y": 10},
+    {"x": "B", "y": 20},
+    {"x": "C", "y": 15}
+]
+
+
+class PreviewCancelled(Exception):
+    """La petición de vista previa quedó obsoleta antes de terminar."""
+
+
+def build_spec_from_controls(controls: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Construye la especificación ChartSpec canónica a partir de los valores de los
+    controles (leídos en el hilo de la GUI). No toca widgets: se puede llamar desde
+    cualquier hilo.
+    """
+    try:
+        # Especificación canónica base
+        spec: Dict[str, Any] = {
+            "type": controls["type"],
+            "width": controls["width"],
+            "height": controls["height"],
+            "encoding": {},
+            "options": {}
+        }
+
+        # Título y descripción
+        if controls.get("title"):
+            spec["title"] = controls["title"]
+        if controls.get("description"):
+            spec["description"] = controls["description"]
+
+        # Datos
+        try:
+            data_text = controls.get("data_text", "")
+            if data_text:
+                # Aceptar tanto lista de dicts como dict (e.g., {"values": [...]}, {"url": "..."})
+                spec["data"] = json.loads(data_text)
+            else:
+                # Datos de ejemplo por defecto
+                spec["data"] = list(DEFAULT_DATA)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"JSON de datos inválido: {e}")
+
+        # Encoding básico por defecto (canónico)
+        if not spec.get("encoding"):
+            spec["encoding"] = {
+                "x": {"field": "x", "type": "nominal"},
+                "y": {"field": "y", "type": "quantitative"}
+            }
+
+        # Opciones de estilo (canónicas)
+        options: Dict[str, Any] = {}
+        theme = controls.get("theme")
+        if theme and theme != "default":
+            options["theme"] = theme
+        if controls.get("color_scheme"):
+            options["colorScheme"] = controls["color_scheme"]
+        if options:
+            spec["options"] = options
+
+        return spec
+
+    except Exception as e:
+        raise ValueError(f"Error al construir especificación: {e}")
+
+
+def compute_preview(controls: Dict[str, Any], render_html: Callable[[Dict[str, Any]], str],
+                    is_cancelled: Callable[[], bool] = lambda: False) -> Dict[str, Any]:
+    """
+    Ejecuta el pipeline de la vista previa comprobando la cancelación entre etapas.
+
+    Returns:
+        Dict con 'spec', 'vega_spec', 'html', 'chart_spec', 'timings' y 'elapsed_ms'
+    """
+    def checkpoint():
+        if is_cancelled():
+            raise PreviewCancelled()
+
+    start = time.perf_counter()
+    with tracing.collect() as timings, tracing.span('MainWindow.update_preview'):
+        with tracing.span('MainWindow.build_current_spec'):
+            spec = build_spec_from_controls(controls)
+        checkpoint()
+        with tracing.span('ChartSpec'):
+            chart_spec = ChartSpec(**spec)
+        checkpoint()
+        # Mapear ChartSpec canónico → Vega-Lite (reutiliza el encoding ya parseado)
+        vega_spec = chartspec_to_vegalite(chart_spec)
+        checkpoint()
+        with tracing.span('PreviewWebView.update_chart'):
+            html = render_html(vega_spec)
+    checkpoint()
+    return {
+        "spec": spec,
+        "vega_spec": vega_spec,
+        "html": html,
+        "chart_spec": chart_spec,
+        "timings": list(timings),
+        "elapsed_ms": (time.perf_counter() - start) * 1000,
+    }
+
+
+class _PreviewJob(QRunnable):
+    def __init__(self, controller: 'PreviewController', generation: int,
+                 controls: Dict[str, Any], render_html: Callable[[Dict[str, Any]], str]):
+        super().__init__()
+        self.controller = controller
+        self.generation = generation
+        self.controls = controls
+        self.render_html = render_html
+
+    def run(self):
+        try:
+            result = compute_preview(self.controls, self.render_html,
+                                     lambda: self.controller.is_stale(self.generation))
+        except PreviewCancelled:
+            return
+        except Exception as e:
+            self.controller.failed.emit(self.generation, str(e))
+            return
+        self.controller.finished.emit(self.generation, result)
+
+
+class PreviewController(QObject):
+    """
+    Lanza los cálculos de vista previa en un hilo aparte y entrega sólo el resultado
+    de la petición más reciente (señales 'ready' y 'error', en el hilo de la GUI).
+    """
+
+    # Señales internas emitidas desde el hilo de trabajo
+    finished = Signal(int, object)
+    failed = Signal(int, str)
+    # Señales públicas: sólo para la petición vigente
+    ready = Signal(object)
+    error = Signal(str)
+
+    def __init__(self, render_html: Callable[[Dict[str, Any]], str], parent=None):
+        super().__init__(parent)
+        self.render_html = render_html
+        self.generation = 0
+        self.average_cost_ms: Optional[float] = None
+        # Un solo hilo: las peticiones obsoletas en cola se descartan antes de empezar
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(1)
+        self.finished.connect(self._on_finished)
+        self.failed.connect(self._on_failed)
+
+    def submit(self, controls: Dict[str, Any]) -> int:
+        """Pide una vista previa; cancela la anterior si sigue pendiente."""
+        self.generation += 1
+        self.pool.clear()
+        self.pool.start(_PreviewJob(self, self.generation, controls, self.render_html))
+        return self.generation
+
+    def is_stale(self, generation: int) -> bool:
+        return generation != self.generation
+
+    def debounce_ms(self) -> int:
+        """Retardo del debounce según el coste medio de las últimas vistas previas."""
+        if self.average_cost_ms is None:
+            return MIN_DEBOUNCE_MS
+        delay = self.average_cost_ms * DEBOUNCE_COST_FACTOR
+        return int(min(MAX_DEBOUNCE_MS, max(MIN_DEBOUNCE_MS, delay)))
+
+    def shutdown(self):
+        """Cancela lo pendiente y espera al trabajo en curso (al cerrar la ventana)."""
+        self.generation += 1
+        self.pool.clear()
+        self.pool.waitForDone()
+
+    def _on_finished(self, generation: int, result: Dict[str, Any]):
+        cost = result["elapsed_ms"]
+        if self.average_cost_ms is None:
+            self.average_cost_ms = cost
+        else:
+            self.average_cost_ms += COST_SMOOTHING * (cost - self.average_cost_ms)
+        if not self.is_stale(generation):
+            self.ready.emit(result)
+
+    def _on_failed(self, generation: int, message: str):
+        if not self.is_stale(generation):
+            self.error.emit(message)
@@ -0,0 +1,211 @@
+"""
+Vigilante de bloqueos del bucle de eventos de Qt (opcional)
+
+Un QTimer del hilo principal marca un latido; un hilo aparte comprueba que el latido
+llega a tiempo. Si el hilo principal lleva más del umbral sin latir, se muestrea su
+pila mientras dura el bloqueo y al terminar se registra un informe (duración, manejador
+en curso y pila más frecuente) en un log rotativo.
+
+Se activa con CHART_MAKER_WATCHDOG=<umbral en ms> (o "1" para el umbral por defecto)
+o con --watchdog desde la línea de comandos.
+"""
+
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import Counter
+from functools import wraps
+from logging.handlers import RotatingFileHandler
+from typing import Any, Dict, List, Optional
+
+from PySide6.QtCore import QTimer
+from PySide6.QtWidgets import (QDialog, QVBoxLayout, QTableWidget, QTableWidgetItem,
+                               QHeaderView, QPlainTextEdit, QDialogButtonBox, QLabel)
+
+ENV_VAR = 'CHART_MAKER_WATCHDOG'
+DEFAULT_THRESHOLD_MS = 200
+HEARTBEAT_MS = 50
+SAMPLE_INTERVAL_S = 0.02
+DEFAULT_LOG_PATH = os.path.join(os.path.expanduser('~'), '.chart_maker', 'stalls.log')
+LOG_MAX_BYTES = 1_000_000
+LOG_BACKUPS = 3
+# Informes que se conservan en memoria para el resumen
+MAX_REPORTS = 500
+
+_active: Optional['StallWatchdog'] = None
+
+
+def watched_handler(name: str):
+    """Decorador para manejadores de la GUI: anota el manejador en curso para los informes."""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            watchdog = _active
+            if watchdog is None:
+                return func(*args, **kwargs)
+            previous = watchdog.current_handler
+            watchdog.current_handler = name
+            try:
+                return func(*args, **kwargs)
+            finally:
+                watchdog.current_handler = previous
+        return wrapper
+    return decorator
+
+
+class StallWatchdog:
+    """Detecta bloqueos del hilo principal y registra su duración, manejador y pila."""
+
+    def __init__(self, threshold_ms: int = DEFAULT_THRESHOLD_MS, log_path: str = DEFAULT_LOG_PATH):
+        self.threshold = threshold_ms / 1000
+        self.log_path = log_path
+        self.current_handler: Optional[str] = None
+        self.reports: List[Dict[str, Any]] = []
+
+        self._main_thread_id = threading.main_thread().ident
+        self._last_beat = time.perf_counter()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._heartbeat = QTimer()
+        self._heartbeat.timeout.connect(self._beat)
+        self._logger = self._make_logger()
+
+    @classmethod
+    def from_env(cls) -> Optional['StallWatchdog']:
+        """Crea el vigilante si CHART_MAKER_WATCHDOG está definida; si no, None."""
+        value = os.environ.get(ENV_VAR)
+        if not value or value in ('0', 'false'):
+            return None
+        threshold = DEFAULT_THRESHOLD_MS if value in ('1', 'true') else int(value)
+        return cls(threshold_ms=threshold)
+
+    def _make_logger(self) -> logging.Logger:
+        logger = logging.getLogger('chart_maker.stalls')
+        logger.setLevel(logging.WARNING)
+        logger.propagate = False
+        if not any(getattr(h, 'baseFilename', None) == os.path.abspath(self.log_path) for h in logger.handlers):
+            os.makedirs(os.path.dirname(self.log_path) or '.', exist_ok=True)
+            handler = RotatingFileHandler(self.log_path, maxBytes=LOG_MAX_BYTES,
+                                          backupCount=LOG_BACKUPS, encoding='utf-8')
+            handler.setFormatter(logging.Formatter('%(asctime)s %(message)s'))
+            logger.addHandler(handler)
+        return logger
+
+    def start(self):
+        """Arranca el latido (hilo principal) y el hilo vigilante."""
+        global _active
+        _active = self
+        self._last_beat = time.perf_counter()
+        self._heartbeat.start(HEARTBEAT_MS)
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='StallWatchdog', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        global _active
+        self._heartbeat.stop()
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+        if _active is self:
+            _active = None
+
+    def _beat(self):
+        self._last_beat = time.perf_counter()
+
+    def _run(self):
+        while not self._stop.wait(SAMPLE_INTERVAL_S):
+            stalled_for = time.perf_counter() - self._last_beat
+            if stalled_for < self.threshold:
+                continue
+            self._watch_stall(self._last_beat)
+
+    def _watch_stall(self, last_beat: float):
+        """Muestrea la pila del hilo principal hasta que vuelve el latido."""
+        samples: Counter = Counter()
+        handler = self.current_handler
+        while not self._stop.is_set() and self._last_beat == last_beat:
+            frame = sys._current_frames().get(self._main_thread_id)
+            if frame is not None:
+                stack = tuple(traceback.format_stack(frame))
+                samples[stack] += 1
+            handler = handler or self.current_handler
+            time.sleep(SAMPLE_INTERVAL_S)
+        duration = (self._last_beat if self._last_beat != last_beat else time.perf_counter()) - last_beat
+        self._report(duration, handler, samples)
+
+    def _report(self, duration: float, handler: Optional[str], samples: Counter):
+        stack, hits = samples.most_common(1)[0] if samples else ((), 0)
+        report = {
+            'time': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'duration_ms': duration * 1000,
+            'handler': handler or '(desconocido)',
+            'stack': ''.join(stack),
+            'samples': sum(samples.values()),
+            'stack_share': hits / max(1, sum(samples.values())),
+        }
+        self.reports.append(report)
+        del self.reports[:-MAX_REPORTS]
+        self._logger.warning(
+            "Bloqueo de %.0f ms en %s (%d muestras, pila en el %.0f%%)\n%s",
+            report['duration_ms'], report['handler'], report['samples'],
+            report['stack_share'] * 100, report['stack'],
+        )
+
+    def summary(self) -> List[Dict[str, Any]]:
+        """Bloqueos agrupados por manejador, ordenados por el peor bloqueo."""
+        by_handler: Dict[str, Dict[str, Any]] = {}
+        for report in list(self.reports):
+            entry = by_handler.setdefault(report['handler'], {
+                'handler': report['handler'], 'count': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'stack': '',
+            })
+            entry['count'] += 1
+            entry['total_ms'] += report['duration_ms']
+            if report['duration_ms'] >= entry['max_ms']:
+                entry['max_ms'] = report['duration_ms']
+                entry['stack'] = report['stack']
+        return sorted(by_handler.values(), key=lambda e: e['max_ms'], reverse=True)
+
+
+class StallSummaryDialog(QDialog):
+    """Diálogo con los manejadores que más bloquean la GUI y la pila del peor bloqueo."""
+
+    def __init__(self, watchdog: StallWatchdog, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Bloqueos de la interfaz")
+        self.resize(800, 500)
+        self.entries = watchdog.summary()
+
+        layout = QVBoxLayout()
+        layout.addWidget(QLabel(f"Umbral: {watchdog.threshold * 1000:.0f} ms · Log: {watchdog.log_path}"))
+
+        self.table = QTableWidget(len(self.entries), 4)
+        self.table.setHorizontalHeaderLabels(["Manejador", "Bloqueos", "Peor (ms)", "Total (ms)"])
+        self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+        for row, entry in enumerate(self.entries):
+            values = [entry['handler'], str(entry['count']), f"{entry['max_ms']:.0f}", f"{entry['total_ms']:.0f}"]
+            for column, value in enumerate(values):
+                self.table.setItem(row, column, QTableWidgetItem(value))
+        self.table.currentCellChanged.connect(self.show_stack)
+        layout.addWidget(self.table)
+
+        self.stack_view = QPlainTextEdit()
+        self.stack_view.setReadOnly(True)
+        layout.addWidget(self.stack_view)
+
+        buttons = QDialogButtonBox(QDialogButtonBox.Close)
+        buttons.rejected.connect(self.reject)
+        layout.addWidget(buttons)
+        self.setLayout(layout)
+
+        if self.entries:
+            self.table.setCurrentCell(0, 0)
+        else:
+            self.stack_view.setPlainText("No se han detectado bloqueos.")
+
+    def show_stack(self, row, *_):
+        if 0 <= row < len(self.entries):
+            self.stack_view.setPlainText(self.entries[row]['stack'])
@@ -0,0 +1,207 @@
+"""
+Clasificación del encoding de un ChartSpec en dimensiones y medidas.
+
+Los exportadores lo usan para trasladar la agregación al motor de cada plataforma
+(DAX en Power BI, pills agregadas en Tableau, measures en LookML...).
+"""
+
+import math
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .encoding import MeasurementType, parse_encoding
+
+# Alias de agregados aceptados en el encoding → nombre canónico
+AGGREGATE_ALIASES = {
+    'sum': 'sum',
+    'suma': 'sum',
+    'mean': 'mean',
+    'average': 'mean',
+    'avg': 'mean',
+    'promedio': 'mean',
+    'count': 'count',
+    'conteo': 'count',
+    'distinct': 'distinct',
+    'count_distinct': 'distinct',
+    'min': 'min',
+    'max': 'max',
+    'median': 'median',
+    'mediana': 'median',
+}
+
+# Agregado por defecto para campos cuantitativos agrupados por alguna dimensión
+DEFAULT_AGGREGATE = 'sum'
+
+
+def normalize_aggregate(aggregate: Any) -> str:
+    """Normaliza un agregado del encoding a su nombre canónico."""
+    name = str(aggregate).lower()
+    if name not in AGGREGATE_ALIASES:
+        raise ValueError(f"Agregado no soportado: {aggregate}. Válidos: {sorted(set(AGGREGATE_ALIASES))}")
+    return AGGREGATE_ALIASES[name]
+
+
+def split_encoding(encoding: Dict[str, Any]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    Separa los canales con campo en dimensiones y medidas.
+
+    - Un canal con 'aggregate' es siempre una medida.
+    - Un canal binned o no cuantitativo es una dimensión.
+    - Un canal cuantitativo sin agregado es una medida (suma) sólo si existe alguna
+      dimensión por la que agrupar; si no (p. ej. dispersión x/y) es una columna cruda.
+
+    Returns:
+        (dimensiones, medidas): listas de dicts con 'channel', 'field' y 'type' o 'aggregate'
+    """
+    dimensions: List[Dict[str, Any]] = []
+    measures: List[Dict[str, Any]] = []
+    raw_quantitative: List[Dict[str, Any]] = []
+
+    for channel, fd in parse_encoding(encoding).fields.items():
+        field_type = (fd.type or MeasurementType.NOMINAL).value
+        if fd.aggregate is not None:
+            # 'count' puede venir sin campo: cuenta filas
+            measures.append({'channel': channel, 'field': fd.field,
+                             'aggregate': normalize_aggregate(fd.aggregate)})
+        elif fd.bin or field_type != 'quantitative':
+            dimensions.append({'channel': channel, 'field': fd.field, 'type': field_type,
+                               'bin': fd.bin})
+        else:
+            raw_quantitative.append({'channel': channel, 'field': fd.field, 'type': field_type})
+
+    if dimensions:
+        for item in raw_quantitative:
+            measures.append({'channel': item['channel'], 'field': item['field'],
+                             'aggregate': DEFAULT_AGGREGATE})
+    else:
+        dimensions.extend(dict(item, bin=None) for item in raw_quantitative)
+
+    return dimensions, measures
+
+
+# Número de bins por defecto cuando el encoding no indica step ni maxbins
+DEFAULT_MAXBINS = 10
+# Holgura al elegir el bin (la del transform bin de Vega), escalada por |valor| / paso para
+# cubrir el error del cociente: 0.3 / 0.1 = 2.9999999999999996 y 57.3 / 0.1 = 572.9999999999999
+# caen en los bins 3 y 573
+BIN_EPSILON = 1e-14
+
+
+def bin_index(value: float, step: float) -> int:
+    """Bin (floor(valor / paso) con holgura) de un valor; los bordes decimales abren su bin."""
+    return math.floor(value / step + BIN_EPSILON * (1.0 + abs(value / step)))
+
+
+def bin_step(lo: float, hi: float, bin_def: Any) -> float:
+    """Paso de bin: 'step' explícito o un paso 'redondo' (1, 2, 5 x 10^n) según maxbins."""
+    if isinstance(bin_def, dict) and bin_def.get('step'):
+        return float(bin_def['step'])
+    maxbins = bin_def.get('maxbins', DEFAULT_MAXBINS) if isinstance(bin_def, dict) else DEFAULT_MAXBINS
+    span = hi - lo
+    if span <= 0:
+        return 1.0
+    raw = span / max(1, maxbins)
+    magnitude = 10 ** math.floor(math.log10(raw))
+    for factor in (1, 2, 5, 10):
+        if raw <= factor * magnitude:
+            return float(factor * magnitude)
+    return float(10 * magnitude)
+
+
+def measure_column(measure: Dict[str, Any]) -> str:
+    """Nombre de la columna agregada de una medida ('count' o '<agregado>_<campo>')."""
+    if measure['aggregate'] == 'count' or measure['field'] is None:
+        return 'count'
+    return f"{measure['aggregate']}_{measure['field']}"
+
+
+def to_number(value: Any) -> Optional[float]:
+    """Convierte un valor (número o texto de un CSV) a número; None si no lo es."""
+    if isinstance(value, bool) or value is None or value == '':
+        return None
+    if isinstance(value, (int, float)):
+        return value
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def aggregate_rows(rows: Iterable[Dict[str, Any]], dimensions: List[Dict[str, Any]],
+                   measures: List[Dict[str, Any]],
+                   bin_steps: Optional[Dict[str, float]] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Agrega las filas en una sola pasada agrupando por las dimensiones.
+
+    La memoria depende del número de grupos, no del de filas: cada grupo guarda sólo
+    sus acumuladores (suma, recuento, mín, máx). Las excepciones son 'distinct' y
+    'median', que necesitan los valores del grupo.
+
+    Args:
+        rows: iterable de filas (dicts); puede ser un lector en streaming
+        dimensions, measures: resultado de split_encoding
+        bin_steps: paso de bin por campo para las dimensiones binned
+
+    Returns:
+        Iterador de filas agregadas con las dimensiones y measure_column(m) por medida
+    """
+    bin_steps = bin_steps or {}
+    groups: Dict[tuple, List[Dict[str, Any]]] = {}
+
+    for row in rows:
+        key = []
+        for dim in dimensions:
+            value = row.get(dim['field'])
+            step = bin_steps.get(dim['field'])
+            if step and dim.get('bin'):
+                number = to_number(value)
+                value = bin_index(number, step) * step if number is not None else None
+            key.append(value)
+        accumulators = groups.get(tuple(key))
+        if accumulators is None:
+            accumulators = groups[tuple(key)] = [
+                {'sum': 0, 'count': 0, 'min': None, 'max': None,
+                 'values': set() if m['aggregate'] == 'distinct' else []}
+                for m in measures
+            ]
+        for measure, acc in zip(measures, accumulators):
+            if measure['aggregate'] == 'count':
+                acc['count'] += 1
+                continue
+            value = row.get(measure['field'])
+            if measure['aggregate'] == 'distinct':
+                if value is not None and value != '':
+                    acc['values'].add(value)
+                continue
+            number = to_number(value)
+            if number is None:
+                continue
+            acc['sum'] += number
+            acc['count'] += 1
+            acc['min'] = number if acc['min'] is None else min(acc['min'], number)
+            acc['max'] = number if acc['max'] is None else max(acc['max'], number)
+            if measure['aggregate'] == 'median':
+                acc['values'].append(number)
+
+    for key, accumulators in groups.items():
+        out = {dim['field']: value for dim, value in zip(dimensions, key)}
+        for measure, acc in zip(measures, accumulators):
+            out[measure_column(measure)] = _finalize(measure['aggregate'], acc)
+        yield out
+
+
+def _finalize(aggregate: str, acc: Dict[str, Any]) -> Any:
+    if aggregate == 'count':
+        return acc['count']
+    if aggregate == 'distinct':
+        return len(acc['values'])
+    if aggregate == 'sum':
+        return acc['sum']
+    if acc['count'] == 0:
+        return None
+    if aggregate == 'mean':
+        return acc['sum'] / acc['count']
+    if aggregate == 'median':
+        values = sorted(acc['values'])
+        middle = len(values) // 2
+        return values[middle] if len(values) % 2 else (values[middle - 1] + values[middle]) / 2
+    return acc[aggregate]
@@ -0,0 +1,252 @@
+"""
+Motor de binning 1D/2D vectorizado para histogramas y mapas de calor.
+
+Los bins usan el mismo paso 'redondo' que los extractos (aggregation.bin_step) y
+bordes alineados a múltiplos del paso. Cada eje se convierte en un índice entero
+(bin numérico o código de categoría) y BinAccumulator suma conteos y agregados por
+celda con np.bincount sobre el índice plano, bloque a bloque: los bloques de un
+dataset troceado se acumulan (o se combinan con merge) sin juntar las filas. El spec
+de Vega-Lite resultante sólo lleva una fila por bin o celda no vacía.
+"""
+
+import math
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .aggregation import BIN_EPSILON, DEFAULT_AGGREGATE, DEFAULT_MAXBINS, bin_index, bin_step, measure_column, normalize_aggregate
+from .chart_types import ChartTypeInfo
+from .encoding import Encoding, FieldDef, MeasurementType
+from .transforms import Precomputed, group_codes, numeric_column, register
+
+# Bins por eje de un mapa de calor con ejes cuantitativos (sin maxbins en el encoding)
+HEATMAP_MAXBINS = 20
+# Valores indexados por bloque al acumular
+CHUNK_SIZE = 1_000_000
+# Agregados que se acumulan por celda sin guardar los valores
+STREAMING_AGGREGATES = ('count', 'sum', 'mean', 'min', 'max')
+
+
+@dataclass(frozen=True)
+class Bins:
+    """Bins regulares [start + i·step, start + (i+1)·step), i = 0..count-1."""
+    start: float
+    step: float
+    count: int
+
+    @classmethod
+    def from_extent(cls, lo: float, hi: float, bin_def: Any = True) -> 'Bins':
+        """Bins que cubren [lo, hi] con el paso del encoding ('step', 'maxbins', 'extent')."""
+        if isinstance(bin_def, dict) and bin_def.get('extent'):
+            lo, hi = (float(v) for v in bin_def['extent'])
+        step = bin_step(lo, hi, bin_def)
+        first = bin_index(lo, step)
+        return cls(first * step, step, max(bin_index(hi, step) - first + 1, 1))
+
+    @property
+    def stop(self) -> float:
+        return self.start + self.count * self.step
+
+    def edges(self) -> np.ndarray:
+        return self.start + self.step * np.arange(self.count + 1)
+
+    def index(self, values: np.ndarray) -> np.ndarray:
+        """Bin de cada valor; -1 para NaN o fuera del rango."""
+        values = np.asarray(values, dtype=float)
+        # Con la holgura de bin_index un valor en un borde decimal cae en el bin que empieza en él
+        position = (values - self.start) / self.step
+        position += BIN_EPSILON * (1.0 + (np.abs(values) + abs(self.start)) / self.step)
+        # El borde superior se incluye: el redondeo puede dejar el valor máximo justo en él
+        inside = (position >= 0) & (position <= self.count + BIN_EPSILON)
+        index = np.full(values.shape, -1, dtype=np.intp)
+        index[inside] = np.minimum(position[inside].astype(np.intp), self.count - 1)
+        return index
+
+
+class BinAccumulator:
+    """Conteo y agregado de un valor por celda (1D o 2D), acumulados bloque a bloque."""
+
+    def __init__(self, shape: Tuple[int, ...], aggregate: str = 'count'):
+        aggregate = normalize_aggregate(aggregate)
+        if aggregate not in STREAMING_AGGREGATES:
+            raise ValueError(f"Agregado no acumulable por bins: {aggregate}. Válidos: {STREAMING_AGGREGATES}")
+        self.shape = tuple(int(n) for n in shape)
+        self.aggregate = aggregate
+        size = int(np.prod(self.shape))
+        self.counts = np.zeros(size)
+        self.sums = np.zeros(size) if aggregate in ('sum', 'mean') else None
+        self.extremes = None
+        if aggregate in ('min', 'max'):
+            self.extremes = np.full(size, np.inf if aggregate == 'min' else -np.inf)
+
+    def add(self, indices: Sequence[np.ndarray], values: Optional[np.ndarray] = None) -> 'BinAccumulator':
+        """Suma un bloque: el índice de cada eje (-1 = fuera) y, si el agregado lo usa, el valor."""
+        valid = np.logical_and.reduce([np.asarray(i) >= 0 for i in indices])
+        if self.aggregate != 'count':
+            values = np.asarray(values, dtype=float)
+            valid &= np.isfinite(values)
+            values = values[valid]
+        flat = np.ravel_multi_index([np.asarray(i)[valid] for i in indices], self.shape)
+        size = self.counts.size
+        self.counts += np.bincount(flat, minlength=size)
+        if self.sums is not None:
+            self.sums += np.bincount(flat, weights=values, minlength=size)
+        if self.extremes is not None:
+            (np.minimum if self.aggregate == 'min' else np.maximum).at(self.extremes, flat, values)
+        return self
+
+    def merge(self, other: 'BinAccumulator') -> 'BinAccumulator':
+        """Combina otro acumulador con los mismos bins (p. ej. de otro proceso o bloque)."""
+        if other.shape != self.shape or other.aggregate != self.aggregate:
+            raise ValueError("Sólo se combinan acumuladores con los mismos bins y agregado")
+        self.counts += other.counts
+        if self.sums is not None:
+            self.sums += other.sums
+        if self.extremes is not None:
+            reduce = np.minimum if self.aggregate == 'min' else np.maximum
+            self.extremes = reduce(self.extremes, other.extremes)
+        return self
+
+    def result(self) -> np.ndarray:
+        """Agregado por celda con la forma de los bins (NaN en celdas vacías, salvo conteo y suma)."""
+        if self.aggregate == 'count':
+            out = self.counts
+        elif self.aggregate == 'sum':
+            out = self.sums
+        elif self.aggregate == 'mean':
+            with np.errstate(invalid='ignore', divide='ignore'):
+                out = np.where(self.counts > 0, self.sums / self.counts, np.nan)
+        else:
+            out = np.where(self.counts > 0, self.extremes, np.nan)
+        return out.reshape(self.shape)
+
+
+def histogram(values: Sequence[float], bin_def: Any = True, chunk_size: int = CHUNK_SIZE) -> Tuple[Bins, np.ndarray]:
+    """Conteos de un histograma 1D con bins 'redondos' (acumulados por bloques)."""
+    values = np.asarray(values, dtype=float)
+    finite = values[np.isfinite(values)]
+    bins = Bins.from_extent(float(finite.min()) if finite.size else 0.0,
+                            float(finite.max()) if finite.size else 0.0, bin_def)
+    accumulator = BinAccumulator((bins.count,))
+    for start in range(0, values.size, chunk_size):
+        accumulator.add([bins.index(values[start:start + chunk_size])])
+    return bins, accumulator.result()
+
+
+# ---------------------------------------------------------------------------
+# Transformación 'bin' (histograma, mapa de calor, mapa de calor geográfico)
+# ---------------------------------------------------------------------------
+
+def _axis(rows: List[Dict[str, Any]], fd: FieldDef, bin_def: Any):
+    """(índices, bins o etiquetas) de un eje: bins si es cuantitativo, categorías si no."""
+    if fd.type == MeasurementType.QUANTITATIVE:
+        values = numeric_column(rows, fd.field)
+        finite = values[np.isfinite(values)]
+        if not finite.size:
+            return None
+        bins = Bins.from_extent(float(finite.min()), float(finite.max()), bin_def)
+        return bins.index(values), bins
+    labels, codes = group_codes(rows, fd.field)
+    return codes, labels
+
+
+def _axis_channel(fd: FieldDef, bins, channel: str) -> Dict[str, Dict[str, Any]]:
+    if isinstance(bins, Bins):
+        return {
+            channel: {'field': f'{fd.field}_inicio', 'type': 'quantitative', 'title': fd.field,
+                      'bin': {'binned': True, 'step': bins.step}},
+            f'{channel}2': {'field': f'{fd.field}_fin'},
+        }
+    return {channel: {'field': fd.field, 'type': (fd.type or MeasurementType.NOMINAL).value}}
+
+
+def _axis_values(fd: FieldDef, bins, index: int) -> Dict[str, Any]:
+    if isinstance(bins, Bins):
+        start = bins.start + index * bins.step
+        return {f'{fd.field}_inicio': start, f'{fd.field}_fin': start + bins.step}
+    return {fd.field: bins[index]}
+
+
+def cell_measure(encoding: Encoding, channels: Sequence[str]) -> Dict[str, Any]:
+    """Medida de las celdas: el primer canal cuantitativo con campo, o el conteo de filas."""
+    for channel in channels:
+        fd = encoding.fields.get(channel)
+        if fd is None:
+            continue
+        if fd.aggregate is not None and normalize_aggregate(fd.aggregate) == 'count':
+            break
+        if fd.field is not None and fd.type == MeasurementType.QUANTITATIVE:
+            return {'field': fd.field, 'aggregate': normalize_aggregate(fd.aggregate or DEFAULT_AGGREGATE)}
+    return {'field': None, 'aggregate': 'count'}
+
+
+@register('bin')
+def precompute_bins(info: ChartTypeInfo, rows: List[Dict[str, Any]], encoding: Encoding,
+                    options: Dict[str, Any]) -> Optional[Precomputed]:
+    """Conteos (o agregados) por bin del histograma o por celda del mapa de calor."""
+    fields = encoding.fields
+    if info.name == 'histograma':
+        channels = [('x', fields.get('x'))]
+        if fields.get('color') is not None and fields['color'].type != MeasurementType.QUANTITATIVE:
+            channels.append(('color', fields['color']))
+        measure = cell_measure(encoding, ('y',))
+        maxbins = options.get('maxbins') or DEFAULT_MAXBINS
+    else:
+        pairs = (('x', 'longitude'), ('y', 'latitude')) if info.name == 'mapa_calor_geografico' else (('x', 'x'), ('y', 'y'))
+        channels = [(vl, fields.get(enc)) for vl, enc in pairs]
+        measure = cell_measure(encoding, ('color', 'size'))
+        maxbins = options.get('maxbins') or HEATMAP_MAXBINS
+    if any(fd is None or fd.field is None for _, fd in channels):
+        return None
+    if measure['aggregate'] not in STREAMING_AGGREGATES:
+        return None
+
+    axes = []
+    for _, fd in channels:
+        bin_def = fd.bin if isinstance(fd.bin, dict) else {'maxbins': maxbins}
+        axis = _axis(rows, fd, bin_def)
+        if axis is None:
+            return None
+        axes.append(axis)
+    shape = tuple(bins.count if isinstance(bins, Bins) else len(bins) for _, bins in axes)
+    accumulator = BinAccumulator(shape, measure['aggregate'])
+    values = numeric_column(rows, measure['field']) if measure['field'] is not None else None
+    for start in range(0, len(rows), CHUNK_SIZE):
+        block = slice(start, start + CHUNK_SIZE)
+        accumulator.add([index[block] for index, _ in axes], values[block] if values is not None else None)
+    result = accumulator.result()
+
+    column = measure_column(measure)
+    if len(axes) == 1:
+        # 1D: todos los bins (los vacíos también se ven); 2D: sólo las celdas con datos
+        cells = np.arange(shape[0])[:, None]
+    else:
+        cells = np.argwhere(accumulator.counts.reshape(shape) > 0)
+    out_rows = []
+    for cell in cells.tolist():
+        row: Dict[str, Any] = {}
+        for (_, fd), (_, bins), i in zip(channels, axes, cell):
+            row.update(_axis_values(fd, bins, i))
+        value = result[tuple(cell)]
+        if measure['aggregate'] == 'count':
+            row[column] = int(value)
+        else:
+            row[column] = float(value) if np.isfinite(value) else None
+        out_rows.append(row)
+    if not out_rows:
+        return None
+
+    vl_encoding: Dict[str, Any] = {}
+    for (channel, fd), (_, bins) in zip(channels, axes):
+        vl_encoding.update(_axis_channel(fd, bins, channel))
+    measure_channel = {'field': column, 'type': 'quantitative', 'title': column}
+    if info.name == 'histograma':
+        mark = 'bar'
+        vl_encoding['y'] = measure_channel
+    else:
+        mark = 'rect'
+        vl_encoding['color'] = measure_channel
+    vl_encoding['tooltip'] = [{'field': v['field'], 'type': v['type'], 'title': v.get('title', v['field'])}
+                              for k, v in vl_encoding.items() if k in ('x', 'y', 'color')]
+    return Precomputed('bin', out_rows, {'data': {'values': out_rows}, 'mark': mark, 'encoding': vl_encoding})
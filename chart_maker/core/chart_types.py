@@ -1,71 +1,154 @@
 """
 Catálogo de tipos de gráficos soportados - Español e Inglés.
 Lista completa para generación de objetos visuales locales para Power BI y Tableau.
+
+Cada tipo canónico (español) se registra una sola vez con su alias en inglés y con
+su entrada precalculada para cada destino: marca de Vega-Lite, clase de marca de
+Tableau, renderizador de Power BI, tipo de Looker Studio, canales requeridos y
+transformaciones de datos que necesita. Las etapas consultan chart_type_info(tipo)
+en O(1) en lugar de reconstruir sus tablas en cada llamada.
 """
 
-CHART_TYPES = [
-    # Gráficos Básicos Comunes / Common Basic Charts
-    'barras_vertical', 'bar_chart_vertical',
-    'barras_horizontal', 'bar_chart_horizontal', 
-    'columnas', 'column_chart',
-    'barras_agrupadas', 'grouped_bar_chart',
-    'barras_apiladas', 'stacked_bar_chart',
-    
-    # Gráficos de Tendencias / Trend Charts
-    'lineas', 'line_chart',
-    'area', 'area_chart', 
-    'area_apilada', 'stacked_area_chart',
-    
-    # Gráficos de Composición / Composition Charts
-    'circular', 'pie_chart',
-    'dona', 'donut_chart',
-    'treemap', 'treemap_chart',
-    'waffle', 'waffle_chart',
-    
-    # Análisis de Distribución / Distribution Analysis
-    'histograma', 'histogram',
-    'caja', 'box_plot',
-    'violin', 'violin_plot',
-    'densidad', 'density_plot',
-    
-    # Análisis de Correlación / Correlation Analysis  
-    'dispersion', 'scatter_plot',
-    'burbujas', 'bubble_chart',
-    'matriz_correlacion', 'correlation_matrix',
-    
-    # Mapas y Geoespaciales / Maps and Geospatial
-    'mapa_coropletico', 'choropleth_map',
-    'mapa_puntos', 'point_map', 
-    'mapa_calor_geografico', 'geographic_heatmap',
-    
-    # Análisis de Flujo y Proceso / Flow and Process Analysis
-    'embudo', 'funnel_chart',
-    'sankey', 'sankey_diagram',
-    'cascada', 'waterfall_chart',
-    'lazo', 'loop_chart',
-    'lazo_circular', 'circular_loop_chart',
-    'lazo_proceso', 'process_loop_chart',
-    'lazo_flujo', 'flow_loop_chart',
-    
-    # Visualizaciones Avanzadas / Advanced Visualizations
-    'mapa_calor', 'heatmap',
-    'radar', 'radar_chart',
-    'gantt', 'gantt_chart',
-    'kpi', 'kpi_card',
-    'espiral', 'spiral_chart',
-    
-    # Gráficos Específicos R/ggplot2 / R/ggplot2 Specific
-    'puntos', 'geom_point',
-    'linea_tendencia', 'geom_smooth',
-    'poligono', 'geom_polygon',
-    
-    # Categorías de Visualización / Visualization Categories
-    'correlacion', 'correlation',
-    'desviacion', 'deviation', 
-    'ranking', 'ranking',
-    'distribucion', 'distribution',
-    'composicion', 'composition',
-    'cambio', 'change',
-    'grupos', 'groups',
-    'espacial', 'spatial'
-]
+import sys
+from dataclasses import dataclass
+from typing import Any, Dict, List, Tuple
+
+
+@dataclass(frozen=True, slots=True)
+class ChartTypeInfo:
+    """Entrada del registro: un tipo canónico y su despacho por destino."""
+    name: str
+    alias: str
+    category: str
+    vegalite_mark: str
+    tableau_mark: str
+    powerbi_renderer: str
+    looker_studio_type: str
+    required_channels: Tuple[str, ...] = ()
+    # Transformaciones de datos previas al dibujo ('bin', 'stack', 'density', 'layout'...)
+    transforms: Tuple[str, ...] = ()
+    horizontal: bool = False
+    stacked: bool = False
+    # Propiedades de la marca de Vega-Lite: (propiedad, valor por defecto); options la sobrescribe
+    mark_defaults: Tuple[Tuple[str, Any], ...] = ()
+
+    @property
+    def names(self) -> Tuple[str, ...]:
+        return (self.name, self.alias) if self.alias != self.name else (self.name,)
+
+    def missing_channels(self, encoding: Dict[str, Any]) -> List[str]:
+        """Canales requeridos que faltan en el encoding."""
+        return [channel for channel in self.required_channels if channel not in (encoding or {})]
+
+
+# (nombre, alias, vega-lite, tableau, power bi, looker studio, canales requeridos, transformaciones)
+_DEFINITIONS = {
+    'Gráficos Básicos Comunes / Common Basic Charts': [
+        ('barras_vertical', 'bar_chart_vertical', 'bar', 'bar', 'bar', 'COLUMN', ('x', 'y'), ()),
+        ('barras_horizontal', 'bar_chart_horizontal', 'bar', 'horizontal-bar', 'bar', 'BAR', ('x', 'y'), ()),
+        ('columnas', 'column_chart', 'bar', 'bar', 'bar', 'COLUMN', ('x', 'y'), ()),
+        ('barras_agrupadas', 'grouped_bar_chart', 'bar', 'bar', 'bar', 'COLUMN', ('x', 'y', 'color'), ()),
+        ('barras_apiladas', 'stacked_bar_chart', 'bar', 'bar', 'bar', 'STACKED_COLUMN', ('x', 'y', 'color'), ('stack', 'resample')),
+    ],
+    'Gráficos de Tendencias / Trend Charts': [
+        ('lineas', 'line_chart', 'line', 'line', 'line', 'LINE', ('x', 'y'), ('resample',)),
+        ('area', 'area_chart', 'area', 'area', 'area', 'AREA', ('x', 'y'), ('resample',)),
+        ('area_apilada', 'stacked_area_chart', 'area', 'area', 'area', 'STACKED_AREA', ('x', 'y', 'color'), ('stack', 'resample')),
+    ],
+    'Gráficos de Composición / Composition Charts': [
+        ('circular', 'pie_chart', 'arc', 'pie', 'pie', 'PIE', ('theta', 'color'), ()),
+        ('dona', 'donut_chart', 'arc', 'pie', 'donut', 'DONUT', ('theta', 'color'), ()),
+        ('treemap', 'treemap_chart', 'rect', 'square', 'bar', 'TREEMAP', ('color', 'size'), ('layout',)),
+        ('waffle', 'waffle_chart', 'rect', 'square', 'bar', 'TABLE', ('theta', 'color'), ('layout',)),
+    ],
+    'Análisis de Distribución / Distribution Analysis': [
+        ('histograma', 'histogram', 'bar', 'bar', 'bar', 'COLUMN', ('x',), ('bin',)),
+        ('caja', 'box_plot', 'boxplot', 'circle', 'bar', 'TABLE', ('x', 'y'), ('quantiles',)),
+        ('violin', 'violin_plot', 'area', 'area', 'area', 'TABLE', ('x',), ('density',)),
+        ('densidad', 'density_plot', 'area', 'area', 'area', 'TABLE', ('x',), ('density',)),
+    ],
+    'Análisis de Correlación / Correlation Analysis': [
+        ('dispersion', 'scatter_plot', 'point', 'scatter', 'scatter', 'SCATTER', ('x', 'y'), ()),
+        ('burbujas', 'bubble_chart', 'point', 'scatter', 'scatter', 'BUBBLE', ('x', 'y', 'size'), ()),
+        ('matriz_correlacion', 'correlation_matrix', 'rect', 'heatmap', 'heatmap', 'TABLE', ('x', 'y'), ('correlation',)),
+    ],
+    'Mapas y Geoespaciales / Maps and Geospatial': [
+        ('mapa_coropletico', 'choropleth_map', 'geoshape', 'map', 'bar', 'GEO', ('color',), ('geo',)),
+        ('mapa_puntos', 'point_map', 'point', 'map', 'scatter', 'GEO', ('latitude', 'longitude'), ('geo',)),
+        ('mapa_calor_geografico', 'geographic_heatmap', 'rect', 'map', 'heatmap', 'TABLE',
+         ('latitude', 'longitude'), ('geo', 'bin')),
+    ],
+    'Análisis de Flujo y Proceso / Flow and Process Analysis': [
+        ('embudo', 'funnel_chart', 'bar', 'bar', 'bar', 'TABLE', ('x', 'y'), ('layout',)),
+        ('sankey', 'sankey_diagram', 'rect', 'bar', 'bar', 'TABLE', ('source', 'target', 'value'), ('layout',)),
+        ('cascada', 'waterfall_chart', 'bar', 'gantt', 'bar', 'TABLE', ('x', 'y'), ('layout',)),
+        ('lazo', 'loop_chart', 'line', 'line', 'line', 'TABLE', ('x', 'y'), ()),
+        ('lazo_circular', 'circular_loop_chart', 'arc', 'pie', 'pie', 'TABLE', ('theta',), ()),
+        ('lazo_proceso', 'process_loop_chart', 'point', 'scatter', 'scatter', 'TABLE', ('x', 'y'), ()),
+        ('lazo_flujo', 'flow_loop_chart', 'area', 'area', 'area', 'TABLE', ('x', 'y'), ()),
+    ],
+    'Visualizaciones Avanzadas / Advanced Visualizations': [
+        ('mapa_calor', 'heatmap', 'rect', 'heatmap', 'heatmap', 'PIVOT_TABLE', ('x', 'y', 'color'), ('bin',)),
+        ('radar', 'radar_chart', 'line', 'line', 'line', 'TABLE', ('theta', 'radius'), ()),
+        ('gantt', 'gantt_chart', 'bar', 'gantt', 'bar', 'TABLE', ('x', 'x2', 'y'), ('resample',)),
+        ('kpi', 'kpi_card', 'text', 'text', 'bar', 'SCORECARD', ('value',), ()),
+        ('espiral', 'spiral_chart', 'point', 'line', 'line', 'TABLE', ('theta', 'radius'), ()),
+    ],
+    'Gráficos Específicos R/ggplot2 / R/ggplot2 Specific': [
+        ('puntos', 'geom_point', 'point', 'scatter', 'scatter', 'SCATTER', ('x', 'y'), ()),
+        ('linea_tendencia', 'geom_smooth', 'line', 'line', 'line', 'LINE', ('x', 'y'), ('regression',)),
+        ('poligono', 'geom_polygon', 'area', 'polygon', 'area', 'TABLE', ('x', 'y'), ()),
+    ],
+    'Categorías de Visualización / Visualization Categories': [
+        ('correlacion', 'correlation', 'point', 'scatter', 'scatter', 'SCATTER', ('x', 'y'), ()),
+        ('desviacion', 'deviation', 'bar', 'bar', 'bar', 'COLUMN', ('x', 'y'), ()),
+        ('ranking', 'ranking', 'bar', 'bar', 'bar', 'BAR', ('x', 'y'), ()),
+        ('distribucion', 'distribution', 'bar', 'bar', 'bar', 'COLUMN', ('x', 'y'), ()),
+        ('composicion', 'composition', 'arc', 'pie', 'pie', 'PIE', ('theta', 'color'), ()),
+        ('cambio', 'change', 'line', 'line', 'line', 'LINE', ('x', 'y'), ('resample',)),
+        ('grupos', 'groups', 'bar', 'bar', 'bar', 'COLUMN', ('x', 'y', 'color'), ()),
+        ('espacial', 'spatial', 'point', 'map', 'scatter', 'GEO', ('latitude', 'longitude'), ('geo',)),
+    ],
+}
+
+# Propiedades que no caben en la tabla
+_EXTRAS = {
+    'barras_horizontal': {'horizontal': True},
+    'barras_apiladas': {'stacked': True},
+    'area_apilada': {'stacked': True},
+    'dona': {'mark_defaults': (('innerRadius', 50),)},
+}
+
+
+def _build_registry(definitions) -> Dict[str, ChartTypeInfo]:
+    registry: Dict[str, ChartTypeInfo] = {}
+    for category, rows in definitions.items():
+        for name, alias, *dispatch in rows:
+            info = ChartTypeInfo(sys.intern(name), sys.intern(alias), category, *dispatch,
+                                 **_EXTRAS.get(name, {}))
+            for key in info.names:
+                if key in registry:
+                    raise ValueError(f'Tipo de gráfico duplicado en el registro: {key}')
+                registry[key] = info
+    return registry
+
+
+# Nombre o alias -> entrada (ambos nombres comparten el mismo objeto)
+CHART_REGISTRY: Dict[str, ChartTypeInfo] = _build_registry(_DEFINITIONS)
+
+# Lista plana (español, inglés) en el orden del catálogo, para la GUI y los mensajes
+CHART_TYPES: List[str] = list(CHART_REGISTRY)
+
+
+def chart_type_info(chart_type: str) -> ChartTypeInfo:
+    """Entrada del registro de un tipo (nombre o alias); error si no está soportado."""
+    try:
+        return CHART_REGISTRY[chart_type]
+    except (KeyError, TypeError):
+        raise ValueError(f'Tipo de gráfico no soportado: {chart_type}. Tipos válidos: {CHART_TYPES}') from None
+
+
+def canonical_chart_type(chart_type: str) -> str:
+    """Nombre canónico (español) de un tipo o de su alias en inglés."""
+    return chart_type_info(chart_type).name
+
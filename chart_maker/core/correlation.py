@@ -0,0 +1,267 @@
+"""
+Matrices de correlación (Pearson y Spearman) para tablas anchas.
+
+Las filas se recorren por bloques de tamaño acotado (CHUNK_BYTES) y cada bloque suma
+sus co-momentos en CorrelationAccumulator: por cada par de columnas, el número de filas
+donde ambas tienen valor y las sumas de x, x² y x·y sobre esas filas (NaN por pares).
+Cada suma es un producto de matrices sobre franjas de columnas, repartidas en un pool
+de hilos (BLAS libera el GIL). La memoria depende de columnas², no de filas.
+
+Spearman es Pearson sobre los rangos: con pocos datos los rangos son exactos (empates
+promediados); con muchos, la primera pasada resume cada columna en un TDigest y una
+segunda pasada acumula los rangos aproximados que da ese resumen. Los rangos se calculan
+por columna, así que con huecos difiere un poco de volver a ordenar cada par completo.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+from .chart_types import ChartTypeInfo
+from .encoding import Encoding
+from .quantiles import EXACT_LIMIT, TDigest
+from .transforms import Precomputed, numeric_column, register
+
+# Memoria de un bloque de filas (float64); el cálculo usa unas cuatro veces esto
+CHUNK_BYTES = 32 * 1024 * 1024
+# Columnas por franja de cada tarea del pool
+COLUMN_BLOCK = 128
+# Filas que se inspeccionan para decidir qué columnas son numéricas
+SAMPLE_ROWS = 1000
+METHODS = ('pearson', 'spearman')
+# Con más variables no se escribe el coeficiente en cada celda
+MAX_LABELED_FIELDS = 15
+
+
+class CorrelationAccumulator:
+    """Co-momentos por pares de columnas, acumulados bloque a bloque (NaN = sin valor)."""
+
+    def __init__(self, n_columns: int, block_size: int = COLUMN_BLOCK):
+        p = int(n_columns)
+        self.n_columns = p
+        self.block_size = block_size
+        self.shift: Optional[np.ndarray] = None
+        # counts[i, j]: filas con valor en i y j; sums[i, j] / squares[i, j]: Σx_i y Σx_i² en esas filas
+        self.counts = np.zeros((p, p))
+        self.sums = np.zeros((p, p))
+        self.squares = np.zeros((p, p))
+        # products[i, j] = Σx_i·x_j (sólo el triángulo superior; el inferior se refleja al final)
+        self.products = np.zeros((p, p))
+
+    def _stripes(self):
+        return [(start, min(start + self.block_size, self.n_columns))
+                for start in range(0, self.n_columns, self.block_size)]
+
+    def add(self, chunk: np.ndarray, pool: Optional[ThreadPoolExecutor] = None) -> 'CorrelationAccumulator':
+        """Suma un bloque (filas × columnas)."""
+        chunk = np.asarray(chunk, dtype=float)
+        if not chunk.size:
+            return self
+        if self.shift is None:
+            # Desplazar por una media aproximada evita la cancelación en Σx² - (Σx)²/n
+            with np.errstate(invalid='ignore'):
+                shift = np.nanmean(chunk, axis=0) if np.isnan(chunk).any() else chunk.mean(axis=0)
+            self.shift = np.nan_to_num(shift)
+        centered = chunk - self.shift
+        present = ~np.isnan(centered)
+        complete = bool(present.all())
+        values = centered if complete else np.where(present, centered, 0.0)
+        squared = values * values
+        # Los conteos de un bloque son enteros < 2^24: exactos en float32 (producto el doble de rápido)
+        mask = None if complete else present.astype(np.float32)
+
+        if complete:
+            # Sin huecos: los conteos y sumas por pares son los de cada columna
+            self.counts += len(values)
+            self.sums += values.sum(axis=0)[:, None]
+            self.squares += squared.sum(axis=0)[:, None]
+
+        def stripe(bounds):
+            start, stop = bounds
+            block = values[:, start:stop]
+            # Triángulo superior: filas 0..stop contra las columnas de la franja
+            self.products[:stop, start:stop] += values[:, :stop].T @ block
+            if mask is not None:
+                block_mask = mask[:, start:stop]
+                self.counts[:, start:stop] += mask.T @ block_mask
+                self.sums[:, start:stop] += values.T @ block_mask.astype(float)
+                self.squares[:, start:stop] += squared.T @ block_mask.astype(float)
+
+        stripes = self._stripes()
+        if pool is not None and len(stripes) > 1:
+            list(pool.map(stripe, stripes))
+        else:
+            for bounds in stripes:
+                stripe(bounds)
+        return self
+
+    def merge(self, other: 'CorrelationAccumulator') -> 'CorrelationAccumulator':
+        """Combina los co-momentos de otro acumulador (mismas columnas)."""
+        if other.n_columns != self.n_columns:
+            raise ValueError("Sólo se combinan acumuladores con las mismas columnas")
+        if other.shift is None:
+            return self
+        if self.shift is None:
+            self.shift = other.shift
+        # Llevar las sumas del otro a este desplazamiento: x - a = (x - b) + (b - a)
+        d = other.shift - self.shift
+        n = other.counts
+        sums = other.sums + n * d[:, None]
+        self.squares += other.squares + 2 * d[:, None] * other.sums + n * (d * d)[:, None]
+        upper = np.triu(other.products) + np.triu(other.products, 1).T
+        self.products += np.triu(upper + d[:, None] * other.sums.T + other.sums * d[None, :]
+                                 + n * np.outer(d, d))
+        self.sums += sums
+        self.counts += n
+        return self
+
+    def pearson(self) -> np.ndarray:
+        """Matriz de Pearson (NaN si un par tiene menos de 2 filas o varianza nula)."""
+        products = np.triu(self.products) + np.triu(self.products, 1).T
+        n = self.counts
+        with np.errstate(invalid='ignore', divide='ignore'):
+            covariance = products - self.sums * self.sums.T / n
+            variance = self.squares - self.sums ** 2 / n
+            r = covariance / np.sqrt(variance * variance.T)
+        r[(n < 2) | ~(variance > 0) | ~(variance.T > 0)] = np.nan
+        return np.clip(r, -1.0, 1.0)
+
+
+def rank_columns(matrix: np.ndarray) -> np.ndarray:
+    """Rangos (1..n) de cada columna, con empates promediados; los NaN siguen siendo NaN."""
+    ranks = np.full(matrix.shape, np.nan)
+    for j in range(matrix.shape[1]):
+        column = matrix[:, j]
+        present = ~np.isnan(column)
+        _, inverse, counts = np.unique(column[present], return_inverse=True, return_counts=True)
+        ends = np.cumsum(counts)
+        ranks[present, j] = (ends - (counts - 1) / 2)[inverse]
+    return ranks
+
+
+def correlation_matrices(chunks: Callable[[], Iterable[np.ndarray]], n_columns: int,
+                         methods: Sequence[str] = METHODS, exact: bool = False,
+                         workers: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Matrices de correlación de datos que llegan por bloques (filas × columnas).
+
+    Args:
+        chunks: Función que devuelve un iterador nuevo de bloques en cada llamada
+                (Spearman aproximado recorre los datos dos veces)
+        methods: 'pearson' y/o 'spearman'
+        exact: Rangos exactos para Spearman; exige que todos los bloques quepan en memoria
+
+    Returns:
+        {'counts': filas por par, 'pearson': matriz, 'spearman': matriz} según methods
+    """
+    for method in methods:
+        if method not in METHODS:
+            raise ValueError(f"Método de correlación no soportado: {method}. Válidos: {METHODS}")
+    spearman = 'spearman' in methods
+    pearson = CorrelationAccumulator(n_columns)
+    digests: List[List[TDigest]] = [[] for _ in range(n_columns)]
+    held: List[np.ndarray] = []
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for chunk in chunks():
+            pearson.add(chunk, pool)
+            if spearman and exact:
+                held.append(np.asarray(chunk, dtype=float))
+            elif spearman:
+                ordered = np.sort(chunk, axis=0)
+                for j in range(n_columns):
+                    digests[j].append(TDigest.from_sorted(ordered[:, j]))
+        result: Dict[str, Any] = {'counts': pearson.counts.copy()}
+        if 'pearson' in methods:
+            result['pearson'] = pearson.pearson()
+        if spearman:
+            ranked = CorrelationAccumulator(n_columns)
+            if exact:
+                if held:
+                    ranked.add(rank_columns(np.vstack(held)), pool)
+            else:
+                merged = [TDigest.merge_all(column) for column in digests]
+                for chunk in chunks():
+                    chunk = np.asarray(chunk, dtype=float)
+                    ranks = np.column_stack([merged[j].rank(chunk[:, j]) for j in range(n_columns)])
+                    ranked.add(ranks, pool)
+            result['spearman'] = ranked.pearson()
+    return result
+
+
+def chunk_rows(n_columns: int) -> int:
+    """Filas por bloque para no pasar de CHUNK_BYTES."""
+    return max(1024, CHUNK_BYTES // (8 * max(n_columns, 1)))
+
+
+# ---------------------------------------------------------------------------
+# Transformación 'correlation' (matriz de correlación)
+# ---------------------------------------------------------------------------
+
+def numeric_fields(rows: List[Dict[str, Any]], sample: int = SAMPLE_ROWS) -> List[str]:
+    """Campos (en orden de aparición) cuyos valores de muestra no vacíos son todos numéricos."""
+    kinds: Dict[str, set] = {}
+    for row in rows[:sample]:
+        for field, value in row.items():
+            found = kinds.setdefault(field, set())
+            if value is not None and value != '':
+                found.add(isinstance(value, (int, float)) and not isinstance(value, bool))
+    return [field for field, found in kinds.items() if found == {True}]
+
+
+def _row_chunks(rows: List[Dict[str, Any]], fields: List[str]) -> Iterator[np.ndarray]:
+    size = chunk_rows(len(fields))
+    for start in range(0, len(rows), size):
+        block = rows[start:start + size]
+        yield np.column_stack([numeric_column(block, field) for field in fields])
+
+
+@register('correlation')
+def precompute_correlation(info: ChartTypeInfo, rows: List[Dict[str, Any]], encoding: Encoding,
+                           options: Dict[str, Any]) -> Optional[Precomputed]:
+    """Matriz en formato largo (variable_x, variable_y, pearson, spearman, n) de las columnas numéricas."""
+    fields = list(options.get('fields') or numeric_fields(rows))
+    if len(fields) < 2:
+        return None
+    method = options.get('method', 'pearson')
+    methods = tuple(dict.fromkeys([method] + list(options.get('methods') or METHODS)))
+    matrices = correlation_matrices(lambda: _row_chunks(rows, fields), len(fields), methods,
+                                    exact=len(rows) <= EXACT_LIMIT)
+
+    out_rows = []
+    for i, field_x in enumerate(fields):
+        for j, field_y in enumerate(fields):
+            row: Dict[str, Any] = {'variable_x': field_x, 'variable_y': field_y}
+            for name in methods:
+                value = matrices[name][i, j]
+                row[name] = round(float(value), 6) if np.isfinite(value) else None
+            row['n'] = int(matrices['counts'][i, j])
+            out_rows.append(row)
+
+    axis = {'type': 'nominal', 'sort': fields, 'title': None}
+    cells = {
+        'mark': 'rect',
+        'encoding': {
+            'x': dict(axis, field='variable_x'),
+            'y': dict(axis, field='variable_y'),
+            'color': {'field': method, 'type': 'quantitative', 'title': method.capitalize(),
+                      'scale': {'domain': [-1, 1], 'scheme': 'redblue', 'reverse': True}},
+            'tooltip': [{'field': 'variable_x', 'type': 'nominal'}, {'field': 'variable_y', 'type': 'nominal'}]
+                       + [{'field': name, 'type': 'quantitative', 'format': '.3f'} for name in methods]
+                       + [{'field': 'n', 'type': 'quantitative'}],
+        },
+    }
+    vegalite: Dict[str, Any] = {'data': {'values': out_rows}}
+    if len(fields) <= MAX_LABELED_FIELDS:
+        labels = {
+            'mark': {'type': 'text', 'fontSize': 10},
+            'encoding': {
+                'x': dict(axis, field='variable_x'),
+                'y': dict(axis, field='variable_y'),
+                'text': {'field': method, 'type': 'quantitative', 'format': '.2f'},
+            },
+        }
+        vegalite['layer'] = [cells, labels]
+    else:
+        vegalite.update(cells)
+    return Precomputed('correlation', out_rows, vegalite)
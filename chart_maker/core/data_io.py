@@ -0,0 +1,47 @@
+"""
+Lectura de datos de archivos CSV y JSON en el formato de ChartSpec.data.
+
+La GUI y los scripts (benchmarks, exportación por lotes) comparten estas funciones
+para que la conversión de tipos sea la misma en todos los casos.
+"""
+
+import csv
+import json
+from typing import Any, Dict, List, TextIO, Union
+
+
+def _convert_value(value: Any) -> Any:
+    """Convierte un valor de texto a int/float si es posible; si no, lo deja igual."""
+    try:
+        if '.' in value:
+            return float(value)
+        return int(value)
+    except (TypeError, ValueError):
+        return value
+
+
+def read_csv_rows(source: Union[str, TextIO]) -> List[Dict[str, Any]]:
+    """
+    Lee un CSV (ruta o archivo abierto) detectando el dialecto y convirtiendo los
+    valores numéricos.
+
+    Returns:
+        Lista de filas como dicts
+    """
+    if isinstance(source, str):
+        with open(source, 'r', encoding='utf-8', newline='') as file:
+            return read_csv_rows(file)
+
+    sample = source.read(1024)
+    source.seek(0)
+    dialect = csv.Sniffer().sniff(sample)
+    reader = csv.DictReader(source, dialect=dialect)
+    return [{key: _convert_value(value) for key, value in row.items()} for row in reader]
+
+
+def read_json_rows(source: Union[str, TextIO]) -> Union[List[Dict[str, Any]], Dict[str, Any]]:
+    """Lee datos JSON (lista de filas o {"values": [...]}) desde una ruta o archivo abierto."""
+    if isinstance(source, str):
+        with open(source, 'r', encoding='utf-8') as file:
+            return json.load(file)
+    return json.load(source)
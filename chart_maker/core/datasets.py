@@ -0,0 +1,216 @@
+"""
+Registro de datasets direccionado por contenido.
+
+Varios ChartSpec de un mismo dashboard suelen compartir el dataset. En lugar de que
+cada spec lleve su propia copia de las filas, el dataset se registra una vez y el spec
+guarda una referencia:
+
+    ref = DATASETS.add(filas)            # {"dataset": "<hash>"}
+    spec = ChartSpec(type='lineas', data=ref, encoding={...})
+    filas = resolve_data(spec.data)      # las filas registradas
+
+La clave es un hash del contenido (filas iguales -> misma clave, una sola copia). Cada
+add/retain suma una referencia y release la quita; el dataset se libera al llegar a
+cero. Los bundles (write_bundle/read_bundle) escriben cada dataset una sola vez.
+"""
+
+import hashlib
+import json
+import sys
+import threading
+from typing import Any, Dict, Iterable, List, Optional
+
+# Clave del dict de referencia en ChartSpec.data
+REF_KEY = 'dataset'
+BUNDLE_VERSION = 1
+# Caracteres hex de la clave (blake2b de 128 bits)
+DIGEST_SIZE = 16
+# Filas serializadas por bloque al calcular el hash
+HASH_CHUNK_ROWS = 1000
+
+
+def is_dataset_ref(data) -> bool:
+    """True si data es una referencia {"dataset": "<hash>"}."""
+    return isinstance(data, dict) and isinstance(data.get(REF_KEY), str) and len(data) == 1
+
+
+def _rows_of(data) -> List[Dict[str, Any]]:
+    if isinstance(data, dict):
+        data = data.get('values') or []
+    return list(data or [])
+
+
+def content_hash(rows: List[Dict[str, Any]]) -> str:
+    """Hash estable de las filas (independiente del orden de las claves de cada fila)."""
+    digest = hashlib.blake2b(digest_size=DIGEST_SIZE)
+    # Por bloques de filas: una llamada a json.dumps por bloque en lugar de una por fila
+    for start in range(0, len(rows), HASH_CHUNK_ROWS):
+        chunk = rows[start:start + HASH_CHUNK_ROWS]
+        digest.update(json.dumps(chunk, sort_keys=True, ensure_ascii=False, default=str).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def estimate_nbytes(rows: List[Dict[str, Any]]) -> int:
+    """Memoria aproximada de las filas (lista, dicts y valores; las claves se comparten)."""
+    total = sys.getsizeof(rows)
+    for row in rows:
+        total += sys.getsizeof(row)
+        if isinstance(row, dict):
+            total += sum(sys.getsizeof(v) for v in row.values())
+    return total
+
+
+class DatasetRegistry:
+    """Datasets registrados por hash de contenido, con cuenta de referencias y de memoria."""
+
+    def __init__(self):
+        self._rows: Dict[str, List[Dict[str, Any]]] = {}
+        self._refcounts: Dict[str, int] = {}
+        self._nbytes: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def add(self, data) -> Dict[str, str]:
+        """
+        Registra las filas (lista o {'values': [...]}) y devuelve su referencia.
+        Si el mismo contenido ya estaba registrado se reutiliza y sólo suma una referencia.
+        """
+        if is_dataset_ref(data):
+            self.retain(data[REF_KEY])
+            return dict(data)
+        rows = _rows_of(data)
+        key = content_hash(rows)
+        with self._lock:
+            if key not in self._rows:
+                self._rows[key] = rows
+                self._nbytes[key] = estimate_nbytes(rows)
+                self._refcounts[key] = 0
+            self._refcounts[key] += 1
+        return {REF_KEY: key}
+
+    def retain(self, key: str):
+        """Suma una referencia a un dataset ya registrado."""
+        with self._lock:
+            if key not in self._rows:
+                raise KeyError(f"Dataset no registrado: {key}")
+            self._refcounts[key] += 1
+
+    def release(self, key: str) -> bool:
+        """Quita una referencia; devuelve True si el dataset se ha liberado."""
+        with self._lock:
+            if key not in self._rows:
+                return False
+            self._refcounts[key] -= 1
+            if self._refcounts[key] > 0:
+                return False
+            del self._rows[key], self._refcounts[key], self._nbytes[key]
+            return True
+
+    def get(self, key: str) -> List[Dict[str, Any]]:
+        rows = self._rows.get(key)
+        if rows is None:
+            raise KeyError(f"Dataset no registrado: {key}")
+        return rows
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._rows
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def refcount(self, key: str) -> int:
+        return self._refcounts.get(key, 0)
+
+    def memory_usage(self) -> Dict[str, Any]:
+        """Memoria aproximada por dataset y total, con filas y referencias de cada uno."""
+        with self._lock:
+            datasets = {
+                key: {'rows': len(rows), 'refs': self._refcounts[key], 'nbytes': self._nbytes[key]}
+                for key, rows in self._rows.items()
+            }
+        return {'datasets': datasets, 'total_nbytes': sum(d['nbytes'] for d in datasets.values())}
+
+    def clear(self):
+        with self._lock:
+            self._rows.clear()
+            self._refcounts.clear()
+            self._nbytes.clear()
+
+
+# Registro por defecto del proceso (GUI, exportadores y validación de ChartSpec)
+DATASETS = DatasetRegistry()
+
+
+def resolve_data(data, registry: Optional[DatasetRegistry] = None):
+    """Devuelve las filas si data es una referencia; si no, data sin cambios."""
+    if is_dataset_ref(data):
+        return (registry if registry is not None else DATASETS).get(data[REF_KEY])
+    return data
+
+
+def to_bundle(specs: Iterable[Dict[str, Any]], registry: Optional[DatasetRegistry] = None) -> Dict[str, Any]:
+    """
+    Agrupa varios specs (dicts) en un bundle donde cada dataset aparece una sola vez:
+    los datos embebidos se sustituyen por referencias y las referencias se resuelven
+    contra el registro.
+    """
+    registry = registry if registry is not None else DATASETS
+    datasets: Dict[str, List[Dict[str, Any]]] = {}
+    charts = []
+    for spec in specs:
+        spec = dict(spec)
+        data = spec.get('data')
+        if is_dataset_ref(data):
+            key = data[REF_KEY]
+            if key not in datasets:
+                datasets[key] = registry.get(key)
+        elif isinstance(data, list) or (isinstance(data, dict) and 'values' in data):
+            rows = _rows_of(data)
+            key = content_hash(rows)
+            datasets.setdefault(key, rows)
+        else:
+            # {'url': ...} u otros orígenes externos se dejan tal cual
+            charts.append(spec)
+            continue
+        spec['data'] = {REF_KEY: key}
+        charts.append(spec)
+    return {'version': BUNDLE_VERSION, 'datasets': datasets, 'charts': charts}
+
+
+def from_bundle(bundle: Dict[str, Any], registry: Optional[DatasetRegistry] = None) -> List[Dict[str, Any]]:
+    """
+    Registra los datasets de un bundle (una referencia por cada spec que los usa) y
+    devuelve los specs con referencias al registro.
+    """
+    registry = registry if registry is not None else DATASETS
+    if bundle.get('version') != BUNDLE_VERSION:
+        raise ValueError(f"Versión de bundle no soportada: {bundle.get('version')}")
+    datasets = bundle.get('datasets') or {}
+    # Clave del bundle -> referencia en el registro (el hash se recalcula al registrar)
+    refs: Dict[str, Dict[str, str]] = {}
+    charts = []
+    for spec in bundle.get('charts') or []:
+        spec = dict(spec)
+        data = spec.get('data')
+        if is_dataset_ref(data):
+            key = data[REF_KEY]
+            if key not in datasets:
+                raise ValueError(f"El bundle no contiene el dataset {key}")
+            if key in refs:
+                registry.retain(refs[key][REF_KEY])
+            else:
+                refs[key] = registry.add(datasets[key])
+            spec['data'] = dict(refs[key])
+        charts.append(spec)
+    return charts
+
+
+def write_bundle(path: str, specs: Iterable[Dict[str, Any]], registry: Optional[DatasetRegistry] = None):
+    """Guarda varios specs en un JSON con cada dataset escrito una sola vez."""
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(to_bundle(specs, registry), f, ensure_ascii=False)
+
+
+def read_bundle(path: str, registry: Optional[DatasetRegistry] = None) -> List[Dict[str, Any]]:
+    """Lee un bundle de write_bundle registrando sus datasets; devuelve los specs."""
+    with open(path, encoding='utf-8') as f:
+        return from_bundle(json.load(f), registry)
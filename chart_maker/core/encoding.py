@@ -0,0 +1,114 @@
+"""
+Modelo tipado del encoding de un ChartSpec.
+
+ChartSpec.encoding sigue siendo un dict (se serializa igual), pero al validarse se
+parsea una sola vez a un Encoding: un dict con el atributo 'fields', que guarda un
+FieldDef por canal con campo. Los consumidores (mapper de Vega-Lite, split_encoding)
+leen atributos en lugar de volver a inspeccionar cada dict.
+
+    spec.encoding.fields['x'].field   # 'categoria'
+    spec.encoding.fields['x'].type    # MeasurementType.NOMINAL
+"""
+
+import sys
+from enum import Enum
+from typing import Any, Dict, Optional
+
+# Alias de tipos de medida aceptados en el encoding → tipo de Vega-Lite
+TYPE_ALIASES = {
+    'quantitative': 'quantitative',
+    'temporal': 'temporal',
+    'ordinal': 'ordinal',
+    'nominal': 'nominal',
+    'geojson': 'geojson',
+    # alias
+    'number': 'quantitative',
+    'string': 'nominal',
+    'date': 'temporal',
+}
+
+
+class MeasurementType(str, Enum):
+    QUANTITATIVE = 'quantitative'
+    TEMPORAL = 'temporal'
+    ORDINAL = 'ordinal'
+    NOMINAL = 'nominal'
+    GEOJSON = 'geojson'
+
+    @classmethod
+    def parse(cls, value: Any) -> 'MeasurementType':
+        """Convierte un tipo del encoding (o uno de sus alias) en el miembro del enum."""
+        if isinstance(value, cls):
+            return value
+        name = TYPE_ALIASES.get(value)
+        if name is None:
+            raise ValueError(f"Tipo de medida no soportado: {value}. Válidos: {sorted(TYPE_ALIASES)}")
+        return cls(name)
+
+
+class FieldDef:
+    """Definición de campo de un canal del encoding (campo, tipo, agregado y bin)."""
+
+    __slots__ = ('channel', 'field', 'type', 'aggregate', 'bin')
+
+    def __init__(self, channel: str, field: Optional[str], type: Optional[MeasurementType] = None,
+                 aggregate: Optional[str] = None, bin: Any = None):
+        self.channel = sys.intern(channel)
+        # Los nombres de campo se repiten entre canales, capas y specs: se internan
+        self.field = sys.intern(field) if isinstance(field, str) else field
+        self.type = type
+        self.aggregate = aggregate
+        self.bin = bin
+
+    @classmethod
+    def from_dict(cls, channel: str, fd: Dict[str, Any]) -> 'FieldDef':
+        field_type = fd.get('type')
+        return cls(
+            channel,
+            fd.get('field'),
+            MeasurementType.parse(field_type) if field_type is not None else None,
+            fd.get('aggregate'),
+            fd.get('bin'),
+        )
+
+    def to_vegalite(self) -> Dict[str, Any]:
+        """Definición de canal de Vega-Lite (sólo las claves presentes en el encoding)."""
+        m: Dict[str, Any] = {'field': self.field}
+        if self.type is not None:
+            m['type'] = self.type.value
+        if self.aggregate is not None:
+            m['aggregate'] = self.aggregate
+        if self.bin is not None:
+            m['bin'] = self.bin
+        return m
+
+    def __eq__(self, other):
+        if not isinstance(other, FieldDef):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    def __repr__(self):
+        values = ', '.join(f'{name}={getattr(self, name)!r}' for name in self.__slots__)
+        return f'FieldDef({values})'
+
+
+class Encoding(dict):
+    """El dict del encoding más sus FieldDef ya parseados (atributo 'fields')."""
+
+    __slots__ = ('fields',)
+
+    def __init__(self, encoding: Optional[Dict[str, Any]] = None):
+        super().__init__(encoding or {})
+        self.fields: Dict[str, FieldDef] = {
+            channel: FieldDef.from_dict(channel, fd)
+            for channel, fd in self.items()
+            # Los canales sin campo ni agregado ({'value': ...}, {'datum': ...}) no son FieldDef
+            if isinstance(fd, dict) and ('field' in fd or 'aggregate' in fd)
+        }
+
+
+def parse_encoding(encoding: Optional[Dict[str, Any]]) -> Encoding:
+    """Devuelve el Encoding de un dict de encoding (sin reparsear si ya lo es)."""
+    if isinstance(encoding, Encoding):
+        return encoding
+    return Encoding(encoding)
@@ -0,0 +1,478 @@
+"""
+Motor de layout para los tipos de gráfico que necesitan geometría precalculada.
+
+treemap (squarified), sankey (columnas por profundidad + relajación iterativa),
+cascada (acumulado), embudo (barras centradas) y waffle (rejilla). Cada función de
+layout trabaja sobre arrays de NumPy y devuelve la geometría x0/x1/y0/y1; el manejador
+de la transformación 'layout' la convierte en filas y en el spec de Vega-Lite que la
+dibuja. Las coordenadas de treemap y sankey están en píxeles del gráfico (origen
+arriba a la izquierda); las de waffle, en celdas.
+"""
+
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .chart_types import ChartTypeInfo
+from .encoding import Encoding
+from .transforms import Precomputed, pick_field, register
+
+DEFAULT_WIDTH = 400
+DEFAULT_HEIGHT = 300
+SANKEY_NODE_WIDTH = 15
+SANKEY_NODE_PADDING = 10
+SANKEY_ITERATIONS = 6
+WAFFLE_ROWS = 10
+WAFFLE_COLUMNS = 10
+WAFFLE_GAP = 0.1
+WATERFALL_COLORS = {'aumento': '#2e7d32', 'descenso': '#c62828', 'total': '#1565c0'}
+
+
+# ---------------------------------------------------------------------------
+# Layouts (NumPy)
+# ---------------------------------------------------------------------------
+
+def _worst_ratio(row_sum: float, row_min: float, row_max: float, side: float) -> float:
+    s2 = row_sum * row_sum
+    side2 = side * side
+    return max(side2 * row_max / s2, s2 / (side2 * row_min))
+
+
+def squarify(values: Sequence[float], width: float, height: float) -> np.ndarray:
+    """
+    Treemap squarified (Bruls, Huizing y van Wijk) de valores positivos.
+
+    Returns:
+        Array (n, 4) con x0, y0, x1, y1 de cada valor, en el orden de entrada
+    """
+    values = np.asarray(values, dtype=float)
+    out = np.zeros((len(values), 4))
+    if not len(values) or values.sum() <= 0:
+        return out
+    order = np.argsort(-values, kind='stable')
+    areas = values[order] * (width * height / values.sum())
+    rects = np.zeros((len(areas), 4))
+    x, y, w, h = 0.0, 0.0, float(width), float(height)
+    i = 0
+    while i < len(areas):
+        side = min(w, h)
+        row_sum = areas[i]
+        worst = _worst_ratio(row_sum, areas[i], areas[i], side)
+        j = i + 1
+        # Crecer la fila mientras no empeore la peor relación de aspecto
+        while j < len(areas) and areas[j] > 0:
+            candidate = _worst_ratio(row_sum + areas[j], areas[j], areas[i], side)
+            if candidate > worst:
+                break
+            row_sum += areas[j]
+            worst = candidate
+            j += 1
+        row = areas[i:j]
+        if w >= h:
+            # Columna a la izquierda del espacio libre
+            thickness = row_sum / h if h else 0.0
+            ends = y + np.cumsum(row / thickness) if thickness else np.full(len(row), y)
+            rects[i:j] = np.column_stack([np.full(len(row), x), np.r_[y, ends[:-1]],
+                                          np.full(len(row), x + thickness), ends])
+            x += thickness
+            w -= thickness
+        else:
+            # Fila encima del espacio libre
+            thickness = row_sum / w if w else 0.0
+            ends = x + np.cumsum(row / thickness) if thickness else np.full(len(row), x)
+            rects[i:j] = np.column_stack([np.r_[x, ends[:-1]], np.full(len(row), y),
+                                          ends, np.full(len(row), y + thickness)])
+            y += thickness
+            h -= thickness
+        i = j
+    out[order] = rects
+    return out
+
+
+def _resolve_collisions(y0: np.ndarray, heights: np.ndarray, padding: float, height: float) -> np.ndarray:
+    """Separa los nodos de una columna (ya ordenados por y0): empuja abajo y luego arriba."""
+    # Abajo: y'_i = max(y_i, y'_{i-1} + h_{i-1} + padding) -> máximo acumulado de y - offsets
+    offsets = np.r_[0.0, np.cumsum(heights[:-1] + padding)]
+    y0 = np.maximum.accumulate(np.maximum(y0, 0.0) - offsets) + offsets
+    # Arriba desde el fondo: y'_i = min(y'_i, y'_{i+1} - h_i - padding) -> mínimo acumulado
+    reversed_y = y0[::-1].copy()
+    reversed_y[0] = min(reversed_y[0], height - heights[-1])
+    offsets = np.r_[0.0, np.cumsum(heights[::-1][1:] + padding)]
+    reversed_y = np.minimum.accumulate(reversed_y + offsets) - offsets
+    return np.maximum(reversed_y[::-1], 0.0)
+
+
+def sankey_layout(sources: np.ndarray, targets: np.ndarray, values: np.ndarray, n_nodes: int,
+                  width: float, height: float, node_width: float = SANKEY_NODE_WIDTH,
+                  node_padding: float = SANKEY_NODE_PADDING,
+                  iterations: int = SANKEY_ITERATIONS) -> Dict[str, np.ndarray]:
+    """
+    Layout de sankey: profundidad por el camino más largo, columnas justificadas,
+    altura de nodo proporcional al flujo y relajación iterativa hacia la media ponderada
+    de los nodos conectados.
+
+    Args:
+        sources, targets: índices de nodo de cada enlace (sin bucles)
+        values: flujo de cada enlace
+
+    Returns:
+        Dict con 'x0', 'x1', 'y0', 'y1' y 'value' por nodo, y 'sy', 'ty', 'width' por enlace
+        (sy/ty son el centro del enlace en su nodo de origen/destino)
+    """
+    values = np.asarray(values, dtype=float)
+    depth = np.zeros(n_nodes, dtype=int)
+    # Camino más largo desde los orígenes (acotado a n_nodes pasadas si hay ciclos)
+    for _ in range(n_nodes):
+        candidate = depth.copy()
+        np.maximum.at(candidate, targets, depth[sources] + 1)
+        if np.array_equal(candidate, depth):
+            break
+        depth = candidate
+    has_outgoing = np.bincount(sources, minlength=n_nodes) > 0
+    max_depth = int(depth.max()) if n_nodes else 0
+    # Los nodos finales van a la última columna
+    depth = np.where(has_outgoing, depth, max_depth)
+
+    incoming = np.bincount(targets, weights=values, minlength=n_nodes)
+    outgoing = np.bincount(sources, weights=values, minlength=n_nodes)
+    node_value = np.maximum(incoming, outgoing)
+
+    columns = [np.flatnonzero(depth == d) for d in range(max_depth + 1)]
+    columns = [c for c in columns if len(c)]
+    largest = max(len(c) for c in columns)
+    padding = min(node_padding, height / largest / 3)
+    ky = min((height - (len(c) - 1) * padding) / max(node_value[c].sum(), 1e-12) for c in columns)
+    heights = node_value * ky
+
+    kx = (width - node_width) / max(max_depth, 1)
+    x0 = depth * kx
+    y0 = np.zeros(n_nodes)
+    for column in columns:
+        y0[column] = np.r_[0.0, np.cumsum(heights[column] + padding)[:-1]]
+
+    for iteration in range(iterations):
+        alpha = 0.99 ** iteration
+        for forward in (False, True):
+            centers = y0 + heights / 2
+            near, far = (targets, sources) if forward else (sources, targets)
+            numerator = np.bincount(near, weights=values * centers[far], minlength=n_nodes)
+            denominator = np.bincount(near, weights=values, minlength=n_nodes)
+            linked = denominator > 0
+            y0[linked] += (numerator[linked] / denominator[linked] - centers[linked]) * alpha
+            for column in columns:
+                order = column[np.argsort(y0[column], kind='stable')]
+                y0[order] = _resolve_collisions(y0[order], heights[order], padding, height)
+
+    link_widths = values * ky
+    centers = y0 + heights / 2
+    sy = _stack_links(sources, centers[targets], link_widths, y0)
+    ty = _stack_links(targets, centers[sources], link_widths, y0)
+    return {
+        'x0': x0, 'x1': x0 + node_width, 'y0': y0, 'y1': y0 + heights, 'value': node_value,
+        'sy': sy, 'ty': ty, 'width': link_widths,
+    }
+
+
+def _stack_links(nodes: np.ndarray, other_centers: np.ndarray, widths: np.ndarray,
+                 node_y0: np.ndarray) -> np.ndarray:
+    """Centro de cada enlace apilado en su nodo, ordenados por la altura del otro extremo."""
+    order = np.lexsort((other_centers, nodes))
+    sorted_nodes = nodes[order]
+    cumulative = np.cumsum(widths[order])
+    before = cumulative - widths[order]
+    # Restar lo acumulado hasta el primer enlace de cada nodo
+    starts = np.r_[True, sorted_nodes[1:] != sorted_nodes[:-1]]
+    group_start = np.maximum.accumulate(np.where(starts, np.arange(len(order)), 0))
+    offsets = before - before[group_start]
+    centers = np.empty(len(order))
+    centers[order] = node_y0[sorted_nodes] + offsets + widths[order] / 2
+    return centers
+
+
+def waterfall_layout(values: Sequence[float], total: bool = True) -> Dict[str, np.ndarray]:
+    """Inicio y fin acumulados de cada paso de una cascada (y de la barra total)."""
+    values = np.asarray(values, dtype=float)
+    end = np.cumsum(values)
+    start = end - values
+    if total:
+        start = np.r_[start, 0.0]
+        end = np.r_[end, end[-1] if len(end) else 0.0]
+    return {'start': start, 'end': end}
+
+
+def funnel_layout(values: Sequence[float]) -> Dict[str, np.ndarray]:
+    """Barras centradas en 0 (x0 = -v/2, x1 = v/2) y porcentaje sobre la primera etapa."""
+    values = np.asarray(values, dtype=float)
+    first = values[0] if len(values) and values[0] else 1.0
+    return {'x0': -values / 2, 'x1': values / 2, 'percent': values / first * 100}
+
+
+def waffle_layout(values: Sequence[float], rows: int = WAFFLE_ROWS,
+                  columns: int = WAFFLE_COLUMNS) -> Dict[str, np.ndarray]:
+    """
+    Reparte rows × columns celdas entre los valores (mayor resto) y las coloca por filas.
+
+    Returns:
+        Dict con 'category' (índice del valor de cada celda), 'row' y 'column'
+    """
+    values = np.clip(np.asarray(values, dtype=float), 0, None)
+    cells = rows * columns
+    if not len(values) or values.sum() <= 0:
+        return {'category': np.zeros(0, dtype=int), 'row': np.zeros(0, dtype=int), 'column': np.zeros(0, dtype=int)}
+    exact = values / values.sum() * cells
+    counts = np.floor(exact).astype(int)
+    remainder = cells - counts.sum()
+    if remainder:
+        counts[np.argsort(-(exact - counts), kind='stable')[:remainder]] += 1
+    category = np.repeat(np.arange(len(values)), counts)
+    index = np.arange(len(category))
+    return {'category': category, 'row': index // columns, 'column': index % columns}
+
+
+# ---------------------------------------------------------------------------
+# Transformación 'layout' (filas del spec -> geometría + Vega-Lite)
+# ---------------------------------------------------------------------------
+
+def _group_sum(rows: List[Dict[str, Any]], label: str, value: str) -> Tuple[List[Any], np.ndarray]:
+    """Suma value por label conservando el orden de primera aparición."""
+    labels = np.array([str(row.get(label)) for row in rows], dtype=object)
+    amounts = np.array([_number(row.get(value)) for row in rows], dtype=float)
+    if not len(labels):
+        return [], np.zeros(0)
+    unique, first, inverse = np.unique(labels, return_index=True, return_inverse=True)
+    totals = np.bincount(inverse, weights=amounts, minlength=len(unique))
+    order = np.argsort(first, kind='stable')
+    return unique[order].tolist(), totals[order]
+
+
+def _number(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _pixel_axis(field: str, extent: float, reverse: bool = False) -> Dict[str, Any]:
+    scale: Dict[str, Any] = {'domain': [0, extent]}
+    if reverse:
+        scale['reverse'] = True
+    return {'field': field, 'type': 'quantitative', 'axis': None, 'scale': scale}
+
+
+def _treemap(label, value, labels, totals, width, height):
+    keep = totals > 0
+    labels = [l for l, k in zip(labels, keep) if k]
+    totals = totals[keep]
+    rects = squarify(totals, width, height)
+    rows = [
+        {label: l, value: float(v), 'x0': float(r[0]), 'y0': float(r[1]), 'x1': float(r[2]), 'y1': float(r[3])}
+        for l, v, r in zip(labels, totals, rects)
+    ]
+    tooltip = [{'field': label, 'type': 'nominal'}, {'field': value, 'type': 'quantitative'}]
+    vegalite = {
+        'data': {'values': rows},
+        'layer': [
+            {
+                'mark': {'type': 'rect', 'stroke': 'white'},
+                'encoding': {
+                    'x': _pixel_axis('x0', width), 'x2': {'field': 'x1'},
+                    'y': _pixel_axis('y0', height, reverse=True), 'y2': {'field': 'y1'},
+                    'color': {'field': label, 'type': 'nominal', 'legend': None},
+                    'tooltip': tooltip,
+                },
+            },
+            {
+                'mark': {'type': 'text', 'align': 'left', 'baseline': 'top', 'dx': 4, 'dy': 4, 'color': 'white'},
+                'encoding': {
+                    'x': _pixel_axis('x0', width), 'y': _pixel_axis('y0', height, reverse=True),
+                    'text': {'field': label, 'type': 'nominal'},
+                },
+            },
+        ],
+    }
+    return rows, vegalite
+
+
+def _waffle(label, labels, totals, options):
+    rows_n = int(options.get('waffleRows') or WAFFLE_ROWS)
+    columns_n = int(options.get('waffleColumns') or WAFFLE_COLUMNS)
+    cells = waffle_layout(totals, rows_n, columns_n)
+    rows = [
+        {label: labels[c], 'x0': float(col), 'x1': col + 1 - WAFFLE_GAP, 'y0': float(r), 'y1': r + 1 - WAFFLE_GAP}
+        for c, r, col in zip(cells['category'].tolist(), cells['row'].tolist(), cells['column'].tolist())
+    ]
+    vegalite = {
+        'data': {'values': rows},
+        'mark': 'rect',
+        'encoding': {
+            'x': _pixel_axis('x0', columns_n), 'x2': {'field': 'x1'},
+            'y': _pixel_axis('y0', rows_n, reverse=True), 'y2': {'field': 'y1'},
+            'color': {'field': label, 'type': 'nominal', 'sort': None},
+            'tooltip': [{'field': label, 'type': 'nominal'}],
+        },
+    }
+    return rows, vegalite
+
+
+def _waterfall(label, value, labels, totals, options):
+    total = options.get('waterfallTotal', True)
+    geometry = waterfall_layout(totals, total=total)
+    names = list(labels) + (['Total'] if total else [])
+    amounts = list(totals.tolist()) + ([float(totals.sum())] if total else [])
+    kinds = ['aumento' if v >= 0 else 'descenso' for v in totals.tolist()] + (['total'] if total else [])
+    rows = [
+        {label: n, value: float(v), 'inicio': float(s), 'fin': float(e), 'tipo': k}
+        for n, v, s, e, k in zip(names, amounts, geometry['start'].tolist(), geometry['end'].tolist(), kinds)
+    ]
+    vegalite = {
+        'data': {'values': rows},
+        'mark': 'bar',
+        'encoding': {
+            'x': {'field': label, 'type': 'nominal', 'sort': None},
+            'y': {'field': 'inicio', 'type': 'quantitative', 'title': value},
+            'y2': {'field': 'fin'},
+            'color': {'field': 'tipo', 'type': 'nominal',
+                      'scale': {'domain': list(WATERFALL_COLORS), 'range': list(WATERFALL_COLORS.values())}},
+            'tooltip': [{'field': label, 'type': 'nominal'}, {'field': value, 'type': 'quantitative'},
+                        {'field': 'fin', 'type': 'quantitative', 'title': 'acumulado'}],
+        },
+    }
+    return rows, vegalite
+
+
+def _funnel(label, value, labels, totals):
+    geometry = funnel_layout(totals)
+    rows = [
+        {label: l, value: float(v), 'x0': float(a), 'x1': float(b), 'porcentaje': round(float(p), 2)}
+        for l, v, a, b, p in zip(labels, totals, geometry['x0'], geometry['x1'], geometry['percent'])
+    ]
+    vegalite = {
+        'data': {'values': rows},
+        'mark': 'bar',
+        'encoding': {
+            'y': {'field': label, 'type': 'nominal', 'sort': None},
+            'x': {'field': 'x0', 'type': 'quantitative', 'axis': None},
+            'x2': {'field': 'x1'},
+            'color': {'field': label, 'type': 'nominal', 'legend': None, 'sort': None},
+            'tooltip': [{'field': label, 'type': 'nominal'}, {'field': value, 'type': 'quantitative'},
+                        {'field': 'porcentaje', 'type': 'quantitative', 'title': '% sobre la primera etapa'}],
+        },
+    }
+    return rows, vegalite
+
+
+def _sankey(rows_in, encoding, width, height, options):
+    source = pick_field(encoding, ('source',), quantitative=False)
+    target = pick_field(encoding, ('target',), quantitative=False)
+    value = pick_field(encoding, ('value', 'size'), quantitative=True)
+    if not (source and target and value):
+        return None
+    pairs = [(str(r.get(source)), str(r.get(target)), _number(r.get(value))) for r in rows_in]
+    pairs = [p for p in pairs if p[0] != p[1] and p[2] > 0]
+    if not pairs:
+        return None
+    names, codes = np.unique(np.array([p[0] for p in pairs] + [p[1] for p in pairs], dtype=object),
+                             return_inverse=True)
+    n = len(pairs)
+    link_codes = codes[:n] * len(names) + codes[n:]
+    # Enlaces repetidos se suman
+    unique_links, inverse = np.unique(link_codes, return_inverse=True)
+    link_values = np.bincount(inverse, weights=np.array([p[2] for p in pairs]))
+    sources, targets = unique_links // len(names), unique_links % len(names)
+
+    layout = sankey_layout(
+        sources, targets, link_values, len(names), width, height,
+        node_width=float(options.get('sankeyNodeWidth') or SANKEY_NODE_WIDTH),
+        node_padding=float(options.get('sankeyNodePadding') or SANKEY_NODE_PADDING),
+        iterations=int(options.get('sankeyIterations') or SANKEY_ITERATIONS),
+    )
+    rows = [
+        {'tipo': 'nodo', 'nombre': name, value: float(v), 'x0': float(a), 'x1': float(b), 'y0': float(c), 'y1': float(d)}
+        for name, v, a, b, c, d in zip(names.tolist(), layout['value'], layout['x0'], layout['x1'],
+                                       layout['y0'], layout['y1'])
+    ]
+    x_start = layout['x1'][sources]
+    x_end = layout['x0'][targets]
+    middle = (x_start + x_end) / 2
+    for k in range(len(sources)):
+        s, t = int(sources[k]), int(targets[k])
+        # Cuatro puntos de control: la interpolación 'basis' dibuja la curva en S
+        for order, (x, y) in enumerate(((x_start[k], layout['sy'][k]), (middle[k], layout['sy'][k]),
+                                        (middle[k], layout['ty'][k]), (x_end[k], layout['ty'][k]))):
+            rows.append({
+                'tipo': 'enlace', 'enlace': k, 'orden': order, source: names[s], target: names[t],
+                value: float(link_values[k]), 'x': float(x), 'y': float(y), 'grosor': float(layout['width'][k]),
+            })
+    vegalite = {
+        'data': {'values': rows},
+        'layer': [
+            {
+                'transform': [{'filter': "datum.tipo === 'enlace'"}],
+                'mark': {'type': 'line', 'interpolate': 'basis', 'opacity': 0.4, 'strokeCap': 'butt'},
+                'encoding': {
+                    'x': _pixel_axis('x', width), 'y': _pixel_axis('y', height, reverse=True),
+                    'detail': {'field': 'enlace', 'type': 'nominal'},
+                    'order': {'field': 'orden', 'type': 'quantitative'},
+                    'size': {'field': 'grosor', 'type': 'quantitative', 'scale': None, 'legend': None},
+                    'color': {'field': source, 'type': 'nominal', 'legend': None},
+                    'tooltip': [{'field': source, 'type': 'nominal'}, {'field': target, 'type': 'nominal'},
+                                {'field': value, 'type': 'quantitative'}],
+                },
+            },
+            {
+                'transform': [{'filter': "datum.tipo === 'nodo'"}],
+                'mark': 'rect',
+                'encoding': {
+                    'x': _pixel_axis('x0', width), 'x2': {'field': 'x1'},
+                    'y': _pixel_axis('y0', height, reverse=True), 'y2': {'field': 'y1'},
+                    'color': {'field': 'nombre', 'type': 'nominal', 'legend': None},
+                    'tooltip': [{'field': 'nombre', 'type': 'nominal'}, {'field': value, 'type': 'quantitative'}],
+                },
+            },
+            {
+                'transform': [{'filter': "datum.tipo === 'nodo'"}],
+                'mark': {'type': 'text', 'align': 'left', 'baseline': 'middle', 'dx': SANKEY_NODE_WIDTH + 4},
+                'encoding': {
+                    'x': _pixel_axis('x0', width),
+                    'y': {'field': 'centro', 'type': 'quantitative', 'axis': None,
+                          'scale': {'domain': [0, height], 'reverse': True}},
+                    'text': {'field': 'nombre', 'type': 'nominal'},
+                },
+            },
+        ],
+    }
+    for row in rows:
+        if row['tipo'] == 'nodo':
+            row['centro'] = (row['y0'] + row['y1']) / 2
+    return rows, vegalite
+
+
+@register('layout')
+def precompute_layout(info: ChartTypeInfo, rows: List[Dict[str, Any]], encoding: Encoding,
+                      options: Dict[str, Any]) -> Optional[Precomputed]:
+    """Geometría de treemap, sankey, cascada, embudo y waffle a partir de las filas."""
+    width = float(options.get('width') or DEFAULT_WIDTH)
+    height = float(options.get('height') or DEFAULT_HEIGHT)
+    if info.name == 'sankey':
+        result = _sankey(rows, encoding, width, height, options)
+        return Precomputed('layout', *result) if result else None
+
+    label = pick_field(encoding, ('color', 'detail', 'x', 'y'), quantitative=False)
+    value = pick_field(encoding, ('size', 'theta', 'y', 'x', 'value'), quantitative=True)
+    if not (label and value):
+        return None
+    labels, totals = _group_sum(rows, label, value)
+    if not labels:
+        return None
+
+    if info.name == 'treemap':
+        result = _treemap(label, value, labels, totals, width, height)
+    elif info.name == 'waffle':
+        result = _waffle(label, labels, totals, options)
+    elif info.name == 'cascada':
+        result = _waterfall(label, value, labels, totals, options)
+    elif info.name == 'embudo':
+        result = _funnel(label, value, labels, totals)
+    else:
+        return None
+    return Precomputed('layout', *result)
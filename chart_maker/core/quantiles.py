@@ -0,0 +1,322 @@
+"""
+Estadísticos de diagrama de caja (cuartiles, bigotes y atípicos) por grupo.
+
+La columna de valores se convierte una vez a un array float (8 bytes por fila, poco al
+lado de las filas en dicts) y se separa por grupo con un argsort. Con la columna en
+memoria los cuartiles son exactos (np.percentile con interpolación lineal, como el
+boxplot de Vega-Lite): resumirla no ahorraría memoria y sería más lento. Para datos que
+no caben, box_stats_chunks recorre los bloques dos veces: la primera resume cada bloque
+en un TDigest por grupo (en paralelo; NumPy libera el GIL) y los combina con merge(), la
+segunda obtiene los extremos de los bigotes y los atípicos. El mapper dibuja las cajas
+ya calculadas en lugar de mandar todas las filas al navegador.
+"""
+
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from .chart_types import ChartTypeInfo
+from .encoding import Encoding
+from .transforms import Precomputed, group_codes, numeric_column, pick_field, register
+
+# Valores hasta los que los rangos de Spearman se calculan exactos (correlation.py)
+EXACT_LIMIT = 100_000
+# Compresión del TDigest (~centroides); más alta = más precisión
+COMPRESSION = 200
+# Bigotes: rango intercuartílico multiplicado por este factor (extent de Vega-Lite)
+WHISKER_EXTENT = 1.5
+# Atípicos enviados por grupo (los más alejados de la mediana)
+MAX_OUTLIERS = 500
+BOX_FIELDS = ('bigote_inferior', 'q1', 'mediana', 'q3', 'bigote_superior')
+
+
+class TDigest:
+    """
+    Resumen de cuantiles combinable (t-digest con función de escala k1).
+
+    Los centroides son medias ponderadas de valores consecutivos; cerca de los extremos
+    agrupan muy pocos valores, así que los cuantiles de las colas son casi exactos.
+    """
+
+    __slots__ = ('means', 'weights', 'compression', 'min', 'max')
+
+    def __init__(self, means: np.ndarray, weights: np.ndarray, compression: float = COMPRESSION,
+                 minimum: float = np.nan, maximum: float = np.nan):
+        self.means = means
+        self.weights = weights
+        self.compression = compression
+        self.min = minimum
+        self.max = maximum
+
+    @classmethod
+    def from_values(cls, values: Sequence[float], compression: float = COMPRESSION) -> 'TDigest':
+        return cls.from_sorted(np.sort(np.asarray(values, dtype=float)), compression)
+
+    @classmethod
+    def from_sorted(cls, values: np.ndarray, compression: float = COMPRESSION) -> 'TDigest':
+        """TDigest de valores ya ordenados (los NaN, al final como los deja np.sort, se ignoran)."""
+        values = values[np.isfinite(values)]
+        if not values.size:
+            return cls(np.zeros(0), np.zeros(0), compression)
+        return cls._compressed(values, np.ones(values.size), compression, values[0], values[-1])
+
+    @classmethod
+    def _compressed(cls, means: np.ndarray, weights: np.ndarray, compression: float,
+                    minimum: float, maximum: float) -> 'TDigest':
+        # Centroides ordenados -> cubetas de ancho 1 en la escala k1 (según el cuantil del centro)
+        cumulative = np.cumsum(weights)
+        total = cumulative[-1]
+        q = (cumulative - weights / 2) / total
+        k = np.floor(compression / (2 * np.pi) * np.arcsin(2 * q - 1))
+        starts = np.concatenate(([0], np.flatnonzero(np.diff(k)) + 1))
+        merged_weights = np.add.reduceat(weights, starts)
+        merged_means = np.add.reduceat(means * weights, starts) / merged_weights
+        return cls(merged_means, merged_weights, compression, minimum, maximum)
+
+    @property
+    def count(self) -> float:
+        return float(self.weights.sum())
+
+    def merge(self, other: 'TDigest') -> 'TDigest':
+        """Nuevo TDigest con los valores de ambos."""
+        return TDigest.merge_all([self, other])
+
+    @staticmethod
+    def merge_all(digests: Sequence['TDigest']) -> 'TDigest':
+        digests = [d for d in digests if d.weights.size]
+        if not digests:
+            return TDigest(np.zeros(0), np.zeros(0))
+        compression = max(d.compression for d in digests)
+        means = np.concatenate([d.means for d in digests])
+        weights = np.concatenate([d.weights for d in digests])
+        order = np.argsort(means, kind='stable')
+        return TDigest._compressed(means[order], weights[order], compression,
+                                   min(d.min for d in digests), max(d.max for d in digests))
+
+    def _knots(self):
+        # Posición (0..n-1) de cada centro, como en la interpolación lineal de np.percentile,
+        # con el mínimo y el máximo en los extremos
+        cumulative = np.cumsum(self.weights)
+        centers = cumulative - (self.weights + 1) / 2
+        positions = np.concatenate(([0.0], centers, [cumulative[-1] - 1]))
+        values = np.concatenate(([self.min], self.means, [self.max]))
+        return positions, values
+
+    def quantile(self, q: Union[float, Sequence[float]]) -> np.ndarray:
+        """Cuantiles (0..1) interpolando entre los centros de los centroides y los extremos."""
+        q = np.asarray(q, dtype=float)
+        if not self.weights.size:
+            return np.full(q.shape, np.nan)
+        positions, values = self._knots()
+        return np.interp(q * positions[-1], positions, values)
+
+    def rank(self, values: Sequence[float]) -> np.ndarray:
+        """Posición aproximada (0..n-1) de cada valor entre los resumidos: inversa de quantile."""
+        values = np.asarray(values, dtype=float)
+        if not self.weights.size:
+            return np.full(values.shape, np.nan)
+        positions, knots = self._knots()
+        return np.where(np.isfinite(values), np.interp(values, knots, positions), np.nan)
+
+
+def _split(values: Sequence[float], codes: Optional[np.ndarray], n_groups: int) -> List[np.ndarray]:
+    """Valores finitos de cada grupo (un argsort, sin copiar si hay un solo grupo)."""
+    values = np.asarray(values, dtype=float)
+    codes = np.zeros(values.size, dtype=np.intp) if codes is None else np.asarray(codes, dtype=np.intp)
+    finite = np.isfinite(values)
+    if not finite.all():
+        values, codes = values[finite], codes[finite]
+    if n_groups == 1:
+        return [values]
+    order = np.argsort(codes, kind='stable')
+    bounds = np.searchsorted(codes[order], np.arange(n_groups + 1))
+    ordered = values[order]
+    return [ordered[bounds[k]:bounds[k + 1]] for k in range(n_groups)]
+
+
+def _fences(quartiles: Sequence[float], extent: Union[str, float]):
+    q1, _, q3 = quartiles
+    if extent == 'min-max':
+        return -np.inf, np.inf
+    reach = float(extent) * (q3 - q1)
+    return q1 - reach, q3 + reach
+
+
+def _farthest(outliers: np.ndarray, median: float) -> np.ndarray:
+    """Como mucho MAX_OUTLIERS atípicos, los más alejados de la mediana."""
+    if outliers.size <= MAX_OUTLIERS:
+        return outliers
+    return outliers[np.argpartition(-np.abs(outliers - median), MAX_OUTLIERS)[:MAX_OUTLIERS]]
+
+
+def _box(n: int, quartiles: Sequence[float], low: Optional[float], high: Optional[float],
+         total_outliers: int, outliers: np.ndarray, exact: bool) -> Dict[str, Any]:
+    q1, median, q3 = (float(v) for v in quartiles)
+    return {
+        'n': int(n),
+        'bigote_inferior': q1 if low is None else float(low),
+        'q1': q1,
+        'mediana': median,
+        'q3': q3,
+        'bigote_superior': q3 if high is None else float(high),
+        'atipicos': int(total_outliers),
+        'exacto': exact,
+        'outliers': np.sort(outliers).tolist(),
+    }
+
+
+def box_stats(values: Sequence[float], codes: Optional[np.ndarray] = None, n_groups: int = 1,
+              extent: Union[str, float] = WHISKER_EXTENT) -> List[Optional[Dict[str, Any]]]:
+    """
+    Estadísticos de caja exactos de cada grupo, a partir de la columna completa en memoria.
+
+    Args:
+        values: Valores (los NaN se ignoran)
+        codes: Grupo de cada valor (0..n_groups-1); None = un solo grupo
+        extent: Factor del IQR para los bigotes, o 'min-max' (sin atípicos)
+
+    Returns:
+        Un dict por grupo (None si el grupo no tiene valores) con n, bigote_inferior, q1,
+        mediana, q3, bigote_superior, atipicos (cuántos), exacto y outliers (valores)
+    """
+    stats: List[Optional[Dict[str, Any]]] = []
+    for group in _split(values, codes, n_groups):
+        if not group.size:
+            stats.append(None)
+            continue
+        quartiles = np.percentile(group, [25, 50, 75])
+        low, high = _fences(quartiles, extent)
+        inside = group[(group >= low) & (group <= high)]
+        outliers = group[(group < low) | (group > high)]
+        stats.append(_box(group.size, quartiles,
+                          inside.min() if inside.size else None, inside.max() if inside.size else None,
+                          outliers.size, _farthest(outliers, quartiles[1]), exact=True))
+    return stats
+
+
+def _chunk_digests(chunk, n_groups: int, compression: float) -> List[TDigest]:
+    values, codes = chunk
+    return [TDigest.from_values(group, compression) for group in _split(values, codes, n_groups)]
+
+
+def box_stats_chunks(chunks: Callable[[], Iterable[Tuple[Sequence[float], Optional[np.ndarray]]]],
+                     n_groups: int = 1, extent: Union[str, float] = WHISKER_EXTENT,
+                     compression: float = COMPRESSION,
+                     workers: Optional[int] = None) -> List[Optional[Dict[str, Any]]]:
+    """
+    Estadísticos de caja de datos que llegan por bloques, sin tener la columna entera.
+
+    La primera pasada resume cada bloque en un TDigest por grupo (en paralelo, con pocos
+    bloques en vuelo) y los combina; la segunda recorre otra vez los bloques para contar
+    atípicos y obtener los extremos de los bigotes con los cuartiles aproximados.
+
+    Args:
+        chunks: Función que devuelve un iterador nuevo de bloques (valores, códigos de grupo
+                o None) en cada llamada
+        n_groups: Número de grupos (códigos 0..n_groups-1)
+        extent: Factor del IQR para los bigotes, o 'min-max' (sin atípicos)
+        workers: Hilos para resumir los bloques (None = uno por CPU)
+
+    Returns:
+        Lo mismo que box_stats, con exacto=False
+    """
+    window = workers or os.cpu_count() or 1
+    digests: List[Optional[TDigest]] = [None] * n_groups
+
+    def combine(future):
+        for k, digest in enumerate(future.result()):
+            if digest.weights.size:
+                digests[k] = digest if digests[k] is None else digests[k].merge(digest)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending: Deque = deque()
+        for chunk in chunks():
+            pending.append(pool.submit(_chunk_digests, chunk, n_groups, compression))
+            if len(pending) > window:
+                combine(pending.popleft())
+        while pending:
+            combine(pending.popleft())
+
+    quartiles = [None if d is None else d.quantile([0.25, 0.5, 0.75]) for d in digests]
+    fences = [None if q is None else _fences(q, extent) for q in quartiles]
+    # Por grupo: n, extremo inferior y superior dentro de los bigotes, atípicos y candidatos
+    counts = np.zeros(n_groups, dtype=np.int64)
+    lows = np.full(n_groups, np.inf)
+    highs = np.full(n_groups, -np.inf)
+    totals = np.zeros(n_groups, dtype=np.int64)
+    kept: List[np.ndarray] = [np.zeros(0) for _ in range(n_groups)]
+    for values, codes in chunks():
+        for k, group in enumerate(_split(values, codes, n_groups)):
+            if not group.size or fences[k] is None:
+                continue
+            low, high = fences[k]
+            inside = group[(group >= low) & (group <= high)]
+            outliers = group[(group < low) | (group > high)]
+            counts[k] += group.size
+            if inside.size:
+                lows[k] = min(lows[k], inside.min())
+                highs[k] = max(highs[k], inside.max())
+            totals[k] += outliers.size
+            if outliers.size:
+                kept[k] = _farthest(np.concatenate((kept[k], outliers)), quartiles[k][1])
+
+    return [None if quartiles[k] is None else
+            _box(counts[k], quartiles[k], lows[k] if np.isfinite(lows[k]) else None,
+                 highs[k] if np.isfinite(highs[k]) else None, totals[k], kept[k], exact=False)
+            for k in range(n_groups)]
+
+
+@register('quantiles')
+def precompute_box(info: ChartTypeInfo, rows: List[Dict[str, Any]], encoding: Encoding,
+                   options: Dict[str, Any]) -> Optional[Precomputed]:
+    """Cajas, bigotes y atípicos por grupo, ya calculados."""
+    y_fd = encoding.fields.get('y')
+    value = pick_field(encoding, ('y', 'x'), quantitative=True)
+    if value is None:
+        return None
+    group = pick_field(encoding, ('x', 'y', 'color'), quantitative=False)
+    # Cajas verticales salvo que el valor vaya en x
+    value_axis, group_axis = ('y', 'x') if y_fd is not None and y_fd.field == value else ('x', 'y')
+
+    labels, codes = group_codes(rows, group)
+    stats = box_stats(numeric_column(rows, value), codes, len(labels),
+                      extent=options.get('extent', WHISKER_EXTENT))
+    boxes, outliers = [], []
+    for label, box in zip(labels, stats):
+        if box is None:
+            continue
+        points = box.pop('outliers')
+        if group is not None:
+            box = {group: label, **box}
+        boxes.append(box)
+        outliers.extend({group: label, value: v} if group is not None else {value: v} for v in points)
+    if not boxes:
+        return None
+
+    def axis(field):
+        return {'field': field, 'type': 'quantitative', 'title': value}
+
+    base: Dict[str, Any] = {}
+    if group is not None:
+        base[group_axis] = {'field': group, 'type': 'nominal'}
+    size = options.get('boxSize', 20)
+    box_color = {'field': group, 'type': 'nominal', 'legend': None} if group is not None else {'value': '#4c78a8'}
+    tooltip = ([{'field': group, 'type': 'nominal'}] if group is not None else []) + [
+        {'field': f, 'type': 'quantitative'} for f in ('n',) + BOX_FIELDS
+    ]
+    layers = [
+        {'mark': {'type': 'rule'},
+         'encoding': {**base, value_axis: axis('bigote_inferior'), f'{value_axis}2': {'field': 'bigote_superior'}}},
+        {'mark': {'type': 'bar', 'size': size},
+         'encoding': {**base, value_axis: axis('q1'), f'{value_axis}2': {'field': 'q3'},
+                      'color': box_color, 'tooltip': tooltip}},
+        {'mark': {'type': 'tick', 'color': 'white', 'size': size},
+         'encoding': {**base, value_axis: axis('mediana')}},
+    ]
+    if outliers:
+        layers.append({'data': {'values': outliers}, 'mark': {'type': 'point'},
+                       'encoding': {**base, value_axis: axis(value)}})
+    return Precomputed('quantiles', boxes, {'data': {'values': boxes}, 'layer': layers})
@@ -0,0 +1,397 @@
+"""
+Datasets en memoria compartida para exportar muchos gráficos en varios procesos.
+
+El proceso principal publica una sola vez las columnas del dataset en un bloque de
+multiprocessing.shared_memory; los workers reciben sólo un descriptor pequeño
+(SharedDatasetHandle) y se enganchan al bloque sin copiar los buffers. Las columnas
+de texto se guardan codificadas por diccionario (códigos int32 + diccionario UTF-8).
+
+Los workers no convierten el bloque en una lista de dicts: reciben un ColumnarRows, una
+secuencia de filas sobre las mismas columnas. numeric_column, group_codes y los
+precálculos leen las columnas enteras (vistas del bloque y códigos del diccionario) y las
+filas (dicts) sólo se construyen al recorrerlas o indexarlas, p. ej. en los exportadores
+que escriben las filas o al devolver un spec con los datos embebidos.
+
+Ciclo de vida: sólo el propietario (quien publica) hace unlink del bloque, al cerrar el
+dataset, al salir del proceso o si el objeto se recolecta; los workers sólo cierran su
+mapeo, así que un worker que muere no deja el bloque a medias ni lo borra.
+
+Uso:
+    with SharedDataset.publish(filas) as dataset:
+        results = batch_export(dataset, [(spec_sin_datos, 'tableau', 'a.twb'), ...])
+"""
+
+import multiprocessing
+import sys
+import weakref
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from .datasets import resolve_data
+
+# Alineación de cada buffer dentro del bloque compartido
+ALIGNMENT = 64
+# Filas que se convierten a dicts de una vez al recorrer un ColumnarRows
+ROW_BLOCK = 4096
+
+
+@dataclass(frozen=True)
+class SharedDatasetHandle:
+    """Descriptor picklable de un dataset publicado (nombre del bloque y columnas)."""
+    shm_name: str
+    n_rows: int
+    # (nombre, tipo, dtype, offset, longitud, offset_diccionario, n_categorias, offset_texto, bytes_texto)
+    columns: Tuple[Tuple[Any, ...], ...]
+    size: int
+
+
+def _align(offset: int) -> int:
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def _to_columns(data) -> Dict[str, np.ndarray]:
+    """Filas (lista de dicts o {'values': [...]}) o columnas -> dict de arrays."""
+    data = resolve_data(data)
+    if isinstance(data, dict) and 'values' not in data:
+        return {name: np.asarray(values) for name, values in data.items()}
+    if isinstance(data, dict):
+        data = data['values']
+    rows = [row for row in data if isinstance(row, dict)]
+    names = list(dict.fromkeys(key for row in rows for key in row))
+    columns = {}
+    for name in names:
+        values = [row.get(name) for row in rows]
+        numbers = [v for v in values if v is not None]
+        if numbers and all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in numbers):
+            # Los nulos de una columna numérica viajan como NaN
+            columns[name] = np.asarray(values, dtype=float) if len(numbers) < len(values) else np.asarray(values)
+        else:
+            columns[name] = np.asarray(['' if v is None else str(v) for v in values], dtype=object)
+    return columns
+
+
+def _attach_segment(name: str) -> shared_memory.SharedMemory:
+    """Se engancha a un bloque sin registrarlo para borrado en este proceso."""
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    segment = shared_memory.SharedMemory(name=name)
+    # Antes de 3.13 engancharse registra el bloque en el resource_tracker, que lo
+    # borraría al salir. Los hijos de multiprocessing comparten el tracker del padre
+    # (el registro es idempotente y el unlink del propietario lo retira); un proceso
+    # independiente tiene el suyo y hay que quitar el registro.
+    if multiprocessing.parent_process() is None:
+        from multiprocessing import resource_tracker
+        resource_tracker.unregister(segment._name, 'shared_memory')
+    return segment
+
+
+def _release(segment: shared_memory.SharedMemory, owner: bool):
+    try:
+        segment.close()
+    except BufferError:
+        # Quedan vistas vivas del buffer: el mapeo se libera cuando se recolecten
+        pass
+    if owner:
+        try:
+            segment.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def _python_values(values: np.ndarray) -> List[Any]:
+    """Valores de Python de un array (NaN -> None, como en ChartSpec.data)."""
+    if values.dtype.kind == 'f' and np.isnan(values).any():
+        values = np.where(np.isnan(values), None, values.astype(object))
+    return values.tolist()
+
+
+def _number(value) -> float:
+    try:
+        return float(value) if value != '' else np.nan
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def _first_appearance(codes: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Valores distintos de codes en orden de primera aparición y el código 0..k-1 de cada fila."""
+    distinct, first, inverse = np.unique(codes, return_index=True, return_inverse=True)
+    order = np.argsort(first, kind='stable')
+    rank = np.empty(len(order), dtype=np.intp)
+    rank[order] = np.arange(len(order))
+    return distinct[order], rank[inverse.reshape(-1)]
+
+
+class ColumnarRows(Sequence):
+    """
+    Filas (dicts) de un dataset columnar, construidas al leerlas.
+
+    Las columnas numéricas son arrays y las de texto, códigos más diccionario; ninguna
+    se copia. numeric() y codes() dan columnas enteras sin crear filas (los usan
+    numeric_column y group_codes) y key identifica el dataset en las cachés de los
+    precálculos. Al serializarse con pickle viaja como una lista de dicts normal.
+    """
+
+    def __init__(self, columns: Dict[str, Union[np.ndarray, Tuple[np.ndarray, np.ndarray]]],
+                 length: int, key: Optional[str] = None):
+        # Numéricas: array; texto: (diccionario, códigos)
+        self._columns = columns
+        self._length = length
+        self.key = key
+
+    def __len__(self) -> int:
+        return self._length
+
+    @property
+    def fields(self) -> List[str]:
+        """Nombres de las columnas (las claves de cada fila)."""
+        return list(self._columns)
+
+    def is_text(self, field: str) -> bool:
+        return isinstance(self._columns.get(field), tuple)
+
+    def _slice(self, rows: slice) -> 'ColumnarRows':
+        columns = {name: (column[0], column[1][rows]) if isinstance(column, tuple) else column[rows]
+                   for name, column in self._columns.items()}
+        return ColumnarRows(columns, len(range(*rows.indices(self._length))))
+
+    def _lists(self, start: int, stop: int) -> List[List[Any]]:
+        lists = []
+        for column in self._columns.values():
+            if isinstance(column, tuple):
+                lists.append(column[0][column[1][start:stop]].tolist())
+            else:
+                lists.append(_python_values(column[start:stop]))
+        return lists
+
+    def _block(self, start: int, stop: int) -> List[Dict[str, Any]]:
+        names = list(self._columns)
+        return [dict(zip(names, row)) for row in zip(*self._lists(start, stop))]
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self._slice(index)
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError(index)
+        return self._block(index, index + 1)[0]
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for start in range(0, self._length, ROW_BLOCK):
+            yield from self._block(start, start + ROW_BLOCK)
+
+    def tuples(self) -> Iterator[Tuple[Any, ...]]:
+        """Valores de cada fila en el orden de fields, sin crear dicts (p. ej. para un CSV)."""
+        for start in range(0, self._length, ROW_BLOCK):
+            yield from zip(*self._lists(start, start + ROW_BLOCK))
+
+    def __reduce__(self):
+        return list, (list(self),)
+
+    def numeric(self, field: str) -> np.ndarray:
+        """Columna float (NaN donde falta o no es número); el texto se convierte por categoría."""
+        column = self._columns.get(field)
+        if column is None:
+            return np.full(self._length, np.nan)
+        if isinstance(column, tuple):
+            categories, codes = column
+            numbers = np.array([_number(v) for v in categories.tolist()], dtype=float)
+            return numbers[codes]
+        return column.astype(float, copy=False)
+
+    def codes(self, field: str) -> Tuple[List[Any], np.ndarray]:
+        """Etiquetas en orden de primera aparición y el código de cada fila (como group_codes)."""
+        column = self._columns.get(field)
+        if column is None:
+            return [None], np.zeros(self._length, dtype=np.intp)
+        if isinstance(column, tuple):
+            categories, codes = column
+            used, codes = _first_appearance(codes)
+            return categories[used].tolist(), codes
+        labels, codes = _first_appearance(column)
+        return _python_values(labels), codes
+
+
+class SharedDataset:
+    """Columnas de un dataset en memoria compartida (propietario o enganchado)."""
+
+    def __init__(self, segment: shared_memory.SharedMemory, handle: SharedDatasetHandle, owner: bool):
+        self._segment = segment
+        self.handle = handle
+        self.owner = owner
+        self._columns: Optional[Dict[str, np.ndarray]] = None
+        self._finalizer = weakref.finalize(self, _release, segment, owner)
+
+    @classmethod
+    def publish(cls, data) -> 'SharedDataset':
+        """Copia el dataset (filas o columnas) a un bloque compartido nuevo."""
+        plan = []
+        offset = 0
+        for name, values in _to_columns(data).items():
+            offset = _align(offset)
+            if values.dtype.kind in 'biuf':
+                array = np.ascontiguousarray(values)
+                plan.append((name, 'numeric', array, offset, None, None))
+                offset += array.nbytes
+                continue
+            # Texto: códigos int32 + diccionario (offsets int64 y bytes UTF-8 concatenados)
+            categories, codes = np.unique(values.astype(str), return_inverse=True)
+            codes = codes.astype(np.int32)
+            encoded = [c.encode('utf-8') for c in categories.tolist()]
+            bounds = np.zeros(len(encoded) + 1, dtype=np.int64)
+            np.cumsum([len(b) for b in encoded], out=bounds[1:])
+            codes_offset = offset
+            bounds_offset = _align(codes_offset + codes.nbytes)
+            text_offset = bounds_offset + bounds.nbytes
+            plan.append((name, 'category', codes, codes_offset, bounds, bounds_offset))
+            plan.append((name, 'text', b''.join(encoded), text_offset, None, None))
+            offset = text_offset + int(bounds[-1])
+        size = max(offset, 1)
+
+        segment = shared_memory.SharedMemory(create=True, size=size)
+        layout = []
+        n_rows = 0
+        for name, kind, array, array_offset, bounds, bounds_offset in plan:
+            if kind == 'text':
+                segment.buf[array_offset:array_offset + len(array)] = array
+                layout[-1] = layout[-1] + (array_offset, len(array))
+                continue
+            target = np.ndarray(array.shape, dtype=array.dtype, buffer=segment.buf, offset=array_offset)
+            target[...] = array
+            del target
+            n_rows = len(array)
+            if kind == 'numeric':
+                layout.append((name, kind, array.dtype.str, array_offset, len(array)))
+            else:
+                target = np.ndarray(bounds.shape, dtype=bounds.dtype, buffer=segment.buf, offset=bounds_offset)
+                target[...] = bounds
+                del target
+                layout.append((name, kind, array.dtype.str, array_offset, len(array), bounds_offset, len(bounds) - 1))
+        handle = SharedDatasetHandle(segment.name, n_rows, tuple(layout), size)
+        return cls(segment, handle, owner=True)
+
+    @classmethod
+    def attach(cls, handle: SharedDatasetHandle) -> 'SharedDataset':
+        """Se engancha (sin copia) a un dataset publicado por otro proceso."""
+        return cls(_attach_segment(handle.shm_name), handle, owner=False)
+
+    def _encoded(self) -> Dict[str, Union[np.ndarray, Tuple[np.ndarray, np.ndarray]]]:
+        """Numéricas como vistas del bloque; texto como (diccionario decodificado, vista de códigos)."""
+        if self._columns is None:
+            buf = self._segment.buf
+            columns = {}
+            for name, kind, dtype, offset, length, *dictionary in self.handle.columns:
+                view = np.ndarray((length,), dtype=np.dtype(dtype), buffer=buf, offset=offset)
+                view.flags.writeable = False
+                if kind == 'numeric':
+                    columns[name] = view
+                    continue
+                bounds_offset, n_categories, text_offset, text_size = dictionary
+                bounds = np.ndarray((n_categories + 1,), dtype=np.int64, buffer=buf, offset=bounds_offset)
+                text = bytes(buf[text_offset:text_offset + text_size])
+                categories = np.array([text[a:b].decode('utf-8') for a, b in zip(bounds[:-1], bounds[1:])],
+                                      dtype=object)
+                columns[name] = (categories, view)
+            self._columns = columns
+        return self._columns
+
+    def columns(self) -> Dict[str, np.ndarray]:
+        """
+        Columnas como arrays de NumPy. Las numéricas son vistas del bloque compartido; las
+        de texto se devuelven decodificadas (diccionario[códigos]).
+        """
+        return {name: column[0][column[1]] if isinstance(column, tuple) else column
+                for name, column in self._encoded().items()}
+
+    def rows(self) -> ColumnarRows:
+        """Filas sobre las columnas del bloque, sin copiarlas (el formato de ChartSpec.data)."""
+        return ColumnarRows(self._encoded(), self.handle.n_rows, key=f'shm:{self.handle.shm_name}')
+
+    def records(self) -> List[Dict[str, Any]]:
+        """Filas como lista de dicts, el formato de ChartSpec.data (NaN -> None)."""
+        return list(self.rows())
+
+    def close(self):
+        """Suelta el mapeo; si es el propietario, además borra el bloque."""
+        self._columns = None
+        self._finalizer()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+# Dataset enganchado en cada worker (uno por proceso, reutilizado entre tareas)
+_worker_datasets: Dict[str, Tuple[SharedDataset, ColumnarRows]] = {}
+
+
+def _worker_rows(handle: SharedDatasetHandle) -> ColumnarRows:
+    cached = _worker_datasets.get(handle.shm_name)
+    if cached is None:
+        dataset = SharedDataset.attach(handle)
+        cached = _worker_datasets[handle.shm_name] = (dataset, dataset.rows())
+    return cached[1]
+
+
+def _export_task(handle: SharedDatasetHandle, spec: Dict[str, Any], exporter_name: str, output_path: str):
+    from ..exporters import get_exporter
+    from .spec import ChartSpec
+    spec = dict(spec, data=_worker_rows(handle))
+    return get_exporter(exporter_name).export(ChartSpec(**spec), output_path)
+
+
+def _vegalite_task(handle: SharedDatasetHandle, spec: Dict[str, Any]):
+    from .vegalite_mapper import chartspec_to_vegalite
+    return chartspec_to_vegalite(dict(spec, data=_worker_rows(handle)))
+
+
+def _run_pool(task, dataset: SharedDataset, args_list: Sequence[tuple],
+              max_workers: Optional[int]) -> List[Dict[str, Any]]:
+    """Ejecuta task(handle, *args) por cada args; un worker caído se informa como error."""
+    results: List[Dict[str, Any]] = []
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        futures = [pool.submit(task, dataset.handle, *args) for args in args_list]
+        for future in futures:
+            try:
+                results.append({'success': True, 'result': future.result(), 'error': None})
+            except BrokenProcessPool as e:
+                results.append({'success': False, 'result': None, 'error': f'Worker terminado inesperadamente: {e}'})
+            except Exception as e:
+                results.append({'success': False, 'result': None, 'error': str(e)})
+    return results
+
+
+def batch_export(dataset: SharedDataset, jobs: Sequence[Tuple[Dict[str, Any], str, str]],
+                 max_workers: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Exporta varios specs sobre el mismo dataset compartido en un pool de procesos.
+
+    Args:
+        dataset: dataset publicado con SharedDataset.publish
+        jobs: tuplas (spec sin 'data', nombre del exportador, ruta de salida)
+        max_workers: procesos del pool (por defecto, os.cpu_count())
+
+    Returns:
+        Un dict por trabajo con 'success', 'exporter', 'output_path' y 'error'
+    """
+    results = _run_pool(_export_task, dataset, jobs, max_workers)
+    for result, (_, name, path) in zip(results, jobs):
+        if result['success'] and not result['result']:
+            result.update(success=False, error='El exportador devolvió False')
+        result.update(exporter=name, output_path=path)
+        del result['result']
+    return results
+
+
+def batch_vegalite(dataset: SharedDataset, specs: Sequence[Dict[str, Any]],
+                   max_workers: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Mapea varios specs (sin 'data') a Vega-Lite en un pool; 'result' lleva el spec mapeado."""
+    return _run_pool(_vegalite_task, dataset, [(spec,) for spec in specs], max_workers)
@@ -0,0 +1,273 @@
+"""
+Curvas de ajuste (geom_smooth) por mínimos cuadrados o LOESS, por grupo del campo de color.
+
+- 'linear' y 'poly': las ecuaciones normales de cada grupo salen de sus sumas Σx^k y
+  Σx^k·y, acumuladas con np.bincount en una pasada (x reescalado a [-1, 1] para que la
+  matriz esté bien condicionada); no se separan ni se ordenan los puntos.
+- 'loess': regresión local lineal con núcleo tricúbico y vecindario de `bandwidth`·n
+  puntos (como el loess de Vega-Lite), sobre los datos agrupados en LOESS_BINS bins por
+  grupo: cada bin pesa por su número de puntos en su x medio, así que el coste por curva
+  no depende de n.
+
+La banda de confianza usa la varianza del ajuste en cada punto (σ² · v'(X'X)⁻¹v en
+mínimos cuadrados, σ² · Σ l_i² en LOESS) y el cuantil t de Student aproximado por la
+expansión de Cornish-Fisher. Sólo la curva (y la banda) llega a la vista previa.
+"""
+
+import math
+from statistics import NormalDist
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .chart_types import ChartTypeInfo
+from .encoding import Encoding
+from .transforms import Precomputed, group_codes, numeric_column, pick_field, register
+
+METHODS = ('linear', 'poly', 'loess')
+DEFAULT_METHOD = 'loess'
+# Grado del ajuste polinómico por defecto y máximo
+DEFAULT_DEGREE = 2
+MAX_DEGREE = 6
+# Fracción de puntos del vecindario de LOESS (bandwidth de Vega-Lite)
+DEFAULT_BANDWIDTH = 0.3
+# Bins por grupo de la aproximación de LOESS
+LOESS_BINS = 256
+# Puntos de cada curva
+CURVE_POINTS = 100
+DEFAULT_LEVEL = 0.95
+BAND_FIELDS = ('inferior', 'superior')
+
+
+def t_critical(level: float, dof: float) -> float:
+    """Cuantil bilateral de la t de Student (Cornish-Fisher sobre el de la normal)."""
+    if not dof > 0:
+        return math.nan
+    z = NormalDist().inv_cdf((1 + level) / 2)
+    return (z + (z ** 3 + z) / (4 * dof) + (5 * z ** 5 + 16 * z ** 3 + 3 * z) / (96 * dof ** 2)
+            + (3 * z ** 7 + 19 * z ** 5 + 17 * z ** 3 - 15 * z) / (384 * dof ** 3))
+
+
+def _group_extents(x: np.ndarray, codes: np.ndarray, n_groups: int) -> Tuple[np.ndarray, np.ndarray]:
+    if n_groups == 1:
+        return np.array([x.min()]), np.array([x.max()])
+    lo = np.full(n_groups, np.inf)
+    hi = np.full(n_groups, -np.inf)
+    np.minimum.at(lo, codes, x)
+    np.maximum.at(hi, codes, x)
+    return lo, hi
+
+
+def _sums(codes: np.ndarray, weights: np.ndarray, n_groups: int) -> np.ndarray:
+    if n_groups == 1:
+        return np.array([weights.sum()])
+    return np.bincount(codes, weights=weights, minlength=n_groups)
+
+
+def polynomial_fit(x: np.ndarray, y: np.ndarray, codes: np.ndarray, n_groups: int, degree: int,
+                   grids: np.ndarray, level: Optional[float]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Ajuste polinómico por grupo evaluado en grids (grupos × puntos).
+
+    Returns:
+        (ajuste, semiancho de la banda) con la forma de grids; la banda es NaN sin level
+    """
+    p = degree + 1
+    center = (x.max() + x.min()) / 2
+    scale = (x.max() - x.min()) / 2 or 1.0
+    xs = (x - center) / scale
+    # moments[g, k] = Σ xs^k (k = 0..2·grado); targets[g, k] = Σ xs^k · y
+    moments = np.empty((n_groups, 2 * degree + 1))
+    targets = np.empty((n_groups, p))
+    power = np.ones_like(xs)
+    for k in range(2 * degree + 1):
+        moments[:, k] = _sums(codes, power, n_groups)
+        if k < p:
+            targets[:, k] = _sums(codes, power * y, n_groups)
+        power = power * xs
+    squares = _sums(codes, y * y, n_groups)
+    normal = moments[:, np.add.outer(np.arange(p), np.arange(p))]
+    inverse = np.linalg.pinv(normal)
+    coefficients = np.einsum('gij,gj->gi', inverse, targets)
+
+    basis = ((grids - center) / scale)[..., None] ** np.arange(p)
+    fit = np.einsum('gek,gk->ge', basis, coefficients)
+    band = np.full(fit.shape, np.nan)
+    if level is not None:
+        n = moments[:, 0]
+        residual = np.maximum(squares - np.einsum('gk,gk->g', coefficients, targets), 0.0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            sigma2 = residual / (n - p)
+        leverage = np.einsum('gek,gkl,gel->ge', basis, inverse, basis)
+        critical = np.array([t_critical(level, dof) for dof in (n - p).tolist()])
+        band = critical[:, None] * np.sqrt(sigma2[:, None] * np.maximum(leverage, 0.0))
+    return fit, band
+
+
+def _local_linear(targets: np.ndarray, centers: np.ndarray, counts: np.ndarray, sums: np.ndarray,
+                  neighbours: float) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Regresión local lineal de los bins (centros, conteos, Σy) en cada punto de targets.
+
+    Returns:
+        (ajuste, pesos l de cada bin por punto): ajuste = Σ_b l_b · Σy_b
+    """
+    distance = np.abs(targets[:, None] - centers[None, :])
+    # Radio: distancia hasta acumular `neighbours` puntos desde el más cercano
+    order = np.argsort(distance, axis=1)
+    reached = np.cumsum(counts[order], axis=1) >= neighbours
+    last = np.minimum(reached.argmax(axis=1), len(centers) - 1)
+    radius = np.take_along_axis(distance, order, axis=1)[np.arange(len(targets)), last]
+    radius = np.maximum(radius, 1e-12) * 1.000001
+    kernel = np.clip(1 - (distance / radius[:, None]) ** 3, 0.0, None) ** 3
+    offsets = centers[None, :] - targets[:, None]
+    weighted = kernel * counts[None, :]
+    s0 = weighted.sum(axis=1)
+    s1 = (weighted * offsets).sum(axis=1)
+    s2 = (weighted * offsets * offsets).sum(axis=1)
+    determinant = s0 * s2 - s1 * s1
+    flat = determinant <= 1e-12 * np.maximum(s0 * s2, 1e-300)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        # Peso por punto del bin; si el vecindario no tiene anchura, media local
+        weights = np.where(flat[:, None], kernel / s0[:, None],
+                           kernel * (s2[:, None] - s1[:, None] * offsets) / determinant[:, None])
+    return weights @ sums, weights
+
+
+def loess_fit(x: np.ndarray, y: np.ndarray, codes: np.ndarray, n_groups: int, bandwidth: float,
+              grids: np.ndarray, level: Optional[float], bins: int = LOESS_BINS) -> Tuple[np.ndarray, np.ndarray]:
+    """LOESS binned por grupo evaluado en grids (grupos × puntos): (ajuste, semiancho de la banda)."""
+    lo, hi = _group_extents(x, codes, n_groups)
+    width = np.where(hi > lo, (hi - lo) / bins, 1.0)
+    index = np.minimum(((x - lo[codes]) / width[codes]).astype(np.intp), bins - 1)
+    flat = codes * bins + index
+    size = n_groups * bins
+    counts = np.bincount(flat, minlength=size).reshape(n_groups, bins).astype(float)
+    sum_x = np.bincount(flat, weights=x, minlength=size).reshape(n_groups, bins)
+    sum_y = np.bincount(flat, weights=y, minlength=size).reshape(n_groups, bins)
+    sum_y2 = np.bincount(flat, weights=y * y, minlength=size).reshape(n_groups, bins) if level is not None else None
+
+    fit = np.full(grids.shape, np.nan)
+    band = np.full(grids.shape, np.nan)
+    for g in range(n_groups):
+        used = counts[g] > 0
+        if not used.any():
+            continue
+        n = counts[g].sum()
+        centers = sum_x[g, used] / counts[g, used]
+        neighbours = max(bandwidth * n, 3.0)
+        fit[g], weights = _local_linear(grids[g], centers, counts[g, used], sum_y[g, used], neighbours)
+        if level is None:
+            continue
+        # σ²: residuos con el ajuste en el centro de cada bin; grados de libertad n - traza(H)
+        at_centers, own = _local_linear(centers, centers, counts[g, used], sum_y[g, used], neighbours)
+        residual = (sum_y2[g, used] - 2 * at_centers * sum_y[g, used] + counts[g, used] * at_centers ** 2).sum()
+        dof = n - float((np.diag(own) * counts[g, used]).sum())
+        sigma2 = max(residual, 0.0) / dof if dof > 0 else np.nan
+        variance = sigma2 * (weights * weights * counts[g, used][None, :]).sum(axis=1)
+        band[g] = t_critical(level, dof) * np.sqrt(variance)
+    return fit, band
+
+
+def smooth(x: np.ndarray, y: np.ndarray, codes: Optional[np.ndarray] = None, n_groups: int = 1,
+           method: str = DEFAULT_METHOD, degree: int = DEFAULT_DEGREE, bandwidth: float = DEFAULT_BANDWIDTH,
+           points: int = CURVE_POINTS, level: Optional[float] = DEFAULT_LEVEL):
+    """
+    Curva de ajuste de cada grupo.
+
+    Args:
+        codes: Grupo de cada punto (0..n_groups-1); None = un solo grupo
+        method: 'linear', 'poly' (de grado `degree`) o 'loess' (vecindario `bandwidth`·n)
+        level: Nivel de la banda de confianza; None = sin banda
+
+    Returns:
+        (x de cada curva, ajuste, semiancho de la banda), matrices grupos × points
+        (filas NaN en los grupos sin puntos)
+    """
+    if method not in METHODS:
+        raise ValueError(f"Método de ajuste no soportado: {method}. Válidos: {METHODS}")
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    codes = np.zeros(x.size, dtype=np.intp) if codes is None else np.asarray(codes, dtype=np.intp)
+    finite = np.isfinite(x) & np.isfinite(y)
+    if not finite.all():
+        x, y, codes = x[finite], y[finite], codes[finite]
+    if not x.size:
+        empty = np.full((n_groups, points), np.nan)
+        return empty, empty, empty
+
+    lo, hi = _group_extents(x, codes, n_groups)
+    grids = lo[:, None] + (hi - lo)[:, None] * np.linspace(0, 1, points)[None, :]
+    if method == 'loess':
+        fit, band = loess_fit(x, y, codes, n_groups, bandwidth, grids, level)
+    else:
+        degree = 1 if method == 'linear' else min(max(int(degree), 1), MAX_DEGREE)
+        fit, band = polynomial_fit(x, y, codes, n_groups, degree, grids, level)
+    empty = ~np.isfinite(lo)
+    grids[empty] = fit[empty] = band[empty] = np.nan
+    return grids, fit, band
+
+
+# ---------------------------------------------------------------------------
+# Transformación 'regression' (línea de tendencia / geom_smooth)
+# ---------------------------------------------------------------------------
+
+def _level(options: Dict[str, Any]) -> Optional[float]:
+    """Nivel de la banda: options.confidence (True, False o un nivel 0..1)."""
+    confidence = options.get('confidence', True)
+    if confidence is True:
+        return DEFAULT_LEVEL
+    if not confidence:
+        return None
+    return float(confidence)
+
+
+@register('regression')
+def precompute_smooth(info: ChartTypeInfo, rows: List[Dict[str, Any]], encoding: Encoding,
+                      options: Dict[str, Any]) -> Optional[Precomputed]:
+    """Curva ajustada (y banda de confianza) por grupo del campo de color."""
+    x_field = pick_field(encoding, ('x',), quantitative=True)
+    y_field = pick_field(encoding, ('y',), quantitative=True)
+    if x_field is None or y_field is None:
+        return None
+    group = pick_field(encoding, ('color',), quantitative=False)
+    labels, codes = group_codes(rows, group)
+    level = _level(options)
+    grids, fit, band = smooth(
+        numeric_column(rows, x_field), numeric_column(rows, y_field), codes, len(labels),
+        method=options.get('method', DEFAULT_METHOD),
+        degree=int(options.get('degree') or DEFAULT_DEGREE),
+        bandwidth=float(options.get('bandwidth') or DEFAULT_BANDWIDTH),
+        points=int(options.get('points') or CURVE_POINTS),
+        level=level,
+    )
+
+    curves: List[Dict[str, Any]] = []
+    for label, xs, ys, half in zip(labels, grids.tolist(), fit.tolist(), band.tolist()):
+        for xv, yv, hv in zip(xs, ys, half):
+            if not (math.isfinite(xv) and math.isfinite(yv)):
+                continue
+            row: Dict[str, Any] = {x_field: xv, y_field: yv}
+            if level is not None:
+                finite = math.isfinite(hv)
+                row[BAND_FIELDS[0]] = yv - hv if finite else None
+                row[BAND_FIELDS[1]] = yv + hv if finite else None
+            if group is not None:
+                row[group] = label
+            curves.append(row)
+    if not curves:
+        return None
+
+    x_channel = {'field': x_field, 'type': 'quantitative', 'title': x_field}
+    color = {'color': {'field': group, 'type': 'nominal'}} if group is not None else {}
+    line = {'mark': {'type': 'line'},
+            'encoding': {'x': x_channel, 'y': {'field': y_field, 'type': 'quantitative', 'title': y_field}, **color}}
+    if level is None:
+        vegalite = {'data': {'values': curves}, **line}
+    else:
+        area = {'mark': {'type': 'area', 'opacity': 0.2},
+                'encoding': {'x': x_channel,
+                             'y': {'field': BAND_FIELDS[0], 'type': 'quantitative', 'title': y_field},
+                             'y2': {'field': BAND_FIELDS[1]}, **color}}
+        vegalite = {'data': {'values': curves}, 'layer': [area, line]}
+    return Precomputed('regression', curves, vegalite)
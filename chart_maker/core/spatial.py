@@ -0,0 +1,287 @@
+"""
+Índice espacial y agregación por celdas (rejilla o hexágonos) para los mapas de puntos.
+
+Las coordenadas se proyectan una vez (Mercator o equirrectangular, como el mapa) y se
+ordenan por celda de una rejilla uniforme: SpatialIndex guarda el orden y el inicio de
+cada celda, así que una consulta por rectángulo (la vista visible) sólo recorre las
+celdas que lo cortan. El índice se construye una vez por dataset y campos de
+latitud/longitud y se reutiliza al mover o ampliar la vista.
+
+Con pocos puntos visibles se envían las filas; con muchos (o en el mapa de calor) se
+agregan en celdas de ~CELL_PIXELS px del tamaño del gráfico. El tamaño de celda se
+redondea a potencias de 2, así que desplazar la vista reutiliza las celdas de cada punto,
+que el índice guarda por resolución.
+"""
+
+import math
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .aggregation import measure_column
+from .binning import STREAMING_AGGREGATES, BinAccumulator, cell_measure
+from .chart_types import ChartTypeInfo
+from .encoding import Encoding
+from .transforms import Precomputed, TransformCache, numeric_column, register
+
+# Puntos por celda del índice (de media)
+LEAF_SIZE = 64
+# Lado (o ancho del hexágono) de las celdas de agregación, en píxeles
+CELL_PIXELS = 12
+# Puntos visibles hasta los que un mapa de puntos envía las filas sin agregar
+MAX_POINTS = 5000
+# Límite de latitud de la proyección Mercator
+MAX_LATITUDE = 85.05113
+POINT_TYPES = ('mapa_puntos', 'espacial')
+CELL_SHAPES = ('hex', 'square')
+# Hexágono con vértice arriba inscrito en [-1, 1] (forma de símbolo de Vega)
+HEXAGON_PATH = 'M0,-1L0.866,-0.5L0.866,0.5L0,1L-0.866,0.5L-0.866,-0.5Z'
+
+# Índices de los últimos datasets (los construye el hilo que los pide primero)
+INDEX_CACHE = TransformCache(size=8)
+
+
+def project(lon: np.ndarray, lat: np.ndarray, projection: str = 'mercator') -> Tuple[np.ndarray, np.ndarray]:
+    """Coordenadas planas (en grados) de la proyección; la equirrectangular no cambia nada."""
+    lon = np.asarray(lon, dtype=float)
+    lat = np.asarray(lat, dtype=float)
+    if projection != 'mercator':
+        return lon, lat
+    phi = np.radians(np.clip(lat, -MAX_LATITUDE, MAX_LATITUDE))
+    return lon, np.degrees(np.log(np.tan(np.pi / 4 + phi / 2)))
+
+
+def unproject(x: np.ndarray, y: np.ndarray, projection: str = 'mercator') -> Tuple[np.ndarray, np.ndarray]:
+    if projection != 'mercator':
+        return x, y
+    return x, np.degrees(2 * np.arctan(np.exp(np.radians(y))) - np.pi / 2)
+
+
+class SpatialIndex:
+    """Rejilla uniforme sobre puntos planos: consultas por rectángulo y celdas por resolución."""
+
+    def __init__(self, x: np.ndarray, y: np.ndarray, leaf_size: int = LEAF_SIZE):
+        self.x = np.asarray(x, dtype=float)
+        self.y = np.asarray(y, dtype=float)
+        ids = np.flatnonzero(np.isfinite(self.x) & np.isfinite(self.y))
+        self.size = int(ids.size)
+        self.valid = ids
+        if ids.size:
+            x, y = self.x[ids], self.y[ids]
+            self.bbox = (float(x.min()), float(y.min()), float(x.max()), float(y.max()))
+        else:
+            x = y = np.zeros(0)
+            self.bbox = (0.0, 0.0, 0.0, 0.0)
+        x0, y0, x1, y1 = self.bbox
+        side = max(int(math.sqrt(ids.size / leaf_size)), 1)
+        self.cell = max(x1 - x0, y1 - y0) / side or 1.0
+        self.nx = int((x1 - x0) / self.cell) + 1
+        self.ny = int((y1 - y0) / self.cell) + 1
+        keys = self._column(x) * self.ny + self._row(y)
+        order = np.argsort(keys, kind='stable')
+        # order: puntos ordenados por celda; starts[k]:starts[k+1], los de la celda k
+        self.order = ids[order]
+        self.starts = np.searchsorted(keys[order], np.arange(self.nx * self.ny + 1))
+        self._cells: Dict[Tuple[str, float], Tuple[np.ndarray, np.ndarray]] = {}
+
+    def _column(self, x) -> np.ndarray:
+        return np.clip(((np.asarray(x, dtype=float) - self.bbox[0]) / self.cell).astype(np.intp), 0, self.nx - 1)
+
+    def _row(self, y) -> np.ndarray:
+        return np.clip(((np.asarray(y, dtype=float) - self.bbox[1]) / self.cell).astype(np.intp), 0, self.ny - 1)
+
+    def query(self, bbox: Optional[Sequence[float]] = None) -> np.ndarray:
+        """Índices (ordenados) de los puntos dentro de bbox = (x0, y0, x1, y1); None = todos."""
+        if bbox is None:
+            return self.valid
+        x0, y0, x1, y1 = bbox
+        bx0, by0, bx1, by1 = self.bbox
+        if not self.size or x0 > bx1 or x1 < bx0 or y0 > by1 or y1 < by0:
+            return np.zeros(0, dtype=np.intp)
+        columns = np.arange(self._column(x0), self._column(x1) + 1)
+        # Las filas de una columna son consecutivas en el orden: un tramo por columna
+        lo = self.starts[columns * self.ny + self._row(y0)]
+        hi = self.starts[columns * self.ny + self._row(y1) + 1]
+        candidates = np.concatenate([self.order[a:b] for a, b in zip(lo.tolist(), hi.tolist())])
+        x, y = self.x[candidates], self.y[candidates]
+        return np.sort(candidates[(x >= x0) & (x <= x1) & (y >= y0) & (y <= y1)])
+
+    def cells(self, size: float, shape: str = 'hex') -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Celda (i, j) de cada punto para celdas de lado (o ancho de hexágono) size,
+        alineadas al origen; se calcula una vez por resolución.
+        """
+        key = (shape, float(size))
+        if key not in self._cells:
+            if shape == 'hex':
+                self._cells[key] = _hex_cells(self.x, self.y, size)
+            else:
+                self._cells[key] = (np.floor(self.x / size).astype(np.int64), np.floor(self.y / size).astype(np.int64))
+        return self._cells[key]
+
+
+def _hex_cells(x: np.ndarray, y: np.ndarray, width: float) -> Tuple[np.ndarray, np.ndarray]:
+    """Hexágono (columna, fila) de cada punto, con filas desplazadas medio ancho (como d3-hexbin)."""
+    dx = width
+    dy = width * math.sqrt(3) / 2
+    with np.errstate(invalid='ignore'):
+        py = y / dy
+        pj = np.round(py)
+        odd = np.mod(pj, 2)
+        px = x / dx - odd / 2
+        pi = np.round(px)
+        py1 = py - pj
+        # Cerca del borde entre filas: el centro más cercano puede ser el de la fila vecina
+        near = np.abs(py1) * 3 > 1
+        px1 = px - pi
+        pi2 = pi + np.where(px < pi, -0.5, 0.5)
+        pj2 = pj + np.where(py < pj, -1.0, 1.0)
+        px2 = px - pi2
+        py2 = py - pj2
+        switch = near & ((px1 * dx) ** 2 + (py1 * dy) ** 2 > (px2 * dx) ** 2 + (py2 * dy) ** 2)
+        pi = np.where(switch, pi2 + np.where(odd == 1, 0.5, -0.5), pi)
+        pj = np.where(switch, pj2, pj)
+    pi = np.nan_to_num(pi, nan=0).astype(np.int64)
+    pj = np.nan_to_num(pj, nan=0).astype(np.int64)
+    return pi, pj
+
+
+def _cell_centers(i: np.ndarray, j: np.ndarray, size: float, shape: str) -> Tuple[np.ndarray, np.ndarray]:
+    if shape == 'hex':
+        return (i + np.mod(j, 2) / 2) * size, j * size * math.sqrt(3) / 2
+    return (i + 0.5) * size, (j + 0.5) * size
+
+
+def cell_size(bbox: Sequence[float], width: float, height: float, pixels: float = CELL_PIXELS) -> float:
+    """Tamaño de celda (unidades planas) de ~pixels px al dibujar bbox en width × height (potencia de 2)."""
+    x0, y0, x1, y1 = bbox
+    unit = max((x1 - x0) / max(width, 1), (y1 - y0) / max(height, 1))
+    if unit <= 0:
+        return 1.0
+    return 2.0 ** round(math.log2(unit * pixels))
+
+
+def spatial_index(rows: List[Dict[str, Any]], lon_field: str, lat_field: str,
+                  dataset: Optional[str] = None, projection: str = 'mercator') -> SpatialIndex:
+    """Índice de las filas; con la clave del dataset se reutiliza entre llamadas."""
+    def build():
+        return SpatialIndex(*project(numeric_column(rows, lon_field), numeric_column(rows, lat_field), projection))
+    if dataset is None:
+        return build()
+    return INDEX_CACHE.get_or_compute((dataset, lon_field, lat_field, projection), build)
+
+
+def aggregate_cells(index: SpatialIndex, visible: np.ndarray, size: float, shape: str,
+                    values: Optional[np.ndarray] = None, aggregate: str = 'count'):
+    """
+    Agregado por celda de los puntos visibles.
+
+    Returns:
+        (x, y, resultado, conteo) de las celdas con puntos; x/y son los centros planos
+    """
+    ci, cj = index.cells(size, shape)
+    ci, cj = ci[visible], cj[visible]
+    if not visible.size:
+        empty = np.zeros(0)
+        return empty, empty, empty, empty
+    i0, j0 = ci.min(), cj.min()
+    dims = (int(ci.max() - i0) + 1, int(cj.max() - j0) + 1)
+    accumulator = BinAccumulator(dims, aggregate)
+    accumulator.add([ci - i0, cj - j0], values[visible] if values is not None else None)
+    counts = accumulator.counts.reshape(dims)
+    occupied = np.nonzero(counts)
+    x, y = _cell_centers(occupied[0] + i0, occupied[1] + j0, size, shape)
+    return x, y, accumulator.result()[occupied], counts[occupied]
+
+
+# ---------------------------------------------------------------------------
+# Transformación 'geo' (mapas de puntos y mapa de calor geográfico)
+# ---------------------------------------------------------------------------
+
+@register('geo')
+def precompute_points(info: ChartTypeInfo, rows: List[Dict[str, Any]], encoding: Encoding,
+                      options: Dict[str, Any]) -> Optional[Precomputed]:
+    """
+    Puntos de la vista visible (options.viewport = [lon0, lat0, lon1, lat1]) o, si son
+    muchos, su agregado por celdas hexagonales o cuadradas (options.binShape).
+    """
+    heatmap = info.name == 'mapa_calor_geografico'
+    if info.name not in POINT_TYPES and not heatmap:
+        return None
+    fields = encoding.fields
+    lon_fd, lat_fd = fields.get('longitude'), fields.get('latitude')
+    if lon_fd is None or lat_fd is None or lon_fd.field is None or lat_fd.field is None:
+        return None
+    # Bins explícitos: los bins redondos de la transformación 'bin'
+    if heatmap and (options.get('maxbins') or isinstance(lon_fd.bin, dict) or isinstance(lat_fd.bin, dict)):
+        return None
+    measure = cell_measure(encoding, ('color', 'size'))
+    if measure['aggregate'] not in STREAMING_AGGREGATES:
+        return None
+
+    projection = options.get('projection', 'mercator')
+    index = spatial_index(rows, lon_fd.field, lat_fd.field, options.get('dataset'), projection)
+    if not index.size:
+        return None
+    viewport = options.get('viewport')
+    if viewport:
+        lon0, lat0, lon1, lat1 = (float(v) for v in viewport)
+        (x0, x1), (y0, y1) = project([lon0, lon1], [lat0, lat1], projection)
+        bbox = (x0, y0, x1, y1)
+        visible = index.query(bbox)
+    else:
+        bbox = index.bbox
+        visible = index.query()
+        (lon0, lon1), (lat0, lat1) = unproject(np.array(bbox[0::2]), np.array(bbox[1::2]), projection)
+    vl_projection = {'type': projection, 'fit': [[float(lon0), float(lat0)], [float(lon1), float(lat1)]]}
+    position = {
+        'longitude': {'field': lon_fd.field, 'type': 'quantitative'},
+        'latitude': {'field': lat_fd.field, 'type': 'quantitative'},
+    }
+
+    if not heatmap and visible.size <= options.get('maxPoints', MAX_POINTS):
+        out_rows = [rows[i] for i in visible.tolist()]
+        vl_encoding = dict(position)
+        for channel in ('color', 'size', 'shape', 'opacity'):
+            fd = fields.get(channel)
+            if fd is not None and fd.field is not None:
+                vl_encoding[channel] = fd.to_vegalite()
+        vl_encoding['tooltip'] = [{'field': fd['field'], 'type': fd.get('type', 'nominal')}
+                                  for fd in vl_encoding.values() if isinstance(fd, dict) and 'field' in fd]
+        return Precomputed('geo', out_rows, {'data': {'values': out_rows}, 'projection': vl_projection,
+                                             'mark': {'type': 'circle'}, 'encoding': vl_encoding})
+
+    shape = options.get('binShape', 'square' if heatmap else 'hex')
+    if shape not in CELL_SHAPES:
+        raise ValueError(f"Forma de celda no soportada: {shape}. Válidas: {CELL_SHAPES}")
+    width = float(options.get('width') or 400)
+    height = float(options.get('height') or 300)
+    size = cell_size(bbox, width, height)
+    values = numeric_column(rows, measure['field']) if measure['field'] is not None else None
+    x, y, result, counts = aggregate_cells(index, visible, size, shape, values, measure['aggregate'])
+    lon, lat = unproject(x, y, projection)
+    column = measure_column(measure)
+    out_rows = []
+    for cell_lon, cell_lat, value, n in zip(lon.tolist(), lat.tolist(), result.tolist(), counts.tolist()):
+        row = {lon_fd.field: round(cell_lon, 6), lat_fd.field: round(cell_lat, 6)}
+        if measure['aggregate'] == 'count':
+            row[column] = int(value)
+        else:
+            row[column] = float(value) if math.isfinite(value) else None
+            row['n'] = int(n)
+        out_rows.append(row)
+
+    # Tamaño del símbolo en px²: el hexágono de Vega ocupa [-1, 1], alto = 2/√3 del ancho
+    pixels = size / max((bbox[2] - bbox[0]) / width, (bbox[3] - bbox[1]) / height, 1e-12)
+    if shape == 'hex':
+        mark = {'type': 'point', 'shape': HEXAGON_PATH, 'size': (pixels * 2 / math.sqrt(3)) ** 2}
+    else:
+        mark = {'type': 'square', 'size': pixels ** 2}
+    mark.update({'filled': True, 'opacity': 0.85, 'strokeWidth': 0})
+    vl_encoding = dict(position)
+    vl_encoding['color'] = {'field': column, 'type': 'quantitative', 'title': column}
+    vl_encoding['tooltip'] = [{'field': column, 'type': 'quantitative'}]
+    if measure['aggregate'] != 'count':
+        vl_encoding['tooltip'].append({'field': 'n', 'type': 'quantitative'})
+    return Precomputed('geo', out_rows, {'data': {'values': out_rows}, 'projection': vl_projection,
+                                         'mark': mark, 'encoding': vl_encoding})
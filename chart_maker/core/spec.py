@@ -2,11 +2,17 @@
 # Definición de ChartSpec usando Pydantic
 from pydantic import BaseModel, validator, Field
 from typing import Any, Dict, List, Union, Optional
-from .chart_types import CHART_TYPES
+from .chart_types import CHART_REGISTRY, CHART_TYPES
+from .datasets import DATASETS, REF_KEY, is_dataset_ref
+from .encoding import parse_encoding
+from .shared_data import ColumnarRows
 
 class ChartSpec(BaseModel):
+    # ColumnarRows (datasets en memoria compartida) se guarda tal cual, sin copiar las filas
+    model_config = {'arbitrary_types_allowed': True}
+
     type: str = Field(..., description="Tipo de gráfico")
-    data: Union[List[Dict], Dict] = Field(..., description="Datos del gráfico")
+    data: Union[List[Dict], Dict, ColumnarRows] = Field(..., description="Datos del gráfico")
     encoding: Dict[str, Any] = Field(..., description="Codificación visual")
     options: Dict[str, Any] = Field(default_factory=dict, description="Opciones adicionales")
     # Metadatos y dimensiones opcionales
@@ -17,7 +23,7 @@ class ChartSpec(BaseModel):
     
     @validator('type')
     def validate_chart_type(cls, v):
-        if v not in CHART_TYPES:
+        if v not in CHART_REGISTRY:
             raise ValueError(f'Tipo de gráfico no soportado: {v}. Tipos válidos: {CHART_TYPES}')
         return v
     
@@ -25,6 +31,9 @@ class ChartSpec(BaseModel):
     def validate_data(cls, v):
         if not v:
             raise ValueError('Los datos no pueden estar vacíos')
+        # Referencia a un dataset compartido: {"dataset": "<hash>"}
+        if is_dataset_ref(v) and v[REF_KEY] not in DATASETS:
+            raise ValueError(f'Dataset no registrado: {v[REF_KEY]}')
         return v
     
     @validator('encoding')
@@ -35,7 +44,8 @@ class ChartSpec(BaseModel):
         
         if not v and chart_type not in allowed_empty_encoding:
             raise ValueError('La codificación no puede estar vacía para este tipo de gráfico')
-        return v
+        # Se parsea una vez a FieldDef tipados (spec.encoding.fields)
+        return parse_encoding(v)
 
     @validator('width')
     def validate_width(cls, v):
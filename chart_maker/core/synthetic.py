@@ -0,0 +1,269 @@
+"""
+Generador vectorizado de datos sintéticos para pruebas de carga.
+
+A partir del ejemplo de cada tipo de gráfico (encoding + filas de muestra) genera N
+filas con distribuciones, cardinalidades y rangos temporales realistas: categorías con
+frecuencias tipo Zipf, importes log-normales, fechas ordenadas con el mismo paso que el
+ejemplo. Todo se genera con NumPy por columnas (millones de filas por segundo).
+
+Uso:
+    from chart_maker.core.synthetic import generate_columns, generate_records
+    columnas = generate_columns('barras_vertical', 1_000_000)
+
+    python -m chart_maker.core.synthetic lineas 1000000 --format csv --output lineas.csv
+"""
+
+import argparse
+import json
+import sys
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from .chart_types import CHART_REGISTRY
+from .encoding import TYPE_ALIASES
+from .examples_new import EXAMPLES
+
+FORMATS = ('columnar', 'json', 'jsonl', 'csv')
+
+# Filas de muestra para los tipos de gráfico que no tienen ejemplo en EXAMPLES
+TEMPLATES: Dict[str, Dict[str, Any]] = {
+    'distribucion_grupos': {
+        'data': [{'grupo': 'A', 'valor': 12.5}, {'grupo': 'B', 'valor': 18.0}, {'grupo': 'C', 'valor': 9.2}],
+        'encoding': {'x': {'field': 'grupo', 'type': 'nominal'}, 'y': {'field': 'valor', 'type': 'quantitative'}},
+    },
+    'densidad': {
+        'data': [{'grupo': 'A', 'valor': 12.5}, {'grupo': 'B', 'valor': 18.0}, {'grupo': 'A', 'valor': 9.2}],
+        'encoding': {'x': {'field': 'valor', 'type': 'quantitative'}, 'color': {'field': 'grupo', 'type': 'nominal'}},
+    },
+    'correlacion_columnas': {
+        'data': [{'ventas': 120.0, 'costes': 80.0, 'visitas': 1500, 'margen': 0.33},
+                 {'ventas': 90.0, 'costes': 70.0, 'visitas': 1100, 'margen': 0.22}],
+        'encoding': {'x': {'field': 'ventas', 'type': 'quantitative'}, 'y': {'field': 'costes', 'type': 'quantitative'}},
+    },
+    'mapa_regiones': {
+        'data': [{'region': 'Madrid', 'valor': 120}, {'region': 'Cataluña', 'valor': 95},
+                 {'region': 'Andalucía', 'valor': 80}],
+        'encoding': {'color': {'field': 'valor', 'type': 'quantitative'}, 'detail': {'field': 'region', 'type': 'nominal'}},
+    },
+    'mapa_puntos': {
+        'data': [{'lat': 40.41, 'lon': -3.70, 'valor': 12}, {'lat': 41.38, 'lon': 2.17, 'valor': 8},
+                 {'lat': 37.39, 'lon': -5.98, 'valor': 5}],
+        'encoding': {'latitude': {'field': 'lat', 'type': 'quantitative'},
+                     'longitude': {'field': 'lon', 'type': 'quantitative'},
+                     'size': {'field': 'valor', 'type': 'quantitative'}},
+    },
+    'flujos': {
+        'data': [{'origen': 'Web', 'destino': 'Carrito', 'valor': 120},
+                 {'origen': 'Carrito', 'destino': 'Compra', 'valor': 45}],
+        'encoding': {'source': {'field': 'origen', 'type': 'nominal'}, 'target': {'field': 'destino', 'type': 'nominal'},
+                     'value': {'field': 'valor', 'type': 'quantitative'}},
+    },
+    'series_temporales': {
+        'data': [{'fecha': '2023-01', 'grupo': 'A', 'valor': 5}, {'fecha': '2023-01', 'grupo': 'B', 'valor': 3},
+                 {'fecha': '2023-02', 'grupo': 'A', 'valor': 7}, {'fecha': '2023-02', 'grupo': 'B', 'valor': 4}],
+        'encoding': {'x': {'field': 'fecha', 'type': 'temporal'}, 'y': {'field': 'valor', 'type': 'quantitative'},
+                     'color': {'field': 'grupo', 'type': 'nominal'}},
+    },
+    'tendencia': {
+        'data': [{'x': 1.0, 'y': 2.1}, {'x': 2.0, 'y': 3.9}, {'x': 3.0, 'y': 6.2}, {'x': 4.0, 'y': 8.1}],
+        'encoding': {'x': {'field': 'x', 'type': 'quantitative'}, 'y': {'field': 'y', 'type': 'quantitative'}},
+    },
+}
+
+# Tipo de gráfico sin ejemplo propio -> ejemplo de EXAMPLES o plantilla de TEMPLATES
+CHART_TEMPLATES = {
+    'columnas': 'barras_vertical', 'column_chart': 'barras_vertical',
+    'barras_apiladas': 'barras_agrupadas', 'stacked_bar_chart': 'barras_agrupadas',
+    'area_apilada': 'series_temporales', 'stacked_area_chart': 'series_temporales',
+    'treemap_chart': 'treemap', 'waffle': 'circular', 'waffle_chart': 'circular',
+    'caja': 'distribucion_grupos', 'box_plot': 'distribucion_grupos',
+    'violin': 'densidad', 'violin_plot': 'densidad',
+    'densidad': 'densidad', 'density_plot': 'densidad',
+    'distribucion': 'distribucion_grupos', 'distribution': 'distribucion_grupos',
+    'matriz_correlacion': 'correlacion_columnas', 'correlation_matrix': 'correlacion_columnas',
+    'correlacion': 'correlacion_columnas', 'correlation': 'correlacion_columnas',
+    'mapa_coropletico': 'mapa_regiones', 'choropleth_map': 'mapa_regiones',
+    'mapa_puntos': 'mapa_puntos', 'point_map': 'mapa_puntos',
+    'mapa_calor_geografico': 'mapa_puntos', 'geographic_heatmap': 'mapa_puntos',
+    'espacial': 'mapa_puntos', 'spatial': 'mapa_puntos',
+    'sankey': 'flujos', 'sankey_diagram': 'flujos',
+    'gantt_chart': 'gantt',
+    'puntos': 'dispersion', 'geom_point': 'dispersion',
+    'linea_tendencia': 'tendencia', 'geom_smooth': 'tendencia',
+    'poligono': 'area', 'geom_polygon': 'area',
+    'desviacion': 'cascada', 'deviation': 'cascada',
+    'ranking': 'barras_horizontal',
+    'composicion': 'circular', 'composition': 'circular',
+    'cambio': 'lineas', 'change': 'lineas',
+    'grupos': 'barras_agrupadas', 'groups': 'barras_agrupadas',
+}
+
+# Periodos que cubren las fechas generadas según la resolución del ejemplo
+TEMPORAL_PERIODS = {'M': 120, 'D': 3650, 's': 30 * 86400}
+# Exponente de la distribución tipo Zipf de las categorías
+ZIPF_EXPONENT = 1.1
+
+
+def template_for(chart_type: str) -> Dict[str, Any]:
+    """Datos de muestra y encoding del ejemplo (o plantilla) de un tipo de gráfico."""
+    if chart_type not in CHART_REGISTRY:
+        raise ValueError(f'Tipo de gráfico no soportado: {chart_type}')
+    key = chart_type if chart_type in EXAMPLES else CHART_TEMPLATES.get(chart_type, 'barras_vertical')
+    if key in EXAMPLES:
+        example = EXAMPLES[key]
+        data = example.data.get('values', []) if isinstance(example.data, dict) else example.data
+        return {'data': data, 'encoding': example.encoding}
+    return TEMPLATES[key]
+
+
+def _temporal_unit(text: str) -> str:
+    return 'M' if len(text) == 7 else 'D' if len(text) == 10 else 's'
+
+
+def _numeric_column(rng, values: np.ndarray, n: int, field: str) -> np.ndarray:
+    lo, hi = float(values.min()), float(values.max())
+    integer = np.issubdtype(values.dtype, np.integer)
+    if field.lower() in ('lat', 'latitud', 'latitude', 'lon', 'lng', 'longitud', 'longitude'):
+        pad = max(hi - lo, 1.0) * 0.25
+        column = rng.uniform(lo - pad, hi + pad, n)
+    elif lo >= 0:
+        # Magnitudes positivas (importes, recuentos): log-normal en torno a la mediana
+        median = max(float(np.median(values)), 1e-9)
+        column = median * rng.lognormal(0.0, 0.5, n)
+    else:
+        spread = float(values.std()) or (hi - lo) / 4 or 1.0
+        column = rng.normal(float(values.mean()), spread, n)
+    return np.rint(column).astype(np.int64) if integer else np.round(column, 4)
+
+
+def _category_column(rng, values: List[Any], n: int, field: str, cardinality: Optional[int]) -> np.ndarray:
+    categories = list(dict.fromkeys(values))
+    k = max(cardinality or len(categories), 1)
+    categories += [f'{field}_{i}' for i in range(len(categories), k)]
+    categories = np.array(categories[:k], dtype=object)
+    weights = 1.0 / np.arange(1, k + 1) ** ZIPF_EXPONENT
+    return categories[rng.choice(k, size=n, p=weights / weights.sum())]
+
+
+def _temporal_values(rng, values: List[str], n: int):
+    unit = _temporal_unit(values[0])
+    stamps = np.array(values, dtype=f'datetime64[{unit}]')
+    start = stamps.min()
+    span = max(int((stamps.max() - start).astype(np.int64)) + 1, min(n, TEMPORAL_PERIODS[unit]))
+    offsets = np.sort(rng.integers(0, span, n))
+    return start, offsets, unit
+
+
+def _temporal_strings(start, offsets: np.ndarray, unit: str) -> np.ndarray:
+    """Formatea las fechas una sola vez por periodo distinto y las indexa por fila."""
+    periods, inverse = np.unique(offsets, return_inverse=True)
+    labels = np.datetime_as_string(start + periods.astype(f'timedelta64[{unit}]'), unit=unit)
+    return labels[inverse]
+
+
+def generate_columns(chart_type: str, n: int, seed: Optional[int] = 0,
+                     cardinality: Optional[int] = None) -> Dict[str, np.ndarray]:
+    """
+    Genera n filas sintéticas en formato columnar para un tipo de gráfico.
+
+    Args:
+        chart_type: tipo de CHART_TYPES
+        n: número de filas
+        seed: semilla del generador (None para aleatorio)
+        cardinality: número de categorías de los campos nominales (por defecto, las del ejemplo)
+
+    Returns:
+        Dict campo -> array de NumPy (las fechas como texto, en el formato del ejemplo)
+    """
+    rng = np.random.default_rng(seed)
+    template = template_for(chart_type)
+    rows = [row for row in template['data'] if isinstance(row, dict)]
+    field_types = {}
+    end_fields = {}
+    for channel, fd in (template['encoding'] or {}).items():
+        if isinstance(fd, dict) and 'field' in fd:
+            field_type = fd.get('type', 'nominal')
+            field_types[fd['field']] = TYPE_ALIASES.get(field_type, field_type)
+            if channel in ('x2', 'y2'):
+                start = (template['encoding'].get(channel[0]) or {}).get('field')
+                if start:
+                    end_fields[fd['field']] = start
+
+    columns: Dict[str, np.ndarray] = {}
+    temporal: Dict[str, tuple] = {}
+    fields = list(dict.fromkeys([key for row in rows for key in row] + list(field_types)))
+    for field in fields:
+        values = [row[field] for row in rows if row.get(field) is not None]
+        if field in end_fields:
+            continue
+        if not values:
+            columns[field] = rng.normal(100, 25, n).round(2)
+        elif all(isinstance(v, bool) for v in values):
+            columns[field] = rng.random(n) < np.mean(values)
+        elif all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in values):
+            columns[field] = _numeric_column(rng, np.array(values), n, field)
+        elif field_types.get(field) == 'temporal' and all(isinstance(v, str) for v in values):
+            temporal[field] = _temporal_values(rng, values, n)
+        else:
+            columns[field] = _category_column(rng, values, n, field, cardinality)
+
+    # Fin de intervalos (x2/y2 temporales, p. ej. Gantt): inicio + duración positiva
+    for field, start in end_fields.items():
+        if start in temporal:
+            origin, offsets, unit = temporal[start]
+            temporal[field] = (origin, offsets + rng.integers(1, 30, n), unit)
+        else:
+            columns[field] = columns.get(start, np.zeros(n)) + rng.integers(1, 30, n)
+
+    for field, (origin, offsets, unit) in temporal.items():
+        columns[field] = _temporal_strings(origin, offsets, unit)
+    return {field: columns[field] for field in fields if field in columns}
+
+
+def columns_to_records(columns: Dict[str, np.ndarray]) -> List[Dict[str, Any]]:
+    """Convierte columnas a la lista de filas de ChartSpec.data."""
+    names = list(columns)
+    return [dict(zip(names, values)) for values in zip(*(columns[name].tolist() for name in names))]
+
+
+def generate_records(chart_type: str, n: int, seed: Optional[int] = 0,
+                     cardinality: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Como generate_columns, pero como lista de filas (dicts) lista para ChartSpec.data."""
+    return columns_to_records(generate_columns(chart_type, n, seed, cardinality))
+
+
+def write_columns(columns: Dict[str, np.ndarray], path: str, fmt: str):
+    """Escribe las columnas en JSON columnar, JSON (lista de filas), JSONL o CSV."""
+    if fmt not in FORMATS:
+        raise ValueError(f'Formato no soportado: {fmt}. Válidos: {FORMATS}')
+    if fmt == 'columnar':
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({name: values.tolist() for name, values in columns.items()}, f, ensure_ascii=False)
+        return
+    import pandas as pd
+    frame = pd.DataFrame(columns)
+    if fmt == 'csv':
+        frame.to_csv(path, index=False)
+    elif fmt == 'jsonl':
+        frame.to_json(path, orient='records', lines=True, force_ascii=False)
+    else:
+        frame.to_json(path, orient='records', force_ascii=False)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Genera datos sintéticos para un tipo de gráfico")
+    parser.add_argument('chart_type', help="Tipo de gráfico de CHART_TYPES")
+    parser.add_argument('rows', type=int, help="Número de filas")
+    parser.add_argument('--format', choices=FORMATS, default='csv')
+    parser.add_argument('--output', required=True, help="Archivo de salida")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--cardinality', type=int, help="Categorías por campo nominal")
+    args = parser.parse_args(argv)
+    write_columns(generate_columns(args.chart_type, args.rows, args.seed, args.cardinality),
+                  args.output, args.format)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
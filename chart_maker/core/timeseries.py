@@ -0,0 +1,339 @@
+"""
+Fechas como epoch (int64, ms) y remuestreo por calendario de los ejes temporales.
+
+Las fechas llegan como texto ('2023-01', '2023-01-05 10:20:30', '05/01/2023'...), como
+años enteros (2020) o como epoch en ms. Cada
+columna se convierte una vez: se detecta el formato con el primer valor, se elige el
+parser de ese formato (cacheado) y sólo se interpretan los valores distintos; la columna
+resultante se guarda por dataset y campo.
+
+El remuestreo agrupa los instantes en cubetas de calendario (segundo, minuto, hora, día,
+semana ISO, mes, trimestre, año). La unidad es la más fina que deja como mucho
+width / PIXELS_PER_BUCKET cubetas en el rango de fechas, así que una serie por segundos
+de un año llega a la vista previa como ~130 puntos, y sólo se aplica cuando hay más
+instantes distintos que cubetas.
+"""
+
+import re
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .aggregation import measure_column, normalize_aggregate
+from .binning import STREAMING_AGGREGATES, BinAccumulator
+from .chart_types import ChartTypeInfo
+from .encoding import Encoding, MeasurementType
+from .transforms import Precomputed, TransformCache, group_codes, numeric_column, pick_field, register
+
+SECOND = 1000
+MINUTE = 60 * SECOND
+HOUR = 60 * MINUTE
+DAY = 24 * HOUR
+# Duración (media, para elegir la unidad) y resolución del texto de cada unidad
+UNITS: Dict[str, Tuple[float, str]] = {
+    'second': (SECOND, 's'),
+    'minute': (MINUTE, 'm'),
+    'hour': (HOUR, 'm'),
+    'day': (DAY, 'D'),
+    'week': (7 * DAY, 'D'),
+    'month': (30.436875 * DAY, 'M'),
+    'quarter': (91.310625 * DAY, 'M'),
+    'year': (365.2425 * DAY, 'Y'),
+}
+# Meses por cubeta de las unidades de calendario
+MONTH_STEPS = {'month': 1, 'quarter': 3, 'year': 12}
+# Píxeles del eje por cubeta al elegir la unidad automáticamente
+PIXELS_PER_BUCKET = 3
+# Agregado de la cubeta si el eje y no trae uno: la media conserva la escala de los valores
+RESAMPLE_AGGREGATE = 'mean'
+NAT = np.iinfo(np.int64).min
+# Formatos reconocidos (además de ISO 8601), probados en orden sobre el primer valor
+FORMATS: Sequence[Tuple[str, str]] = (
+    (r'^\d{4}(-\d{2}(-\d{2}([T ]\d{2}:\d{2}(:\d{2}(\.\d+)?)?)?)?)?Z?$', 'iso'),
+    (r'^\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}(:\d{2}(\.\d+)?)?[+-]\d{2}:?\d{2}$', 'iso_offset'),
+    (r'^\d{1,2}/\d{1,2}/\d{4} \d{1,2}:\d{2}:\d{2}$', '%d/%m/%Y %H:%M:%S'),
+    (r'^\d{1,2}/\d{1,2}/\d{4} \d{1,2}:\d{2}$', '%d/%m/%Y %H:%M'),
+    (r'^\d{1,2}/\d{1,2}/\d{4}$', '%d/%m/%Y'),
+    (r'^\d{1,2}-\d{1,2}-\d{4}$', '%d-%m-%Y'),
+)
+
+# Columnas ya convertidas (dataset, campo) -> epoch ms
+PARSED_CACHE = TransformCache(size=16)
+
+
+def _is_year(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and value == int(value) and 1000 <= value <= 9999
+
+
+def detect_format(sample: Any) -> Optional[str]:
+    """
+    Formato de un valor de fecha: 'year' (entero de 4 cifras), 'number' (epoch ms), 'iso',
+    'iso_offset', un patrón de strptime o None.
+    """
+    if _is_year(sample):
+        return 'year'
+    if isinstance(sample, (int, float)) and not isinstance(sample, bool):
+        return 'number'
+    if not isinstance(sample, str):
+        return None
+    text = sample.strip()
+    for pattern, fmt in FORMATS:
+        if re.match(pattern, text):
+            return fmt
+    return None
+
+
+def _python_parser(parse: Callable[[str], datetime]) -> Callable[[Sequence[str]], np.ndarray]:
+    def parser(labels: Sequence[str]) -> np.ndarray:
+        out = np.full(len(labels), NAT, dtype=np.int64)
+        for i, label in enumerate(labels):
+            try:
+                moment = parse(label.strip())
+            except (TypeError, ValueError, AttributeError):
+                continue
+            if moment.tzinfo is not None:
+                moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+            out[i] = int((moment - datetime(1970, 1, 1)).total_seconds() * 1000)
+        return out
+    return parser
+
+
+@lru_cache(maxsize=None)
+def parser_for(fmt: str) -> Callable[[Sequence[Any]], np.ndarray]:
+    """Parser vectorizado (valores -> epoch ms, NAT si no es una fecha) de un formato."""
+    if fmt == 'year':
+        def parse_years(labels):
+            years = np.array([v if _is_year(v) else 0 for v in labels], dtype=np.int64)
+            parsed = (years - 1970).astype('datetime64[Y]').astype('datetime64[ms]').astype(np.int64)
+            return np.where(years > 0, parsed, NAT)
+        return parse_years
+    if fmt == 'number':
+        def parse_numbers(labels):
+            values = np.array([v if isinstance(v, (int, float)) and not isinstance(v, bool) else np.nan
+                               for v in labels], dtype=float)
+            return np.where(np.isfinite(values), np.nan_to_num(values), NAT).astype(np.int64)
+        return parse_numbers
+    if fmt == 'iso':
+        fallback = _python_parser(datetime.fromisoformat)
+
+        def parse_iso(labels):
+            try:
+                # NumPy interpreta ISO 8601 de una vez (la 'Z' final es UTC, como sin zona)
+                return np.array([str(v).strip().rstrip('Z') for v in labels], dtype='datetime64[ms]').astype(np.int64)
+            except ValueError:
+                return fallback([str(v) for v in labels])
+        return parse_iso
+    if fmt == 'iso_offset':
+        return _python_parser(datetime.fromisoformat)
+    return _python_parser(lambda text: datetime.strptime(text, fmt))
+
+
+def parse_times(values: Sequence[Any]) -> np.ndarray:
+    """Epoch ms (int64) de una secuencia de fechas; NAT donde no hay fecha."""
+    index: Dict[Any, int] = {}
+    codes = np.fromiter((index.setdefault(v, len(index)) for v in values), dtype=np.intp, count=len(values))
+    labels = [v for v in index if v is not None and v != '']
+    parsed = np.full(len(index), NAT, dtype=np.int64)
+    # Formato del primer valor; los que no encajan se vuelven a intentar con el suyo
+    while labels:
+        fmt = detect_format(labels[0])
+        if fmt is None:
+            labels = labels[1:]
+            continue
+        positions = np.array([index[v] for v in labels], dtype=np.intp)
+        parsed[positions] = parser_for(fmt)(labels)
+        labels = [v for v, bad in zip(labels[1:], (parsed[positions[1:]] == NAT).tolist())
+                  if bad and detect_format(v) not in (None, fmt)]
+    return parsed[codes]
+
+
+def time_column(rows: List[Dict[str, Any]], field: str, dataset: Optional[str] = None) -> np.ndarray:
+    """Columna de epoch ms de un campo; con la clave del dataset se convierte una sola vez."""
+    def parse():
+        # Se interpretan los valores distintos una vez (con un ColumnarRows, sin crear filas)
+        labels, codes = group_codes(rows, field)
+        return parse_times(labels)[codes]
+    if dataset is None:
+        return parse()
+    return PARSED_CACHE.get_or_compute((dataset, field), parse)
+
+
+def choose_unit(span_ms: float, width: float, pixels: float = PIXELS_PER_BUCKET) -> str:
+    """Unidad más fina con como mucho width / pixels cubetas en span_ms."""
+    buckets = max(width / pixels, 1.0)
+    for unit, (duration, _) in UNITS.items():
+        if span_ms / duration <= buckets:
+            return unit
+    return 'year'
+
+
+def bucket_numbers(ms: np.ndarray, unit: str) -> np.ndarray:
+    """Ordinal de la cubeta de cada instante (consecutivo entre cubetas vecinas)."""
+    if unit == 'week':
+        # El 1970-01-01 fue jueves: desplazar 3 días alinea las semanas al lunes
+        return np.floor_divide(np.floor_divide(ms, DAY) + 3, 7)
+    if unit not in MONTH_STEPS:
+        return np.floor_divide(ms, int(UNITS[unit][0]))
+    months = ms.astype('datetime64[ms]').astype('datetime64[M]').astype(np.int64)
+    return np.floor_divide(months, MONTH_STEPS[unit])
+
+
+def bucket_starts(numbers: np.ndarray, unit: str) -> np.ndarray:
+    """Inicio (epoch ms) de las cubetas con esos ordinales."""
+    numbers = np.asarray(numbers, dtype=np.int64)
+    if unit == 'week':
+        return (numbers * 7 - 3) * DAY
+    if unit not in MONTH_STEPS:
+        return numbers * int(UNITS[unit][0])
+    return (numbers * MONTH_STEPS[unit]).astype('datetime64[M]').astype('datetime64[ms]').astype(np.int64)
+
+
+def floor_times(ms: np.ndarray, unit: str) -> np.ndarray:
+    """Inicio de la cubeta (epoch ms) de cada instante; las semanas empiezan en lunes."""
+    return bucket_starts(bucket_numbers(ms, unit), unit)
+
+
+def format_times(ms: np.ndarray, unit: str) -> List[str]:
+    """Texto ISO de cada instante con la resolución de la unidad ('2023-01', '2023-01-05T10:00'...)."""
+    return np.datetime_as_string(ms.astype('datetime64[ms]'), unit=UNITS[unit][1]).tolist()
+
+
+def _unit(options: Dict[str, Any], span_ms: float, count: Callable[[], int]) -> Optional[str]:
+    """
+    Unidad pedida (options.resample) o automática; None = sin remuestreo. count() da los
+    instantes distintos (o los intervalos en Gantt) y sólo se calcula en modo automático.
+    """
+    requested = options.get('resample', 'auto')
+    if requested in (False, None, 'none'):
+        return None
+    if requested != 'auto':
+        if requested not in UNITS:
+            raise ValueError(f"Unidad de remuestreo no soportada: {requested}. Válidas: {tuple(UNITS)}")
+        return requested
+    width = float(options.get('width') or 400)
+    # Con menos instantes distintos que cubetas, las filas se dibujan tal cual
+    if count() <= width / PIXELS_PER_BUCKET:
+        return None
+    return choose_unit(span_ms, width)
+
+
+# ---------------------------------------------------------------------------
+# Transformación 'resample' (líneas, áreas y Gantt con eje temporal)
+# ---------------------------------------------------------------------------
+
+def _resample_series(info: ChartTypeInfo, rows, encoding: Encoding, options: Dict[str, Any]) -> Optional[Precomputed]:
+    x_fd, y_fd = encoding.fields.get('x'), encoding.fields.get('y')
+    if x_fd is None or x_fd.type != MeasurementType.TEMPORAL or y_fd is None or y_fd.field is None:
+        return None
+    times = time_column(rows, x_fd.field, options.get('dataset'))
+    valid = times != NAT
+    if not valid.any():
+        return None
+    lo, hi = int(times[valid].min()), int(times[valid].max())
+    unit = _unit(options, hi - lo, lambda: np.unique(times[valid]).size)
+    if unit is None:
+        return None
+    aggregate = normalize_aggregate(y_fd.aggregate or options.get('aggregate') or RESAMPLE_AGGREGATE)
+    if aggregate not in STREAMING_AGGREGATES:
+        return None
+    measure = {'field': y_fd.field if aggregate != 'count' else None, 'aggregate': aggregate}
+
+    group = pick_field(encoding, ('color', 'detail'), quantitative=False)
+    labels, codes = group_codes(rows, group)
+    first, last = (int(v) for v in bucket_numbers(np.array([lo, hi]), unit))
+    buckets = np.where(valid, bucket_numbers(times, unit) - first, -1)
+    starts = bucket_starts(np.arange(first, last + 1), unit)
+    accumulator = BinAccumulator((len(starts), len(labels)), aggregate)
+    values = numeric_column(rows, y_fd.field) if aggregate != 'count' else None
+    accumulator.add([buckets, codes], values)
+    result = accumulator.result()
+
+    column = measure_column(measure)
+    stamps = format_times(starts, unit)
+    out_rows = []
+    for b, g in np.argwhere(accumulator.counts.reshape(result.shape) > 0).tolist():
+        value = result[b, g]
+        row: Dict[str, Any] = {x_fd.field: stamps[b], column: int(value) if aggregate == 'count'
+                               else (float(value) if np.isfinite(value) else None)}
+        if group is not None:
+            row[group] = labels[g]
+        out_rows.append(row)
+    if not out_rows:
+        return None
+
+    vl_encoding: Dict[str, Any] = {
+        'x': {'field': x_fd.field, 'type': 'temporal', 'title': x_fd.field},
+        'y': {'field': column, 'type': 'quantitative', 'title': y_fd.field},
+        'tooltip': [{'field': x_fd.field, 'type': 'temporal', 'title': f'{x_fd.field} ({unit})'},
+                    {'field': column, 'type': 'quantitative'}],
+    }
+    if group is not None:
+        vl_encoding['color'] = {'field': group, 'type': 'nominal'}
+    return Precomputed('resample', out_rows, {'data': {'values': out_rows}, 'mark': info.vegalite_mark,
+                                             'encoding': vl_encoding})
+
+
+def _resample_intervals(info: ChartTypeInfo, rows, encoding: Encoding, options: Dict[str, Any]) -> Optional[Precomputed]:
+    """Gantt: intervalos ajustados a cubetas y unidos por tarea cuando se solapan."""
+    x_fd, x2_fd = encoding.fields.get('x'), encoding.fields.get('x2')
+    task = pick_field(encoding, ('y',), quantitative=False)
+    if x_fd is None or x2_fd is None or x_fd.field is None or x2_fd.field is None or task is None:
+        return None
+    if x_fd.type != MeasurementType.TEMPORAL:
+        return None
+    dataset = options.get('dataset')
+    starts = time_column(rows, x_fd.field, dataset)
+    ends = time_column(rows, x2_fd.field, dataset)
+    valid = (starts != NAT) & (ends != NAT)
+    if not valid.any():
+        return None
+    starts, ends = starts[valid], np.maximum(ends[valid], starts[valid])
+    lo, hi = int(starts.min()), int(ends.max())
+    unit = _unit(options, hi - lo, lambda: len(starts))
+    if unit is None:
+        return None
+
+    labels, codes = group_codes(rows, task)
+    codes = codes[valid]
+    starts = floor_times(starts, unit)
+    # Fin redondeado hacia arriba: la cubeta que lo contiene termina en la siguiente
+    numbers = bucket_numbers(ends, unit)
+    ends = np.where(bucket_starts(numbers, unit) == ends, ends, bucket_starts(numbers + 1, unit))
+    order = np.lexsort((starts, codes))
+    codes, starts, ends = codes[order], starts[order], ends[order]
+    # Un tramo nuevo cuando cambia la tarea o el inicio supera el mayor fin anterior de la tarea
+    reach = np.empty_like(ends)
+    task_starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+    for a, b in zip(task_starts, np.r_[task_starts[1:], len(codes)]):
+        reach[a:b] = np.maximum.accumulate(ends[a:b])
+    new = np.r_[True, (codes[1:] != codes[:-1]) | (starts[1:] > reach[:-1])]
+    segments = np.flatnonzero(new)
+    segment_ends = np.maximum.reduceat(ends, segments)
+    counts = np.diff(np.r_[segments, len(codes)])
+
+    begin_text = format_times(starts[segments], unit)
+    end_text = format_times(segment_ends, unit)
+    out_rows = [{task: labels[codes[s]], x_fd.field: begin_text[i], x2_fd.field: end_text[i], 'n': int(counts[i])}
+                for i, s in enumerate(segments.tolist())]
+    vl_encoding = {
+        'x': {'field': x_fd.field, 'type': 'temporal', 'title': x_fd.field},
+        'x2': {'field': x2_fd.field},
+        'y': {'field': task, 'type': 'nominal'},
+        'tooltip': [{'field': task, 'type': 'nominal'},
+                    {'field': x_fd.field, 'type': 'temporal', 'title': f'{x_fd.field} ({unit})'},
+                    {'field': x2_fd.field, 'type': 'temporal'},
+                    {'field': 'n', 'type': 'quantitative'}],
+    }
+    return Precomputed('resample', out_rows, {'data': {'values': out_rows}, 'mark': info.vegalite_mark,
+                                             'encoding': vl_encoding})
+
+
+@register('resample')
+def precompute_resample(info: ChartTypeInfo, rows: List[Dict[str, Any]], encoding: Encoding,
+                        options: Dict[str, Any]) -> Optional[Precomputed]:
+    """Serie agregada por cubetas de calendario (o intervalos de Gantt ajustados a ellas)."""
+    if info.name == 'gantt':
+        return _resample_intervals(info, rows, encoding, options)
+    return _resample_series(info, rows, encoding, options)
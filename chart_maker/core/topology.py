@@ -0,0 +1,442 @@
+"""
+GeoJSON -> TopoJSON cuantizado y simplificado para los mapas coropléticos.
+
+Los ficheros de límites (municipios, provincias...) ocupan decenas de MB en GeoJSON:
+cada frontera se repite en los dos polígonos que separa y cada coordenada lleva
+15 cifras. La conversión:
+
+1. cuantiza las coordenadas a una rejilla entera (QUANTIZATION por eje),
+2. corta los anillos en arcos en los puntos de unión y guarda cada arco compartido
+   una sola vez (el vecino lo referencia invertido, ~i),
+3. calcula una vez el área efectiva de Visvalingam–Whyatt de cada punto de cada arco
+   (los arcos compartidos se simplifican igual en ambos lados: no hay huecos) y
+   descarta los puntos por debajo de la tolerancia del zoom (≈ 1 px² al tamaño del
+   gráfico),
+4. codifica los arcos por diferencias (enteros pequeños en el JSON).
+
+El resultado de cada fichero se guarda en disco con clave hash del fichero +
+cuantización + tolerancia + propiedades, así que la vista previa no repite la conversión.
+"""
+
+import hashlib
+import heapq
+import json
+import math
+import os
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .binning import STREAMING_AGGREGATES, BinAccumulator
+from .aggregation import DEFAULT_AGGREGATE, measure_column, normalize_aggregate
+from .chart_types import ChartTypeInfo
+from .encoding import Encoding
+from .transforms import Precomputed, group_codes, numeric_column, pick_field, register
+
+# Valores enteros por eje de las coordenadas cuantizadas
+QUANTIZATION = 100_000
+# Área mínima visible de un triángulo, en píxeles² del gráfico
+MIN_PIXEL_AREA = 1.0
+CACHE_ENV_VAR = 'CHART_MAKER_GEO_CACHE'
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.chart_maker', 'topojson')
+OBJECT_NAME = 'features'
+
+
+# ---------------------------------------------------------------------------
+# Simplificación (Visvalingam–Whyatt)
+# ---------------------------------------------------------------------------
+
+def effective_areas(points: np.ndarray) -> np.ndarray:
+    """
+    Área efectiva de cada punto de una polilínea (los extremos, infinita).
+
+    Es el área del triángulo con sus vecinos en el momento en que se eliminaría; nunca
+    menor que la de un punto eliminado antes, así que filtrar por área >= tolerancia da
+    la misma simplificación que eliminar punto a punto hasta esa tolerancia.
+    """
+    n = len(points)
+    areas = np.full(n, np.inf)
+    if n < 3:
+        return areas
+    xs = points[:, 0].astype(float).tolist()
+    ys = points[:, 1].astype(float).tolist()
+
+    def triangle(a, b, c):
+        return abs((xs[b] - xs[a]) * (ys[c] - ys[a]) - (xs[c] - xs[a]) * (ys[b] - ys[a])) / 2
+
+    previous = list(range(-1, n - 1))
+    following = list(range(1, n + 1))
+    current = [math.inf] + [triangle(i - 1, i, i + 1) for i in range(1, n - 1)] + [math.inf]
+    heap = [(current[i], i) for i in range(1, n - 1)]
+    heapq.heapify(heap)
+    largest = 0.0
+    while heap:
+        area, i = heapq.heappop(heap)
+        if area != current[i] or areas[i] != np.inf:
+            continue
+        largest = max(largest, area)
+        areas[i] = largest
+        before, after = previous[i], following[i]
+        following[before] = after
+        previous[after] = before
+        for j in (before, after):
+            if 0 < j < n - 1:
+                current[j] = max(triangle(previous[j], j, following[j]), largest)
+                heapq.heappush(heap, (current[j], j))
+    return areas
+
+
+def _keep(areas: np.ndarray, tolerance: float, closed: bool) -> np.ndarray:
+    keep = areas >= tolerance
+    # Un anillo de un solo arco necesita al menos 3 vértices distintos
+    if closed and keep.sum() < 4 and len(areas) >= 4:
+        interior = np.argsort(-areas[1:-1], kind='stable')[:2] + 1
+        keep[interior] = True
+    return keep
+
+
+# ---------------------------------------------------------------------------
+# Topología
+# ---------------------------------------------------------------------------
+
+def _features(geojson: Dict[str, Any]) -> List[Dict[str, Any]]:
+    if geojson.get('type') == 'FeatureCollection':
+        return list(geojson.get('features') or [])
+    if geojson.get('type') == 'Feature':
+        return [geojson]
+    return [{'type': 'Feature', 'properties': {}, 'geometry': geojson}]
+
+
+class _Lines:
+    """Anillos y líneas de todas las geometrías, con su cuantización común."""
+
+    def __init__(self):
+        self.coordinates: List[np.ndarray] = []
+        self.closed: List[bool] = []
+
+    def add(self, coordinates, closed: bool) -> int:
+        self.coordinates.append(np.asarray(coordinates, dtype=float)[:, :2])
+        self.closed.append(closed)
+        return len(self.coordinates) - 1
+
+
+def _collect(geometry: Optional[Dict[str, Any]], lines: _Lines, points: List[np.ndarray]):
+    """Sustituye las coordenadas de la geometría por índices de líneas (o de puntos)."""
+    if not geometry or not geometry.get('type'):
+        return {'type': None}
+    kind = geometry['type']
+    coordinates = geometry.get('coordinates')
+    if kind == 'Polygon':
+        return {'type': kind, 'rings': [lines.add(ring, True) for ring in coordinates if len(ring) >= 4]}
+    if kind == 'MultiPolygon':
+        return {'type': kind, 'rings': [[lines.add(ring, True) for ring in polygon if len(ring) >= 4]
+                                        for polygon in coordinates]}
+    if kind == 'LineString':
+        return {'type': kind, 'rings': lines.add(coordinates, False)}
+    if kind == 'MultiLineString':
+        return {'type': kind, 'rings': [lines.add(line, False) for line in coordinates]}
+    if kind in ('Point', 'MultiPoint'):
+        points.append(np.asarray([coordinates] if kind == 'Point' else coordinates, dtype=float)[:, :2])
+        return {'type': kind, 'points': len(points) - 1}
+    return {'type': None}
+
+
+def _junctions(quantized: List[np.ndarray], closed: List[bool], span: int) -> np.ndarray:
+    """
+    Claves (x·span + y) de los puntos de unión: puntos por los que pasan varias líneas
+    con vecinos distintos, y los extremos de las líneas abiertas.
+    """
+    keys, lows, highs, ends = [], [], [], []
+    for q, is_closed in zip(quantized, closed):
+        key = q[:, 0] * span + q[:, 1]
+        if is_closed:
+            ring = key[:-1]
+            before, after = np.roll(ring, 1), np.roll(ring, -1)
+        else:
+            ring = key
+            before = np.concatenate(([-1], key[:-1]))
+            after = np.concatenate((key[1:], [-1]))
+            ends.extend((key[0], key[-1]))
+        keys.append(ring)
+        lows.append(np.minimum(before, after))
+        highs.append(np.maximum(before, after))
+    if not keys:
+        return np.zeros(0, dtype=np.int64)
+    triples = np.unique(np.column_stack([np.concatenate(keys), np.concatenate(lows), np.concatenate(highs)]), axis=0)
+    point_keys, neighbour_sets = np.unique(triples[:, 0], return_counts=True)
+    return np.union1d(point_keys[neighbour_sets > 1], np.asarray(ends, dtype=np.int64))
+
+
+def _cut(q: np.ndarray, is_closed: bool, junction: np.ndarray) -> List[np.ndarray]:
+    """Arcos de una línea cortada en sus puntos de unión."""
+    if is_closed:
+        ring = q[:-1]
+        cuts = np.flatnonzero(junction[:-1])
+        if not cuts.size:
+            # Anillo sin uniones: un arco cerrado que empieza en su punto mínimo (canónico)
+            start = np.lexsort((ring[:, 1], ring[:, 0]))[0]
+            rotated = np.roll(ring, -start, axis=0)
+            return [np.vstack([rotated, rotated[:1]])]
+        rotated = np.roll(ring, -cuts[0], axis=0)
+        rotated = np.vstack([rotated, rotated[:1]])
+        bounds = list(cuts - cuts[0]) + [len(ring)]
+    else:
+        rotated = q
+        bounds = list(np.flatnonzero(junction))
+    return [rotated[a:b + 1] for a, b in zip(bounds[:-1], bounds[1:]) if b > a]
+
+
+def geojson_to_topology(geojson: Dict[str, Any], quantization: int = QUANTIZATION,
+                        tolerance: float = 0.0, properties: Optional[Sequence[str]] = None,
+                        name: str = OBJECT_NAME) -> Dict[str, Any]:
+    """
+    Convierte un GeoJSON (FeatureCollection, Feature o geometría) en TopoJSON.
+
+    Args:
+        quantization: Valores enteros por eje
+        tolerance: Área efectiva mínima (en unidades de las coordenadas al cuadrado) de
+                   los puntos que se conservan; 0 = sin simplificar
+        properties: Propiedades que se conservan (None = todas)
+    """
+    features = _features(geojson)
+    lines, points = _Lines(), []
+    shapes = [_collect(f.get('geometry'), lines, points) for f in features]
+
+    everything = lines.coordinates + points
+    if everything:
+        stacked = np.vstack([c for c in everything if len(c)]) if any(len(c) for c in everything) else np.zeros((1, 2))
+        x0, y0 = stacked.min(axis=0)
+        x1, y1 = stacked.max(axis=0)
+    else:
+        x0 = y0 = x1 = y1 = 0.0
+    kx = (x1 - x0) / (quantization - 1) or 1.0
+    ky = (y1 - y0) / (quantization - 1) or 1.0
+
+    def quantize(c: np.ndarray) -> np.ndarray:
+        q = np.round((c - (x0, y0)) / (kx, ky)).astype(np.int64)
+        if len(q) > 1:
+            # Puntos repetidos tras cuantizar
+            q = q[np.concatenate(([True], np.any(np.diff(q, axis=0) != 0, axis=1)))]
+        return q
+
+    quantized = [quantize(c) for c in lines.coordinates]
+    for i, is_closed in enumerate(lines.closed):
+        if is_closed and len(quantized[i]) and not np.array_equal(quantized[i][0], quantized[i][-1]):
+            quantized[i] = np.vstack([quantized[i], quantized[i][:1]])
+    span = quantization + 1
+    junction_keys = _junctions(quantized, lines.closed, span)
+
+    # Arcos únicos: un arco y su inverso se guardan una vez
+    arcs: List[np.ndarray] = []
+    arc_closed: List[bool] = []
+    index: Dict[bytes, int] = {}
+    line_arcs: List[List[int]] = []
+    for q, is_closed in zip(quantized, lines.closed):
+        junction = np.isin(q[:, 0] * span + q[:, 1], junction_keys)
+        refs = []
+        for arc in _cut(q, is_closed, junction):
+            key = arc.tobytes()
+            if key in index:
+                refs.append(index[key])
+                continue
+            reverse = arc[::-1].tobytes()
+            if reverse in index:
+                refs.append(~index[reverse])
+                continue
+            index[key] = len(arcs)
+            refs.append(len(arcs))
+            arcs.append(arc)
+            arc_closed.append(bool(np.array_equal(arc[0], arc[-1])))
+        line_arcs.append(refs)
+
+    encoded_arcs = []
+    for arc, is_closed in zip(arcs, arc_closed):
+        if tolerance > 0 and len(arc) > 2:
+            arc = arc[_keep(effective_areas(arc) * (kx * ky), tolerance, is_closed)]
+        encoded_arcs.append(np.vstack([arc[:1], np.diff(arc, axis=0)]).tolist())
+
+    geometries = []
+    for feature, shape in zip(features, shapes):
+        kind = shape['type']
+        geometry: Dict[str, Any] = {'type': kind}
+        if kind == 'Polygon':
+            geometry['arcs'] = [line_arcs[r] for r in shape['rings']]
+        elif kind == 'MultiPolygon':
+            geometry['arcs'] = [[line_arcs[r] for r in polygon] for polygon in shape['rings']]
+        elif kind == 'LineString':
+            geometry['arcs'] = line_arcs[shape['rings']]
+        elif kind == 'MultiLineString':
+            geometry['arcs'] = [line_arcs[r] for r in shape['rings']]
+        elif kind in ('Point', 'MultiPoint'):
+            coords = np.round((points[shape['points']] - (x0, y0)) / (kx, ky)).astype(np.int64).tolist()
+            geometry['coordinates'] = coords[0] if kind == 'Point' else coords
+        props = feature.get('properties') or {}
+        if properties is not None:
+            props = {k: props[k] for k in properties if k in props}
+        if props:
+            geometry['properties'] = props
+        if feature.get('id') is not None:
+            geometry['id'] = feature['id']
+        geometries.append(geometry)
+
+    return {
+        'type': 'Topology',
+        'bbox': [float(x0), float(y0), float(x1), float(y1)],
+        'transform': {'scale': [kx, ky], 'translate': [float(x0), float(y0)]},
+        'objects': {name: {'type': 'GeometryCollection', 'geometries': geometries}},
+        'arcs': encoded_arcs,
+    }
+
+
+# ---------------------------------------------------------------------------
+# Tolerancia por zoom y caché en disco
+# ---------------------------------------------------------------------------
+
+def simplify_tolerance(bbox: Sequence[float], width: float, height: float, zoom: float = 1.0) -> float:
+    """
+    Tolerancia (área en unidades de las coordenadas²) que elimina los triángulos de
+    menos de MIN_PIXEL_AREA px² al dibujar bbox en width × height con ese zoom. Se
+    redondea a una potencia de 2 para que tamaños parecidos compartan la caché.
+    """
+    x0, y0, x1, y1 = bbox
+    pixel = max((x1 - x0) / max(width, 1), (y1 - y0) / max(height, 1)) / max(zoom, 1e-9)
+    tolerance = MIN_PIXEL_AREA * pixel * pixel
+    if tolerance <= 0:
+        return 0.0
+    return 2.0 ** math.floor(math.log2(tolerance))
+
+
+def _file_hash(path: str) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _geojson_bbox(geojson: Dict[str, Any]) -> Tuple[float, float, float, float]:
+    def walk(coordinates):
+        if coordinates and isinstance(coordinates[0], (int, float)):
+            yield coordinates[:2]
+        else:
+            for item in coordinates or []:
+                yield from walk(item)
+    xs, ys = [], []
+    for feature in _features(geojson):
+        for x, y in walk((feature.get('geometry') or {}).get('coordinates')):
+            xs.append(x)
+            ys.append(y)
+    if not xs:
+        return 0.0, 0.0, 0.0, 0.0
+    return min(xs), min(ys), max(xs), max(ys)
+
+
+def cache_dir() -> str:
+    return os.environ.get(CACHE_ENV_VAR) or DEFAULT_CACHE_DIR
+
+
+def load_topology(path: str, width: float = 400, height: float = 300, zoom: float = 1.0,
+                  quantization: int = QUANTIZATION, properties: Optional[Sequence[str]] = None,
+                  directory: Optional[str] = None) -> Dict[str, Any]:
+    """
+    TopoJSON de un fichero GeoJSON simplificado para el tamaño y zoom del gráfico.
+
+    Usa la caché en disco (CHART_MAKER_GEO_CACHE o ~/.chart_maker/topojson) con clave
+    hash del fichero + cuantización + tolerancia + propiedades.
+    """
+    directory = directory or cache_dir()
+    file_hash = _file_hash(path)
+    index_path = os.path.join(directory, f'{file_hash}.bbox.json')
+    geojson = None
+    if os.path.exists(index_path):
+        with open(index_path, encoding='utf-8') as f:
+            bbox = json.load(f)
+    else:
+        with open(path, encoding='utf-8') as f:
+            geojson = json.load(f)
+        bbox = list(_geojson_bbox(geojson))
+        os.makedirs(directory, exist_ok=True)
+        with open(index_path, 'w', encoding='utf-8') as f:
+            json.dump(bbox, f)
+
+    tolerance = simplify_tolerance(bbox, width, height, zoom)
+    selected = ','.join(properties) if properties is not None else '*'
+    variant = hashlib.blake2b(f'{quantization}|{tolerance!r}|{selected}'.encode('utf-8'), digest_size=8).hexdigest()
+    cached = os.path.join(directory, f'{file_hash}-{variant}.topojson')
+    if os.path.exists(cached):
+        with open(cached, encoding='utf-8') as f:
+            return json.load(f)
+
+    if geojson is None:
+        with open(path, encoding='utf-8') as f:
+            geojson = json.load(f)
+    topology = geojson_to_topology(geojson, quantization, tolerance, properties)
+    os.makedirs(directory, exist_ok=True)
+    # Escritura atómica: otro proceso puede estar leyendo la misma entrada
+    partial = f'{cached}.{os.getpid()}.tmp'
+    with open(partial, 'w', encoding='utf-8') as f:
+        json.dump(topology, f, ensure_ascii=False, separators=(',', ':'))
+    os.replace(partial, cached)
+    return topology
+
+
+# ---------------------------------------------------------------------------
+# Transformación 'geo' (mapa coroplético)
+# ---------------------------------------------------------------------------
+
+@register('geo')
+def precompute_choropleth(info: ChartTypeInfo, rows: List[Dict[str, Any]], encoding: Encoding,
+                          options: Dict[str, Any]) -> Optional[Precomputed]:
+    """
+    Coropleta sobre un TopoJSON simplificado: options.geojson (ruta o dict GeoJSON) y
+    options.featureKey (propiedad de cada región que coincide con el campo de región).
+    """
+    source = options.get('geojson')
+    if info.name != 'mapa_coropletico' or not source:
+        return None
+    region = pick_field(encoding, ('region', 'detail', 'key', 'shape'), quantitative=False)
+    feature_key = options.get('featureKey') or region
+    if region is None:
+        return None
+    # Un valor por región (agregado del canal de color); median, distinct... no se acumulan
+    color = encoding.fields.get('color')
+    if color is not None and color.field is not None and color.field != region:
+        measure = {'field': color.field, 'aggregate': normalize_aggregate(color.aggregate or DEFAULT_AGGREGATE)}
+    else:
+        measure = {'field': None, 'aggregate': 'count'}
+    if measure['aggregate'] not in STREAMING_AGGREGATES:
+        return None
+
+    width = float(options.get('width') or 400)
+    height = float(options.get('height') or 300)
+    zoom = float(options.get('zoom') or 1.0)
+    if isinstance(source, dict):
+        tolerance = simplify_tolerance(_geojson_bbox(source), width, height, zoom)
+        topology = geojson_to_topology(source, tolerance=tolerance, properties=[feature_key])
+    else:
+        topology = load_topology(source, width, height, zoom, properties=[feature_key])
+
+    labels, codes = group_codes(rows, region)
+    accumulator = BinAccumulator((len(labels),), measure['aggregate'])
+    values = numeric_column(rows, measure['field']) if measure['field'] is not None else None
+    accumulator.add([codes], values)
+    column = measure_column(measure)
+    totals = accumulator.result()
+    region_rows = [{region: label, column: float(v) if np.isfinite(v) else None}
+                   for label, v in zip(labels, totals.tolist())]
+
+    vegalite = {
+        'data': {'values': topology, 'format': {'type': 'topojson', 'feature': OBJECT_NAME}},
+        'transform': [{
+            'lookup': f'properties.{feature_key}',
+            'from': {'data': {'values': region_rows}, 'key': region, 'fields': [column]},
+        }],
+        'projection': {'type': options.get('projection', 'mercator')},
+        'mark': {'type': 'geoshape', 'stroke': 'white', 'strokeWidth': 0.5},
+        'encoding': {
+            'color': {'field': column, 'type': 'quantitative', 'title': color.field if measure['field'] else column},
+            'tooltip': [{'field': f'properties.{feature_key}', 'type': 'nominal', 'title': region},
+                        {'field': column, 'type': 'quantitative'}],
+        },
+    }
+    return Precomputed('geo', region_rows, vegalite)
@@ -0,0 +1,199 @@
+"""
+Trazas ligeras del pipeline (spans) con salida en formato Chrome trace-event.
+
+Uso:
+    from chart_maker.core import tracing
+
+    with tracing.span('chartspec_to_vegalite'):
+        ...
+
+    @tracing.traced('export:tableau')
+    def export(...):
+        ...
+
+Se activa con la variable de entorno CHART_MAKER_TRACE (ruta del JSON de salida, o
+"1" para usar chart_maker_trace.json) o con tracing.enable(ruta) desde un flag de CLI.
+Al salir del proceso se escribe el JSON (abrir en chrome://tracing o Perfetto) y una
+tabla agregada por etapa. Desactivado, span() devuelve un contexto vacío compartido.
+
+tracing.collect() captura los spans de un bloque aunque la traza global esté
+desactivada (la GUI lo usa para mostrar los tiempos de la última vista previa).
+"""
+
+import atexit
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+ENV_VAR = 'CHART_MAKER_TRACE'
+DEFAULT_TRACE_PATH = 'chart_maker_trace.json'
+
+_enabled = False
+_output_path: Optional[str] = None
+_events: List[Dict[str, Any]] = []
+_lock = threading.Lock()
+_local = threading.local()
+_pid = os.getpid()
+
+
+class _NullSpan:
+    """Contexto vacío que se devuelve cuando no se está trazando."""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ('name', 'cat', 'args', 'start')
+
+    def __init__(self, name: str, cat: str, args: Dict[str, Any]):
+        self.name = name
+        self.cat = cat
+        self.args = args
+        self.start = 0
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = time.perf_counter_ns() - self.start
+        collectors = getattr(_local, 'collectors', None)
+        if collectors:
+            for collector in collectors:
+                collector.append((self.name, duration / 1e6))
+        if _enabled:
+            event = {
+                'name': self.name,
+                'cat': self.cat,
+                'ph': 'X',
+                'ts': self.start / 1000,
+                'dur': duration / 1000,
+                'pid': _pid,
+                'tid': threading.get_ident(),
+            }
+            if self.args or exc_type is not None:
+                event['args'] = dict(self.args, **({'error': exc_type.__name__} if exc_type else {}))
+            with _lock:
+                _events.append(event)
+        return False
+
+
+def span(name: str, cat: str = 'chart_maker', **args):
+    """Context manager que mide un tramo del pipeline."""
+    if not _enabled and not getattr(_local, 'collectors', None):
+        return _NULL_SPAN
+    return _Span(name, cat, args)
+
+
+def traced(name: Optional[str] = None, cat: str = 'chart_maker'):
+    """Decorador que envuelve la función en un span (por defecto con su __qualname__)."""
+    def decorator(func):
+        span_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled and not getattr(_local, 'collectors', None):
+                return func(*args, **kwargs)
+            with _Span(span_name, cat, {}):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+@contextmanager
+def collect():
+    """
+    Captura los spans del hilo actual dentro del bloque.
+
+    Yields:
+        Lista de tuplas (nombre, milisegundos) en orden de finalización
+    """
+    collectors = getattr(_local, 'collectors', None)
+    if collectors is None:
+        collectors = _local.collectors = []
+    timings: List[tuple] = []
+    collectors.append(timings)
+    try:
+        yield timings
+    finally:
+        collectors.remove(timings)
+
+
+def enable(output_path: Optional[str] = None):
+    """Activa la traza global; al salir se escribe en output_path."""
+    global _enabled, _output_path
+    _output_path = output_path or _output_path or DEFAULT_TRACE_PATH
+    if not _enabled:
+        _enabled = True
+        atexit.register(_write_at_exit)
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def events() -> List[Dict[str, Any]]:
+    """Copia de los eventos registrados."""
+    with _lock:
+        return list(_events)
+
+
+def reset():
+    with _lock:
+        _events.clear()
+
+
+def stage_table(trace_events: Optional[List[Dict[str, Any]]] = None) -> List[Dict[str, Any]]:
+    """Tiempos agregados por etapa: llamadas, total, media y máximo (ms), de mayor a menor total."""
+    stages: Dict[str, Dict[str, Any]] = {}
+    for event in (events() if trace_events is None else trace_events):
+        stage = stages.setdefault(event['name'], {'stage': event['name'], 'calls': 0, 'total_ms': 0.0, 'max_ms': 0.0})
+        duration = event['dur'] / 1000
+        stage['calls'] += 1
+        stage['total_ms'] += duration
+        stage['max_ms'] = max(stage['max_ms'], duration)
+    for stage in stages.values():
+        stage['mean_ms'] = stage['total_ms'] / stage['calls']
+    return sorted(stages.values(), key=lambda s: s['total_ms'], reverse=True)
+
+
+def format_stage_table(table: List[Dict[str, Any]]) -> str:
+    lines = [f"{'Etapa':<40} {'Llamadas':>8} {'Total ms':>10} {'Media ms':>10} {'Máx ms':>10}"]
+    lines.append('-' * len(lines[0]))
+    for stage in table:
+        lines.append(f"{stage['stage'][:40]:<40} {stage['calls']:>8} {stage['total_ms']:>10.2f} "
+                     f"{stage['mean_ms']:>10.2f} {stage['max_ms']:>10.2f}")
+    return '\n'.join(lines)
+
+
+def write_chrome_trace(path: str):
+    """Escribe los eventos en formato Chrome trace-event (JSON Object Format)."""
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'traceEvents': events(), 'displayTimeUnit': 'ms'}, f)
+
+
+def _write_at_exit():
+    if not _events:
+        return
+    write_chrome_trace(_output_path)
+    print(f"\n⏱️ Traza guardada en {_output_path}", file=sys.stderr)
+    print(format_stage_table(stage_table()), file=sys.stderr)
+
+
+# Activación por variable de entorno
+_env_value = os.environ.get(ENV_VAR)
+if _env_value and _env_value not in ('0', 'false'):
+    enable(DEFAULT_TRACE_PATH if _env_value in ('1', 'true') else _env_value)
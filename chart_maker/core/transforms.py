@@ -0,0 +1,208 @@
+"""
+Etapa de precálculo de datos por tipo de gráfico.
+
+Los tipos del registro con 'transforms' (layout, density, bin...) no se pueden
+dibujar bien pasando las filas crudas a la marca: el precálculo se hace una vez en
+Python y produce una tabla compacta (geometría, curvas, conteos...) más las claves de
+Vega-Lite que la dibujan. El mapper de Vega-Lite y los exportadores consumen el mismo
+resultado, que se guarda en una caché por hash del dataset + encoding + opciones.
+
+Cada módulo de transformaciones registra su manejador con @register('<nombre>'); una
+transformación puede tener varios manejadores (p. ej. uno por familia de tipos) y se
+usa el primero que devuelve un resultado:
+
+    @register('layout')
+    def precompute_layout(info, rows, encoding, options) -> Optional[Precomputed]: ...
+
+Las opciones que recibe el manejador incluyen width/height del spec y 'dataset', la clave
+del dataset, para cachear estructuras que dependen sólo de los datos (índices...).
+
+Las filas pueden ser una lista de dicts o un ColumnarRows (datasets en memoria compartida):
+los manejadores leen las columnas con numeric_column y group_codes, que con un
+ColumnarRows no crean ninguna fila.
+"""
+
+import json
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from . import tracing
+from .chart_types import ChartTypeInfo, chart_type_info
+from .datasets import REF_KEY, content_hash, is_dataset_ref, resolve_data
+from .encoding import Encoding, MeasurementType, parse_encoding
+from .shared_data import ColumnarRows
+
+# Resultados que se conservan en la caché (LRU)
+CACHE_SIZE = 64
+
+
+@dataclass(frozen=True)
+class Precomputed:
+    """Resultado de un precálculo: la tabla calculada y cómo dibujarla en Vega-Lite."""
+    transform: str
+    # Tabla calculada (geometría, densidades, conteos...); también la usan los extractos
+    rows: List[Dict[str, Any]]
+    # Claves de Vega-Lite que sustituyen a data/mark/encoding ('layer' incluido)
+    vegalite: Dict[str, Any]
+
+
+Handler = Callable[[ChartTypeInfo, List[Dict[str, Any]], Encoding, Dict[str, Any]], Optional[Precomputed]]
+_HANDLERS: Dict[str, List[Handler]] = {}
+
+
+def register(transform: str):
+    """Decorador: registra un manejador de una transformación del registro de tipos."""
+    def decorator(func: Handler) -> Handler:
+        _HANDLERS.setdefault(transform, []).append(func)
+        return func
+    return decorator
+
+
+class TransformCache:
+    """Caché LRU de precálculos, segura entre el hilo de la GUI y el de la vista previa."""
+
+    def __init__(self, size: int = CACHE_SIZE):
+        self.size = size
+        self._items: 'OrderedDict[tuple, Optional[Precomputed]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_compute(self, key: tuple, compute: Callable[[], Optional[Precomputed]]) -> Optional[Precomputed]:
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return self._items[key]
+            self.misses += 1
+        result = compute()
+        with self._lock:
+            self._items[key] = result
+            while len(self._items) > self.size:
+                self._items.popitem(last=False)
+        return result
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.hits = self.misses = 0
+
+
+CACHE = TransformCache()
+
+
+# Hash del contenido embebido por lista de filas: (id, nº de filas) -> (lista, hash). La
+# entrada guarda la lista, así que su id no se reutiliza mientras siga en la caché; el
+# tamaño es pequeño porque retiene los datasets. Las filas embebidas se tratan como
+# inmutables: para cambiar los datos se pasa una lista nueva.
+DATA_HASHES = TransformCache(size=4)
+
+
+def _data_key(data) -> str:
+    """Clave del dataset: el hash de la referencia o el hash del contenido embebido."""
+    if is_dataset_ref(data):
+        return data[REF_KEY]
+    values = (data.get('values') if isinstance(data, dict) else data) or []
+    if isinstance(values, ColumnarRows) and values.key is not None:
+        return values.key
+    _, key = DATA_HASHES.get_or_compute((id(values), len(values)),
+                                        lambda: (values, content_hash(_rows(data))))
+    return key
+
+
+def _rows(data) -> List[Dict[str, Any]]:
+    if isinstance(data, dict):
+        data = data.get('values') or []
+    if isinstance(data, ColumnarRows):
+        return data
+    return [row for row in (data or []) if isinstance(row, dict)]
+
+
+def pick_field(encoding: Encoding, channels: Sequence[str], quantitative: bool) -> Optional[str]:
+    """Primer campo de los canales indicados que sea (o no) cuantitativo."""
+    for channel in channels:
+        fd = encoding.fields.get(channel)
+        if fd is None or fd.field is None:
+            continue
+        if (fd.type == MeasurementType.QUANTITATIVE) == quantitative:
+            return fd.field
+    return None
+
+
+def _number(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def numeric_column(rows: List[Dict[str, Any]], field: str) -> np.ndarray:
+    """Columna float de las filas; los valores vacíos o no numéricos quedan como NaN."""
+    if isinstance(rows, ColumnarRows):
+        return rows.numeric(field)
+    values = [row.get(field) for row in rows]
+    try:
+        return np.array(values, dtype=float)
+    except (TypeError, ValueError):
+        return np.array([_number(v) for v in values], dtype=float)
+
+
+def group_codes(rows: List[Dict[str, Any]], field: Optional[str]) -> Tuple[List[Any], np.ndarray]:
+    """Etiquetas de un campo en orden de primera aparición y el código de cada fila."""
+    if field is None:
+        return [None], np.zeros(len(rows), dtype=np.intp)
+    if isinstance(rows, ColumnarRows):
+        return rows.codes(field)
+    index: Dict[Any, int] = {}
+    codes = np.fromiter((index.setdefault(row.get(field), len(index)) for row in rows),
+                        dtype=np.intp, count=len(rows))
+    return list(index), codes
+
+
+def _load_handlers():
+    # Los manejadores se registran al importar sus módulos; se importan al primer uso (y no
+    # al final de este módulo) para que cada uno pueda importarse antes que transforms
+    from . import binning, correlation, density, layout, quantiles, smoothing, spatial, timeseries, topology  # noqa: F401
+
+
+def precompute(spec: Dict[str, Any], cache: Optional[TransformCache] = None) -> Optional[Precomputed]:
+    """
+    Ejecuta el precálculo del tipo de gráfico del spec (dict o ChartSpec), si lo tiene.
+
+    Returns:
+        Precomputed, o None si el tipo no necesita precálculo, los datos son externos
+        ({'url': ...}) o faltan los campos que el manejador necesita
+    """
+    if not isinstance(spec, dict):
+        spec = dict(spec)
+    _load_handlers()
+    info = chart_type_info(spec.get('type'))
+    transforms = [t for t in info.transforms if t in _HANDLERS]
+    data = spec.get('data')
+    if not transforms or (isinstance(data, dict) and 'url' in data):
+        return None
+    encoding = parse_encoding(spec.get('encoding'))
+    options = spec.get('options') or {}
+    sizes = {'width': spec.get('width'), 'height': spec.get('height')}
+    data_key = _data_key(data)
+    key = (
+        info.name,
+        data_key,
+        json.dumps([dict(encoding), options, sizes], sort_keys=True, default=str),
+    )
+
+    def compute():
+        rows = _rows(resolve_data(data))
+        for transform in transforms:
+            for handler in _HANDLERS[transform]:
+                with tracing.span(f'transform:{transform}', chart_type=info.name, rows=len(rows)):
+                    result = handler(info, rows, encoding, dict(options, dataset=data_key, **sizes))
+                if result is not None:
+                    return result
+        return None
+
+    return (cache if cache is not None else CACHE).get_or_compute(key, compute)
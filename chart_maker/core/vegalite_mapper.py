@@ -7,19 +7,32 @@ pie/donut, heatmap, table básica) y usa degradaciones simples para otros tipos.
 
 from typing import Dict, Any
 
+from . import tracing
+from .chart_types import chart_type_info
+from .datasets import resolve_data
+from .encoding import TYPE_ALIASES, parse_encoding
+from .shared_data import ColumnarRows
+from .transforms import precompute
 
+
+@tracing.traced('chartspec_to_vegalite')
 def chartspec_to_vegalite(spec: Dict[str, Any]) -> Dict[str, Any]:
-    """Convierte una especificación ChartSpec canónica a una Vega-Lite v6 básica."""
-    chart_type = spec.get('type', 'bar')
-    data = spec.get('data')
+    """
+    Convierte una especificación ChartSpec canónica (dict o ChartSpec) a una Vega-Lite v6
+    básica. Con un ChartSpec se reutiliza el encoding ya parseado y no se copian los datos.
+    """
+    if not isinstance(spec, dict):
+        spec = dict(spec)
+    chart_type = spec.get('type')
+    data = resolve_data(spec.get('data'))
     encoding = spec.get('encoding', {})
     options = spec.get('options', {})
 
     vl: Dict[str, Any] = {
         "$schema": "https://vega.github.io/schema/vega-lite/v6.json",
         "mark": _map_mark(chart_type, options),
-        "width": spec.get('width', 400),
-        "height": spec.get('height', 300),
+        "width": spec.get('width') or 400,
+        "height": spec.get('height') or 300,
     }
 
     # Título / descripción
@@ -29,7 +42,7 @@ def chartspec_to_vegalite(spec: Dict[str, Any]) -> Dict[str, Any]:
         vl['description'] = spec['description']
 
     # Datos: soporta lista de dicts o dict con values/url
-    if isinstance(data, list):
+    if isinstance(data, (list, ColumnarRows)):
         vl['data'] = {"values": data}
     elif isinstance(data, dict):
         # si ya viene como {values: [...] } ó {url: '...'}
@@ -44,15 +57,25 @@ def chartspec_to_vegalite(spec: Dict[str, Any]) -> Dict[str, Any]:
     stacking = options.get('stacking')
     if stacking in ('stack', 'normalize', 'none'):
         # aplicar stacking a mark si procede (para bar/area)
-        if isinstance(vl['mark'], dict) and chart_type in ('bar', 'area'):
+        if isinstance(vl['mark'], dict) and vl['mark'].get('type') in ('bar', 'area'):
             if stacking == 'none':
                 vl['mark']['stack'] = None
             else:
                 vl['mark']['stack'] = stacking
 
+    # Tipos con precálculo (layout, densidad, bins...): la tabla calculada sustituye a los datos
+    precomputed = precompute(spec)
+    if precomputed is not None:
+        for key in ('data', 'mark', 'encoding'):
+            vl.pop(key, None)
+        vl.update(precomputed.vegalite)
+    elif isinstance(data, ColumnarRows):
+        # Sin precálculo Vega-Lite embebe las filas: sólo aquí se crean los dicts
+        vl['data'] = {"values": list(data)}
+
     # Líneas de referencia
     ref_lines = options.get('referenceLines') or []
-    if ref_lines:
+    if ref_lines and precomputed is None:
         vl['layer'] = [
             {k: v for k, v in vl.items() if k not in ('layer',)}
         ]
@@ -76,122 +99,25 @@ def chartspec_to_vegalite(spec: Dict[str, Any]) -> Dict[str, Any]:
 
 
 def _map_mark(chart_type: str, options: Dict[str, Any]) -> Any:
-    # mapeo básico de tipo - español e inglés
-    mark_map = {
-        # Barras / Bars
-        'barras_vertical': 'bar',
-        'bar_chart_vertical': 'bar',
-        'barras_horizontal': 'bar',
-        'bar_chart_horizontal': 'bar',
-        'columnas': 'bar',
-        'column_chart': 'bar',
-        'barras_agrupadas': 'bar',
-        'grouped_bar_chart': 'bar',
-        'barras_apiladas': 'bar',
-        'stacked_bar_chart': 'bar',
-        # Líneas y áreas / Lines and areas
-        'lineas': 'line',
-        'line_chart': 'line',
-        'area': 'area',
-        'area_chart': 'area',
-        'area_apilada': 'area',
-        'stacked_area_chart': 'area',
-        # Composición / Composition
-        'circular': 'arc',
-        'pie_chart': 'arc',
-        'dona': {'type': 'arc', 'innerRadius': options.get('innerRadius', 50)},
-        'donut_chart': {'type': 'arc', 'innerRadius': options.get('innerRadius', 50)},
-        'treemap': 'rect',
-        'treemap_chart': 'rect',
-        # Distribución / Distribution
-        'histograma': 'bar',
-        'histogram': 'bar',
-        'caja': 'boxplot',
-        'box_plot': 'boxplot',
-        'violin': 'area',
-        'violin_plot': 'area',
-        'densidad': 'area',
-        'density_plot': 'area',
-        # Correlación / Correlation
-        'dispersion': 'point',
-        'scatter_plot': 'point',
-        'burbujas': {'type': 'point'},
-        'bubble_chart': {'type': 'point'},
-        'matriz_correlacion': 'rect',
-        'correlation_matrix': 'rect',
-        # Mapas / Maps
-        'mapa_coropletico': 'geoshape',
-        'choropleth_map': 'geoshape',
-        'mapa_puntos': 'point',
-        'point_map': 'point',
-        'mapa_calor_geografico': 'rect',
-        'geographic_heatmap': 'rect',
-        # Flujo / Flow
-        'embudo': 'bar',
-        'funnel_chart': 'bar',
-        'sankey': 'rect',
-        'sankey_diagram': 'rect',
-        'cascada': 'bar',
-        'waterfall_chart': 'bar',
-        'lazo': 'line',
-        'loop_chart': 'line',
-        'lazo_circular': 'arc',
-        'circular_loop_chart': 'arc',
-        'lazo_proceso': 'point',
-        'process_loop_chart': 'point',
-        'lazo_flujo': 'area',
-        'flow_loop_chart': 'area',
-        # Avanzados / Advanced
-        'mapa_calor': 'rect',
-        'heatmap': 'rect',
-        'radar': 'line',
-        'radar_chart': 'line',
-        'gantt': 'bar',
-        'gantt_chart': 'bar',
-        'kpi': 'text',
-        'kpi_card': 'text',
-        # R/ggplot2
-        'puntos': 'point',
-        'geom_point': 'point',
-        'linea_tendencia': 'line',
-        'geom_smooth': 'line',
-        'poligono': 'area',
-        'geom_polygon': 'area',
-        # Categorías
-        'correlacion': 'point',
-        'correlation': 'point',
-        'desviacion': 'bar',
-        'deviation': 'bar',
-        'ranking': 'bar',
-        'distribucion': 'bar',
-        'distribution': 'bar',
-        'composicion': 'arc',
-        'composition': 'arc',
-        'cambio': 'line',
-        'change': 'line',
-        'grupos': 'bar',
-        'groups': 'bar',
-        'espacial': 'point',
-        'spatial': 'point'
-    }
-    return mark_map.get(chart_type, 'point')
+    # Marca precalculada en el registro de tipos (español e inglés)
+    info = chart_type_info(chart_type)
+    if not info.mark_defaults:
+        return info.vegalite_mark
+    mark = {'type': info.vegalite_mark}
+    for prop, default in info.mark_defaults:
+        mark[prop] = options.get(prop, default)
+    return mark
 
 
 def _map_encoding(chart_type: str, enc: Dict[str, Any]) -> Dict[str, Any]:
     # Decodificación directa de canales canónicos → Vega-Lite
     vl_enc: Dict[str, Any] = {}
+    fields = parse_encoding(enc).fields
 
     def _field(channel: str, fallback_field: str = None, fallback_type: str = None):
-        fd = enc.get(channel)
-        if isinstance(fd, dict) and 'field' in fd:
-            m = {'field': fd['field']}
-            if 'type' in fd:
-                m['type'] = _map_type(fd['type'])
-            if 'aggregate' in fd:
-                m['aggregate'] = fd['aggregate']
-            if 'bin' in fd:
-                m['bin'] = fd['bin']
-            return m
+        fd = fields.get(channel)
+        if fd is not None and fd.field is not None:
+            return fd.to_vegalite()
         if fallback_field:
             m = {'field': fallback_field}
             if fallback_type:
@@ -225,7 +151,8 @@ def _map_encoding(chart_type: str, enc: Dict[str, Any]) -> Dict[str, Any]:
         vl_enc['shape'] = shape
 
     # canales especiales
-    if chart_type in ('pie', 'donut'):
+    canonical = chart_type_info(chart_type).name
+    if canonical in ('circular', 'dona'):
         theta = _field('theta', fallback_field='value', fallback_type='quantitative')
         if theta:
             vl_enc['theta'] = theta
@@ -235,7 +162,7 @@ def _map_encoding(chart_type: str, enc: Dict[str, Any]) -> Dict[str, Any]:
             if cat:
                 vl_enc['color'] = cat
 
-    if chart_type == 'heatmap':
+    if canonical == 'mapa_calor':
         if 'color' not in vl_enc:
             vl_enc['color'] = {'field': 'value', 'type': 'quantitative'}
 
@@ -244,14 +171,4 @@ def _map_encoding(chart_type: str, enc: Dict[str, Any]) -> Dict[str, Any]:
 
 def _map_type(t: str) -> str:
     # normaliza tipos a vega-lite
-    mapping = {
-        'quantitative': 'quantitative',
-        'temporal': 'temporal',
-        'ordinal': 'ordinal',
-        'nominal': 'nominal',
-        # alias
-        'number': 'quantitative',
-        'string': 'nominal',
-        'date': 'temporal',
-    }
-    return mapping.get(t, t)
+    return TYPE_ALIASES.get(t, t)
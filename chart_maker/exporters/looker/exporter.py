@@ -1,14 +1,230 @@
 # exporter.py
 # Exportador para Looker
+# Genera una view y un explore LookML a partir del encoding del ChartSpec, con una
+# aggregate_table y una PDT de resumen (rollup) disparadas por un datagroup, de modo
+# que el gráfico se sirve desde la tabla agregada y no recorre la tabla base.
+import re
+import unicodedata
 from ..base import IExporter
+from ...core import tracing
+from ...core.aggregation import split_encoding
+
+# Agregado canónico -> tipo de measure de LookML
+LOOKML_MEASURE_TYPES = {
+    'sum': 'sum',
+    'mean': 'average',
+    'min': 'min',
+    'max': 'max',
+    'median': 'median',
+    'count': 'count',
+    'distinct': 'count_distinct',
+}
+
+# Cómo se re-agrega cada measure dentro de la PDT de resumen (None = no aditiva)
+ROLLUP_MEASURE_TYPES = {
+    'sum': 'sum',
+    'count': 'sum',
+    'min': 'min',
+    'max': 'max',
+}
+
+MEASURE_PREFIXES = {
+    'sum': 'total',
+    'mean': 'promedio',
+    'min': 'minimo',
+    'max': 'maximo',
+    'median': 'mediana',
+    'count': 'conteo',
+    'distinct': 'distintos',
+}
+
+TIMEFRAMES = ['raw', 'date', 'week', 'month', 'quarter', 'year']
+DEFAULT_TIMEFRAME = 'date'
+DEFAULT_TRIGGER_SQL = 'SELECT CURRENT_DATE'
+DEFAULT_MAX_CACHE_AGE = '24 hours'
+
+
+def _identifier(text) -> str:
+    """Convierte un texto en un identificador LookML válido (minúsculas, _)."""
+    ascii_text = unicodedata.normalize('NFKD', str(text)).encode('ascii', 'ignore').decode('ascii')
+    name = re.sub(r'[^a-z0-9]+', '_', ascii_text.lower()).strip('_') or 'campo'
+    return name if not name[0].isdigit() else f'f_{name}'
+
+
+def _column_sql(field: str) -> str:
+    """Referencia SQL a la columna, entrecomillada si no es un identificador simple."""
+    if re.fullmatch(r'[A-Za-z_][A-Za-z0-9_]*', field):
+        return '${TABLE}.' + field
+    return '${TABLE}."' + field.replace('"', '""') + '"'
+
 
 class LookerExporter(IExporter):
+    @tracing.traced('export:looker')
     def export(self, spec, output_path: str):
-        # Implementación mínima: escribimos un contenido LookML simplificado
-        content = (
-            "# LookML generado automáticamente (marcador de posición)\n"
-            "view: demo {\n  dimension: id { type: number }\n}\n"
-        )
+        """Genera un archivo .lkml con view, explore, aggregate_table y PDT de resumen."""
+        spec_dict = getattr(spec, 'dict', lambda: spec)() if hasattr(spec, 'dict') else spec
+        content = build_lookml(spec_dict)
         with open(output_path, "w", encoding="utf-8") as f:
             f.write(content)
         return True
+
+
+def build_lookml(spec_dict: dict) -> str:
+    """Construye el LookML (texto) de un ChartSpec."""
+    options = spec_dict.get('options') or {}
+    looker_options = options.get('looker') or {}
+    view = _identifier(looker_options.get('view') or spec_dict.get('title') or spec_dict.get('type', 'grafico'))
+    table = looker_options.get('table') or view
+    datagroup = f'{view}_datagroup'
+    rollup = f'{view}_rollup'
+
+    dimensions, measures = split_encoding(spec_dict.get('encoding') or {})
+
+    lines = [
+        '# LookML generado por Creador de Gráficos',
+        f"# Gráfico: {spec_dict.get('title') or spec_dict.get('type', '')} ({spec_dict.get('type', '')})",
+        '',
+        f'datagroup: {datagroup} {{',
+        f"  sql_trigger: {looker_options.get('triggerSql', DEFAULT_TRIGGER_SQL)} ;;",
+        f"  max_cache_age: \"{looker_options.get('maxCacheAge', DEFAULT_MAX_CACHE_AGE)}\"",
+        '}',
+        '',
+        f'view: {view} {{',
+        f'  sql_table_name: {table} ;;',
+    ]
+
+    # Campos de agrupación: nombre del campo LookML usado en la aggregate_table
+    group_fields = []
+    seen = set()
+    for dim in dimensions:
+        name = _identifier(dim['field'])
+        if name in seen:
+            continue
+        seen.add(name)
+        sql = _column_sql(dim['field'])
+        lines.append('')
+        if dim['type'] == 'temporal':
+            lines += [
+                f'  dimension_group: {name} {{',
+                '    type: time',
+                f"    timeframes: [{', '.join(TIMEFRAMES)}]",
+                f'    sql: {sql} ;;',
+                '  }',
+            ]
+            group_fields.append((f'{name}_{DEFAULT_TIMEFRAME}', 'date'))
+        elif dim.get('bin'):
+            step = dim['bin'].get('step') if isinstance(dim['bin'], dict) else None
+            tiers = [step * i for i in range(0, 11)] if step else [0, 10, 20, 50, 100, 200, 500, 1000]
+            lines += [
+                f'  dimension: {name}_tier {{',
+                '    type: tier',
+                f"    tiers: [{', '.join(str(t) for t in tiers)}]",
+                '    style: interval',
+                f'    sql: {sql} ;;',
+                '  }',
+            ]
+            group_fields.append((f'{name}_tier', 'tier'))
+        else:
+            lookml_type = 'number' if dim['type'] == 'quantitative' else 'string'
+            lines += [
+                f'  dimension: {name} {{',
+                f'    type: {lookml_type}',
+                f'    sql: {sql} ;;',
+                '  }',
+            ]
+            group_fields.append((name, lookml_type))
+
+    measure_fields = []
+    for measure in measures:
+        aggregate = measure['aggregate']
+        if aggregate == 'count':
+            name = 'count'
+        else:
+            name = f"{MEASURE_PREFIXES[aggregate]}_{_identifier(measure['field'])}"
+        if name in seen:
+            continue
+        seen.add(name)
+        lines.append('')
+        lines.append(f'  measure: {name} {{')
+        lines.append(f'    type: {LOOKML_MEASURE_TYPES[aggregate]}')
+        # Como en Vega-Lite, 'count' cuenta filas aunque indique un campo
+        if aggregate != 'count':
+            lines.append(f"    sql: {_column_sql(measure['field'])} ;;")
+        lines.append('  }')
+        measure_fields.append((name, aggregate))
+    lines.append('}')
+
+    # PDT de resumen con la misma agrupación que el gráfico
+    if group_fields and measure_fields:
+        lines += [
+            '',
+            f'view: {rollup} {{',
+            '  derived_table: {',
+            f'    explore_source: {view} {{',
+        ]
+        for name, _ in group_fields + measure_fields:
+            lines.append(f'      column: {name} {{ field: {view}.{name} }}')
+        lines += [
+            '    }',
+            f'    datagroup_trigger: {datagroup}',
+            '  }',
+        ]
+        for name, lookml_type in group_fields:
+            rollup_type = {'date': 'date', 'number': 'number'}.get(lookml_type, 'string')
+            lines += [
+                '',
+                f'  dimension: {name} {{',
+                f'    type: {rollup_type}',
+                f'    sql: ${{TABLE}}.{name} ;;',
+                '  }',
+            ]
+        for name, aggregate in measure_fields:
+            rollup_type = ROLLUP_MEASURE_TYPES.get(aggregate)
+            lines.append('')
+            if rollup_type:
+                lines += [
+                    f'  measure: {name} {{',
+                    f'    type: {rollup_type}',
+                    f'    sql: ${{TABLE}}.{name} ;;',
+                    '  }',
+                ]
+            else:
+                # Medida no aditiva: se expone el valor precalculado por grupo
+                lines += [
+                    f'  dimension: {name} {{',
+                    '    type: number',
+                    f'    sql: ${{TABLE}}.{name} ;;',
+                    '  }',
+                ]
+        lines.append('}')
+
+    # Explore con aggregate awareness
+    lines += [
+        '',
+        f'explore: {view} {{',
+        f'  persist_with: {datagroup}',
+    ]
+    if group_fields and measure_fields:
+        lines += [
+            '',
+            f"  aggregate_table: rollup_{_identifier(spec_dict.get('type', 'grafico'))} {{",
+            '    query: {',
+            f"      dimensions: [{', '.join(f'{view}.{name}' for name, _ in group_fields)}]",
+            f"      measures: [{', '.join(f'{view}.{name}' for name, _ in measure_fields)}]",
+            '    }',
+            '    materialization: {',
+            f'      datagroup_trigger: {datagroup}',
+            '    }',
+            '  }',
+        ]
+    lines.append('}')
+
+    if group_fields and measure_fields:
+        lines += [
+            '',
+            f'explore: {rollup} {{',
+            f'  persist_with: {datagroup}',
+            '}',
+        ]
+
+    return '\n'.join(lines) + '\n'
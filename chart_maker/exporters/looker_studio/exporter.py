@@ -1,16 +1,203 @@
 # exporter.py
 # Exportador para Looker Studio
+# Genera la configuración del informe (JSON) y un extracto de datos ya agregado por
+# las dimensiones del gráfico, de modo que el informe lee unos pocos miles de filas
+# agregadas en lugar del conjunto de datos completo.
 from ..base import IExporter
+from ...core import tracing
+import csv
+import gzip
 import json
+import os
+from ...core.aggregation import (
+    aggregate_rows, bin_step, measure_column, split_encoding, to_number,
+)
+from ...core.chart_types import chart_type_info
+from ...core.datasets import resolve_data
+from ...core.transforms import precompute
+
+# Cómo re-agrega Looker Studio cada columna del extracto (ya agregada)
+REAGGREGATIONS = {
+    'sum': 'SUM',
+    'count': 'SUM',
+    'min': 'MIN',
+    'max': 'MAX',
+    'mean': 'AVG',
+    'median': 'AVG',
+    'distinct': 'SUM',
+}
+
+DATA_TYPES = {
+    'quantitative': 'NUMBER',
+    'temporal': 'YEAR_MONTH_DAY',
+    'ordinal': 'TEXT',
+    'nominal': 'TEXT',
+}
+
+EXTRACT_FORMATS = ('csv', 'jsonl.gz')
+DEFAULT_EXTRACT_FORMAT = 'csv'
+
+
+def _spec_rows(data):
+    """Filas del spec como iterable de dicts (acepta lista, {'values': [...]} o {'dataset': ...})."""
+    data = resolve_data(data)
+    if isinstance(data, dict):
+        data = data.get('values') or []
+    return (row for row in (data or []) if isinstance(row, dict))
+
+
+def _csv_rows(path):
+    """Lee un CSV fila a fila (sin cargarlo entero en memoria)."""
+    with open(path, newline='', encoding='utf-8') as f:
+        yield from csv.DictReader(f)
+
 
 class LookerStudioExporter(IExporter):
+    @tracing.traced('export:looker_studio')
     def export(self, spec, output_path: str):
-        # Implementación mínima: JSON con metadatos de marcador de posición
-        payload = {
+        """
+        Escribe la configuración del informe en output_path y, a su lado, el extracto
+        agregado (<nombre>_extracto.csv o .jsonl.gz según options.lookerStudio.extractFormat).
+
+        options.lookerStudio.source permite indicar un CSV grande que se agrega en
+        streaming en lugar de los datos embebidos en el spec.
+        """
+        try:
+            # Sin copiar las filas: se leen de spec.data en streaming
+            if hasattr(spec, 'model_dump'):
+                spec_dict, data = spec.model_dump(exclude={'data'}), spec.data
+            else:
+                spec_dict, data = spec, spec.get('data')
+            return self._export(spec_dict, data, output_path)
+        except Exception as e:
+            print(f"Error creando informe de Looker Studio: {e}")
+            return False
+
+    def _export(self, spec_dict, data, output_path: str):
+        options = spec_dict.get('options') or {}
+        studio_options = options.get('lookerStudio') or {}
+
+        extract_format = studio_options.get('extractFormat', DEFAULT_EXTRACT_FORMAT)
+        if extract_format not in EXTRACT_FORMATS:
+            raise ValueError(f"Formato de extracto no soportado: {extract_format}. Válidos: {EXTRACT_FORMATS}")
+
+        source = studio_options.get('source')
+        if source:
+            read_rows = lambda: _csv_rows(source)
+        else:
+            read_rows = lambda: _spec_rows(data)
+
+        dimensions, measures = split_encoding(spec_dict.get('encoding') or {})
+        if not measures and any(d.get('bin') for d in dimensions):
+            # Histograma: los bins sin medida explícita cuentan filas
+            measures = [{'channel': 'y', 'field': None, 'aggregate': 'count'}]
+        bin_steps = self._bin_steps(dimensions, read_rows)
+
+        if measures:
+            extract_rows = aggregate_rows(read_rows(), dimensions, measures, bin_steps)
+            columns = [d['field'] for d in dimensions] + [measure_column(m) for m in measures]
+        else:
+            # Sin agregados (p. ej. dispersión x/y) el extracto copia las columnas usadas
+            columns = [d['field'] for d in dimensions]
+            extract_rows = ({c: row.get(c) for c in columns} for row in read_rows())
+
+        base, _ = os.path.splitext(output_path)
+        extract_path = f"{base}_extracto.{extract_format}"
+        with tracing.span('looker_studio:extract', extract_format=extract_format):
+            row_count = self._write_extract(extract_path, extract_format, columns, extract_rows)
+
+        # Tipos con precálculo (layout, densidad, bins...): la tabla calculada va en otro extracto
+        precomputed = None if source else precompute(dict(spec_dict, data=data))
+        if precomputed is not None:
+            precomputed_path = f"{base}_precalculo.{extract_format}"
+            precomputed_columns = list(dict.fromkeys(key for row in precomputed.rows for key in row))
+            self._write_extract(precomputed_path, extract_format, precomputed_columns, precomputed.rows)
+
+        report = {
             "type": "looker_studio_report",
-            "title": "Reporte de ejemplo",
-            "spec": spec.dict() if hasattr(spec, "dict") else str(spec),
+            "title": spec_dict.get('title') or f"Gráfico {spec_dict.get('type', '')}",
+            "description": spec_dict.get('description') or "",
+            "dataSource": {
+                "name": os.path.basename(extract_path),
+                "format": extract_format,
+                "rowCount": row_count,
+                "preAggregated": bool(measures),
+                "fields": self._fields(dimensions, measures),
+            },
+            "charts": [{
+                "type": chart_type_info(spec_dict.get('type')).looker_studio_type,
+                "dimensions": [d['field'] for d in dimensions],
+                "metrics": [measure_column(m) for m in measures],
+                "width": spec_dict.get('width') or 800,
+                "height": spec_dict.get('height') or 600,
+            }],
         }
+        if precomputed is not None:
+            report["precomputed"] = {
+                "transform": precomputed.transform,
+                "name": os.path.basename(precomputed_path),
+                "rowCount": len(precomputed.rows),
+                "columns": precomputed_columns,
+            }
         with open(output_path, "w", encoding="utf-8") as f:
-            json.dump(payload, f, ensure_ascii=False, indent=2)
+            json.dump(report, f, ensure_ascii=False, indent=2)
         return True
+
+    def _bin_steps(self, dimensions, read_rows):
+        """Paso de cada dimensión binned; sin 'step' hace una pasada previa para el rango."""
+        steps = {}
+        pending = []
+        for dim in dimensions:
+            if not dim.get('bin'):
+                continue
+            if isinstance(dim['bin'], dict) and dim['bin'].get('step'):
+                steps[dim['field']] = float(dim['bin']['step'])
+            else:
+                pending.append(dim)
+        if pending:
+            ranges = {dim['field']: [None, None] for dim in pending}
+            for row in read_rows():
+                for field, bounds in ranges.items():
+                    number = to_number(row.get(field))
+                    if number is None:
+                        continue
+                    bounds[0] = number if bounds[0] is None else min(bounds[0], number)
+                    bounds[1] = number if bounds[1] is None else max(bounds[1], number)
+            for dim in pending:
+                lo, hi = ranges[dim['field']]
+                steps[dim['field']] = bin_step(lo or 0, hi or 0, dim['bin'])
+        return steps
+
+    def _fields(self, dimensions, measures):
+        fields = []
+        for dim in dimensions:
+            fields.append({
+                "name": dim['field'],
+                "conceptType": "DIMENSION",
+                "dataType": 'NUMBER' if dim.get('bin') else DATA_TYPES.get(dim['type'], 'TEXT'),
+            })
+        for measure in measures:
+            fields.append({
+                "name": measure_column(measure),
+                "conceptType": "METRIC",
+                "dataType": "NUMBER",
+                "aggregation": REAGGREGATIONS[measure['aggregate']],
+            })
+        return fields
+
+    def _write_extract(self, path, extract_format, columns, rows):
+        """Escribe el extracto fila a fila y devuelve el número de filas."""
+        count = 0
+        if extract_format == 'csv':
+            with open(path, "w", newline="", encoding="utf-8") as f:
+                writer = csv.DictWriter(f, fieldnames=columns, extrasaction='ignore')
+                writer.writeheader()
+                for row in rows:
+                    writer.writerow(row)
+                    count += 1
+        else:
+            with gzip.open(path, "wt", encoding="utf-8") as f:
+                for row in rows:
+                    f.write(json.dumps(row, ensure_ascii=False, default=str) + "\n")
+                    count += 1
+        return count
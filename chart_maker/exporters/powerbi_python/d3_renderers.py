@@ -0,0 +1,415 @@
+# d3_renderers.py
+# Generación del código TypeScript/D3 de los visuales de Power BI.
+# Cada tipo de gráfico se resuelve a un renderizador D3 con data joins por clave,
+# de modo que update() sólo añade, mueve o elimina las marcas que cambian.
+import json
+
+from ...core.chart_types import chart_type_info
+
+
+def renderer_for(chart_type: str) -> str:
+    """Devolvemos el renderizador D3 de un tipo de gráfico (precalculado en el registro)."""
+    return chart_type_info(chart_type).powerbi_renderer
+
+
+# Cuerpos de render(duration) por renderizador. Todos usan selectAll().data(..., key).join()
+# para que las marcas existentes se reutilicen entre actualizaciones.
+_RENDER_BAR = '''
+    private render(duration: number) {
+        const data = this.data;
+        const categories = Array.from(new Set(data.map(d => d.category)));
+        const seriesNames = Array.from(new Set(data.map(d => d.series)));
+        const band = d3.scaleBand<string>().domain(categories)
+            .range(HORIZONTAL ? [0, this.innerHeight] : [0, this.innerWidth]).padding(0.1);
+        const sub = d3.scaleBand<string>().domain(seriesNames).range([0, band.bandwidth()]).padding(0.05);
+        const extent = d3.extent(data, d => d.value);
+        const value = d3.scaleLinear()
+            .domain([Math.min(0, extent[0] || 0), Math.max(0, extent[1] || 0)]).nice()
+            .range(HORIZONTAL ? [0, this.innerWidth] : [this.innerHeight, 0]);
+        const color = d3.scaleOrdinal<string, string>(d3.schemeTableau10).domain(seriesNames);
+        const position = (d: DataPoint) => (band(d.category) || 0) + (sub(d.series) || 0);
+        const start = (d: DataPoint) => Math.min(value(0), value(d.value));
+        const length = (d: DataPoint) => Math.abs(value(d.value) - value(0));
+
+        this.plot.selectAll<SVGRectElement, DataPoint>("rect.mark")
+            .data(data, d => d.key)
+            .join(
+                enter => enter.append("rect").classed("mark", true)
+                    .attr(HORIZONTAL ? "y" : "x", position)
+                    .attr(HORIZONTAL ? "height" : "width", sub.bandwidth())
+                    .attr(HORIZONTAL ? "x" : "y", value(0))
+                    .attr(HORIZONTAL ? "width" : "height", 0),
+                update => update,
+                exit => exit.remove()
+            )
+            .attr("fill", d => color(d.series))
+            .transition().duration(duration)
+            .attr(HORIZONTAL ? "y" : "x", position)
+            .attr(HORIZONTAL ? "height" : "width", sub.bandwidth())
+            .attr(HORIZONTAL ? "x" : "y", start)
+            .attr(HORIZONTAL ? "width" : "height", length);
+
+        if (HORIZONTAL) {
+            this.drawAxes(d3.axisBottom(value).ticks(5), d3.axisLeft(band));
+        } else {
+            this.drawAxes(d3.axisBottom(band), d3.axisLeft(value).ticks(5));
+        }
+    }
+'''
+
+_RENDER_LINE = '''
+    private render(duration: number) {
+        const data = this.data;
+        const categories = Array.from(new Set(data.map(d => d.category)));
+        const x = d3.scalePoint<string>().domain(categories).range([0, this.innerWidth]);
+        const extent = d3.extent(data, d => d.value);
+        const y = d3.scaleLinear()
+            .domain([Math.min(0, extent[0] || 0), Math.max(0, extent[1] || 0)]).nice()
+            .range([this.innerHeight, 0]);
+        const series: Series[] = Array.from(d3.group(data, d => d.series), ([name, points]) => ({ name, points }));
+        const color = d3.scaleOrdinal<string, string>(d3.schemeTableau10).domain(series.map(s => s.name));
+        const line = d3.line<DataPoint>().x(d => x(d.category) || 0).y(d => y(d.value));
+
+        this.plot.selectAll<SVGPathElement, Series>("path.mark")
+            .data(series, s => s.name)
+            .join(
+                enter => enter.append("path").classed("mark", true).attr("fill", "none").attr("stroke-width", 2),
+                update => update,
+                exit => exit.remove()
+            )
+            .attr("stroke", s => color(s.name))
+            .transition().duration(duration)
+            .attr("d", s => line(s.points));
+
+        this.drawAxes(d3.axisBottom(x), d3.axisLeft(y).ticks(5));
+    }
+'''
+
+_RENDER_AREA = '''
+    private render(duration: number) {
+        const data = this.data;
+        const categories = Array.from(new Set(data.map(d => d.category)));
+        const x = d3.scalePoint<string>().domain(categories).range([0, this.innerWidth]);
+        const extent = d3.extent(data, d => d.value);
+        const y = d3.scaleLinear()
+            .domain([Math.min(0, extent[0] || 0), Math.max(0, extent[1] || 0)]).nice()
+            .range([this.innerHeight, 0]);
+        const series: Series[] = Array.from(d3.group(data, d => d.series), ([name, points]) => ({ name, points }));
+        const color = d3.scaleOrdinal<string, string>(d3.schemeTableau10).domain(series.map(s => s.name));
+        const area = d3.area<DataPoint>().x(d => x(d.category) || 0).y0(y(0)).y1(d => y(d.value));
+
+        this.plot.selectAll<SVGPathElement, Series>("path.mark")
+            .data(series, s => s.name)
+            .join(
+                enter => enter.append("path").classed("mark", true).attr("fill-opacity", 0.6),
+                update => update,
+                exit => exit.remove()
+            )
+            .attr("fill", s => color(s.name))
+            .transition().duration(duration)
+            .attr("d", s => area(s.points));
+
+        this.drawAxes(d3.axisBottom(x), d3.axisLeft(y).ticks(5));
+    }
+'''
+
+_RENDER_PIE = '''
+    private render(duration: number) {
+        const data = this.data;
+        const radius = Math.max(0, Math.min(this.innerWidth, this.innerHeight) / 2);
+        const pie = d3.pie<DataPoint>().value(d => Math.max(0, d.value)).sort(null);
+        const arc = d3.arc<d3.PieArcDatum<DataPoint>>().innerRadius(radius * INNER_RADIUS_RATIO).outerRadius(radius);
+        const color = d3.scaleOrdinal<string, string>(d3.schemeTableau10).domain(data.map(d => d.key));
+
+        this.plot.attr("transform", `translate(${MARGIN.left + this.innerWidth / 2},${MARGIN.top + this.innerHeight / 2})`);
+        this.plot.selectAll<SVGPathElement, d3.PieArcDatum<DataPoint>>("path.mark")
+            .data(pie(data), a => a.data.key)
+            .join(
+                enter => enter.append("path").classed("mark", true).attr("stroke", "#fff"),
+                update => update,
+                exit => exit.remove()
+            )
+            .attr("fill", a => color(a.data.key))
+            .transition().duration(duration)
+            .attr("d", arc);
+
+        this.drawAxes(null, null);
+    }
+'''
+
+_RENDER_SCATTER = '''
+    private render(duration: number) {
+        const data = this.data;
+        const numeric = data.length > 0 && data.every(d => !isNaN(d.x));
+        const categories = Array.from(new Set(data.map(d => d.category)));
+        const xExtent = d3.extent(data, d => d.x);
+        const xLinear = d3.scaleLinear().domain([xExtent[0] || 0, xExtent[1] || 1]).nice().range([0, this.innerWidth]);
+        const xPoint = d3.scalePoint<string>().domain(categories).range([0, this.innerWidth]).padding(0.5);
+        const extent = d3.extent(data, d => d.value);
+        const y = d3.scaleLinear().domain([extent[0] || 0, extent[1] || 1]).nice().range([this.innerHeight, 0]);
+        const color = d3.scaleOrdinal<string, string>(d3.schemeTableau10).domain(Array.from(new Set(data.map(d => d.series))));
+        const cx = (d: DataPoint) => numeric ? xLinear(d.x) : (xPoint(d.category) || 0);
+
+        this.plot.selectAll<SVGCircleElement, DataPoint>("circle.mark")
+            .data(data, d => d.key)
+            .join(
+                enter => enter.append("circle").classed("mark", true).attr("r", 0).attr("cx", cx).attr("cy", d => y(d.value)),
+                update => update,
+                exit => exit.remove()
+            )
+            .attr("fill", d => color(d.series))
+            .transition().duration(duration)
+            .attr("r", 4)
+            .attr("cx", cx)
+            .attr("cy", d => y(d.value));
+
+        if (numeric) {
+            this.drawAxes(d3.axisBottom(xLinear).ticks(5), d3.axisLeft(y).ticks(5));
+        } else {
+            this.drawAxes(d3.axisBottom(xPoint), d3.axisLeft(y).ticks(5));
+        }
+    }
+'''
+
+_RENDER_HEATMAP = '''
+    private render(duration: number) {
+        const data = this.data;
+        const x = d3.scaleBand<string>().domain(Array.from(new Set(data.map(d => d.category))))
+            .range([0, this.innerWidth]).padding(0.02);
+        const y = d3.scaleBand<string>().domain(Array.from(new Set(data.map(d => d.series))))
+            .range([0, this.innerHeight]).padding(0.02);
+        const extent = d3.extent(data, d => d.value);
+        const color = d3.scaleSequential(d3.interpolateBlues).domain([extent[0] || 0, extent[1] || 1]);
+
+        this.plot.selectAll<SVGRectElement, DataPoint>("rect.mark")
+            .data(data, d => d.key)
+            .join(
+                enter => enter.append("rect").classed("mark", true)
+                    .attr("x", d => x(d.category) || 0).attr("y", d => y(d.series) || 0),
+                update => update,
+                exit => exit.remove()
+            )
+            .transition().duration(duration)
+            .attr("x", d => x(d.category) || 0)
+            .attr("y", d => y(d.series) || 0)
+            .attr("width", x.bandwidth())
+            .attr("height", y.bandwidth())
+            .attr("fill", d => color(d.value));
+
+        this.drawAxes(d3.axisBottom(x), d3.axisLeft(y));
+    }
+'''
+
+_RENDER_BODIES = {
+    'bar': _RENDER_BAR,
+    'line': _RENDER_LINE,
+    'area': _RENDER_AREA,
+    'pie': _RENDER_PIE,
+    'donut': _RENDER_PIE,
+    'scatter': _RENDER_SCATTER,
+    'heatmap': _RENDER_HEATMAP,
+}
+
+
+def build_visual_ts(spec_dict: dict) -> str:
+    """Genera src/visual.ts con el renderizador D3 correspondiente al tipo de gráfico."""
+    chart_type = spec_dict.get('type', 'barras_vertical')
+    title = spec_dict.get('title') or 'Gráfico Sin Título'
+    renderer = renderer_for(chart_type)
+    horizontal = 'true' if chart_type_info(chart_type).horizontal else 'false'
+    inner_radius_ratio = 0.5 if renderer == 'donut' else 0
+    placeholder = (
+        'Conecta un campo en "Category" y una medida en "Values"'
+        + (' (y un campo en "Series" para el eje Y)' if renderer == 'heatmap' else '')
+    )
+
+    return f'''/**
+ * Visual personalizado para Power BI - {title}
+ * Generado por Creador de Gráficos
+ * Tipo: {chart_type} (renderizador D3: {renderer})
+ *
+ * Las marcas se enlazan por clave de categoría/serie con data joins de D3:
+ * una actualización sólo crea, mueve o elimina las marcas que cambian y
+ * un redimensionado recalcula escalas sin reconstruir el DOM.
+ */
+
+"use strict";
+
+import "./../style/visual.less";
+import powerbi from "powerbi-visuals-api";
+import * as d3 from "d3";
+
+import VisualConstructorOptions = powerbi.extensibility.visual.VisualConstructorOptions;
+import VisualUpdateOptions = powerbi.extensibility.visual.VisualUpdateOptions;
+import IVisual = powerbi.extensibility.visual.IVisual;
+import DataView = powerbi.DataView;
+
+const TITLE = {json.dumps(title)};
+const PLACEHOLDER = {json.dumps(placeholder)};
+const MARGIN = {{ top: 10, right: 10, bottom: 30, left: 40 }};
+const TRANSITION_MS = 250;
+const HORIZONTAL = {horizontal};
+const INNER_RADIUS_RATIO = {inner_radius_ratio};
+const KEY_SEPARATOR = "\\u241F";
+
+interface DataPoint {{
+    key: string;
+    category: string;
+    series: string;
+    x: number;
+    value: number;
+}}
+
+interface Series {{
+    name: string;
+    points: DataPoint[];
+}}
+
+export class Visual implements IVisual {{
+    private target: HTMLElement;
+    private header: HTMLElement;
+    private placeholder: HTMLElement;
+    private svg: d3.Selection<SVGSVGElement, unknown, null, undefined>;
+    private plot: d3.Selection<SVGGElement, unknown, null, undefined>;
+    private xAxisGroup: d3.Selection<SVGGElement, unknown, null, undefined>;
+    private yAxisGroup: d3.Selection<SVGGElement, unknown, null, undefined>;
+    private data: DataPoint[] = [];
+    private innerWidth = 0;
+    private innerHeight = 0;
+
+    constructor(options: VisualConstructorOptions) {{
+        this.target = options.element;
+        this.target.classList.add("visual-container");
+
+        // La estructura del DOM se crea una sola vez; update() sólo toca las marcas
+        this.header = document.createElement("div");
+        this.header.className = "chart-header";
+        const titleElement = document.createElement("h3");
+        titleElement.className = "chart-title";
+        titleElement.textContent = TITLE;
+        this.header.appendChild(titleElement);
+        this.target.appendChild(this.header);
+
+        this.placeholder = document.createElement("div");
+        this.placeholder.className = "placeholder";
+        this.placeholder.textContent = PLACEHOLDER;
+        this.target.appendChild(this.placeholder);
+
+        this.svg = d3.select(this.target).append("svg").classed("chart-svg", true);
+        this.plot = this.svg.append("g").classed("plot", true);
+        this.xAxisGroup = this.svg.append("g").classed("axis x-axis", true);
+        this.yAxisGroup = this.svg.append("g").classed("axis y-axis", true);
+    }}
+
+    public update(options: VisualUpdateOptions) {{
+        // Sólo se vuelve a leer el dataView cuando Power BI indica cambio de datos
+        const dataChanged = (options.type & powerbi.VisualUpdateType.Data) !== 0;
+        if (dataChanged) {{
+            this.data = Visual.extractData(options.dataViews && options.dataViews[0]);
+        }}
+
+        const width = Math.max(0, options.viewport.width);
+        const height = Math.max(0, options.viewport.height - this.header.offsetHeight);
+        this.innerWidth = Math.max(0, width - MARGIN.left - MARGIN.right);
+        this.innerHeight = Math.max(0, height - MARGIN.top - MARGIN.bottom);
+        this.svg.attr("width", width).attr("height", height);
+        this.plot.attr("transform", `translate(${{MARGIN.left}},${{MARGIN.top}})`);
+        this.xAxisGroup.attr("transform", `translate(${{MARGIN.left}},${{MARGIN.top + this.innerHeight}})`);
+        this.yAxisGroup.attr("transform", `translate(${{MARGIN.left}},${{MARGIN.top}})`);
+        this.placeholder.style.display = this.data.length ? "none" : "block";
+
+        // Un redimensionado reutiliza las marcas existentes sin transición
+        this.render(dataChanged ? TRANSITION_MS : 0);
+    }}
+
+    private static extractData(dataView: DataView): DataPoint[] {{
+        if (!dataView || !dataView.categorical || !dataView.categorical.categories || !dataView.categorical.values) {{
+            return [];
+        }}
+        const categories = dataView.categorical.categories[0].values;
+        const points: DataPoint[] = [];
+        dataView.categorical.values.grouped().forEach(group => {{
+            const groupName = group.name == null ? "" : String(group.name);
+            // Una serie por medida del rol de valores; con varias, el nombre incluye la medida
+            group.values.forEach(measure => {{
+                const measureName = group.values.length > 1 ? String(measure.source.displayName) : "";
+                const series = [groupName, measureName].filter(name => name).join(" - ");
+                for (let i = 0; i < categories.length; i++) {{
+                    const value = measure.values[i];
+                    if (value == null) {{
+                        continue;
+                    }}
+                    const category = String(categories[i]);
+                    points.push({{
+                        key: series ? series + KEY_SEPARATOR + category : category,
+                        category,
+                        series,
+                        x: Number(categories[i]),
+                        value: Number(value)
+                    }});
+                }}
+            }});
+        }});
+        return points;
+    }}
+
+    private drawAxes(xAxis: d3.Axis<any> | null, yAxis: d3.Axis<any> | null) {{
+        this.xAxisGroup.style("display", xAxis ? null : "none");
+        this.yAxisGroup.style("display", yAxis ? null : "none");
+        if (xAxis) {{
+            this.xAxisGroup.call(xAxis);
+        }}
+        if (yAxis) {{
+            this.yAxisGroup.call(yAxis);
+        }}
+    }}
+{_RENDER_BODIES[renderer]}}}
+'''
+
+
+# Estilos compartidos por todos los renderizadores D3
+VISUAL_LESS = '''.visual-container {
+    width: 100%;
+    height: 100%;
+    font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, Arial, sans-serif;
+    display: flex;
+    flex-direction: column;
+    box-sizing: border-box;
+    overflow: hidden;
+}
+
+.chart-header {
+    text-align: center;
+}
+
+.chart-title {
+    font-size: 14px;
+    font-weight: 600;
+    margin: 4px 0;
+    color: #333;
+}
+
+.placeholder {
+    text-align: center;
+    padding: 20px;
+    color: #666;
+    font-size: 12px;
+}
+
+.chart-svg {
+    display: block;
+}
+
+.axis text {
+    font-size: 10px;
+    fill: #666;
+}
+
+.axis path,
+.axis line {
+    stroke: #ccc;
+}
+
+.mark {
+    shape-rendering: geometricPrecision;
+}'''
@@ -0,0 +1,202 @@
+# dax.py
+# Generación de medidas DAX y de capabilities.json enlazado a ellas.
+# La agregación del ChartSpec se traslada al motor de Power BI (VertiPaq): el visual
+# recibe sólo las filas ya agregadas por la categoría/serie en lugar de filas crudas.
+from ...core.aggregation import split_encoding
+
+# Tabla del modelo de Power BI a la que apuntan las medidas si el spec no indica otra
+DEFAULT_TABLE = 'Datos'
+
+# Límite de filas agregadas que Power BI entrega al visual (dataReductionAlgorithm)
+MAX_AGGREGATED_ROWS = 30000
+
+DAX_FUNCTIONS = {
+    'sum': 'SUM',
+    'mean': 'AVERAGE',
+    'min': 'MIN',
+    'max': 'MAX',
+    'median': 'MEDIAN',
+    'count': 'COUNT',
+    'distinct': 'DISTINCTCOUNT',
+}
+
+MEASURE_PREFIXES = {
+    'sum': 'Suma de',
+    'mean': 'Promedio de',
+    'min': 'Mínimo de',
+    'max': 'Máximo de',
+    'median': 'Mediana de',
+    'count': 'Recuento de',
+    'distinct': 'Recuento distinto de',
+}
+
+
+def table_name_for(spec_dict: dict) -> str:
+    """Tabla del modelo indicada en options.powerbiTable o la tabla por defecto."""
+    return (spec_dict.get('options') or {}).get('powerbiTable') or DEFAULT_TABLE
+
+
+def _quote_table(table: str) -> str:
+    return "'" + table.replace("'", "''") + "'"
+
+
+def _quote_name(name: str) -> str:
+    return "[" + name.replace("]", "]]") + "]"
+
+
+def _column_ref(table: str, field: str) -> str:
+    return f"{_quote_table(table)}{_quote_name(field)}"
+
+
+def _string(text: str) -> str:
+    return '"' + text.replace('"', '""') + '"'
+
+
+def build_measures(spec_dict: dict) -> list:
+    """
+    Construye las medidas DAX a partir de los canales agregados del encoding. Un
+    agregado distinto de 'count' sin campo no tiene medida equivalente y se omite.
+
+    Returns:
+        Lista de dicts con 'name', 'expression', 'formatString', 'channel' y 'aggregate'
+    """
+    table = table_name_for(spec_dict)
+    _, measures = split_encoding(spec_dict.get('encoding') or {})
+    result = []
+    for measure in measures:
+        aggregate = measure['aggregate']
+        field = measure['field']
+        if field is None and aggregate != 'count':
+            continue
+        if field is None:
+            name = 'Recuento de filas'
+            expression = f"COUNTROWS({_quote_table(table)})"
+        else:
+            name = f"{MEASURE_PREFIXES[aggregate]} {field}"
+            expression = f"{DAX_FUNCTIONS[aggregate]}({_column_ref(table, field)})"
+        result.append({
+            "name": name,
+            "expression": expression,
+            "formatString": "#,0" if aggregate in ('count', 'distinct') else "#,0.##",
+            "channel": measure['channel'],
+            "aggregate": aggregate,
+        })
+    return result
+
+
+def render_dax_script(spec_dict: dict, measures: list) -> str:
+    """
+    Genera un script DAX con las medidas (DEFINE MEASURE) y la consulta agregada
+    equivalente a la que Power BI enviará al visual. Se puede pegar en DAX Studio o
+    Tabular Editor, o crear cada medida a mano con su expresión.
+    """
+    table = table_name_for(spec_dict)
+    dimensions, _ = split_encoding(spec_dict.get('encoding') or {})
+    lines = [
+        "// Medidas DAX generadas por Creador de Gráficos",
+        f"// Gráfico: {spec_dict.get('title') or spec_dict.get('type', '')}",
+        f"// Tabla del modelo: {table}",
+        "",
+    ]
+    if not measures:
+        lines.append("// El encoding no define agregados: el visual recibe columnas sin agregar.")
+        return "\n".join(lines) + "\n"
+
+    lines.append("DEFINE")
+    for measure in measures:
+        lines.append(f"    MEASURE {_quote_table(table)}{_quote_name(measure['name'])} = {measure['expression']}")
+        lines.append(f"        // formatString: {measure['formatString']}")
+    lines.append("")
+    lines.append("EVALUATE")
+    group_by = [_column_ref(table, d['field']) for d in dimensions]
+    selected = [f"{_string(m['name'])}, {_quote_name(m['name'])}" for m in measures]
+    lines.append("    SUMMARIZECOLUMNS(")
+    lines.append(",\n".join(f"        {item}" for item in group_by + selected))
+    lines.append("    )")
+    return "\n".join(lines) + "\n"
+
+
+def build_capabilities(spec_dict: dict, measures: list) -> dict:
+    """
+    capabilities.json con roles Grouping para categoría/serie y el rol Measure 'values'
+    que admite todas las medidas DAX (en su orden), mapeo categórico agrupado y
+    reducción de datos acotada.
+    """
+    dimensions, _ = split_encoding(spec_dict.get('encoding') or {})
+    category_field = dimensions[0]['field'] if dimensions else None
+    series_field = dimensions[1]['field'] if len(dimensions) > 1 else None
+
+    data_roles = [
+        {
+            "displayName": category_field or "Category",
+            "name": "category",
+            "kind": "Grouping",
+            "description": "Data to be grouped"
+        },
+        {
+            "displayName": series_field or "Series",
+            "name": "series",
+            "kind": "Grouping",
+            "description": "Optional series (color or heatmap Y axis)"
+        },
+        {
+            "displayName": ", ".join(m["name"] for m in measures) if measures else "Values",
+            "name": "values",
+            "kind": "Measure",
+            "description": ("; ".join(f"Medida DAX {m['name']}: {m['expression']}" for m in measures)
+                            if measures else "Data values"),
+            "requiredTypes": [{"numeric": True}]
+        }
+    ]
+
+    return {
+        "privileges": [],
+        "dataRoles": data_roles,
+        "dataViewMappings": [
+            {
+                "conditions": [
+                    {
+                        "category": {"max": 1},
+                        "series": {"max": 1},
+                        "values": {"max": max(len(measures), 1)}
+                    }
+                ],
+                "categorical": {
+                    "categories": {
+                        "for": {"in": "category"},
+                        "dataReductionAlgorithm": {"top": {"count": MAX_AGGREGATED_ROWS}}
+                    },
+                    "values": {
+                        "group": {
+                            "by": "series",
+                            "select": [{"for": {"in": "values"}}],
+                            "dataReductionAlgorithm": {"top": {}}
+                        }
+                    }
+                }
+            }
+        ],
+        "objects": {
+            "general": {
+                "displayName": "General",
+                "properties": {
+                    "formatString": {
+                        "type": {"formatting": {"formatString": True}}
+                    }
+                }
+            },
+            "dataPoint": {
+                "displayName": "Data colors",
+                "properties": {
+                    "fill": {
+                        "displayName": "Fill",
+                        "type": {"fill": {"solid": {"color": True}}}
+                    }
+                }
+            }
+        },
+        "sorting": {
+            "custom": {}
+        },
+        "supportsHighlight": True
+    }
@@ -1,24 +1,615 @@
 # exporter.py
 # Exportador para script Python de Power BI
+# Genera un script de visual de Python por tipo de gráfico. Power BI entrega al
+# script el DataFrame 'dataset' (como mucho 150.000 filas) y corta la ejecución por
+# tiempo, así que el script agrega con group-bys vectorizados de pandas, limita las
+# categorías y puntos que dibuja y comprueba el tiempo empleado.
+from itertools import islice
+
 from ..base import IExporter
-import json
+from ...core import tracing
+from ...core.aggregation import BIN_EPSILON, split_encoding
+from ...core.datasets import resolve_data
+from ...core.chart_types import chart_type_info
+from ...core.encoding import parse_encoding
+from .d3_renderers import renderer_for
+
+# Límite de filas que Power BI pasa a un visual de Python
+MAX_ROWS = 150000
+# Puntos como máximo en dispersión/líneas y categorías en barras/sectores
+MAX_POINTS = 5000
+MAX_CATEGORIES = 50
+# Segundos de margen antes del tiempo límite del servicio de Power BI
+DEFAULT_TIME_BUDGET = 30.0
+# Filas de ejemplo que se incrustan para ejecutar el script fuera de Power BI
+SAMPLE_ROWS = 1000
+
+# Agregado canónico -> función de agregación de pandas
+PANDAS_AGGREGATES = {
+    'sum': 'sum',
+    'mean': 'mean',
+    'min': 'min',
+    'max': 'max',
+    'median': 'median',
+    'count': 'size',
+    'distinct': 'nunique',
+}
+
+SCRIPT_HEADER = '''# Power BI Python Visual Script
+# Generado por Creador de Gráficos: {title} ({chart_type})
+# Pegar en un visual de Python de Power BI con los campos: {fields}
+import time
+_inicio = time.perf_counter()
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+
+MAX_FILAS = {max_rows}
+MAX_PUNTOS = {max_points}
+MAX_CATEGORIAS = {max_categories}
+PRESUPUESTO_SEGUNDOS = {time_budget}
+avisos = []
+
+# Power BI define 'dataset'; fuera de Power BI se usan los datos de ejemplo del spec
+try:
+    df = dataset
+except NameError:
+    df = pd.DataFrame({sample!r})
+
+if len(df) >= MAX_FILAS:
+    avisos.append(f'Power BI limita el visual a {{MAX_FILAS:,}} filas: resultado parcial')
+
+'''
+
+SCRIPT_FOOTER = '''
+_transcurrido = time.perf_counter() - _inicio
+if _transcurrido > PRESUPUESTO_SEGUNDOS:
+    avisos.append(f'Tiempo de ejecución {_transcurrido:.1f}s > {PRESUPUESTO_SEGUNDOS:.0f}s: reducir datos o agregar en el modelo')
+if avisos:
+    fig.text(0.01, 0.01, ' | '.join(avisos), fontsize=7, color='#a33')
+fig.tight_layout()
+plt.show()
+'''
+
+# Treemap squarified sobre el cuadrado unidad (ETIQUETA y VALOR los define el script)
+TREEMAP_CODE = '''agregado = agregado[agregado[VALOR] > 0].nlargest(MAX_CATEGORIAS, VALOR)
+areas = agregado[VALOR].to_numpy(dtype=float)
+areas = areas / areas.sum() if len(areas) else areas
+
+def peor(fila, lado):
+    suma = fila.sum()
+    return max(lado * lado * fila.max() / (suma * suma), suma * suma / (lado * lado * fila.min()))
+
+rectangulos = []
+x0, y0, ancho, alto, i = 0.0, 0.0, 1.0, 1.0, 0
+while i < len(areas):
+    lado, j = min(ancho, alto), i + 1
+    while j < len(areas) and peor(areas[i:j + 1], lado) <= peor(areas[i:j], lado):
+        j += 1
+    fila = areas[i:j]
+    grosor = fila.sum() / lado
+    cortes = np.r_[0, np.cumsum(fila / grosor)]
+    if ancho >= alto:
+        rectangulos += [(x0, y0 + a, grosor, b - a) for a, b in zip(cortes[:-1], cortes[1:])]
+        x0, ancho = x0 + grosor, ancho - grosor
+    else:
+        rectangulos += [(x0 + a, y0, b - a, grosor) for a, b in zip(cortes[:-1], cortes[1:])]
+        y0, alto = y0 + grosor, alto - grosor
+    i = j
+colores = plt.cm.tab20(np.arange(len(rectangulos)) % 20)
+for (rx, ry, rw, rh), nombre, valor, color in zip(rectangulos, agregado[ETIQUETA], agregado[VALOR], colores):
+    ax.add_patch(plt.Rectangle((rx, ry), rw, rh, facecolor=color, edgecolor='white'))
+    ax.text(rx + rw / 2, ry + rh / 2, f'{nombre}\\n{valor:,.0f}', ha='center', va='center', fontsize=8)
+ax.set_xlim(0, 1)
+ax.set_ylim(0, 1)
+ax.axis('off')
+'''
+
+# Sankey: nodos en columnas según su profundidad y enlaces como bandas curvas
+# (ORIGEN, DESTINO y VALOR los define el script)
+SANKEY_CODE = '''flujos = agregado[(agregado[VALOR] > 0) & (agregado[ORIGEN].astype(str) != agregado[DESTINO].astype(str))]
+flujos = flujos.nlargest(MAX_CATEGORIAS, VALOR)
+nodos = pd.unique(pd.concat([flujos[ORIGEN], flujos[DESTINO]]).astype(str))
+indice = pd.Series(np.arange(len(nodos)), index=nodos)
+origen = indice.loc[flujos[ORIGEN].astype(str)].to_numpy()
+destino = indice.loc[flujos[DESTINO].astype(str)].to_numpy()
+valor = flujos[VALOR].to_numpy(dtype=float)
+profundidad = np.zeros(len(nodos), dtype=int)
+for _ in range(len(nodos)):
+    nueva = profundidad.copy()
+    np.maximum.at(nueva, destino, profundidad[origen] + 1)
+    if (nueva == profundidad).all():
+        break
+    profundidad = nueva
+total = np.maximum(np.bincount(origen, valor, len(nodos)), np.bincount(destino, valor, len(nodos)))
+columnas = np.bincount(profundidad)
+hueco = 0.2 / columnas.max(initial=1)
+escala = 0.8 / max(np.bincount(profundidad, total).max(initial=0), 1e-12)
+base = np.zeros(len(nodos))
+for d in range(len(columnas)):
+    miembros = np.flatnonzero(profundidad == d)
+    base[miembros] = np.r_[0, np.cumsum(total[miembros] * escala + hueco)[:-1]]
+ax.bar(profundidad, total * escala, bottom=base, width=0.1, color='#4c72b0')
+for i, nombre in enumerate(nodos):
+    ax.text(profundidad[i] + 0.07, base[i] + total[i] * escala / 2, nombre, va='center', fontsize=8)
+salida, entrada = base.copy(), base.copy()
+t = np.linspace(0, 1, 50)
+curva = t * t * (3 - 2 * t)
+for s, d, v in zip(origen, destino, valor):
+    grueso = v * escala
+    x = profundidad[s] + 0.05 + t * (profundidad[d] - profundidad[s] - 0.1)
+    y = salida[s] + (entrada[d] - salida[s]) * curva
+    ax.fill_between(x, y, y + grueso, alpha=0.35, color='#4c72b0', linewidth=0)
+    salida[s] += grueso
+    entrada[d] += grueso
+ax.axis('off')
+'''
+
+
+def _measure_column(measure) -> str:
+    if measure['aggregate'] == 'count' or measure['field'] is None:
+        return 'Recuento'
+    return f"{measure['aggregate']}({measure['field']})"
+
 
 class PowerBIPythonExporter(IExporter):
+    @tracing.traced('export:powerbi_python_script')
     def export(self, spec, output_path: str):
-        # Implementación mínima: escribimos un script Python genérico con metadatos
-        content = (
-            "# Power BI Python Visual Script\n"
-            "# Este script es un marcador de posición generado automáticamente.\n\n"
-            "import pandas as pd\n"
-            "import matplotlib.pyplot as plt\n\n"
-            "# Datos: el usuario debe conectar el dataset de Power BI a 'dataset'\n"
-            "# dataset = pd.DataFrame(...)\n\n"
-            f"# Spec: {json.dumps(getattr(spec, 'dict', lambda: spec)(), ensure_ascii=False) if hasattr(spec, 'dict') else str(spec)}\n"
-            "plt.figure()\n"
-            "plt.title('Gráfico generado - marcador de posición')\n"
-            "plt.plot([0,1],[0,1])\n"
-            "plt.show()\n"
-        )
+        """Escribe el script del visual de Python de Power BI para el spec."""
+        spec_dict = spec.dict() if hasattr(spec, 'dict') else spec
         with open(output_path, "w", encoding="utf-8") as f:
-            f.write(content)
+            f.write(build_script(spec_dict))
         return True
+
+
+def build_script(spec_dict: dict) -> str:
+    """Construye el script de Python (texto) de un ChartSpec."""
+    chart_type = spec_dict.get('type', '')
+    options = spec_dict.get('options') or {}
+    dimensions, measures = split_encoding(spec_dict.get('encoding') or {})
+    if not measures and any(d.get('bin') for d in dimensions):
+        # Histograma: los bins sin medida explícita cuentan filas
+        measures = [{'channel': 'y', 'field': None, 'aggregate': 'count'}]
+
+    data = resolve_data(spec_dict.get('data'))
+    if isinstance(data, dict):
+        data = data.get('values') or []
+    sample = list(islice((row for row in (data or []) if isinstance(row, dict)), SAMPLE_ROWS))
+
+    fields = [d['field'] for d in dimensions] + [m['field'] for m in measures if m['field']]
+    script = SCRIPT_HEADER.format(
+        title=spec_dict.get('title') or chart_type,
+        chart_type=chart_type,
+        fields=', '.join(dict.fromkeys(fields)) or '(ninguno)',
+        max_rows=MAX_ROWS,
+        max_points=MAX_POINTS,
+        max_categories=MAX_CATEGORIES,
+        time_budget=float(options.get('powerbiTimeBudget', DEFAULT_TIME_BUDGET)),
+        sample=sample,
+    )
+
+    name = chart_type_info(chart_type).name if chart_type else ''
+    if name in TYPE_PLOTS:
+        fields = parse_encoding(spec_dict.get('encoding') or {}).fields
+        script += TYPE_PLOTS[name](name, fields, dimensions, measures, spec_dict)
+        script += f"ax.set_title({spec_dict.get('title') or chart_type!r})\n"
+    elif measures:
+        script += _aggregation_code(dimensions, measures)
+        script += _aggregated_plot_code(chart_type, dimensions, measures, spec_dict)
+    else:
+        script += _raw_plot_code(dimensions, spec_dict)
+    return script + SCRIPT_FOOTER
+
+
+def _aggregation_code(dimensions, measures) -> str:
+    """Group-by vectorizado: bins con numpy y agregados con nombre de pandas."""
+    lines = ['# Agregación vectorizada (sin bucles por fila)']
+    for field in dict.fromkeys(m['field'] for m in measures if m['field'] and m['aggregate'] != 'distinct'):
+        lines.append(f"df[{field!r}] = pd.to_numeric(df[{field!r}], errors='coerce')")
+    for dim in dimensions:
+        if not dim.get('bin'):
+            continue
+        field = dim['field']
+        bin_def = dim['bin'] if isinstance(dim['bin'], dict) else {}
+        lines.append(f"_valores = pd.to_numeric(df[{field!r}], errors='coerce')")
+        if bin_def.get('step'):
+            lines.append(f"_paso = {float(bin_def['step'])!r}")
+        else:
+            lines.append(f"_bordes = np.histogram_bin_edges(_valores.dropna(), bins={int(bin_def.get('maxbins', 10))})")
+            lines.append("_paso = float(_bordes[1] - _bordes[0]) if len(_bordes) > 1 and _bordes[1] > _bordes[0] else 1.0")
+        # Holgura de aggregation.bin_index: los valores en un borde decimal abren su bin
+        lines.append("_posicion = _valores / _paso")
+        lines.append(f"df[{field!r}] = np.floor(_posicion + {BIN_EPSILON!r} * (1 + _posicion.abs())) * _paso")
+
+    named = []
+    for measure in measures:
+        source = measure['field'] or (dimensions[0]['field'] if dimensions else None)
+        if source is None:
+            continue
+        named.append(f"    {_measure_column(measure)!r}: ({source!r}, {PANDAS_AGGREGATES[measure['aggregate']]!r}),")
+    group_by = [d['field'] for d in dimensions]
+    if group_by:
+        lines.append(f"agregado = df.groupby({group_by!r}, sort=False, dropna=False).agg(**{{")
+        lines += named
+        lines.append("}).reset_index()")
+    else:
+        lines.append("agregado = pd.DataFrame([{")
+        for measure in measures:
+            column = _measure_column(measure)
+            if measure['aggregate'] == 'count':
+                lines.append(f"    {column!r}: len(df),")
+            else:
+                lines.append(f"    {column!r}: df[{measure['field']!r}].agg({PANDAS_AGGREGATES[measure['aggregate']]!r}),")
+        lines.append("}])")
+    return '\n'.join(lines) + '\n\n'
+
+
+def _aggregated_plot_code(chart_type, dimensions, measures, spec_dict) -> str:
+    renderer = renderer_for(chart_type)
+    value = _measure_column(measures[0])
+    title = spec_dict.get('title') or chart_type
+    lines = [f"fig, ax = plt.subplots(figsize=({(spec_dict.get('width') or 800) / 100}, {(spec_dict.get('height') or 600) / 100}))"]
+
+    if not dimensions:
+        # KPI: un único valor agregado
+        lines += [
+            "ax.axis('off')",
+            f"valor = agregado[{value!r}].iloc[0]",
+            "ax.text(0.5, 0.5, f'{valor:,.2f}', ha='center', va='center', fontsize=36)",
+        ]
+    elif renderer == 'heatmap' and len(dimensions) > 1:
+        x, y = dimensions[0]['field'], dimensions[1]['field']
+        lines += [
+            f"tabla = agregado.pivot_table(index={y!r}, columns={x!r}, values={value!r}, aggfunc='sum')",
+            "tabla = tabla.iloc[:MAX_CATEGORIAS, :MAX_CATEGORIAS]",
+            "imagen = ax.imshow(tabla.to_numpy(dtype=float), aspect='auto', cmap='Blues')",
+            "ax.set_xticks(range(len(tabla.columns)), tabla.columns.astype(str), rotation=45, ha='right')",
+            "ax.set_yticks(range(len(tabla.index)), tabla.index.astype(str))",
+            "fig.colorbar(imagen, ax=ax)",
+        ]
+    elif renderer in ('line', 'area'):
+        x = dimensions[0]['field']
+        series = dimensions[1]['field'] if len(dimensions) > 1 else None
+        lines += [
+            f"agregado = agregado.sort_values({x!r})",
+            "if len(agregado) > MAX_PUNTOS:",
+            "    agregado = agregado.iloc[::int(np.ceil(len(agregado) / MAX_PUNTOS))]",
+            "    avisos.append(f'Serie reducida a {len(agregado):,} puntos')",
+        ]
+        if series:
+            lines.append(f"tabla = agregado.pivot_table(index={x!r}, columns={series!r}, values={value!r}, aggfunc='sum')")
+        else:
+            lines.append(f"tabla = agregado.set_index({x!r})[[{value!r}]]")
+        if renderer == 'area':
+            lines.append("tabla.plot.area(ax=ax, stacked=True, alpha=0.8)")
+        else:
+            lines.append("tabla.plot(ax=ax)")
+    elif renderer in ('pie', 'donut'):
+        x = dimensions[0]['field']
+        lines += [
+            f"agregado = agregado.nlargest(MAX_CATEGORIAS, {value!r})",
+            f"ax.pie(agregado[{value!r}], labels=agregado[{x!r}].astype(str)"
+            + (", wedgeprops={'width': 0.5})" if renderer == 'donut' else ")"),
+            "ax.axis('equal')",
+        ]
+    elif renderer == 'scatter' and len(measures) > 1:
+        lines += [
+            "if len(agregado) > MAX_PUNTOS:",
+            "    agregado = agregado.sample(MAX_PUNTOS, random_state=0)",
+            f"ax.scatter(agregado[{value!r}], agregado[{_measure_column(measures[1])!r}], alpha=0.7)",
+        ]
+    else:
+        x = dimensions[0]['field']
+        series = dimensions[1]['field'] if len(dimensions) > 1 else None
+        info = chart_type_info(chart_type)
+        kind = 'barh' if info.horizontal else 'bar'
+        stacked = info.stacked
+        if any(d.get('bin') for d in dimensions[:1]):
+            lines.append(f"agregado = agregado.sort_values({x!r})")
+        else:
+            lines += [
+                "if agregado[" + repr(x) + "].nunique() > MAX_CATEGORIAS:",
+                f"    principales = agregado.groupby({x!r})[{value!r}].sum().nlargest(MAX_CATEGORIAS).index",
+                f"    agregado = agregado[agregado[{x!r}].isin(principales)]",
+                "    avisos.append(f'Mostrando las {MAX_CATEGORIAS} categorías principales')",
+            ]
+        if series:
+            lines.append(f"tabla = agregado.pivot_table(index={x!r}, columns={series!r}, values={value!r}, aggfunc='sum', sort=False)")
+        else:
+            lines.append(f"tabla = agregado.set_index({x!r})[[{value!r}]]")
+        lines.append(f"tabla.plot(kind={kind!r}, ax=ax, stacked={stacked!r}, width=0.8)")
+
+    lines.append(f"ax.set_title({title!r})")
+    return '\n'.join(lines) + '\n'
+
+
+def _raw_plot_code(dimensions, spec_dict) -> str:
+    """Sin agregados (dispersión x/y, tablas): se dibujan columnas crudas muestreadas."""
+    title = spec_dict.get('title') or spec_dict.get('type', '')
+    lines = [
+        "if len(df) > MAX_PUNTOS:",
+        "    df = df.sample(MAX_PUNTOS, random_state=0)",
+        "    avisos.append(f'Muestra de {MAX_PUNTOS:,} puntos')",
+        f"fig, ax = plt.subplots(figsize=({(spec_dict.get('width') or 800) / 100}, {(spec_dict.get('height') or 600) / 100}))",
+    ]
+    if len(dimensions) >= 2:
+        x, y = dimensions[0]['field'], dimensions[1]['field']
+        lines.append(f"ax.scatter(df[{x!r}], df[{y!r}], alpha=0.7)")
+        lines += [f"ax.set_xlabel({x!r})", f"ax.set_ylabel({y!r})"]
+    elif dimensions:
+        x = dimensions[0]['field']
+        lines.append(f"df[{x!r}].value_counts().head(MAX_CATEGORIAS).plot(kind='bar', ax=ax)")
+    else:
+        lines += [
+            "ax.axis('off')",
+            "ax.table(cellText=df.head(20).astype(str).values, colLabels=list(df.columns), loc='center')",
+        ]
+    lines.append(f"ax.set_title({title!r})")
+    return '\n'.join(lines) + '\n'
+
+
+
+# --- Tipos con dibujo propio (no encajan en barras/líneas/sectores/dispersión) ---
+
+def _figure(spec_dict) -> str:
+    return f"fig, ax = plt.subplots(figsize=({(spec_dict.get('width') or 800) / 100}, {(spec_dict.get('height') or 600) / 100}))"
+
+
+def _is_quantitative(fd) -> bool:
+    return fd is not None and fd.type == 'quantitative'
+
+
+def _value_and_group(fields):
+    """Campo numérico (x o y) y campo de agrupación (el otro eje o el color)."""
+    x, y = fields.get('x'), fields.get('y')
+    value, other = (x, y) if _is_quantitative(x) and not _is_quantitative(y) else (y or x, x if y else None)
+    group = other if other is not None and not _is_quantitative(other) else fields.get('color')
+    return value.field, (group.field if group is not None else None), value is x
+
+
+def _numeric_lines(*fields) -> list:
+    """Convierte los campos a número y descarta las filas sin valor."""
+    fields = [f for f in fields if f]
+    lines = [f"df[{f!r}] = pd.to_numeric(df[{f!r}], errors='coerce')" for f in fields]
+    lines.append(f"df = df.dropna(subset={fields!r})")
+    return lines
+
+
+def _group_lines(group, value) -> list:
+    """Serie 'grupo' (texto) y las MAX_CATEGORIAS categorías con más filas."""
+    lines = [f"grupo = df[{group!r}].astype(str)" if group else f"grupo = pd.Series({value!r}, index=df.index)"]
+    lines += [
+        "principales = grupo.value_counts().index[:MAX_CATEGORIAS]",
+        "if grupo.nunique() > MAX_CATEGORIAS:",
+        "    avisos.append(f'Mostrando las {MAX_CATEGORIAS} categorías con más filas')",
+    ]
+    return lines
+
+
+def _sample_lines() -> list:
+    return [
+        "if len(df) > MAX_PUNTOS:",
+        "    df = df.sample(MAX_PUNTOS, random_state=0)",
+        "    avisos.append(f'Muestra de {MAX_PUNTOS:,} puntos')",
+    ]
+
+
+def _size_expression(size) -> str:
+    """Área de marcador (puntos²) proporcional al campo de tamaño."""
+    return f"s=600 * df[{size!r}].clip(lower=0) / (df[{size!r}].max() or 1)" if size else "s=20"
+
+
+def _field(fields, channel):
+    return fields[channel].field if channel in fields else None
+
+
+def _box_code(name, fields, dimensions, measures, spec_dict) -> str:
+    """Caja: cuartiles y bigotes (1,5 IQR) por grupo con group-bys de pandas."""
+    value, group, horizontal = _value_and_group(fields)
+    lines = _numeric_lines(value) + _group_lines(group, value) + [
+        f"valores = df[{value!r}]",
+        "cuartiles = valores.groupby(grupo).quantile([0.25, 0.5, 0.75]).unstack().reindex(principales)",
+        "rango = cuartiles[0.75] - cuartiles[0.25]",
+        "dentro = (valores >= grupo.map(cuartiles[0.25] - 1.5 * rango)) & (valores <= grupo.map(cuartiles[0.75] + 1.5 * rango))",
+        "bigotes = valores[dentro].groupby(grupo[dentro]).agg(['min', 'max']).reindex(principales)",
+        "cajas = [{'label': str(k), 'q1': q[0.25], 'med': q[0.5], 'q3': q[0.75], 'whislo': b['min'], 'whishi': b['max']}",
+        "         for (k, q), (_, b) in zip(cuartiles.iterrows(), bigotes.iterrows())]",
+        _figure(spec_dict),
+        f"ax.bxp(cajas, showfliers=False, vert={not horizontal!r})",
+    ]
+    return '\n'.join(lines) + '\n'
+
+
+def _density_code(name, fields, dimensions, measures, spec_dict) -> str:
+    """Densidad y violín: KDE gaussiana por grupo sobre un histograma de 256 bins."""
+    value, group, _ = _value_and_group(fields)
+    lines = _numeric_lines(value) + _group_lines(group, value) + [
+        f"valores = df[{value!r}]",
+        "margen = float(valores.max() - valores.min()) * 0.1 or 1.0",
+        "rejilla = np.linspace(valores.min() - margen, valores.max() + margen, 256)",
+        "paso = rejilla[1] - rejilla[0]",
+        "bordes = np.append(rejilla - paso / 2, rejilla[-1] + paso / 2)",
+        "curvas = {}",
+        "for nombre in principales:",
+        "    x = valores[grupo == nombre].to_numpy(dtype=float)",
+        "    # Ancho de banda de Silverman; el coste es lineal en filas (histograma + núcleo 256x256)",
+        "    ancho = 1.06 * x.std() * len(x) ** -0.2 if len(x) > 1 and x.std() > 0 else margen / 10",
+        "    conteos = np.histogram(x, bins=bordes)[0]",
+        "    nucleo = np.exp(-0.5 * ((rejilla[:, None] - rejilla[None, :]) / ancho) ** 2)",
+        "    curvas[nombre] = nucleo @ conteos / (len(x) * ancho * np.sqrt(2 * np.pi))",
+        _figure(spec_dict),
+    ]
+    if name == 'violin':
+        lines += [
+            "escala = 0.4 / (max((c.max() for c in curvas.values()), default=0) or 1)",
+            "for i, curva in enumerate(curvas.values()):",
+            "    ax.fill_betweenx(rejilla, i - curva * escala, i + curva * escala, alpha=0.7)",
+            "ax.set_xticks(range(len(curvas)), [str(n) for n in curvas])",
+            f"ax.set_ylabel({value!r})",
+        ]
+    else:
+        lines += [
+            "for nombre, curva in curvas.items():",
+            "    ax.fill_between(rejilla, curva, alpha=0.4, label=str(nombre))",
+            f"ax.set_xlabel({value!r})",
+        ]
+        if group:
+            lines.append("ax.legend()")
+    return '\n'.join(lines) + '\n'
+
+
+def _gantt_code(name, fields, dimensions, measures, spec_dict) -> str:
+    """Gantt: barras horizontales desde el inicio con la duración (fin - inicio)."""
+    start, end, task = _field(fields, 'x'), _field(fields, 'x2'), _field(fields, 'y')
+    temporal = fields['x'].type == 'temporal'
+    if temporal:
+        lines = [
+            "import matplotlib.dates as mdates",
+            f"inicio = pd.to_datetime(df[{start!r}], errors='coerce')",
+            f"fin = pd.to_datetime(df[{end!r}], errors='coerce')",
+        ]
+    else:
+        lines = [
+            f"inicio = pd.to_numeric(df[{start!r}], errors='coerce')",
+            f"fin = pd.to_numeric(df[{end!r}], errors='coerce')",
+        ]
+    lines += [
+        "validas = (inicio.notna() & fin.notna()).to_numpy()",
+        "if validas.sum() > MAX_PUNTOS:",
+        # Sin '&=': con copy-on-write (pandas 3) el array de to_numpy() es de sólo lectura
+        "    validas = validas & (np.cumsum(validas) <= MAX_PUNTOS)",
+        "    avisos.append(f'Mostrando las {MAX_PUNTOS:,} primeras tareas')",
+        f"tareas = df.loc[validas, {task!r}].astype(str).to_numpy()",
+    ]
+    if temporal:
+        lines += [
+            "inicio = mdates.date2num(inicio[validas])",
+            "duracion = mdates.date2num(fin[validas]) - inicio",
+        ]
+    else:
+        lines += [
+            "inicio = inicio[validas].to_numpy(dtype=float)",
+            "duracion = fin[validas].to_numpy(dtype=float) - inicio",
+        ]
+    lines += [
+        "orden = np.argsort(inicio, kind='stable')",
+        _figure(spec_dict),
+        "ax.barh(tareas[orden], duracion[orden], left=inicio[orden], height=0.6)",
+        "ax.invert_yaxis()",
+    ]
+    if temporal:
+        lines.append("ax.xaxis_date()")
+    return '\n'.join(lines) + '\n'
+
+
+def _trend_code(name, fields, dimensions, measures, spec_dict) -> str:
+    """Línea de tendencia: dispersión muestreada y ajuste polinómico (np.polyfit) por grupo."""
+    x, y, color = _field(fields, 'x'), _field(fields, 'y'), _field(fields, 'color')
+    options = spec_dict.get('options') or {}
+    degree = int(options.get('degree', 2)) if options.get('method') == 'poly' else 1
+    lines = _numeric_lines(x, y) + [
+        f"grupos = list(df.groupby({color!r}, sort=False))[:MAX_CATEGORIAS]" if color else "grupos = [(None, df)]",
+        "muestra = df.sample(MAX_PUNTOS, random_state=0) if len(df) > MAX_PUNTOS else df",
+        _figure(spec_dict),
+        f"ax.scatter(muestra[{x!r}], muestra[{y!r}], s=12, alpha=0.5)",
+        "for nombre, parte in grupos:",
+        f"    if len(parte) <= {degree}:",
+        "        continue",
+        "    # Ajuste sobre todas las filas, no sólo la muestra dibujada",
+        f"    coeficientes = np.polyfit(parte[{x!r}], parte[{y!r}], {degree})",
+        f"    rejilla = np.linspace(parte[{x!r}].min(), parte[{x!r}].max(), 200)",
+        "    ax.plot(rejilla, np.polyval(coeficientes, rejilla), linewidth=2, label=None if nombre is None else str(nombre))",
+        f"ax.set_xlabel({x!r})",
+        f"ax.set_ylabel({y!r})",
+    ]
+    if color:
+        lines.append("ax.legend()")
+    return '\n'.join(lines) + '\n'
+
+
+def _map_code(name, fields, dimensions, measures, spec_dict) -> str:
+    """Mapas de puntos: longitud en x y latitud en y; el mapa de calor agrega en hexágonos."""
+    lat, lon, size = _field(fields, 'latitude'), _field(fields, 'longitude'), _field(fields, 'size')
+    lines = _numeric_lines(lat, lon, size)
+    if name == 'mapa_calor_geografico':
+        weights = f", C=df[{size!r}], reduce_C_function=np.sum" if size else ''
+        lines += [
+            _figure(spec_dict),
+            f"imagen = ax.hexbin(df[{lon!r}], df[{lat!r}]{weights}, gridsize=40, mincnt=1, cmap='YlOrRd')",
+            "fig.colorbar(imagen, ax=ax)",
+        ]
+    else:
+        lines += _sample_lines() + [
+            _figure(spec_dict),
+            f"ax.scatter(df[{lon!r}], df[{lat!r}], {_size_expression(size)}, alpha=0.6)",
+        ]
+    lines += [
+        f"ax.set_xlabel({lon!r})",
+        f"ax.set_ylabel({lat!r})",
+        "if len(df):",
+        "    # Aspecto equirectangular a la latitud media",
+        f"    ax.set_aspect(1 / np.cos(np.radians(df[{lat!r}].mean())))",
+    ]
+    return '\n'.join(lines) + '\n'
+
+
+def _bubble_code(name, fields, dimensions, measures, spec_dict) -> str:
+    """Burbujas: dispersión x/y con el área del marcador proporcional al campo de tamaño."""
+    x, y, size, color = (_field(fields, c) for c in ('x', 'y', 'size', 'color'))
+    lines = _numeric_lines(x, y, size) + _sample_lines() + [_figure(spec_dict)]
+    colors = f", c=pd.factorize(df[{color!r}])[0], cmap='tab10'" if color else ''
+    lines += [
+        f"ax.scatter(df[{x!r}], df[{y!r}], {_size_expression(size)}{colors}, alpha=0.6, edgecolors='white')",
+        f"ax.set_xlabel({x!r})",
+        f"ax.set_ylabel({y!r})",
+    ]
+    return '\n'.join(lines) + '\n'
+
+
+def _with_count(measures):
+    """Sin medida explícita se cuentan filas."""
+    return measures or [{'channel': 'size', 'field': None, 'aggregate': 'count'}]
+
+
+def _treemap_code(name, fields, dimensions, measures, spec_dict) -> str:
+    measures = _with_count(measures)
+    lines = [
+        _aggregation_code(dimensions, measures).rstrip('\n'),
+        f"ETIQUETA = {dimensions[0]['field']!r}",
+        f"VALOR = {_measure_column(measures[0])!r}",
+        _figure(spec_dict),
+        TREEMAP_CODE,
+    ]
+    return '\n'.join(lines)
+
+
+def _sankey_code(name, fields, dimensions, measures, spec_dict) -> str:
+    measures = _with_count(measures)
+    lines = [
+        _aggregation_code(dimensions, measures).rstrip('\n'),
+        f"ORIGEN = {_field(fields, 'source')!r}",
+        f"DESTINO = {_field(fields, 'target')!r}",
+        f"VALOR = {_measure_column(measures[0])!r}",
+        _figure(spec_dict),
+        SANKEY_CODE,
+    ]
+    return '\n'.join(lines)
+
+
+# Tipo canónico -> generador del dibujo (recibe el encoding ya parseado)
+TYPE_PLOTS = {
+    'caja': _box_code,
+    'densidad': _density_code,
+    'violin': _density_code,
+    'gantt': _gantt_code,
+    'linea_tendencia': _trend_code,
+    'mapa_puntos': _map_code,
+    'espacial': _map_code,
+    'mapa_calor_geografico': _map_code,
+    'burbujas': _bubble_code,
+    'treemap': _treemap_code,
+    'sankey': _sankey_code,
+}
@@ -1,22 +1,51 @@
 # Exportador para proyectos de desarrollo Power BI 
 # Genera proyectos completos listos para compilar con 'pbiviz package'
 from ..base import IExporter
+from ...core import tracing
 import json
 import os
 import base64
 from datetime import datetime
 import uuid
 import shutil
+import re
+import unicodedata
+from .d3_renderers import build_visual_ts, VISUAL_LESS
+from .dax import build_measures, build_capabilities, render_dax_script
+
+# Versiones fijadas de la cadena de herramientas. En modo workspace se declaran una sola
+# vez en el package.json raíz, de modo que npm instala un único árbol compartido.
+TOOLCHAIN_VERSIONS = {
+    "powerbi-visuals-tools": "5.4.3",
+    "@typescript-eslint/eslint-plugin": "7.8.0",
+    "@typescript-eslint/parser": "7.8.0",
+    "eslint": "8.57.0",
+    "typescript": "5.4.5"
+}
+
+RUNTIME_VERSIONS = {
+    "powerbi-visuals-api": "5.8.0",
+    "d3": "7.9.0",
+    "@types/d3": "7.4.3"
+}
+
+# Paralelismo por defecto del script build_all.js del workspace
+DEFAULT_BUILD_JOBS = 4
 
 class PowerBIPythonExporter(IExporter):
-    def export(self, spec, output_path: str):
-        """Genera un proyecto de desarrollo Power BI completo listo para compilación"""
+    @tracing.traced('export:powerbi_project')
+    def export(self, spec, output_path: str, workspace: bool = False):
+        """
+        Genera un proyecto de desarrollo Power BI completo listo para compilación.
+        Con workspace=True el package.json del proyecto no declara devDependencies:
+        la cadena de herramientas la aporta el package.json raíz del workspace.
+        """
         try:
             # Extraer información del spec
             spec_dict = getattr(spec, 'dict', lambda: spec)() if hasattr(spec, 'dict') else spec
             chart_type = spec_dict.get('type', 'barras_vertical')
-            title = spec_dict.get('title', 'Gráfico Sin Título')
-            description = spec_dict.get('description', 'Gráfico creado con Creador de Gráficos')
+            title = spec_dict.get('title') or 'Gráfico Sin Título'
+            description = spec_dict.get('description') or 'Gráfico creado con Creador de Gráficos'
             
             # Crear directorio del proyecto (no ZIP, sino directorio completo)
             project_name = os.path.splitext(os.path.basename(output_path))[0]
@@ -62,68 +91,16 @@ class PowerBIPythonExporter(IExporter):
             with open(os.path.join(project_dir, 'pbiviz.json'), 'w', encoding='utf-8') as f:
                 json.dump(pbiviz_config, f, indent=2, ensure_ascii=False)
             
-            # 2. capabilities.json - define qué datos puede recibir el visual
-            capabilities = {
-                "privileges": [],
-                "dataRoles": [
-                    {
-                        "displayName": "Category",
-                        "name": "category",
-                        "kind": "Grouping",
-                        "description": "Data to be grouped"
-                    },
-                    {
-                        "displayName": "Values", 
-                        "name": "values",
-                        "kind": "Measure",
-                        "description": "Data values"
-                    }
-                ],
-                "dataViewMappings": [
-                    {
-                        "conditions": [
-                            {
-                                "category": {"max": 1},
-                                "values": {"max": 1}
-                            }
-                        ],
-                        "categorical": {
-                            "categories": {
-                                "for": {"in": "category"}
-                            },
-                            "values": {
-                                "select": [{"for": {"in": "values"}}]
-                            }
-                        }
-                    }
-                ],
-                "objects": {
-                    "general": {
-                        "displayName": "General",
-                        "properties": {
-                            "formatString": {
-                                "type": {"formatting": {"formatString": True}}
-                            }
-                        }
-                    },
-                    "dataPoint": {
-                        "displayName": "Data colors",
-                        "properties": {
-                            "fill": {
-                                "displayName": "Fill",
-                                "type": {"fill": {"solid": {"color": True}}}
-                            }
-                        }
-                    }
-                },
-                "sorting": {
-                    "custom": {}
-                },
-                "supportsHighlight": True
-            }
+            # 2. capabilities.json - roles enlazados a las medidas DAX (agregación en el motor)
+            measures = build_measures(spec_dict)
+            capabilities = build_capabilities(spec_dict, measures)
             
             with open(os.path.join(project_dir, 'capabilities.json'), 'w', encoding='utf-8') as f:
-                json.dump(capabilities, f, indent=2)
+                json.dump(capabilities, f, indent=2, ensure_ascii=False)
+            
+            # 2.1 measures.dax - medidas a crear en el modelo de Power BI
+            with open(os.path.join(project_dir, 'measures.dax'), 'w', encoding='utf-8') as f:
+                f.write(render_dax_script(spec_dict, measures))
             
             # 3. package.json - definición del paquete NPM
             package_json = {
@@ -135,292 +112,25 @@ class PowerBIPythonExporter(IExporter):
                     "build": "pbiviz package",
                     "start": "pbiviz start"
                 },
-                "dependencies": {
-                    "d3": "^7.0.0",
-                    "@types/d3": "^7.0.0"
-                },
-                "devDependencies": {
-                    "powerbi-visuals-tools": "latest",
-                    "@typescript-eslint/eslint-plugin": "latest",
-                    "@typescript-eslint/parser": "latest",
-                    "eslint": "latest",
-                    "typescript": "latest"
-                }
+                "dependencies": dict(RUNTIME_VERSIONS),
+                "devDependencies": dict(TOOLCHAIN_VERSIONS)
             }
             
+            if workspace:
+                # Nombre único dentro del workspace y herramientas heredadas de la raíz
+                package_json["name"] = f"creador-graficos-{_slugify(project_name)}"
+                package_json["private"] = True
+                del package_json["devDependencies"]
+            
             with open(os.path.join(project_dir, 'package.json'), 'w', encoding='utf-8') as f:
                 json.dump(package_json, f, indent=2)
-            
-            # 4. visual.ts - código principal del visual
-            typescript_code = f'''/**
- * Visual personalizado para Power BI - {title}
- * Generado por Creador de Gráficos  
- * Tipo: {chart_type}
- */
-
-"use strict";
-
-import "./../style/visual.less";
-import powerbi from "powerbi-visuals-api";
-
-import VisualConstructorOptions = powerbi.extensibility.visual.VisualConstructorOptions;
-import VisualUpdateOptions = powerbi.extensibility.visual.VisualUpdateOptions;
-import IVisual = powerbi.extensibility.visual.IVisual;
-import DataView = powerbi.DataView;
-
-export class Visual implements IVisual {{
-    private target: HTMLElement;
-
-    constructor(options: VisualConstructorOptions) {{
-        this.target = options.element;
-        
-        // Crear contenedor principal
-        this.target.innerHTML = `
-            <div class="visual-container">
-                <div class="chart-header">
-                    <h3 class="chart-title">{title}</h3>
-                    <p class="chart-description">{description}</p>
-                </div>
-                <div id="chartContainer" class="chart-container">
-                    <div class="placeholder">
-                        <div class="placeholder-icon">📊</div>
-                        <h4>Visual {chart_type} listo</h4>
-                        <p>Conecta tus datos para visualizar el gráfico</p>
-                        <ul class="placeholder-instructions">
-                            <li>Arrastra campos a "Category" para el eje X</li>
-                            <li>Arrastra campos a "Values" para el eje Y</li>
-                        </ul>
-                    </div>
-                </div>
-            </div>
-        `;
-    }}
-
-    public update(options: VisualUpdateOptions) {{
-        const dataView: DataView = options.dataViews[0];
-        const chartContainer = this.target.querySelector('#chartContainer') as HTMLElement;
-        
-        if (!chartContainer) return;
-        
-        if (!dataView || !dataView.categorical) {{
-            // Mostrar placeholder si no hay datos
-            chartContainer.innerHTML = `
-                <div class="placeholder">
-                    <div class="placeholder-icon">📊</div>
-                    <h4>No hay datos disponibles</h4>
-                    <p>Conecta campos de datos para generar el gráfico {chart_type}</p>
-                </div>
-            `;
-            return;
-        }}
-        
-        const categorical = dataView.categorical;
-        const categories = categorical.categories;
-        const values = categorical.values;
-        
-        // Procesar datos
-        let chartData = [];
-        if (categories && categories[0] && values && values[0]) {{
-            const categoryData = categories[0];
-            const valueData = values[0];
-            
-            for (let i = 0; i < categoryData.values.length; i++) {{
-                chartData.push({{
-                    category: categoryData.values[i],
-                    value: valueData.values[i]
-                }});
-            }}
-        }}
-        
-        // Renderizar gráfico básico
-        this.renderChart(chartContainer, chartData, "{chart_type}");
-    }}
-    
-    private renderChart(container: HTMLElement, data: any[], chartType: string) {{
-        let chartHTML = `
-            <div class="chart-content">
-                <div class="chart-info">
-                    <h4>Gráfico ${{chartType}}</h4>
-                    <p>${{data.length}} elementos de datos</p>
-                </div>
-                <div class="data-preview">
-        `;
-        
-        // Mostrar muestra de datos
-        data.slice(0, 10).forEach((item, index) => {{
-            const maxValue = Math.max(...data.map(d => d.value || 0));
-            const width = maxValue > 0 ? Math.min(100, (item.value / maxValue) * 100) : 0;
-            chartHTML += `
-                <div class="data-item">
-                    <span class="category">${{item.category}}</span>
-                    <span class="value">${{item.value}}</span>
-                    <div class="bar" style="width: ${{width}}%"></div>
-                </div>
-            `;
-        }});
-        
-        if (data.length > 10) {{
-            chartHTML += `<p class="more-data">... y ${{data.length - 10}} elementos más</p>`;
-        }}
-        
-        chartHTML += `
-                </div>
-            </div>
-        `;
-        
-        container.innerHTML = chartHTML;
-    }}
-}}'''
-            
+            # 4. visual.ts - renderizador D3 incremental según el tipo de gráfico
             with open(os.path.join(project_dir, 'src', 'visual.ts'), 'w', encoding='utf-8') as f:
-                f.write(typescript_code)
-            
-            # 5. visual.less - estilos CSS/LESS
-            css_content = '''.visual-container {
-    width: 100%;
-    height: 100%;
-    font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, Arial, sans-serif;
-    display: flex;
-    flex-direction: column;
-    padding: 10px;
-    box-sizing: border-box;
-}
-
-.chart-header {
-    margin-bottom: 15px;
-    text-align: center;
-}
-
-.chart-title {
-    font-size: 18px;
-    font-weight: 600;
-    margin: 0 0 5px 0;
-    color: #333;
-}
-
-.chart-description {
-    font-size: 12px;
-    color: #666;
-    margin: 0;
-}
-
-.chart-container {
-    flex: 1;
-    border: 1px solid #e0e0e0;
-    border-radius: 6px;
-    display: flex;
-    align-items: center;
-    justify-content: center;
-    background-color: #fafafa;
-}
-
-.placeholder {
-    text-align: center;
-    padding: 40px 20px;
-}
-
-.placeholder-icon {
-    font-size: 48px;
-    margin-bottom: 15px;
-}
-
-.placeholder h4 {
-    margin: 0 0 10px 0;
-    font-size: 16px;
-    color: #333;
-}
-
-.placeholder p {
-    margin: 0 0 15px 0;
-    color: #666;
-    font-size: 14px;
-}
-
-.placeholder-instructions {
-    text-align: left;
-    max-width: 300px;
-    margin: 0 auto;
-}
-
-.placeholder-instructions li {
-    margin: 5px 0;
-    color: #777;
-    font-size: 12px;
-}
-
-.chart-content {
-    width: 100%;
-    height: 100%;
-    padding: 20px;
-    box-sizing: border-box;
-}
-
-.chart-info {
-    margin-bottom: 15px;
-    text-align: center;
-}
-
-.chart-info h4 {
-    margin: 0 0 5px 0;
-    color: #333;
-}
-
-.chart-info p {
-    margin: 0;
-    font-size: 12px;
-    color: #666;
-}
-
-.data-preview {
-    max-height: 300px;
-    overflow-y: auto;
-    border: 1px solid #ddd;
-    border-radius: 4px;
-    background: white;
-}
-
-.data-item {
-    display: flex;
-    align-items: center;
-    padding: 8px 12px;
-    border-bottom: 1px solid #f0f0f0;
-    position: relative;
-}
-
-.data-item:last-child {
-    border-bottom: none;
-}
-
-.category {
-    min-width: 100px;
-    font-weight: 500;
-    margin-right: 15px;
-}
-
-.value {
-    min-width: 60px;
-    text-align: right;
-    margin-right: 15px;
-    font-family: monospace;
-}
-
-.bar {
-    height: 4px;
-    background: linear-gradient(90deg, #0078d4, #106ebe);
-    border-radius: 2px;
-    min-width: 2px;
-}
-
-.more-data {
-    text-align: center;
-    padding: 10px;
-    color: #666;
-    font-size: 12px;
-    margin: 0;
-}'''
+                f.write(build_visual_ts(spec_dict))
             
+            # 5. visual.less - estilos de los renderizadores D3
             with open(os.path.join(project_dir, 'style', 'visual.less'), 'w', encoding='utf-8') as f:
-                f.write(css_content)
+                f.write(VISUAL_LESS)
             
             # 6. tsconfig.json - configuración TypeScript
             tsconfig = {
@@ -504,6 +214,7 @@ pbiviz start
 ├── assets/
 │   └── icon.png           # Icono del visual (20x20px)
 ├── capabilities.json      # Capacidades y configuración
+├── measures.dax           # Medidas DAX a crear en el modelo
 ├── pbiviz.json           # Metadata del visual
 ├── package.json          # Dependencias NPM
 ├── tsconfig.json         # Configuración TypeScript
@@ -517,6 +228,13 @@ pbiviz start
 - Modifica `style/visual.less` para cambiar los estilos
 - Actualiza `capabilities.json` para cambiar los datos que acepta el visual
 
+## 🧮 Medidas DAX
+
+`measures.dax` contiene las medidas que corresponden a los agregados del gráfico.
+Créalas en el modelo (o pégalas en DAX Studio / Tabular Editor) y arrástralas al rol
+"Values": la agregación se ejecuta en el motor de Power BI y el visual sólo recibe
+las filas ya agregadas por la categoría y la serie.
+
 ## ℹ️ Información Técnica
 
 - **API Version**: 5.8.0
@@ -572,4 +290,164 @@ Thumbs.db
                 "message": f"Error al generar proyecto Power BI: {str(e)}",
                 "project_path": None,
                 "instructions": None
-            }
\ No newline at end of file
+            }
+
+    @tracing.traced('export:powerbi_workspace')
+    def export_workspace(self, specs, workspace_dir: str, max_parallel: int = DEFAULT_BUILD_JOBS):
+        """
+        Genera varios proyectos Power BI dentro de un único workspace npm.
+        Las dependencias se declaran fijadas una sola vez en la raíz y build_all.js
+        compila todos los proyectos con un número acotado de procesos en paralelo.
+        """
+        try:
+            visuals_dir = os.path.join(workspace_dir, 'visuals')
+            
+            # Se conservan node_modules y package-lock.json de la raíz para reutilizar la instalación
+            if os.path.exists(visuals_dir):
+                shutil.rmtree(visuals_dir)
+            os.makedirs(visuals_dir, exist_ok=True)
+            
+            projects = []
+            used_names = set()
+            for index, spec in enumerate(specs, start=1):
+                spec_dict = spec.model_dump() if hasattr(spec, 'model_dump') else spec
+                base_name = _slugify(spec_dict.get('title') or spec_dict.get('type', 'visual')) or 'visual'
+                # El sufijo puede coincidir con otro título ("ventas_3"): se busca uno libre
+                name, suffix = base_name, index
+                while name in used_names:
+                    name = f"{base_name}_{suffix}"
+                    suffix += 1
+                used_names.add(name)
+                
+                result = self.export(spec_dict, os.path.join(visuals_dir, f"{name}.pbiviz"), workspace=True)
+                if not result["success"]:
+                    return {
+                        "success": False,
+                        "message": f"Error en el proyecto '{name}': {result['message']}",
+                        "project_path": None,
+                        "instructions": None
+                    }
+                projects.append(os.path.relpath(result["project_path"], workspace_dir).replace(os.sep, '/'))
+            
+            # package.json raíz: manifiesto único de dependencias fijadas
+            root_package = {
+                "name": "creador-graficos-workspace",
+                "version": "1.0.0",
+                "private": True,
+                "workspaces": ["visuals/*"],
+                "scripts": {
+                    "build": f"node build_all.js --jobs {max_parallel}"
+                },
+                "dependencies": dict(RUNTIME_VERSIONS),
+                "devDependencies": dict(TOOLCHAIN_VERSIONS)
+            }
+            
+            with open(os.path.join(workspace_dir, 'package.json'), 'w', encoding='utf-8') as f:
+                json.dump(root_package, f, indent=2)
+            
+            with open(os.path.join(workspace_dir, 'build_all.js'), 'w', encoding='utf-8') as f:
+                f.write(BUILD_ALL_JS.replace('__DEFAULT_JOBS__', str(max_parallel)))
+            
+            with open(os.path.join(workspace_dir, '.gitignore'), 'w', encoding='utf-8') as f:
+                f.write("node_modules/\n**/dist/\n**/.tmp/\n*.pbiviz\n")
+            
+            readme_content = f'''# Workspace de visuales Power BI
+
+Workspace npm generado por **Creador de Gráficos** con {len(projects)} proyectos en `visuals/`.
+
+Las dependencias están fijadas una sola vez en `package.json` de esta carpeta, así que la
+instalación y la caché de compilación se comparten entre todos los proyectos.
+
+```bash
+npm install        # una sola vez para todo el workspace
+npm run build      # compila todos los proyectos ({max_parallel} en paralelo)
+node build_all.js --jobs 8 visuals/mi_visual_PowerBI_Project   # subconjunto / otro paralelismo
+```
+
+Cada proyecto deja su `.pbiviz` en `visuals/<proyecto>/dist/`.
+'''
+            
+            with open(os.path.join(workspace_dir, 'README.md'), 'w', encoding='utf-8') as f:
+                f.write(readme_content)
+            
+            return {
+                "success": True,
+                "message": f"Workspace Power BI con {len(projects)} proyectos creado en: {workspace_dir}",
+                "project_path": workspace_dir,
+                "projects": projects,
+                "instructions": f"Para compilar: cd '{workspace_dir}' && npm install && npm run build"
+            }
+            
+        except Exception as e:
+            return {
+                "success": False,
+                "message": f"Error al generar workspace Power BI: {str(e)}",
+                "project_path": None,
+                "instructions": None
+            }
+
+
+def _slugify(text: str) -> str:
+    """Convierte un texto en un nombre apto para carpetas y paquetes npm."""
+    ascii_text = unicodedata.normalize('NFKD', str(text)).encode('ascii', 'ignore').decode('ascii')
+    return re.sub(r'[^a-z0-9]+', '_', ascii_text.lower()).strip('_')
+
+
+# Script de compilación del workspace: ejecuta 'pbiviz package' en cada proyecto
+# con un máximo de N procesos simultáneos usando el pbiviz instalado en la raíz.
+BUILD_ALL_JS = '''#!/usr/bin/env node
+// Generado por Creador de Gráficos: compila todos los visuales del workspace
+"use strict";
+
+const { spawn } = require("child_process");
+const fs = require("fs");
+const path = require("path");
+
+const root = __dirname;
+const args = process.argv.slice(2);
+let jobs = Number(process.env.PBIVIZ_JOBS) || __DEFAULT_JOBS__;
+const selected = [];
+for (let i = 0; i < args.length; i++) {
+    if (args[i] === "--jobs") {
+        jobs = Math.max(1, Number(args[++i]) || jobs);
+    } else {
+        selected.push(path.resolve(root, args[i]));
+    }
+}
+
+const visualsDir = path.join(root, "visuals");
+const projects = selected.length ? selected : fs.readdirSync(visualsDir)
+    .map(name => path.join(visualsDir, name))
+    .filter(dir => fs.existsSync(path.join(dir, "pbiviz.json")));
+const pbiviz = path.join(root, "node_modules", ".bin", process.platform === "win32" ? "pbiviz.cmd" : "pbiviz");
+
+function build(projectDir) {
+    return new Promise(resolve => {
+        const started = Date.now();
+        const child = spawn(pbiviz, ["package"], { cwd: projectDir, stdio: "inherit", shell: process.platform === "win32" });
+        child.on("error", error => resolve({ projectDir, code: 1, error }));
+        child.on("close", code => resolve({ projectDir, code, seconds: (Date.now() - started) / 1000 }));
+    });
+}
+
+async function main() {
+    const queue = projects.slice();
+    const results = [];
+    const workers = Array.from({ length: Math.min(jobs, queue.length) }, async () => {
+        while (queue.length) {
+            results.push(await build(queue.shift()));
+        }
+    });
+    await Promise.all(workers);
+
+    const failed = results.filter(r => r.code !== 0);
+    for (const r of results) {
+        const status = r.code === 0 ? "OK   " : "ERROR";
+        console.log(`${status} ${path.relative(root, r.projectDir)}${r.seconds ? ` (${r.seconds.toFixed(1)} s)` : ""}`);
+    }
+    console.log(`${results.length - failed.length}/${results.length} proyectos compilados con ${jobs} procesos`);
+    process.exit(failed.length ? 1 : 0);
+}
+
+main();
+'''
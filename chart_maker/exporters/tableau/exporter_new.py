@@ -1,51 +1,325 @@
 # exporter.py
 # Exportador para archivos .twb/.twbx de Tableau
 from ..base import IExporter
+from ...core import tracing
 import json
 import xml.etree.ElementTree as ET
 import zipfile
 import os
-from datetime import datetime
+import csv
+from datetime import date, datetime
+import numpy as np
+from ...core.aggregation import bin_step, split_encoding
+from ...core.chart_types import chart_type_info
+from ...core.datasets import resolve_data
+from ...core.shared_data import ColumnarRows
+
+try:
+    # Opcional: sin la Hyper API no se escribe extracto y Tableau lo crea desde el CSV
+    from tableauhyperapi import (Connection, CreateMode, HyperProcess, Inserter, SqlType,
+                                 TableDefinition, TableName, Telemetry)
+except ImportError:
+    HyperProcess = None
+
+DATASOURCE_NAME = 'federated.datasource'
+DATA_FILENAME = 'datos.csv'
+EXTRACT_FILENAME = 'datos.hyper'
+
+# Agregado canónico -> (derivación de Tableau, prefijo de la instancia de columna)
+AGGREGATE_DERIVATIONS = {
+    'sum': ('Sum', 'sum'),
+    'mean': ('Avg', 'avg'),
+    'min': ('Min', 'min'),
+    'max': ('Max', 'max'),
+    'median': ('Median', 'med'),
+    'count': ('Count', 'cnt'),
+    'distinct': ('CountD', 'ctd'),
+}
+
+# Canal del ChartSpec -> encoding de la tarjeta de marcas (x/y van a los estantes)
+MARK_CHANNELS = {
+    'color': 'color',
+    'size': 'size',
+    'radius': 'size',
+    'theta': 'wedge-size',
+    'shape': 'shape',
+    'text': 'text',
+    'value': 'text',
+    'detail': 'lod',
+}
+
+TYPE_SUFFIXES = {'nominal': 'nk', 'ordinal': 'ok', 'quantitative': 'qk'}
+
+
+def _data_rows(data):
+    """Filas del spec como lista de dicts (acepta lista, {'values': [...]} o {'dataset': ...})."""
+    data = resolve_data(data)
+    if isinstance(data, dict):
+        data = data.get('values') or []
+    # Columnas compartidas: las filas se crean al escribir el CSV, sin guardar la lista
+    if isinstance(data, ColumnarRows):
+        return data
+    return [row for row in (data or []) if isinstance(row, dict)]
+
+
+def _infer_datatype(rows, field):
+    """Deduce el datatype de Tableau de un campo a partir de los datos."""
+    values = [row.get(field) for row in rows[:1000] if row.get(field) is not None]
+    if not values:
+        return 'string'
+    if all(isinstance(v, bool) for v in values):
+        return 'boolean'
+    if all(isinstance(v, int) and not isinstance(v, bool) for v in values):
+        return 'integer'
+    if all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in values):
+        return 'real'
+    if all(isinstance(v, str) and len(v) >= 7 and v[:4].isdigit() and v[4] == '-' for v in values):
+        return 'date'
+    return 'string'
+
+
+def _bin_size(rows, field, bin_def):
+    """Tamaño de bin: 'step' explícito o un paso 'redondo' según maxbins y el rango de datos."""
+    if isinstance(rows, ColumnarRows):
+        # Rango de la columna compartida, sin crear las filas
+        values = rows.numeric(field) if not rows.is_text(field) else np.zeros(0)
+        values = values[np.isfinite(values)].tolist()
+    else:
+        values = [row[field] for row in rows if isinstance(row.get(field), (int, float))]
+    return bin_step(min(values, default=0), max(values, default=0), bin_def)
+
+
+def _plan_fields(encoding, rows):
+    """
+    Traduce el encoding a columnas e instancias de Tableau: las medidas usan la
+    derivación del agregado (pills SUM/AVG/...) y los bins una columna calculada.
+    """
+    dimensions, measures = split_encoding(encoding)
+    fields = []
+    for dim in dimensions:
+        field = dim['field']
+        entry = {'channel': dim['channel'], 'field': field, 'role': 'dimension', 'aggregated': False,
+                 'datatype': _infer_datatype(rows, field), 'column': f'[{field}]'}
+        if dim.get('bin'):
+            entry['bin_size'] = _bin_size(rows, field, dim['bin'])
+            entry['bin_parameter'] = f'[Parameter {field} (bin)]'
+            entry['column'] = f'[{field} (bin)]'
+            entry.update(type='ordinal', derivation='None', instance=f'[none:{field} (bin):ok]')
+        elif dim['type'] == 'temporal':
+            entry['datatype'] = 'date'
+            entry.update(type='quantitative', derivation='Day-Trunc', instance=f'[tdy:{field}:qk]')
+        else:
+            field_type = 'ordinal' if dim['type'] == 'ordinal' else ('quantitative' if dim['type'] == 'quantitative' else 'nominal')
+            if field_type == 'quantitative':
+                entry['role'] = 'measure'
+            entry.update(type=field_type, derivation='None',
+                         instance=f"[none:{field}:{TYPE_SUFFIXES[field_type]}]")
+        fields.append(entry)
+
+    for measure in measures:
+        derivation, prefix = AGGREGATE_DERIVATIONS[measure['aggregate']]
+        field = measure['field']
+        if field is None:
+            # 'count' sin campo: suma de la columna calculada de número de registros
+            field, derivation, prefix = 'Number of Records', 'Sum', 'sum'
+        fields.append({'channel': measure['channel'], 'field': field, 'role': 'measure', 'aggregated': True,
+                       'datatype': 'integer' if field == 'Number of Records' else _infer_datatype(rows, field),
+                       'column': f'[{field}]', 'type': 'quantitative', 'derivation': derivation,
+                       'instance': f'[{prefix}:{field}:qk]'})
+    return fields
+
+
+def _datasource_columns(fields):
+    """Elementos <column> del datasource, incluidas las columnas calculadas."""
+    columns = []
+    seen = set()
+    for f in fields:
+        if f.get('bin_size') is not None and f['field'] not in seen:
+            # Columna base del bin
+            base = ET.Element('column')
+            base.set('datatype', f['datatype'])
+            base.set('name', f"[{f['field']}]")
+            base.set('role', 'measure')
+            base.set('type', 'quantitative')
+            columns.append(base)
+            seen.add(f['field'])
+        if f['column'] in seen:
+            continue
+        seen.add(f['column'])
+        column = ET.Element('column')
+        column.set('name', f['column'])
+        column.set('role', f['role'])
+        if f.get('bin_size') is not None:
+            column.set('caption', f"{f['field']} (bin)")
+            column.set('datatype', 'integer')
+            column.set('type', 'ordinal')
+            calculation = ET.SubElement(column, 'calculation')
+            calculation.set('class', 'bin')
+            calculation.set('decimals', '-1')
+            calculation.set('formula', f"[{f['field']}]")
+            calculation.set('peg', '0')
+            calculation.set('size-parameter', f"[Parameters].{f['bin_parameter']}")
+        elif f['field'] == 'Number of Records':
+            column.set('datatype', 'integer')
+            column.set('type', 'quantitative')
+            calculation = ET.SubElement(column, 'calculation')
+            calculation.set('class', 'tableau')
+            calculation.set('formula', '1')
+        else:
+            column.set('datatype', f['datatype'])
+            column.set('type', 'quantitative' if f['role'] == 'measure' else ('ordinal' if f['type'] == 'ordinal' else 'nominal'))
+        columns.append(column)
+    return columns
+
+
+def _shelf_text(fields, channel):
+    """Contenido del estante (rows/cols) para el canal x o y."""
+    return ' * '.join(f"[{DATASOURCE_NAME}].{f['instance']}" for f in fields if f['channel'] == channel) or None
+
+
+def _plan_filters(predicates, rows):
+    """
+    Normaliza options.filters (predicados estilo Vega-Lite: oneOf/equal, range,
+    gte/lte/gt/lt) en filtros categóricos o cuantitativos de Tableau.
+    """
+    filters = []
+    for predicate in predicates:
+        field = predicate.get('field')
+        if not field:
+            continue
+        if 'oneOf' in predicate or 'equal' in predicate:
+            members = predicate.get('oneOf', [predicate.get('equal')])
+            filters.append({'class': 'categorical', 'field': field, 'members': list(members)})
+            continue
+        low, high = (predicate.get('range') or [None, None])[:2]
+        low = predicate.get('gte', predicate.get('gt', low))
+        high = predicate.get('lte', predicate.get('lt', high))
+        if low is None and high is None:
+            continue
+        filters.append({'class': 'quantitative', 'field': field, 'min': low, 'max': high,
+                        'datatype': _infer_datatype(rows, field)})
+    return filters
+
+
+def _filter_element(flt, datasource_name, extract_filter=False):
+    """Elemento <filter> de Tableau para un filtro normalizado."""
+    field = flt['field']
+    element = ET.Element('filter')
+    element.set('class', flt['class'])
+    if flt['class'] == 'categorical':
+        level = f'[none:{field}:nk]'
+        element.set('column', f'[{datasource_name}].{level}')
+        union = ET.SubElement(element, 'groupfilter')
+        union.set('function', 'union')
+        union.set('user:op', 'manual')
+        for member in flt['members']:
+            member_filter = ET.SubElement(union, 'groupfilter')
+            member_filter.set('function', 'member')
+            member_filter.set('level', level)
+            member_filter.set('member', json.dumps(member, ensure_ascii=False))
+    else:
+        element.set('column', f'[{datasource_name}].[{field}]')
+        if flt['min'] is not None and flt['max'] is not None:
+            element.set('included-values', 'in-range')
+        elif flt['min'] is not None:
+            element.set('included-values', 'at-least')
+        else:
+            element.set('included-values', 'at-most')
+        if flt['min'] is not None:
+            ET.SubElement(element, 'min').text = str(flt['min'])
+        if flt['max'] is not None:
+            ET.SubElement(element, 'max').text = str(flt['max'])
+    if extract_filter:
+        element.set('filter-group', '2')
+    return element
+
+
+def _fieldnames(rows):
+    """Unión de las claves de las filas, en orden de aparición."""
+    if isinstance(rows, ColumnarRows):
+        return rows.fields
+    return list(dict.fromkeys(key for row in rows for key in row))
+
+
+def _write_csv(path, rows):
+    """Escribe las filas del spec como CSV (cabecera con la unión de claves)."""
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        if isinstance(rows, ColumnarRows):
+            writer = csv.writer(f)
+            writer.writerow(rows.fields)
+            writer.writerows(rows.tuples())
+            return
+        writer = csv.DictWriter(f, fieldnames=_fieldnames(rows))
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def _hyper_value(value, datatype):
+    """Valor de una celda convertido al tipo de su columna del extracto (None si no encaja)."""
+    if value is None or value == '':
+        return None
+    try:
+        if datatype == 'integer':
+            return int(value)
+        if datatype == 'real':
+            return float(value)
+        if datatype == 'boolean':
+            return bool(value)
+        if datatype == 'date':
+            return date.fromisoformat(value[:10] if len(value) >= 10 else value[:7] + '-01')
+    except (TypeError, ValueError):
+        return None
+    return str(value)
+
+
+def _write_hyper(path, rows):
+    """Escribe las filas como extracto .hyper (tabla [Extract].[Extract]) con la Hyper API."""
+    sql_types = {'integer': SqlType.big_int(), 'real': SqlType.double(),
+                 'boolean': SqlType.bool(), 'date': SqlType.date()}
+    columns = [(field, _infer_datatype(rows, field)) for field in _fieldnames(rows)]
+    table = TableDefinition(TableName('Extract', 'Extract'),
+                            [TableDefinition.Column(field, sql_types.get(datatype, SqlType.text()))
+                             for field, datatype in columns])
+    with HyperProcess(Telemetry.DO_NOT_SEND_USAGE_DATA_TO_TABLEAU) as hyper:
+        with Connection(hyper.endpoint, path, CreateMode.CREATE_AND_REPLACE) as connection:
+            connection.catalog.create_schema('Extract')
+            connection.catalog.create_table(table)
+            with Inserter(connection, table) as inserter:
+                inserter.add_rows([_hyper_value(row.get(field), datatype) for field, datatype in columns]
+                                  for row in rows)
+                inserter.execute()
+
+
+def _write_data(data_dir, rows, extract):
+    """CSV de la conexión textscan y, si el workbook lo referencia, el extracto .hyper."""
+    os.makedirs(data_dir, exist_ok=True)
+    _write_csv(os.path.join(data_dir, DATA_FILENAME), rows)
+    if extract:
+        os.makedirs(os.path.join(data_dir, 'Extracts'), exist_ok=True)
+        _write_hyper(os.path.join(data_dir, 'Extracts', EXTRACT_FILENAME), rows)
 
 class TableauExporter(IExporter):
+    @tracing.traced('export:tableau')
     def export(self, spec, output_path: str):
         """Genera un archivo .twb o .twbx para Tableau con la especificación del gráfico"""
         try:
             # Extraer información del spec
             spec_dict = getattr(spec, 'dict', lambda: spec)() if hasattr(spec, 'dict') else spec
             chart_type = spec_dict.get('type', 'barras_vertical')
-            title = spec_dict.get('title', 'Gráfico Sin Título')
-            description = spec_dict.get('description', 'Gráfico creado con Creador de Gráficos')
-            width = spec_dict.get('width', 800)
-            height = spec_dict.get('height', 600)
-            
-            # Mapeo de tipos de gráfico a Tableau
-            tableau_chart_types = {
-                'barras_vertical': 'bar',
-                'bar_chart_vertical': 'bar',
-                'barras_horizontal': 'horizontal-bar',
-                'bar_chart_horizontal': 'horizontal-bar',
-                'columnas': 'bar',
-                'column_chart': 'bar',
-                'lineas': 'line',
-                'line_chart': 'line',
-                'area': 'area',
-                'area_chart': 'area',
-                'circular': 'pie',
-                'pie_chart': 'pie',
-                'dispersion': 'scatter',
-                'scatter_plot': 'scatter',
-                'mapa_calor': 'heatmap',
-                'heatmap': 'heatmap'
-            }
-            
-            tableau_type = tableau_chart_types.get(chart_type, 'bar')
+            title = spec_dict.get('title') or 'Gráfico Sin Título'
+            description = spec_dict.get('description') or 'Gráfico creado con Creador de Gráficos'
+            width = spec_dict.get('width') or 800
+            height = spec_dict.get('height') or 600
+            
+            # Clase de marca de Tableau precalculada en el registro de tipos
+            tableau_type = chart_type_info(chart_type).tableau_mark
             
             # Crear XML para Tableau Workbook (.twb)
             workbook = ET.Element('workbook')
             workbook.set('source-build', '2023.1.0 (20223.23.0213.2227)')
             workbook.set('source-platform', 'win')
             workbook.set('version', '18.1')
+            workbook.set('xmlns:user', 'http://www.tableausoftware.com/xml/user')
             
             # Metadata del documento
             document_format = ET.SubElement(workbook, 'document-format-change-manifest')
@@ -66,44 +340,89 @@ class TableauExporter(IExporter):
             datasource.set('name', 'federated.datasource')
             datasource.set('version', '18.1')
             
-            # Conexión de datos
+            # Conexión de datos: CSV con las filas del spec (se empaqueta en el .twbx)
+            rows = _data_rows(spec_dict.get('data'))
+            options = spec_dict.get('options') or {}
+            fields = _plan_fields(spec_dict.get('encoding') or {}, rows)
+            filters = _plan_filters(options.get('filters') or [], rows)
+            # Los datos van en 'Data' dentro del .twbx o en '<nombre>_datos' junto al .twb
+            packaged = output_path.endswith('.twbx')
+            data_dir_name = 'Data' if packaged else f"{os.path.splitext(os.path.basename(output_path))[0]}_datos"
+            
             connection = ET.SubElement(datasource, 'connection')
             connection.set('class', 'federated')
             
             named_connections = ET.SubElement(connection, 'named-connections')
             named_connection = ET.SubElement(named_connections, 'named-connection')
-            named_connection.set('caption', 'DatosEjemplo')
-            named_connection.set('name', 'excel-direct.datos_ejemplo')
+            named_connection.set('caption', 'datos')
+            named_connection.set('name', 'textscan.datos')
             
-            # Datos de ejemplo incrustados
             connection_data = ET.SubElement(named_connection, 'connection')
-            connection_data.set('class', 'excel-direct')
-            connection_data.set('cleaning', 'no')
-            connection_data.set('compat', 'no')
-            connection_data.set('dataRefreshTime', '')
-            connection_data.set('filename', 'datos_ejemplo.xlsx')
-            connection_data.set('interpretationMode', '0')
+            connection_data.set('class', 'textscan')
+            connection_data.set('directory', data_dir_name)
+            connection_data.set('filename', DATA_FILENAME)
             connection_data.set('password', '')
             connection_data.set('server', '')
-            connection_data.set('validate', 'no')
-            
-            # Columnas de datos
-            cols = ET.SubElement(datasource, 'cols')
-            
-            # Columna categoría
-            col_cat = ET.SubElement(cols, 'column')
-            col_cat.set('datatype', 'string')
-            col_cat.set('name', '[Categoría]')
-            col_cat.set('role', 'dimension')
-            col_cat.set('semantic-role', '[Category]')
-            col_cat.set('type', 'nominal')
-            
-            # Columna valor
-            col_val = ET.SubElement(cols, 'column')
-            col_val.set('datatype', 'integer')
-            col_val.set('name', '[Valor]')
-            col_val.set('role', 'measure')
-            col_val.set('type', 'quantitative')
+            
+            relation = ET.SubElement(connection, 'relation')
+            relation.set('connection', 'textscan.datos')
+            relation.set('name', DATA_FILENAME)
+            relation.set('table', '[datos#csv]')
+            relation.set('type', 'table')
+            
+            # Extracto: filtros de extracción y agregación por dimensiones visibles,
+            # de modo que Tableau materializa sólo las filas agregadas que usa la hoja. Sin
+            # la Hyper API no se escribe el .hyper: el extracto se declara desactivado y
+            # Tableau aplica estos ajustes al crearlo desde el CSV
+            extract_options = options.get('extract') if isinstance(options.get('extract'), dict) else {}
+            declare_extract = options.get('extract') is not False
+            write_extract = declare_extract and HyperProcess is not None
+            if declare_extract:
+                extract = ET.SubElement(datasource, 'extract')
+                extract.set('count', '-1')
+                extract.set('enabled', 'true' if write_extract else 'false')
+                extract.set('units', 'records')
+                if extract_options.get('aggregate', True) and any(f['aggregated'] for f in fields):
+                    extract.set('aggregate-visible-dimensions', 'true')
+                    extract.set('rollup', 'true')
+                extract_connection = ET.SubElement(extract, 'connection')
+                extract_connection.set('class', 'hyper')
+                extract_connection.set('dbname', f'{data_dir_name}/Extracts/{EXTRACT_FILENAME}')
+                extract_connection.set('default-settings', 'yes')
+                extract_connection.set('schema', 'Extract')
+                extract_connection.set('tablename', 'Extract')
+                extract_connection.set('update-time', datetime.now().strftime('%m/%d/%Y %I:%M:%S %p'))
+                extract_relation = ET.SubElement(extract_connection, 'relation')
+                extract_relation.set('name', 'Extract')
+                extract_relation.set('table', '[Extract].[Extract]')
+                extract_relation.set('type', 'table')
+                for flt in filters:
+                    extract.append(_filter_element(flt, DATASOURCE_NAME, extract_filter=True))
+            
+            # Columnas de datos y columnas calculadas (bins, número de registros)
+            for column in _datasource_columns(fields):
+                datasource.append(column)
+            
+            # Parámetros con el tamaño de cada bin
+            bin_fields = [f for f in fields if f.get('bin_size') is not None]
+            if bin_fields:
+                parameters = ET.SubElement(datasources, 'datasource')
+                parameters.set('hasconnection', 'false')
+                parameters.set('inline', 'true')
+                parameters.set('name', 'Parameters')
+                parameters.set('version', '18.1')
+                for f in bin_fields:
+                    param = ET.SubElement(parameters, 'column')
+                    param.set('caption', f"Tamaño de bin {f['field']}")
+                    param.set('datatype', 'real')
+                    param.set('name', f['bin_parameter'])
+                    param.set('param-domain-type', 'range')
+                    param.set('role', 'measure')
+                    param.set('type', 'quantitative')
+                    param.set('value', repr(float(f['bin_size'])))
+                    param_calc = ET.SubElement(param, 'calculation')
+                    param_calc.set('class', 'tableau')
+                    param_calc.set('formula', repr(float(f['bin_size'])))
             
             # Worksheets (hojas de trabajo)
             worksheets = ET.SubElement(workbook, 'worksheets')
@@ -127,6 +446,31 @@ class TableauExporter(IExporter):
             view_config = ET.SubElement(view, 'view')
             view_config.set('name', f'[{title}]')
             
+            view_datasources = ET.SubElement(view_config, 'datasources')
+            view_datasource = ET.SubElement(view_datasources, 'datasource')
+            view_datasource.set('caption', 'Datos del Gráfico')
+            view_datasource.set('name', DATASOURCE_NAME)
+            
+            # Dependencias: columnas e instancias (pills) con su derivación (Sum, Avg, ...)
+            dependencies = ET.SubElement(view_config, 'datasource-dependencies')
+            dependencies.set('datasource', DATASOURCE_NAME)
+            for column in _datasource_columns(fields):
+                dependencies.append(column)
+            for f in fields:
+                instance = ET.SubElement(dependencies, 'column-instance')
+                instance.set('column', f['column'])
+                instance.set('derivation', f['derivation'])
+                instance.set('name', f['instance'])
+                instance.set('pivot', 'key')
+                instance.set('type', f['type'])
+            
+            # Filtros de la hoja
+            for flt in filters:
+                view_config.append(_filter_element(flt, DATASOURCE_NAME))
+            
+            aggregation = ET.SubElement(view_config, 'aggregation')
+            aggregation.set('value', 'true')
+            
             # Panes (paneles)
             panes = ET.SubElement(view, 'panes')
             pane = ET.SubElement(panes, 'pane')
@@ -136,16 +480,13 @@ class TableauExporter(IExporter):
             marks = ET.SubElement(pane, 'marks')
             marks.set('class', tableau_type)
             
-            # Codificaciones (encoding)
+            # Codificaciones (encoding): canales de marca con pills agregadas
             encodings = ET.SubElement(marks, 'encodings')
-            
-            # Eje X
-            x_encoding = ET.SubElement(encodings, 'text')
-            x_encoding.set('column', '[Categoría]')
-            
-            # Eje Y  
-            y_encoding = ET.SubElement(encodings, 'text')
-            y_encoding.set('column', '[Valor]')
+            for f in fields:
+                mark_channel = MARK_CHANNELS.get(f['channel'])
+                if mark_channel:
+                    encoding_elem = ET.SubElement(encodings, mark_channel)
+                    encoding_elem.set('column', f"[{DATASOURCE_NAME}].{f['instance']}")
             
             # Estilo de marcas
             style = ET.SubElement(marks, 'style')
@@ -154,6 +495,12 @@ class TableauExporter(IExporter):
             format_elem.set('attr', 'size')
             format_elem.set('value', '10')
             
+            # Estantes de filas y columnas
+            rows_shelf = ET.SubElement(view, 'rows')
+            rows_shelf.text = _shelf_text(fields, 'y')
+            cols_shelf = ET.SubElement(view, 'cols')
+            cols_shelf.text = _shelf_text(fields, 'x')
+            
             # Dashboards
             dashboards = ET.SubElement(workbook, 'dashboards')
             dashboard = ET.SubElement(dashboards, 'dashboard')
@@ -198,53 +545,44 @@ Gráfico generado por Creador de Gráficos
 Tipo: {chart_type}
 Título: {title}
 Descripción: {description}
-Especificación completa: {json.dumps(spec_dict, indent=2)}
+Especificación (sin filas de datos): {json.dumps({k: v for k, v in spec_dict.items() if k != 'data'}, indent=2, ensure_ascii=False)}
 """
             
             workbook.append(ET.Comment(comment_info))
             
             # Escribir el archivo .twb
-            tree = ET.ElementTree(workbook)
-            ET.indent(tree, space="  ", level=0)
-            
-            # Determinar si crear .twb o .twbx
-            if output_path.endswith('.twbx'):
-                # Crear archivo .twbx (es un ZIP con el .twb y datos)
-                temp_dir = os.path.join(os.path.dirname(output_path), 'temp_twbx')
-                os.makedirs(temp_dir, exist_ok=True)
-                
-                # Guardar el .twb en el directorio temporal
-                twb_path = os.path.join(temp_dir, 'workbook.twb')
-                tree.write(twb_path, encoding='utf-8', xml_declaration=True)
+            with tracing.span('tableau:write'):
+                tree = ET.ElementTree(workbook)
+                ET.indent(tree, space="  ", level=0)
+            
+                # Determinar si crear .twb o .twbx
+                if packaged:
+                    # Crear archivo .twbx (es un ZIP con el .twb y datos)
+                    temp_dir = os.path.join(os.path.dirname(output_path), 'temp_twbx')
+                    os.makedirs(temp_dir, exist_ok=True)
                 
-                # Crear datos de ejemplo
-                data_dir = os.path.join(temp_dir, 'Data')
-                os.makedirs(data_dir, exist_ok=True)
+                    # Guardar el .twb en el directorio temporal
+                    twb_path = os.path.join(temp_dir, 'workbook.twb')
+                    tree.write(twb_path, encoding='utf-8', xml_declaration=True)
                 
-                # Crear archivo de datos de ejemplo (CSV)
-                data_csv = os.path.join(data_dir, 'datos_ejemplo.csv')
-                with open(data_csv, 'w', encoding='utf-8') as f:
-                    f.write('Categoría,Valor\\n')
-                    f.write('A,23\\n')
-                    f.write('B,45\\n') 
-                    f.write('C,56\\n')
-                    f.write('D,78\\n')
-                    f.write('E,32\\n')
+                    # Datos del gráfico (CSV y extracto) referenciados por el workbook
+                    _write_data(os.path.join(temp_dir, data_dir_name), rows, write_extract)
                 
-                # Crear el archivo .twbx
-                with zipfile.ZipFile(output_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-                    for root, dirs, files in os.walk(temp_dir):
-                        for file in files:
-                            file_path = os.path.join(root, file)
-                            arc_name = os.path.relpath(file_path, temp_dir)
-                            zipf.write(file_path, arc_name)
+                    # Crear el archivo .twbx
+                    with zipfile.ZipFile(output_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
+                        for root, dirs, files in os.walk(temp_dir):
+                            for file in files:
+                                file_path = os.path.join(root, file)
+                                arc_name = os.path.relpath(file_path, temp_dir)
+                                zipf.write(file_path, arc_name)
                 
-                # Limpiar directorio temporal
-                import shutil
-                shutil.rmtree(temp_dir)
-            else:
-                # Crear archivo .twb simple
-                tree.write(output_path, encoding='utf-8', xml_declaration=True)
+                    # Limpiar directorio temporal
+                    import shutil
+                    shutil.rmtree(temp_dir)
+                else:
+                    # Crear archivo .twb simple con sus datos al lado
+                    tree.write(output_path, encoding='utf-8', xml_declaration=True)
+                    _write_data(os.path.join(os.path.dirname(output_path), data_dir_name), rows, write_extract)
             
             return True
             
@@ -19,14 +19,14 @@ def test_core_functionality():
     try:
         # Probar importación de módulos
         from chart_maker.core.chart_types import CHART_TYPES
-        from chart_maker.core.examples import EXAMPLES
+        from chart_maker.core.examples_new import EXAMPLES
         from chart_maker.core.spec import ChartSpec
         
         print(f"✅ {len(CHART_TYPES)} tipos de gráficos disponibles")
         print(f"✅ {len(EXAMPLES)} ejemplos cargados")
         
         # Probar validación
-        example_spec = EXAMPLES['bar']
+        example_spec = EXAMPLES['barras_vertical']
         print(f"✅ Validación funcionando: {example_spec.type}")
         
         return True
@@ -41,13 +41,13 @@ def test_exporters():
     
     try:
         from chart_maker.exporters import get_exporter, list_exporters
-        from chart_maker.core.examples import EXAMPLES
+        from chart_maker.core.examples_new import EXAMPLES
         
         exporters = list_exporters()
         print(f"✅ {len(exporters)} exportadores disponibles: {exporters}")
         
         # Probar cada exportador
-        test_spec = EXAMPLES['bar']
+        test_spec = EXAMPLES['barras_vertical']
         
         for exporter_name in exporters:
             try:
@@ -72,6 +72,16 @@ def test_exporters():
             except Exception as e:
                 print(f"❌ Exportador {exporter_name}: {e}")
         
+        # Workspace Power BI: títulos que chocan con el sufijo de otro proyecto
+        from chart_maker.exporters.powerbi_python.exporter_project import PowerBIPythonExporter
+        specs = [test_spec.model_copy(update={'title': title}) for title in ('ventas', 'ventas_3', 'ventas')]
+        with tempfile.TemporaryDirectory() as workspace:
+            result = PowerBIPythonExporter().export_workspace(specs, workspace)
+            assert result['success'], result['message']
+            projects = os.listdir(os.path.join(workspace, 'visuals'))
+            assert len(projects) == 3, f"Cada spec debe tener su proyecto: {sorted(projects)}"
+        print(f"✅ Workspace Power BI: {len(projects)} proyectos con nombres distintos")
+        
         return True
         
     except Exception as e:
@@ -133,6 +143,569 @@ C,200,2025-01-03"""
         print(f"❌ Error en procesamiento de datos: {e}")
         return False
 
+def test_lookml_export():
+    """Prueba que el LookML generado se puede parsear"""
+    print("\n🔎 Probando LookML de Looker...")
+    
+    try:
+        import lkml
+        from chart_maker.core.examples_new import EXAMPLES
+        from chart_maker.exporters.looker.exporter import build_lookml
+        
+        parsed = lkml.load(build_lookml(EXAMPLES['barras_vertical'].model_dump()))
+        explore = parsed['explores'][0]
+        
+        assert parsed['datagroups'], "Falta el datagroup"
+        assert len(parsed['views']) == 2, "Faltan la view base o la PDT de resumen"
+        assert explore['aggregate_tables'], "Falta la aggregate_table"
+        
+        print(f"✅ LookML válido: {len(parsed['views'])} views, {len(parsed['explores'])} explores")
+        
+        return True
+        
+    except Exception as e:
+        print(f"❌ Error en LookML: {e}")
+        return False
+
+def test_dataset_registry():
+    """Prueba las referencias a datasets compartidos y los bundles"""
+    print("\n🗃️ Probando registro de datasets...")
+    
+    try:
+        from chart_maker.core.datasets import DatasetRegistry, from_bundle, resolve_data, to_bundle
+        from chart_maker.core.examples_new import EXAMPLES
+        
+        spec = EXAMPLES['barras_vertical'].model_dump()
+        registry = DatasetRegistry()
+        ref = registry.add(spec['data'])
+        
+        assert registry.add(list(spec['data'])) == ref, "El mismo contenido debe dar la misma clave"
+        assert resolve_data(ref, registry) == spec['data']
+        
+        bundle = to_bundle([dict(spec, data=ref), dict(spec, data=ref)], registry)
+        assert len(bundle['datasets']) == 1, "El dataset debe escribirse una sola vez"
+        
+        loaded = DatasetRegistry()
+        from_bundle(bundle, loaded)
+        assert loaded.refcount(ref['dataset']) == 2
+        
+        print(f"✅ Dataset {ref['dataset'][:8]}… compartido: {registry.memory_usage()['total_nbytes']} bytes")
+        
+        return True
+        
+    except Exception as e:
+        print(f"❌ Error en registro de datasets: {e}")
+        return False
+
+def test_dax_measures():
+    """Prueba las medidas DAX y su enlace en capabilities.json"""
+    print("\n📐 Probando medidas DAX...")
+    
+    try:
+        from chart_maker.exporters.powerbi_python.dax import build_capabilities, build_measures, render_dax_script
+        
+        spec = {'type': 'burbujas', 'encoding': {
+            'x': {'field': 'región', 'type': 'nominal'},
+            'y': {'field': 'ventas', 'aggregate': 'sum', 'type': 'quantitative'},
+            'size': {'field': 'margen [%]', 'aggregate': 'mean', 'type': 'quantitative'},
+            'opacity': {'aggregate': 'sum'},
+        }}
+        measures = build_measures(spec)
+        assert [m['name'] for m in measures] == ['Suma de ventas', 'Promedio de margen [%]'], "Un agregado sin campo no debe convertirse en otro"
+        
+        script = render_dax_script(spec, measures)
+        assert "MEASURE 'Datos'[Promedio de margen [%]]] = AVERAGE('Datos'[margen [%]]])" in script, "Los ] de los nombres deben escaparse"
+        
+        capabilities = build_capabilities(spec, measures)
+        assert capabilities['dataViewMappings'][0]['conditions'][0]['values'] == {'max': 2}, "Todas las medidas deben enlazarse"
+        
+        print(f"✅ {len(measures)} medidas DAX enlazadas al rol values")
+        
+        return True
+        
+    except Exception as e:
+        print(f"❌ Error en medidas DAX: {e}")
+        return False
+
+def test_powerbi_python_scripts():
+    """Prueba que el script de Python de Power BI dibuja cada tipo con su gráfico"""
+    print("\n🐍 Probando scripts de Python de Power BI...")
+    
+    try:
+        from chart_maker.core.synthetic import template_for
+        from chart_maker.exporters.powerbi_python.exporter import build_script
+        
+        expected = {
+            'caja': ["quantile([0.25, 0.5, 0.75])", "ax.bxp("],
+            'densidad': ["np.histogram(x, bins=bordes)", "ax.fill_between(rejilla, curva"],
+            'violin': ["nucleo @ conteos", "ax.fill_betweenx(rejilla"],
+            'gantt': ["pd.to_datetime(df['inicio']", "ax.barh(tareas[orden], duracion[orden], left=inicio[orden]"],
+            'linea_tendencia': ["np.polyfit(parte['x'], parte['y'], 1)", "np.polyval(coeficientes"],
+            'mapa_puntos': ["ax.scatter(df['lon'], df['lat'], s=600 * df['valor']"],
+            'mapa_calor_geografico': ["ax.hexbin(df['lon'], df['lat'], C=df['valor']"],
+            'burbujas': ["ax.scatter(df['x'], df['y'], s=600 * df['tamaño']"],
+            'sankey': ["ORIGEN = 'origen'", "ax.fill_between(x, y, y + grueso"],
+            'treemap': ["ETIQUETA = 'categoria'", "plt.Rectangle("],
+        }
+        for chart_type, snippets in expected.items():
+            template = template_for(chart_type)
+            script = build_script({'type': chart_type, 'encoding': template['encoding'], 'data': template['data']})
+            compile(script, chart_type, 'exec')
+            for snippet in snippets:
+                assert snippet in script, f"{chart_type}: falta {snippet!r}"
+            assert "plot(kind='bar'" not in script, f"{chart_type} no debe caer en barras"
+        
+        print(f"✅ {len(expected)} tipos con dibujo propio en el script")
+        
+        # Ejecución con más tareas que MAX_PUNTOS (el caso que recorta); necesita matplotlib
+        try:
+            import matplotlib
+        except ImportError:
+            print("⚠️ matplotlib no disponible: no se ejecutan los scripts")
+            return True
+        import numpy as np
+        import pandas as pd
+        from chart_maker.exporters.powerbi_python.exporter import MAX_POINTS
+        template = template_for('gantt')
+        script = build_script({'type': 'gantt', 'encoding': template['encoding'], 'data': template['data']})
+        n = MAX_POINTS + 1000
+        starts = pd.Timestamp('2023-01-01') + pd.to_timedelta(np.arange(n), unit='h')
+        namespace = {'dataset': pd.DataFrame({'tarea': [f'T{i}' for i in range(n)], 'inicio': starts.astype(str),
+                                              'fin': (starts + pd.Timedelta(hours=5)).astype(str)})}
+        exec(compile(script, 'gantt', 'exec'), namespace)
+        assert len(namespace['tareas']) == MAX_POINTS, "El Gantt debe recortar a MAX_PUNTOS tareas"
+        assert any('primeras tareas' in aviso for aviso in namespace['avisos'])
+        
+        print(f"✅ Script de Gantt ejecutado con {n:,} tareas")
+        
+        return True
+        
+    except Exception as e:
+        print(f"❌ Error en scripts de Power BI: {e}")
+        return False
+
+def test_tableau_workbook_paths():
+    """Prueba que todos los ficheros que referencia el workbook de Tableau existen"""
+    print("\n📒 Probando rutas del workbook de Tableau...")
+    
+    try:
+        import xml.etree.ElementTree as ET
+        import zipfile
+        from chart_maker.core.examples_new import EXAMPLES
+        from chart_maker.exporters.tableau.exporter_new import TableauExporter
+        
+        def referenced(root):
+            paths = [f"{c.get('directory')}/{c.get('filename')}" for c in root.iter('connection') if c.get('class') == 'textscan']
+            # Un extracto desactivado (sin la Hyper API) no tiene .hyper: Tableau lo crea desde el CSV
+            return paths + [c.get('dbname') for e in root.iter('extract') if e.get('enabled') == 'true'
+                            for c in e.iter('connection') if c.get('class') == 'hyper']
+        
+        with tempfile.TemporaryDirectory() as directory:
+            twb = os.path.join(directory, 'grafico.twb')
+            assert TableauExporter().export(EXAMPLES['barras_vertical'], twb)
+            paths = referenced(ET.parse(twb).getroot())
+            for path in paths:
+                assert os.path.exists(os.path.join(directory, path)), f"Falta {path} junto al .twb"
+            
+            twbx = os.path.join(directory, 'grafico.twbx')
+            assert TableauExporter().export(EXAMPLES['barras_vertical'], twbx)
+            with zipfile.ZipFile(twbx) as archive:
+                names = set(archive.namelist())
+                packaged = referenced(ET.fromstring(archive.read('workbook.twb')))
+            for path in packaged:
+                assert path in names, f"Falta {path} en el .twbx"
+            
+            # Filtros de extracción y agregación, con o sin la Hyper API; extract=True vale
+            spec = dict(EXAMPLES['barras_vertical'].model_dump(),
+                        options={'extract': True, 'filters': [{'field': 'categoria', 'oneOf': ['Ventas', 'IT']}]})
+            filtered = os.path.join(directory, 'filtrado.twb')
+            assert TableauExporter().export(spec, filtered), "options.extract=True debe aceptarse"
+            extract = ET.parse(filtered).getroot().find('.//extract')
+            assert extract is not None and extract.find('filter') is not None, "Falta el filtro de extracción"
+            assert extract.get('aggregate-visible-dimensions') == 'true', "Falta la agregación del extracto"
+            
+            spec['options'] = {'extract': False}
+            assert TableauExporter().export(spec, filtered)
+            assert ET.parse(filtered).getroot().find('.//extract') is None, "extract=False no debe declarar extracto"
+        
+        print(f"✅ Workbook de Tableau: {len(paths) + len(packaged)} rutas referenciadas existen")
+        
+        return True
+        
+    except Exception as e:
+        print(f"❌ Error en workbook de Tableau: {e}")
+        return False
+
+def test_density_curves():
+    """Prueba la densidad por KDE binned: área, pico de la normal y una curva por grupo"""
+    print("\n📐 Probando curvas de densidad...")
+    
+    try:
+        import numpy as np
+        from chart_maker.core.density import kde
+        from chart_maker.core.vegalite_mapper import chartspec_to_vegalite
+        
+        values = np.random.default_rng(0).normal(0, 1, 10000)
+        grid, densities = kde(values)
+        area = densities[0].sum() * (grid[1] - grid[0])
+        assert abs(area - 1) < 1e-3, f"La densidad debe integrar 1 (integra {area:.4f})"
+        peak = densities[0].max()
+        assert abs(peak - 1 / np.sqrt(2 * np.pi)) < 0.02, f"El pico de la normal estándar debe rondar 0.399 ({peak:.3f})"
+        assert abs(grid[densities[0].argmax()]) < 0.2, "El pico debe quedar cerca de la media"
+        
+        rows = [{'grupo': 'AB'[i % 2], 'valor': float(v)} for i, v in enumerate(values[:500])]
+        vl = chartspec_to_vegalite({
+            'type': 'densidad', 'data': rows,
+            'encoding': {'x': {'field': 'valor', 'type': 'quantitative'},
+                         'color': {'field': 'grupo', 'type': 'nominal'}},
+        })
+        assert vl['encoding']['y']['field'] == 'densidad'
+        assert {row['grupo'] for row in vl['data']['values']} == {'A', 'B'}
+        
+        print(f"✅ Densidad: {len(rows)} filas -> {len(vl['data']['values'])} puntos de curva, pico {peak:.3f}")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Error en densidad: {e}")
+        return False
+
+def test_box_quartiles():
+    """Prueba los cuartiles de las cajas: exactos en memoria y por TDigest en los datos por bloques"""
+    print("\n📦 Probando cuartiles de diagramas de caja...")
+    
+    try:
+        import numpy as np
+        from chart_maker.core.quantiles import TDigest, box_stats, box_stats_chunks
+        
+        values = np.random.default_rng(0).normal(0, 1, 300000)
+        expected = np.percentile(values, [25, 50, 75])
+        
+        merged = TDigest.merge_all([TDigest.from_values(chunk) for chunk in np.array_split(values, 7)])
+        error = np.abs(merged.quantile([0.25, 0.5, 0.75]) - expected).max()
+        assert error < 0.01, f"Los cuartiles del TDigest combinado deben aproximar np.percentile (error {error:.4f})"
+        
+        big = box_stats(values)[0]
+        assert big['exacto'], "Con la columna en memoria los cuartiles deben ser exactos"
+        assert np.allclose([big['q1'], big['mediana'], big['q3']], expected)
+        
+        # Por bloques: TDigest por bloque y grupo, y segunda pasada para bigotes y atípicos
+        groups = np.arange(values.size) % 2
+        chunks = lambda: zip(np.array_split(values, 9), np.array_split(groups, 9))
+        streamed = box_stats_chunks(chunks, 2)
+        for box, exact in zip(streamed, box_stats(values, groups, 2)):
+            assert not box['exacto'] and box['n'] == exact['n'], "Por bloques se cuentan todos los valores"
+            assert np.allclose([box[f] for f in ('bigote_inferior', 'q1', 'mediana', 'q3', 'bigote_superior')],
+                               [exact[f] for f in ('bigote_inferior', 'q1', 'mediana', 'q3', 'bigote_superior')], atol=0.01)
+            assert abs(box['atipicos'] - exact['atipicos']) <= 0.01 * exact['atipicos'] + 5
+        
+        codes = np.arange(values.size) % 3
+        small = box_stats(values[:3000], codes[:3000], 3)
+        for k, box in enumerate(small):
+            group = values[:3000][codes[:3000] == k]
+            assert box['exacto'] and box['n'] == group.size
+            assert np.allclose([box['q1'], box['mediana'], box['q3']], np.percentile(group, [25, 50, 75]))
+        
+        print(f"✅ Cajas: error máximo del TDigest {error:.4f}, {big['atipicos']} atípicos")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Error en cuartiles: {e}")
+        return False
+
+def test_binned_counts():
+    """Prueba que los conteos por bins (1D y 2D) suman las filas y coinciden con np.histogram"""
+    print("\n📊 Probando conteos por bins...")
+    
+    try:
+        import numpy as np
+        from chart_maker.core.aggregation import aggregate_rows
+        from chart_maker.core.binning import histogram
+        from chart_maker.core.examples_new import EXAMPLES
+        from chart_maker.core.vegalite_mapper import chartspec_to_vegalite
+        
+        rng = np.random.default_rng(0)
+        values = rng.normal(0, 1, 10000)
+        values[::97] = np.nan
+        finite = values[np.isfinite(values)]
+        bins, counts = histogram(values, chunk_size=1000)
+        assert counts.sum() == finite.size, "Los conteos deben sumar los valores no nulos"
+        assert np.array_equal(counts, np.histogram(finite, bins.edges())[0]), "Los bins deben coincidir con np.histogram"
+        
+        # Valores justo en bordes decimales: cada uno abre su propio bin
+        decimal = histogram([0.1, 0.2, 0.3, 0.7], {'step': 0.1})[1]
+        assert decimal.tolist() == [1, 1, 1, 0, 0, 0, 1], f"Bins con paso decimal mal asignados: {decimal.tolist()}"
+        rounded = np.round(np.linspace(0, 100, 1001), 1)
+        for step in (0.1, 0.2):
+            fine = histogram(rounded, {'step': step})[0]
+            expected = np.minimum(np.round(rounded * 10).astype(int) // round(step * 10), fine.count - 1)
+            assert np.array_equal(fine.index(rounded), expected), f"Valores redondeados mal asignados con paso {step}"
+        grouped = aggregate_rows([{'v': v} for v in (0.3, 57.3)], [{'field': 'v', 'bin': True}],
+                                 [{'field': None, 'aggregate': 'count'}], {'v': 0.1})
+        assert [round(row['v'], 6) for row in grouped] == [0.3, 57.3], "aggregate_rows debe usar el mismo borde"
+        
+        bars = chartspec_to_vegalite(EXAMPLES['histograma'])['data']['values']
+        assert sum(row['count'] for row in bars) == len(EXAMPLES['histograma'].data)
+        
+        rows = [{'x': float(a), 'y': float(b)} for a, b in rng.normal(size=(3000, 2))]
+        cells = chartspec_to_vegalite({
+            'type': 'mapa_calor', 'data': rows,
+            'encoding': {'x': {'field': 'x', 'type': 'quantitative', 'bin': True},
+                         'y': {'field': 'y', 'type': 'quantitative', 'bin': True},
+                         'color': {'aggregate': 'count', 'type': 'quantitative'}},
+        })['data']['values']
+        assert sum(row['count'] for row in cells) == len(rows), "Las celdas 2D deben sumar las filas"
+        
+        print(f"✅ Bins: {bins.count} bins 1D, {len(cells)} celdas 2D")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Error en bins: {e}")
+        return False
+
+def test_correlation_matrix():
+    """Prueba las matrices de correlación por bloques frente a np.corrcoef (Pearson y Spearman)"""
+    print("\n🔗 Probando matrices de correlación...")
+    
+    try:
+        import numpy as np
+        from chart_maker.core.correlation import correlation_matrices
+        
+        rng = np.random.default_rng(0)
+        values = rng.normal(0, 1, 10000)
+        table = np.column_stack([values, values * 2 + np.sin(values), np.cos(values), rng.normal(size=values.size)])
+        chunks = lambda: (table[i:i + 1000] for i in range(0, len(table), 1000))
+        ranks = np.argsort(np.argsort(table, axis=0), axis=0)
+        
+        exact = correlation_matrices(chunks, 4, exact=True)
+        assert np.allclose(exact['pearson'], np.corrcoef(table, rowvar=False)), "Pearson por bloques debe coincidir con corrcoef"
+        assert np.allclose(exact['spearman'], np.corrcoef(ranks, rowvar=False)), "Spearman exacto debe ser corrcoef de los rangos"
+        assert (exact['counts'] == len(table)).all(), "Cada par debe contar todas las filas"
+        
+        approx = correlation_matrices(chunks, 4, ('spearman',))['spearman']
+        error = np.abs(approx - np.corrcoef(ranks, rowvar=False)).max()
+        assert error < 1e-3, f"Spearman con TDigest debe aproximar el exacto (error {error:.5f})"
+        
+        print(f"✅ Correlación por bloques: r(0,1) = {exact['pearson'][0, 1]:.3f}, error Spearman {error:.5f}")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Error en correlación: {e}")
+        return False
+
+def test_topojson_arcs():
+    """Prueba que GeoJSON -> TopoJSON comparte los lados comunes y que los arcos reconstruyen los polígonos"""
+    print("\n🗺️ Probando conversión a TopoJSON...")
+    
+    try:
+        import numpy as np
+        from chart_maker.core.topology import OBJECT_NAME, geojson_to_topology
+        
+        def squares(n):
+            return {'type': 'FeatureCollection', 'features': [
+                {'type': 'Feature', 'properties': {'id': i},
+                 'geometry': {'type': 'Polygon', 'coordinates': [[[i, 0], [i + 1, 0], [i + 1, 1], [i, 1], [i, 0]]]}}
+                for i in range(n)
+            ]}
+        
+        assert len(geojson_to_topology(squares(2))['arcs']) == 3, "El lado común de dos regiones debe guardarse una sola vez"
+        
+        # Tres cuadrados en fila: 2 lados comunes, 2 contornos exteriores y los bordes del central partidos en 2
+        geojson = squares(3)
+        topology = geojson_to_topology(geojson)
+        assert len(topology['arcs']) == 6, f"Se esperaban 6 arcos, hay {len(topology['arcs'])}"
+        
+        # Ida y vuelta: decodificar los arcos (deltas + transform) y rehacer cada anillo
+        scale, translate = topology['transform']['scale'], topology['transform']['translate']
+        arcs = [np.cumsum(arc, axis=0) * scale + translate for arc in topology['arcs']]
+        geometries = topology['objects'][OBJECT_NAME]['geometries']
+        for geometry, feature in zip(geometries, geojson['features']):
+            ring = []
+            for ref in geometry['arcs'][0]:
+                arc = arcs[ref] if ref >= 0 else arcs[~ref][::-1]
+                ring.extend((arc[1:] if ring else arc).tolist())
+            original = feature['geometry']['coordinates'][0]
+            assert np.allclose(ring[0], ring[-1]), "El anillo reconstruido debe cerrarse"
+            assert len(ring) == len(original), "El anillo debe conservar sus vértices"
+            assert {tuple(np.round(p, 9)) for p in ring} == {tuple(p) for p in original}
+            assert geometry['properties'] == feature['properties']
+        
+        # Coropleta: sum se precalcula por región; median no se acumula y no debe fallar
+        from chart_maker.core.transforms import precompute
+        spec = {'type': 'mapa_coropletico', 'options': {'geojson': geojson, 'featureKey': 'id'},
+                'data': [{'id': i % 3, 'valor': float(i)} for i in range(30)],
+                'encoding': {'region': {'field': 'id', 'type': 'nominal'},
+                             'color': {'field': 'valor', 'type': 'quantitative', 'aggregate': 'sum'}}}
+        assert precompute(spec) is not None, "La coropleta con sum debe precalcularse"
+        spec['encoding']['color']['aggregate'] = 'median'
+        assert precompute(spec) is None, "Un agregado no acumulable debe dejar el mapa sin precálculo"
+        
+        print(f"✅ TopoJSON: {len(topology['arcs'])} arcos para {len(geometries)} regiones")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Error en TopoJSON: {e}")
+        return False
+
+def test_viewport_points():
+    """Prueba que los mapas de puntos sólo envían (o agregan) los puntos dentro de la vista"""
+    print("\n📍 Probando recorte de puntos por vista...")
+    
+    try:
+        import numpy as np
+        from chart_maker.core.spatial import SpatialIndex
+        from chart_maker.core.vegalite_mapper import chartspec_to_vegalite
+        
+        points = np.random.default_rng(1).uniform(0, 10, (20000, 2))
+        index = SpatialIndex(points[:, 0], points[:, 1])
+        inside = np.flatnonzero((points >= 2).all(axis=1) & (points <= 4).all(axis=1))
+        assert np.array_equal(index.query((2, 2, 4, 4)), inside), "La consulta por rectángulo debe coincidir con el filtro"
+        
+        rows = [{'lon': float(lon), 'lat': float(lat)} for lon, lat in points[:3000]]
+        expected = [row for row in rows if 2 <= row['lon'] <= 4 and 2 <= row['lat'] <= 4]
+        spec = {
+            'type': 'mapa_puntos', 'data': rows,
+            'encoding': {'longitude': {'field': 'lon', 'type': 'quantitative'},
+                         'latitude': {'field': 'lat', 'type': 'quantitative'}},
+            'options': {'viewport': [2, 2, 4, 4]},
+        }
+        visible = chartspec_to_vegalite(spec)['data']['values']
+        assert visible == expected, f"Se esperaban {len(expected)} puntos en la vista, llegaron {len(visible)}"
+        
+        spec['options']['maxPoints'] = 10
+        cells = chartspec_to_vegalite(spec)['data']['values']
+        assert sum(row['count'] for row in cells) == len(expected), "Las celdas sólo deben contar los puntos de la vista"
+        
+        print(f"✅ Vista: {len(visible)} de {len(rows)} puntos, {len(cells)} celdas al agregar")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Error en recorte por vista: {e}")
+        return False
+
+def test_trend_fit():
+    """Prueba los ajustes de la línea de tendencia frente a np.polyfit, por grupo"""
+    print("\n📈 Probando ajuste de líneas de tendencia...")
+    
+    try:
+        import numpy as np
+        from chart_maker.core.smoothing import smooth
+        
+        rng = np.random.default_rng(0)
+        x = rng.uniform(0, 10, 2000)
+        codes = np.arange(x.size) % 2
+        y = np.where(codes == 0, 3 * x - 2, -x + 5) + rng.normal(0, 1, x.size)
+        
+        grid, fit, band = smooth(x, y, codes, 2, method='linear')
+        for k in range(2):
+            line = np.polyfit(x[codes == k], y[codes == k], 1)
+            assert np.allclose(fit[k], np.polyval(line, grid[k])), f"El ajuste lineal del grupo {k} debe coincidir con polyfit"
+        assert (band > 0).all(), "La banda de confianza debe tener anchura"
+        
+        curve = 0.5 * x ** 2 - x + rng.normal(0, 1, x.size)
+        grid, fit, _ = smooth(x, curve, method='poly', degree=2)
+        assert np.allclose(fit[0], np.polyval(np.polyfit(x, curve, 2), grid[0])), "El ajuste cuadrático debe coincidir con polyfit"
+        
+        print(f"✅ Línea de tendencia: {fit.shape[1]} puntos de curva por grupo")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Error en línea de tendencia: {e}")
+        return False
+
+def test_time_resample():
+    """Prueba el remuestreo temporal: cubetas de calendario y sumas por cubeta"""
+    print("\n🕒 Probando remuestreo de series temporales...")
+    
+    try:
+        import numpy as np
+        from chart_maker.core.timeseries import floor_times, format_times, parse_times
+        from chart_maker.core.vegalite_mapper import chartspec_to_vegalite
+        
+        times = parse_times(['2023-05-17', '17/05/2023 10:30', '2023-01-01T00:00:00Z'])
+        quarters = format_times(floor_times(times, 'quarter'), 'quarter')
+        assert quarters == ['2023-04', '2023-04', '2023-01'], "Los trimestres deben seguir el calendario"
+        
+        days = np.arange('2023-01-01', '2024-01-01', dtype='datetime64[D]')
+        rows = [{'fecha': str(day), 'ventas': float(i % 7 + j)} for i, day in enumerate(days) for j in range(2)]
+        expected = {}
+        for row in rows:
+            expected[row['fecha'][:7]] = expected.get(row['fecha'][:7], 0) + row['ventas']
+        spec = {
+            'type': 'lineas', 'data': rows,
+            'encoding': {'x': {'field': 'fecha', 'type': 'temporal'},
+                         'y': {'field': 'ventas', 'type': 'quantitative', 'aggregate': 'sum'}},
+            'options': {'resample': 'month'},
+        }
+        months = chartspec_to_vegalite(spec)['data']['values']
+        assert {row['fecha']: row['sum_ventas'] for row in months} == expected, "Cada mes debe sumar sus filas"
+        
+        spec['options']['resample'] = 'week'
+        weeks = chartspec_to_vegalite(spec)['data']['values']
+        assert sum(row['sum_ventas'] for row in weeks) == sum(row['ventas'] for row in rows), "Las semanas deben repartir el total"
+        
+        # Sin agregado, el remuestreo automático promedia: una serie constante no cambia
+        constant = [{'fecha': str(day), 'temp': 20.0} for day in days]
+        auto = chartspec_to_vegalite({
+            'type': 'lineas', 'data': constant, 'options': {'width': 400},
+            'encoding': {'x': {'field': 'fecha', 'type': 'temporal'},
+                         'y': {'field': 'temp', 'type': 'quantitative'}},
+        })['data']['values']
+        assert len(auto) < len(constant), "Un año diario en 400 px debe remuestrearse"
+        assert {row['mean_temp'] for row in auto} == {20.0}, "Remuestrear una serie constante no debe cambiar sus valores"
+        
+        print(f"✅ Series temporales: {len(rows)} filas -> {len(months)} meses, {len(weeks)} semanas")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Error en remuestreo: {e}")
+        return False
+
+def test_shared_columns():
+    """Prueba las filas columnares del bloque compartido: mismas filas y mismo gráfico que los dicts"""
+    print("\n🧩 Probando filas columnares en memoria compartida...")
+    
+    try:
+        import pickle
+        from chart_maker.core import transforms
+        from chart_maker.core.shared_data import ColumnarRows, SharedDataset
+        from chart_maker.core.spec import ChartSpec
+        from chart_maker.core.vegalite_mapper import chartspec_to_vegalite
+        
+        data = [{'region': ['Norte', 'Sur', 'Este'][i % 3], 'ventas': float(i % 17), 'unidades': i}
+                for i in range(10000)]
+        data[5]['ventas'] = None
+        with SharedDataset.publish(data) as dataset:
+            rows = dataset.rows()
+            assert isinstance(rows, ColumnarRows) and len(rows) == len(data), "rows() debe dar una fila por registro"
+            assert list(rows) == dataset.records(), "Las filas columnares deben coincidir con records()"
+            assert rows[-1] == dataset.records()[-1] and list(rows[10:13]) == dataset.records()[10:13], "Índices y cortes deben funcionar"
+            assert pickle.loads(pickle.dumps(rows)) == dataset.records(), "Con pickle debe viajar como lista de dicts"
+            
+            labels, codes = rows.codes('region')
+            assert labels == ['Norte', 'Sur', 'Este'] and codes[:4].tolist() == [0, 1, 2, 0], "codes() debe seguir el orden de aparición"
+            
+            spec = ChartSpec(type='histograma', data=rows,
+                             encoding={'x': {'field': 'ventas', 'type': 'quantitative', 'bin': True}})
+            assert spec.data is rows, "El spec no debe copiar las filas"
+            for chart_type, encoding in (
+                ('histograma', {'x': {'field': 'ventas', 'type': 'quantitative', 'bin': True}}),
+                ('barras_vertical', {'x': {'field': 'region', 'type': 'nominal'},
+                                     'y': {'field': 'ventas', 'type': 'quantitative', 'aggregate': 'sum'}}),
+                ('caja', {'x': {'field': 'region', 'type': 'nominal'},
+                          'y': {'field': 'unidades', 'type': 'quantitative'}}),
+            ):
+                columnar = chartspec_to_vegalite({'type': chart_type, 'data': rows, 'encoding': encoding})
+                transforms.CACHE.clear()
+                records = chartspec_to_vegalite({'type': chart_type, 'data': dataset.records(), 'encoding': encoding})
+                assert columnar == records, f"{chart_type}: el gráfico debe ser igual con columnas o dicts"
+        
+        print(f"✅ Filas columnares: {len(data)} filas sin copiar, mismo Vega-Lite que los dicts")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Error en filas columnares: {e}")
+        return False
+
 def main():
     """Función principal de pruebas"""
     print("🚀 Iniciando pruebas del Creador de Gráficos...\n")
@@ -141,7 +714,21 @@ def main():
         test_core_functionality,
         test_exporters,
         test_gui_imports,
-        test_data_processing
+        test_data_processing,
+        test_lookml_export,
+        test_dataset_registry,
+        test_dax_measures,
+        test_powerbi_python_scripts,
+        test_tableau_workbook_paths,
+        test_density_curves,
+        test_box_quartiles,
+        test_binned_counts,
+        test_correlation_matrix,
+        test_topojson_arcs,
+        test_viewport_points,
+        test_trend_fit,
+        test_time_resample,
+        test_shared_columns
     ]
     
     passed = 0